@@ -146,10 +146,19 @@ CONFIGURATION = {
     'auto_secondary': (False, None, None),
     'auto_bonds': (False, None, None),
     'selection_warning': (True, None, None),
+    'selection_cache_size': (256, None, None),
     'verbosity': ('debug', list(utilities.LOGGING_LEVELS),
                   LOGGER._setverbosity),
     'pdb_mirror_path': ('', None, proteins.pathPDBMirror),
     'local_pdb_folder': ('', None, proteins.pathPDBFolder),
+    'enm_cache': (False, None, None),
+    'enm_cache_path': ('', None, None),
+    'enm_cache_size': (1024, None, None),
+    'structure_cache': (False, None, None),
+    'structure_cache_path': ('', None, None),
+    'structure_cache_size': (1024, None, None),
+    'pdb_index': (False, None, None),
+    'pdb_index_path': ('', None, None),
 }
 
 
@@ -447,6 +447,7 @@ import numpy as np
 from numpy import array, ndarray, ones, zeros, arange
 from numpy import invert, unique, concatenate, all, any
 from numpy import logical_and, logical_or, floor, ceil, where
+from collections import OrderedDict
 
 try:
     from . import pyparsing as pp
@@ -497,6 +498,8 @@ ATOMGROUP = None
 
 MACROS = SETTINGS.get('selection_macros', {})
 MACROS_REGEX = None
+# incremented when macros change, so that compiled selections are dropped
+MACROS_STAMP = 0
 
 
 def isSelectionMacro(word):
@@ -517,6 +520,8 @@ def defSelectionMacro(name, selstr):
 
        defSelectionMacro('cbeta', 'name CB and protein')"""
 
+    global MACROS_STAMP
+
     if not isinstance(name, str) or not isinstance(selstr, str):
         raise TypeError('both name and selstr must be strings')
     elif isReserved(name):
@@ -535,6 +540,7 @@ def defSelectionMacro(name, selstr):
     else:
         LOGGER.info("Macro {0} is defined as {1}."
                     .format(repr(name), repr(selstr)))
+        MACROS_STAMP += 1
         MACROS[name] = selstr
         SETTINGS['selection_macros'] = MACROS
         SETTINGS.save()
@@ -547,11 +553,14 @@ def delSelectionMacro(name):
 
        delSelectionMacro('cbeta')"""
 
+    global MACROS_STAMP
+
     try:
         MACROS.pop(name)
     except:
         LOGGER.warn("Macro {0} is not found.".format(repr(name)))
     else:
+        MACROS_STAMP += 1
         if MACROS_REGEX is not None: MACROS_REGEX.pop(name, None)
         LOGGER.info("Macro {0} is deleted.".format(repr(name)))
         SETTINGS['selection_macros'] = MACROS
@@ -804,6 +813,41 @@ PP_NRANGE.setParseAction(rangeParseAction)
 UNARY = set(['not', 'bonded', 'exbonded', 'within', 'exwithin', 'same'])
 
 
+class Step(object):
+
+    """A node of a compiled selection.  Calling *method* of :class:`Select`
+    with *tokens*, after nested steps are evaluated, evaluates the node."""
+
+    __slots__ = ['method', 'loc', 'tokens']
+
+    def __init__(self, method, loc, tokens):
+
+        self.method = method
+        self.loc = loc
+        self.tokens = tokens
+
+    def __repr__(self):
+
+        return 'Step({0}, {1}, {2})'.format(repr(self.method), self.loc,
+                                            repr(self.tokens))
+
+
+def listTokens(tokens):
+    """Returns *tokens* with parse results converted to nested lists."""
+
+    return [listTokens(tkn) if isinstance(tkn, pp.ParseResults) else tkn
+            for tkn in tokens]
+
+
+def deferAction(method):
+    """Returns a parse action that records a call to *method* as a
+    :class:`Step`, instead of evaluating it."""
+
+    def action(sel, loc, tokens):
+        return Step(method, loc, listTokens(tokens))
+    return action
+
+
 class Select(object):
 
     """Select subsets of atoms based on a selection string.
@@ -826,7 +870,11 @@ class Select(object):
         self._replace = False
 
         self._parsers = {}
-
+        # compiled selection strings, least recently used first
+        self._plans = OrderedDict()
+        self._stamp = MACROS_STAMP
+        self._hits = 0
+        self._misses = 0
 
         self._evalmap = {'resnum': self._resnum, 'resid': self._resnum,
             'serial': self._serial, 'index': self._index,
@@ -995,13 +1043,74 @@ class Select(object):
                 raise SelectionError(selstr, 0, 'is not a valid selection or '
                                      'user data label')
 
+        sel, step = self._getPlan(selstr)
+        torf = self._evalStep(sel, step)
+        if DEBUG: print('_evalSelstr', torf)
+
+        if not isinstance(torf, ndarray):
+            if DEBUG: print(torf)
+            raise SelectionError(sel)
+        elif torf.dtype != bool:
+            if DEBUG:
+                print('_select torf.dtype', torf.dtype, isinstance(torf.dtype,
+                                                                   bool))
+            raise SelectionError(sel)
+        if DEBUG:
+            print('_select', torf)
+        return torf
+
+    def getCacheInfo(self):
+        """Returns a dictionary with the number of compiled selection string
+        lookups that were found in the cache (``'hits'``) and that required
+        parsing (``'misses'``), and the number of cached strings
+        (``'size'``).  Maximum number of cached strings is set using
+        :func:`.confProDy`, e.g. ``confProDy(selection_cache_size=256)``."""
+
+        return {'hits': self._hits, 'misses': self._misses,
+                'size': len(self._plans),
+                'maxsize': SETTINGS.get('selection_cache_size', 256)}
+
+    def clearCache(self):
+        """Clear compiled selection strings and cache statistics."""
+
+        self._plans.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def _getPlan(self, selstr):
+        """Returns selection string after macro replacement and its compiled
+        :class:`Step` tree.  Compiled strings are cached, so that repeated
+        selections skip parsing and only evaluate the tree."""
+
+        plans = self._plans
+        if self._stamp != MACROS_STAMP:
+            plans.clear()
+            self._stamp = MACROS_STAMP
+
+        try:
+            plan = plans.pop(selstr)
+        except KeyError:
+            self._misses += 1
+            plan = self._compile(selstr)
+        else:
+            self._hits += 1
+
+        maxsize = SETTINGS.get('selection_cache_size', 256)
+        if maxsize > 0:
+            plans[selstr] = plan
+            while len(plans) > maxsize:
+                plans.popitem(last=False)
+        return plan
+
+    def _compile(self, selstr):
+        """Parse *selstr* into a tree of :class:`Step` instances."""
+
         selstr = replaceMacros(selstr)
         try:
             parser = self._getParser(selstr)
             tokens = parser(selstr, parseAll=True)
         except pp.ParseException as err:
             self._parsers.pop(self._parser, None)
-            pass
             which = selstr.rfind(' ', 0, err.column)
             if which > -1:
                 if selstr[which + 1] == '(':
@@ -1017,20 +1126,21 @@ class Select(object):
 
             raise SelectionError(selstr, err.column, msg + '\n' + str(err))
         else:
-            if DEBUG: print('_evalSelstr', tokens)
-            torf = tokens[0]
+            if DEBUG: print('_compile', tokens)
+            return selstr, tokens[0]
 
-        if not isinstance(torf, ndarray):
-            if DEBUG: print(torf)
-            raise SelectionError(selstr)
-        elif torf.dtype != bool:
-            if DEBUG:
-                print('_select torf.dtype', torf.dtype, isinstance(torf.dtype,
-                                                                   bool))
-            raise SelectionError(selstr)
-        if DEBUG:
-            print('_select', torf)
-        return torf
+    def _evalStep(self, sel, step):
+        """Evaluate *step* for current atoms, nested steps first."""
+
+        return getattr(self, step.method)(sel, step.loc,
+                                          self._evalTokens(sel, step.tokens))
+
+    def _evalTokens(self, sel, tokens):
+        """Returns a copy of *tokens* with nested steps evaluated."""
+
+        return [self._evalStep(sel, tkn) if isinstance(tkn, Step) else
+                (self._evalTokens(sel, tkn) if isinstance(tkn, list) else
+                 tkn) for tkn in tokens]
 
     def _getParser(self, selstr):
         """Returns an efficient parser that can handle *selstr*."""
@@ -1069,22 +1179,23 @@ class Select(object):
 
         oplist = []
         if funcs:
-            oplist.append((FUNCNAMES_OPLIST, 1, pp.opAssoc.RIGHT, self._func))
+            oplist.append((FUNCNAMES_OPLIST, 1, pp.opAssoc.RIGHT,
+                           deferAction('_func')))
             # following causes 20% slow down
             #word += FUNCNAMES_EXPR
 
         if funcs or opers:
             oplist.extend([
-                (pp.oneOf('+ -'), 1, pp.opAssoc.RIGHT, self._sign),
-                (pp.oneOf('** ^'), 2, pp.opAssoc.LEFT, self._pow),
-                (pp.oneOf('* / %'), 2, pp.opAssoc.LEFT, self._binop),
-                (pp.oneOf('+ -'), 2, pp.opAssoc.LEFT, self._binop),
+                (pp.oneOf('+ -'), 1, pp.opAssoc.RIGHT, deferAction('_sign')),
+                (pp.oneOf('** ^'), 2, pp.opAssoc.LEFT, deferAction('_pow')),
+                (pp.oneOf('* / %'), 2, pp.opAssoc.LEFT, deferAction('_binop')),
+                (pp.oneOf('+ -'), 2, pp.opAssoc.LEFT, deferAction('_binop')),
                 (pp.oneOf('< > <= >= == = !='), 2, pp.opAssoc.LEFT,
-                 self._comp)])
+                 deferAction('_comp'))])
 
         oplist.extend([
-          (pp.Optional(AND), 2, pp.opAssoc.LEFT, self._and),
-          (OR, 2, pp.opAssoc.LEFT, self._or)])
+          (pp.Optional(AND), 2, pp.opAssoc.LEFT, deferAction('_and')),
+          (OR, 2, pp.opAssoc.LEFT, deferAction('_or'))])
 
         word += WORD
 
@@ -1094,7 +1205,7 @@ class Select(object):
         if nrange: expr = PP_NRANGE | expr
 
         parser = pp.operatorPrecedence(expr, oplist)
-        parser.setParseAction(self._default)
+        parser.setParseAction(deferAction('_default'))
         parser.leaveWhitespace()
         parser.enablePackrat()
         self._parsers[key] = parser, expr, oplist
@@ -1103,7 +1214,7 @@ class Select(object):
     def _noParser(self, selstr, parseAll=True):
 
         debug(selstr, 0, ['_noParser'])
-        return [self._default(selstr, 0, selstr.split())]
+        return [Step('_default', 0, selstr.split())]
 
     def _getZeros(self, subset=None):
         """Returns a bool array with zero elements."""
@@ -1633,14 +1744,9 @@ class Select(object):
 
         if other or len(which) < 20:
             kdtree = self._atoms._getKDTree()
-            get_indices = kdtree.getIndices
-            search = kdtree.search
-            get_count = kdtree.getCount
             torf = zeros(self._ag.numAtoms(), bool)
-            for index in which:
-                search(within, coords[index])
-                if get_count():
-                    torf[get_indices()] = True
+            _, indices, _ = kdtree.searchCenters(within, coords[which])
+            torf[indices] = True
             if self._indices is not None:
                 torf = torf[self._indices]
             if exclude:
@@ -1653,18 +1759,10 @@ class Select(object):
             check = torf.nonzero()[0]
             torf = zeros(n_atoms, bool)
 
-            cxyz = coords[check]
             kdtree = KDTree(coords[which])
-            search = kdtree.search
-            get_count = kdtree.getCount
-            select = []
-            append = select.append
-            for i, xyz in enumerate(cxyz):
-                search(within, xyz)
-                if get_count():
-                    append(i)
-
-            torf[check[select]] = True
+            offsets, _, _ = kdtree.searchCenters(within, coords[check])
+            torf[check[offsets[1:] > offsets[:-1]]] = True
+
             if not exclude:
                 torf[which] = True
 
@@ -36,6 +36,16 @@ calculations:
   * :class:`.GammaStructureBased` - secondary structure based force constants
   * :class:`.GammaVariableCutoff` - atom type based variable cutoff function
 
+Eigensolvers
+============
+
+Following classes are used for diagonalizing Kirchhoff and Hessian matrices,
+and are selected automatically based on the size and sparsity of the matrix:
+
+  * :class:`.DenseEigSolver` - LAPACK solver for dense matrices
+  * :class:`.LanczosEigSolver` - shift-invert Lanczos solver
+  * :class:`.LOBPCGEigSolver` - preconditioned LOBPCG solver
+
 Function library
 ================
 
@@ -121,6 +131,13 @@ using the following functions:
   * :func:`.loadModel`, :func:`.saveModel` - load/save dynamics models
   * :func:`.loadVector`, :func:`.saveVector` - load/save modes or vectors
 
+Modes calculated by :func:`.calcANM`, :func:`.calcGNM`, and :func:`.calcENM`
+can be cached on disk by setting ``confProDy(enm_cache=True)``, see
+:mod:`.enmcache`:
+
+  * :func:`.pathENMCache` - path to the cache folder
+  * :func:`.clearENMCache` - remove all cached models
+
 
 Short-hand functions
 ====================
@@ -208,6 +225,10 @@ from . import functions
 from .functions import *
 __all__.extend(functions.__all__)
 
+from . import enmcache
+from .enmcache import *
+__all__.extend(enmcache.__all__)
+
 from . import perturb
 from .perturb import *
 __all__.extend(perturb.__all__)
@@ -253,6 +274,10 @@ from . import gnm
 from .gnm import *
 __all__.extend(gnm.__all__)
 
+from . import eigsolvers
+from .eigsolvers import *
+__all__.extend(eigsolvers.__all__)
+
 from . import pca
 from .pca import *
 __all__.extend(pca.__all__)
@@ -2,8 +2,6 @@
 """This module defines functions for calculating physical properties from normal
 modes."""
 
-import time
-
 import numpy as np
 
 from prody import LOGGER
@@ -27,6 +25,8 @@ __all__ = ['calcCollectivity', 'calcCovariance', 'calcCrossCorr',
            'calcDistFlucts']
            #'calcEntropyTransfer', 'calcOverallNetEntropyTransfer']
 
+BLOCK_ELEMENTS = 2 ** 22
+
 def calcCollectivity(mode, masses=None, is3d=None):
     """Returns collectivity of the mode.  This function implements collectivity
     as defined in equation 5 of [BR95]_.  If *masses* are provided, they will
@@ -180,10 +180,7 @@ def calcProjection(ensemble, modes, rmsd=True, norm=True):
     elif isinstance(ensemble, (Ensemble, Conformation)):
         deviations = ensemble.getDeviations()
     else:
-        nfi = ensemble.nextIndex()
-        ensemble.goto(0)
-        deviations = np.array([frame.getDeviations() for frame in ensemble])
-        ensemble.goto(nfi)
+        return _calcTrajProjection(ensemble, modes, rmsd, norm)
     if deviations.ndim == 3:
         deviations = deviations.reshape((deviations.shape[0],
                                          deviations.shape[1] * 3))
@@ -202,6 +199,31 @@ def calcProjection(ensemble, modes, rmsd=True, norm=True):
     return projection
 
 
+def _calcTrajProjection(traj, modes, rmsd=True, norm=True):
+    """Returns projection of deviations of trajectory frames from reference
+    coordinates onto *modes*.  Frames are read in chunks, and norm of all
+    deviations is accumulated to normalize projections at the end."""
+
+    n_atoms = traj.numSelected()
+    array = modes._getArray()
+    ref = traj._getCoords()
+    nfi = traj.nextIndex()
+    traj.goto(0)
+    projection = []
+    sqsum = 0
+    for coords, _, _ in traj.iterChunks():
+        deviations = (coords - ref).reshape((len(coords), n_atoms * 3))
+        sqsum += (deviations ** 2).sum()
+        projection.append(np.dot(deviations, array))
+    traj.goto(nfi)
+    projection = np.concatenate(projection)
+    if norm and sqsum != 0:
+        projection /= sqsum ** 0.5
+    if rmsd:
+        projection = (1 / (n_atoms ** 0.5)) * projection
+    return projection
+
+
 def calcCrossProjection(ensemble, mode1, mode2, scale=None, **kwargs):
     """Returns projection of conformational deviations onto modes from
     different models.
@@ -284,7 +306,7 @@ def _getModeProperties(modes):
                                 'not {0}'.format(type(mode)))
             V.append(mode._getArray())
             if isinstance(mode, Mode):
-                W.append(modes.getVariance())
+                W.append(mode.getVariance())
             else:
                 W.append(1.)
             if is3d is None:
@@ -322,21 +344,109 @@ def calcSqFlucts(modes):
     return sq_flucts
 
 
-def calcCrossCorr(modes, n_cpu=1, norm=True):
+def _getModeWeights(modes):
+    """Returns eigenvector array, variances as a 1-d array, whether modes are
+    3-d, and number of atoms."""
+
+    if isinstance(modes, (NMA, ModeSet)):
+        return (modes._getArray(), np.asarray(modes.getVariances(), float),
+                modes.is3d(), modes.numAtoms())
+    V, W, is3d, n_atoms = _getModeProperties(modes)
+    return V, np.diag(W).astype(float), is3d, n_atoms
+
+
+def _calcWeightedGram(X, weights, n_cpu=1, out=None, norm=False, **kwargs):
+    """Returns ``(X * weights).dot(X.T)`` calculated in blocks of rows.
+    Blocks are distributed to a pool of *n_cpu* threads, which run BLAS
+    on the shared input and write into *out*.  Only one temporary array
+    with the size of a block is allocated per thread.  When *norm* is
+    **True**, the result is normalized by the square-root of its diagonal.
+
+    :arg out: an array, e.g. a :class:`numpy.memmap`, to write the result
+    :type out: :class:`numpy.ndarray`
+
+    :arg blocksize: number of rows in a block, by default blocks have
+        about 4 million elements
+    :type blocksize: int"""
+
+    n = X.shape[0]
+    if out is None:
+        out = np.empty((n, n))
+    elif not isinstance(out, np.ndarray):
+        raise TypeError('out must be a Numpy array')
+    elif out.shape != (n, n):
+        raise ValueError('out.shape must be ({0}, {0})'.format(n))
+
+    Xw = X * weights
+    XT = X.T
+    if norm:
+        scale = np.sqrt((X * Xw).sum(1))
+
+    blocksize = kwargs.get('blocksize')
+    if blocksize is None:
+        blocksize = max(1, BLOCK_ELEMENTS // max(n, 1))
+    blocksize = int(blocksize)
+    if blocksize < 1:
+        raise ValueError('blocksize must be a positive integer')
+
+    def calcBlock(start):
+        stop = min(start + blocksize, n)
+        block = np.dot(Xw[start:stop], XT)
+        if norm:
+            block = div0(block, np.outer(scale[start:stop], scale))
+        out[start:stop] = block
+
+    _mapBlocks(calcBlock, range(0, n, blocksize), n_cpu)
+    return out
+
+
+def _mapBlocks(func, starts, n_cpu=1):
+    """Call *func* for each block start, using a pool of *n_cpu* threads
+    when more than one is requested."""
+
+    if n_cpu == 1 or len(starts) == 1:
+        for start in starts:
+            func(start)
+    else:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(n_cpu, len(starts)))
+        try:
+            pool.map(func, starts)
+        finally:
+            pool.close()
+            pool.join()
+
+
+def _checkNCPU(n_cpu):
+
+    if not isinstance(n_cpu, int):
+        raise TypeError('n_cpu must be an integer')
+    elif n_cpu < 1:
+        raise ValueError('n_cpu must be equal to or greater than 1')
+
+
+def calcCrossCorr(modes, n_cpu=1, norm=True, **kwargs):
     """Returns cross-correlations matrix.  For a 3-d model, cross-correlations
     matrix is an NxN matrix, where N is the number of atoms.  Each element of
     this matrix is the trace of the submatrix corresponding to a pair of atoms.
     Covariance matrix may be calculated using all modes or a subset of modes
     of an NMA instance.  For large systems, calculation of cross-correlations
     matrix may be time consuming.  Optionally, multiple processors may be
-    employed to perform calculations by passing ``n_cpu=2`` or more."""
+    employed to perform calculations by passing ``n_cpu=2`` or more.
 
-    if not isinstance(n_cpu, int):
-        raise TypeError('n_cpu must be an integer')
-    elif n_cpu < 1:
-        raise ValueError('n_cpu must be equal to or greater than 1')
+    The matrix is calculated in blocks of rows, which are distributed to
+    *n_cpu* threads.  Result can be written into a given array, such as a
+    :class:`numpy.memmap`, to avoid holding the matrix in memory.
+
+    :arg out: an NxN array for writing the result
+    :type out: :class:`numpy.ndarray`
+
+    :arg blocksize: number of rows calculated at a time
+    :type blocksize: int"""
 
-    if not isinstance(modes, (Mode, NMA, ModeSet)):
+    _checkNCPU(n_cpu)
+
+    if not isinstance(modes, (VectorBase, NMA, ModeSet)):
         if isinstance(modes, list):
             try:
                 is3d = modes[0].is3d()
@@ -346,72 +456,18 @@ def calcCrossCorr(modes, n_cpu=1, norm=True):
         else:
             raise TypeError('modes must be a Mode, NMA, or ModeSet instance, '
                             'not {0}'.format(type(modes)))
-    else:
-        is3d = modes.is3d()
-    if is3d:
-        model = modes
-        if isinstance(modes, (Mode, ModeSet)):
-            model = modes._model
-            if isinstance(modes, (Mode)):
-                indices = [modes.getIndex()]
-                n_modes = 1
-            else:
-                indices = modes.getIndices()
-                n_modes = len(modes)
-        else:
-            n_modes = len(modes)
-            indices = np.arange(n_modes)
-        array = model._getArray()
-        n_atoms = model._n_atoms
-        variances = model._vars
-        if n_cpu == 1:
-            s = (n_modes, n_atoms, 3)
-            arvar = (array[:, indices]*variances[indices]).T.reshape(s)
-            array = array[:, indices].T.reshape(s)
-            covariance = np.tensordot(array.transpose(2, 0, 1),
-                                      arvar.transpose(0, 2, 1),
-                                      axes=([0, 1], [1, 0]))
-        else:
-            import multiprocessing
-            n_cpu = min(multiprocessing.cpu_count(), n_cpu)
-            queue = multiprocessing.Queue()
-            size = n_modes / n_cpu
-            for i in range(n_cpu):
-                if n_cpu - i == 1:
-                    indices = modes.indices[i*size:]
-                else:
-                    indices = modes.indices[i*size:(i+1)*size]
-                process = multiprocessing.Process(
-                    target=_crossCorrelations,
-                    args=(queue, n_atoms, array, variances, indices))
-                process.start()
-            while queue.qsize() < n_cpu:
-                time.sleep(0.05)
-            covariance = queue.get()
-            while queue.qsize() > 0:
-                covariance += queue.get()
-    else:
-        covariance = calcCovariance(modes)
-    if norm:
-        diag = np.power(covariance.diagonal(), 0.5)
-        D = np.outer(diag, diag)
-        covariance = div0(covariance, D)
-    return covariance
 
+    array, variances, is3d, n_atoms = _getModeWeights(modes)
+    if is3d:
+        # (3N, M) -> (N, 3M), so that trace of each 3x3 block is a dot product
+        n_modes = array.shape[1]
+        array = np.ascontiguousarray(array).reshape((n_atoms, 3 * n_modes))
+        variances = np.tile(variances, 3)
+    return _calcWeightedGram(array, variances, n_cpu=n_cpu, norm=norm,
+                             **kwargs)
 
-def _crossCorrelations(queue, n_atoms, array, variances, indices):
-    """Calculate covariance-matrix for a subset of modes."""
-
-    n_modes = len(indices)
-    arvar = (array[:, indices] * variances[indices]).T.reshape((n_modes,
-                                                                n_atoms, 3))
-    array = array[:, indices].T.reshape((n_modes, n_atoms, 3))
-    covariance = np.tensordot(array.transpose(2, 0, 1),
-                              arvar.transpose(0, 2, 1),
-                              axes=([0, 1], [1, 0]))
-    queue.put(covariance)
 
-def calcDistFlucts(modes, n_cpu=1, norm=True):
+def calcDistFlucts(modes, n_cpu=1, norm=True, **kwargs):
     """Returns the matrix of distance fluctuations (i.e. an NxN matrix
     where N is the number of residues, of MSFs in the inter-residue distances)
     computed from the cross-correlation matrix (see Eq. 12.E.1 in [IB18]_). 
@@ -420,10 +476,16 @@ def calcDistFlucts(modes, n_cpu=1, norm=True):
     .. [IB18] Dill K, Jernigan RL, Bahar I. Protein Actions: Principles and
        Modeling. *Garland Science* **2017**. """
 
-    cc = calcCrossCorr(modes, n_cpu=n_cpu, norm=norm)
-    cc_diag = np.diag(cc).reshape(-1,1)
-    distFluct = cc_diag.T + cc_diag -2.*cc
-    return distFluct
+    cc = calcCrossCorr(modes, n_cpu=n_cpu, norm=norm, **kwargs)
+    cc_diag = np.diag(cc).copy()
+    blocksize = kwargs.get('blocksize')
+    if blocksize is None:
+        blocksize = max(1, BLOCK_ELEMENTS // max(len(cc_diag), 1))
+    for start in range(0, len(cc_diag), int(blocksize)):
+        stop = start + int(blocksize)
+        cc[start:stop] = (cc_diag + cc_diag[start:stop, np.newaxis] -
+                          2. * cc[start:stop])
+    return cc
 
 def calcTempFactors(modes, atoms):
     """Returns temperature (β) factors calculated using *modes* from a
@@ -443,14 +505,17 @@ def calcTempFactors(modes, atoms):
     return sqf * (expBetas.sum() / sqf.sum())
 
 
-def calcCovariance(modes):
-    """Returns covariance matrix calculated for given *modes*."""
+def calcCovariance(modes, n_cpu=1, **kwargs):
+    """Returns covariance matrix calculated for given *modes*.  Keyword
+    arguments *out* and *blocksize* are used as in :func:`.calcCrossCorr`,
+    and covariance matrix of an :class:`.NMA` instance is cached only when
+    they are not given and *n_cpu* is 1."""
 
-    if isinstance(modes, NMA):
+    _checkNCPU(n_cpu)
+    if isinstance(modes, NMA) and n_cpu == 1 and not kwargs:
         return modes.getCovariance()
-    else:
-        V, W, _, _ = _getModeProperties(modes)
-        return np.dot(V, np.dot(W, V.T))
+    V, W, _, _ = _getModeWeights(modes)
+    return _calcWeightedGram(V, W, n_cpu=n_cpu, **kwargs)
 
 
 def calcPairDeformationDist(model, coords, ind1, ind2, kbt=1.):
@@ -9,13 +9,95 @@ from prody import LOGGER
 from prody.atomic import Atomic, AtomGroup
 from prody.proteins import parsePDB
 from prody.utilities import checkCoords
-from prody.kdtree import KDTree
 
 from .nma import NMA
-from .gnm import GNMBase, solveEig, checkENMParameters
+from .gnm import GNMBase, solveEig, checkENMParameters, findContactPairs
+from .gnm import assembleKirchhoff
+from .gamma import vectorizeGamma
+from .enmcache import getENMCacheKey, loadCachedENM, saveCachedENM
 
 __all__ = ['ANM', 'calcANM']
 
+
+def assembleHessian(n_atoms, rows, cols, i2j, dist2, gammas, sparse=False):
+    """Returns Hessian and Kirchhoff matrices assembled from contact pairs.
+
+    All 3x3 super-elements are computed at once as an array with shape
+    ``(n_pairs, 3, 3)`` and scattered into the matrices with a few Numpy
+    calls.  Contributions to diagonal blocks are accumulated in the order
+    of pairs, so the result is identical to adding pairs one at a time.
+
+    :arg n_atoms: number of nodes
+    :type n_atoms: int
+
+    :arg rows: first node indices of contacting pairs
+    :type rows: :class:`numpy.ndarray`
+
+    :arg cols: second node indices of contacting pairs
+    :type cols: :class:`numpy.ndarray`
+
+    :arg i2j: distance vectors from first to second nodes, shape
+        ``(n_pairs, 3)``
+    :type i2j: :class:`numpy.ndarray`
+
+    :arg dist2: squared distances between nodes
+    :type dist2: :class:`numpy.ndarray`
+
+    :arg gammas: force constants for pairs
+    :type gammas: :class:`numpy.ndarray`
+
+    :arg sparse: return :class:`scipy.sparse.csr_matrix` instances,
+        default is **False**
+    :type sparse: bool"""
+
+    dof = n_atoms * 3
+    n_pairs = len(rows)
+
+    super_elements = i2j[:, :, np.newaxis] * i2j[:, np.newaxis, :]
+    super_elements *= (-gammas / dist2)[:, np.newaxis, np.newaxis]
+
+    # diagonal contributions in the order they would be added pair by pair
+    diag_index = np.empty(n_pairs * 2, int)
+    diag_index[0::2] = rows
+    diag_index[1::2] = cols
+    diag_blocks = np.zeros((n_atoms, 3, 3))
+    np.add.at(diag_blocks, diag_index, -np.repeat(super_elements, 2, axis=0))
+
+    kirchhoff = assembleKirchhoff(n_atoms, rows, cols, gammas, sparse=sparse)
+
+    if sparse:
+        try:
+            from scipy import sparse as scipy_sparse
+        except ImportError:
+            raise ImportError('failed to import scipy.sparse, which  is '
+                              'required for sparse matrix calculations')
+
+        block_rows = np.concatenate([rows, cols, np.arange(n_atoms)])
+        block_cols = np.concatenate([cols, rows, np.arange(n_atoms)])
+        blocks = np.concatenate([super_elements, super_elements, diag_blocks])
+        offset = np.arange(3)
+        hess_rows = (block_rows[:, np.newaxis, np.newaxis] * 3 +
+                     offset[np.newaxis, :, np.newaxis])
+        hess_cols = (block_cols[:, np.newaxis, np.newaxis] * 3 +
+                     offset[np.newaxis, np.newaxis, :])
+        hess_rows, hess_cols = np.broadcast_arrays(hess_rows, hess_cols)
+        hessian = scipy_sparse.coo_matrix((blocks.ravel(),
+                                           (hess_rows.ravel(),
+                                            hess_cols.ravel())),
+                                          shape=(dof, dof)).tocsr()
+        hessian.sum_duplicates()
+        hessian.eliminate_zeros()
+    else:
+        hessian = np.zeros((dof, dof), float)
+        blocked = hessian.reshape((n_atoms, 3, n_atoms, 3))
+        blocked[rows, :, cols, :] = super_elements
+        blocked[cols, :, rows, :] = super_elements
+        diag = np.arange(n_atoms)
+        blocked[diag, :, diag, :] = diag_blocks
+
+    return hessian, kirchhoff
+
+
 class ANMBase(NMA):
 
     def __init__(self, name='Unknown'):
@@ -117,71 +199,16 @@ class ANMBase(NMA):
         LOGGER.timeit('_anm_hessian')
 
         sparse = kwargs.get('sparse', False)
-        if sparse:
-            try:
-                from scipy import sparse as scipy_sparse
-            except ImportError:
-                raise ImportError('failed to import scipy.sparse, which  is '
-                                  'required for sparse matrix calculations')
-            kirchhoff = scipy_sparse.lil_matrix((n_atoms, n_atoms))
-            hessian = scipy_sparse.lil_matrix((dof, dof))
-        else:
-            kirchhoff = np.zeros((n_atoms, n_atoms), 'd')
-            hessian = np.zeros((dof, dof), float)
-
-        if kwargs.get('kdtree', False):
+        kdtree = kwargs.get('kdtree', False)
+        if kdtree:
             LOGGER.info('Using KDTree for building the Hessian.')
-            kdtree = KDTree(coords)
-            kdtree.search(cutoff)
-            for i, j in kdtree.getIndices():
-                i2j = coords[j] - coords[i]
-                dist2 = np.dot(i2j, i2j)
-                g = gamma(dist2, i, j)
-                super_element = np.outer(i2j, i2j) * (- g / dist2)
-                res_i3 = i*3
-                res_i33 = res_i3+3
-                res_j3 = j*3
-                res_j33 = res_j3+3
-                hessian[res_i3:res_i33, res_j3:res_j33] = super_element
-                hessian[res_j3:res_j33, res_i3:res_i33] = super_element
-                hessian[res_i3:res_i33, res_i3:res_i33] = \
-                    hessian[res_i3:res_i33, res_i3:res_i33] - super_element
-                hessian[res_j3:res_j33, res_j3:res_j33] = \
-                    hessian[res_j3:res_j33, res_j3:res_j33] - super_element
-                kirchhoff[i, j] = -g
-                kirchhoff[j, i] = -g
-                kirchhoff[i, i] = kirchhoff[i, i] + g
-                kirchhoff[j, j] = kirchhoff[j, j] + g
-        else:
-            cutoff2 = cutoff * cutoff
-            for i in range(n_atoms):
-                res_i3 = i*3
-                res_i33 = res_i3+3
-                i_p1 = i+1
-                i2j_all = coords[i_p1:, :] - coords[i]
-                for j, dist2 in enumerate((i2j_all ** 2).sum(1)):
-                    if dist2 > cutoff2:
-                        continue
-                    i2j = i2j_all[j]
-                    j += i_p1
-                    g = gamma(dist2, i, j)
-                    res_j3 = j*3
-                    res_j33 = res_j3+3
-                    super_element = np.outer(i2j, i2j) * (- g / dist2)
-                    hessian[res_i3:res_i33, res_j3:res_j33] = super_element
-                    hessian[res_j3:res_j33, res_i3:res_i33] = super_element
-                    hessian[res_i3:res_i33, res_i3:res_i33] = \
-                        hessian[res_i3:res_i33, res_i3:res_i33] - super_element
-                    hessian[res_j3:res_j33, res_j3:res_j33] = \
-                        hessian[res_j3:res_j33, res_j3:res_j33] - super_element
-                    kirchhoff[i, j] = -g
-                    kirchhoff[j, i] = -g
-                    kirchhoff[i, i] = kirchhoff[i, i] + g
-                    kirchhoff[j, j] = kirchhoff[j, j] + g
-
-        if sparse:
-            kirchhoff = kirchhoff.tocsr()
-            hessian = hessian.tocsr()
+        rows, cols, _ = findContactPairs(coords, cutoff, kdtree=kdtree)
+        i2j = coords[cols] - coords[rows]
+        dist2 = (i2j ** 2).sum(1)
+        gammas = vectorizeGamma(g)(dist2, rows, cols)
+
+        hessian, kirchhoff = assembleHessian(n_atoms, rows, cols, i2j, dist2,
+                                             gammas, sparse=sparse)
 
         LOGGER.report('Hessian was built in %.2fs.', label='_anm_hessian')
         self._kirchhoff = kirchhoff
@@ -189,7 +216,7 @@ class ANMBase(NMA):
         self._n_atoms = n_atoms
         self._dof = dof
 
-    def calcModes(self, n_modes=20, zeros=False, turbo=True):
+    def calcModes(self, n_modes=20, zeros=False, turbo=True, **kwargs):
         """Calculate normal modes.  This method uses :func:`scipy.linalg.eigh`
         function to diagonalize the Hessian matrix. When Scipy is not found,
         :func:`numpy.linalg.eigh` is used.
@@ -203,6 +230,10 @@ class ANMBase(NMA):
 
         :arg turbo: Use a memory intensive, but faster way to calculate modes.
         :type turbo: bool, default is **True**
+
+        :arg method: eigensolver backend, one of ``'auto'``, ``'lapack'``,
+            ``'lanczos'``, or ``'lobpcg'``, see :func:`.selectEigSolver`
+        :type method: str, default is ``'auto'``
         """
 
         if self._hessian is None:
@@ -216,7 +247,7 @@ class ANMBase(NMA):
         self._clear()
         LOGGER.timeit('_anm_calc_modes')
         values, vectors, vars = solveEig(self._hessian, n_modes=n_modes, zeros=zeros, 
-                                         turbo=turbo, is3d=True)
+                                         turbo=turbo, is3d=True, **kwargs)
         self._eigvals = values
         self._array = vectors
         self._vars = vars
@@ -286,9 +317,14 @@ def calcANM(pdb, selstr='calpha', cutoff=15., gamma=1., n_modes=20,
             raise TypeError('pdb must be an atomic class, not {0}'
                             .format(type(pdb)))
         
-        anm = ANM(title)
         sel = ag.select(selstr)
-        anm.buildHessian(sel, cutoff, gamma)
-        anm.calcModes(n_modes, zeros)
+        key = getENMCacheKey(ANM, sel, selstr, cutoff, gamma,
+                             n_modes, zeros=zeros)
+        anm = loadCachedENM(key, ANM, title)
+        if anm is None:
+            anm = ANM(title)
+            anm.buildHessian(sel, cutoff, gamma)
+            anm.calcModes(n_modes, zeros)
+            saveCachedENM(key, anm)
     
         return anm, sel
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""This module defines eigensolver backends used for diagonalizing Kirchhoff
+and Hessian matrices of elastic network models.
+
+Following backends are available:
+
+  * :class:`.DenseEigSolver` - LAPACK based solver for dense matrices
+  * :class:`.LanczosEigSolver` - shift-invert Lanczos solver for sparse
+    matrices
+  * :class:`.LOBPCGEigSolver` - LOBPCG solver with an optional preconditioner
+    for very large sparse matrices
+
+A backend is selected automatically by :func:`.selectEigSolver` based on the
+size and sparsity of the matrix, or it can be chosen by passing its name or
+an instance to :func:`.solveEig` as *method* argument."""
+
+import time
+
+import numpy as np
+
+from prody import LOGGER
+from prody.utilities import importLA
+
+__all__ = ['EigSolver', 'DenseEigSolver', 'LanczosEigSolver',
+           'LOBPCGEigSolver', 'selectEigSolver', 'countZeroModes']
+
+MB = 1024. * 1024.
+
+DENSE_LIMIT = 5000
+"""Sparse matrices with fewer rows than this are diagonalized with the dense
+solver when backend is selected automatically."""
+
+LOBPCG_LIMIT = 300000
+"""Sparse matrices with more rows than this are diagonalized with the LOBPCG
+solver when backend is selected automatically."""
+
+
+def _issparse(M):
+
+    try:
+        from scipy.sparse import issparse
+    except ImportError:
+        return False
+    return issparse(M)
+
+
+def _nbytes(M):
+
+    if _issparse(M):
+        M = M.tocsr() if M.format != 'csr' else M
+        return M.data.nbytes + M.indices.nbytes + M.indptr.nbytes
+    return M.nbytes
+
+
+class EigSolver(object):
+
+    """Base class for eigensolver backends.  Derived classes implement
+    :meth:`_solve` method that returns eigenvalues and eigenvectors with
+    indices from *start* to *stop* (inclusive) in the ascending order of
+    eigenvalues.  Timing and estimated memory usage of the most recent solve
+    are recorded and can be obtained using :meth:`getStats`."""
+
+    name = None
+
+    def __init__(self, **kwargs):
+
+        self._kwargs = kwargs
+        self._stats = {}
+
+    def __repr__(self):
+
+        return '<{0}>'.format(self.__class__.__name__)
+
+    def getStats(self):
+        """Returns a dictionary with *time* (s) and estimated *memory* (MB)
+        used by the most recent solve, as well as the *size* of the matrix and
+        the number of *modes* calculated."""
+
+        return dict(self._stats)
+
+    def solve(self, M, start=0, stop=None, **kwargs):
+        """Returns eigenvalues and eigenvectors of symmetric matrix *M* from
+        *start* to *stop* (inclusive) in ascending order of eigenvalues. If
+        *stop* is **None**, all eigenvalues are calculated."""
+
+        dof = M.shape[0]
+        if stop is None or stop >= dof:
+            stop = dof - 1
+        start = max(0, start)
+        options = dict(self._kwargs)
+        options.update(kwargs)
+
+        t0 = time.time()
+        values, vectors, workspace = self._solve(M, start, stop, **options)
+        elapsed = time.time() - t0
+
+        memory = (_nbytes(M) + vectors.nbytes + workspace) / MB
+        self._stats = {'time': elapsed, 'memory': memory, 'size': dof,
+                       'modes': len(values)}
+        LOGGER.debug('{0} eigensolver calculated {1} modes of a {2}x{2} '
+                     'matrix in {3:.2f}s using ~{4:.1f} MB.'
+                     .format(self.name, len(values), dof, elapsed, memory))
+        return values, vectors
+
+    def _solve(self, M, start, stop, **kwargs):
+
+        raise NotImplementedError
+
+
+class DenseEigSolver(EigSolver):
+
+    """Dense eigensolver using :func:`scipy.linalg.eigh`, or
+    :func:`numpy.linalg.eigh` when Scipy is not found.  Sparse matrices are
+    converted to dense arrays."""
+
+    name = 'lapack'
+
+    def _solve(self, M, start, stop, turbo=True, **kwargs):
+
+        linalg = importLA()
+        dof = M.shape[0]
+        if _issparse(M):
+            M = M.toarray()
+        workspace = M.nbytes * 2
+
+        if linalg.__package__.startswith('scipy'):
+            if start == 0 and stop == dof - 1:
+                subset = None
+            else:
+                subset = (start, stop)
+                turbo = False
+            try:
+                values, vectors = linalg.eigh(M, subset_by_index=subset,
+                                              driver='evd' if turbo else None)
+            except TypeError:
+                # scipy < 1.5
+                values, vectors = linalg.eigh(M, turbo=turbo, eigvals=subset)
+        else:
+            if start != 0 or stop != dof - 1:
+                LOGGER.info('Scipy is not found, all modes were calculated.')
+            values, vectors = linalg.eigh(M)
+            values = values[start:stop+1]
+            vectors = vectors[:, start:stop+1]
+        return values, vectors, workspace
+
+
+class LanczosEigSolver(EigSolver):
+
+    """Shift-invert Lanczos eigensolver using :func:`scipy.sparse.linalg.eigsh`.
+
+    Matrix is factorized once after shifting it by a small negative *sigma*,
+    which makes the shifted matrix positive definite in the presence of zero
+    modes, and eigenvalues closest to *sigma* are found.  When *sigma* is not
+    given, it is set to ``-1e-5`` times the mean of the absolute value of
+    diagonal elements."""
+
+    name = 'lanczos'
+
+    def _solve(self, M, start, stop, sigma=None, tol=0, maxiter=None,
+               **kwargs):
+
+        try:
+            from scipy.sparse import linalg as scipy_sparse_la
+        except ImportError:
+            raise ImportError('failed to import scipy.sparse.linalg, '
+                              'which is required for sparse matrix '
+                              'decomposition')
+
+        dof = M.shape[0]
+        k = stop + 1
+        if k >= dof:
+            LOGGER.info('Lanczos solver cannot calculate all eigenvalues, '
+                        'dense solver is used instead.')
+            return DenseEigSolver()._solve(M, start, stop, **kwargs)
+
+        if sigma is None:
+            diag = np.abs(M.diagonal())
+            sigma = -1e-5 * (diag.mean() if diag.size and diag.any() else 1.)
+
+        ncv = min(dof, max(2 * k + 1, 20))
+        values, vectors = scipy_sparse_la.eigsh(M, k=k, sigma=sigma,
+                                                which='LM', ncv=ncv, tol=tol,
+                                                maxiter=maxiter)
+        order = values.argsort()
+        values = values[order][start:]
+        vectors = vectors[:, order][:, start:]
+
+        # factorization fill-in is not known, count one more copy of matrix
+        workspace = ncv * dof * 8 + _nbytes(M)
+        return values, vectors, workspace
+
+
+class LOBPCGEigSolver(EigSolver):
+
+    """LOBPCG eigensolver using :func:`scipy.sparse.linalg.lobpcg`.
+
+    :arg preconditioner: preconditioner for *M*, ``'jacobi'`` (default) uses
+        inverse of diagonal elements, **None** disables preconditioning, or a
+        matrix or :class:`scipy.sparse.linalg.LinearOperator` can be given
+    :type preconditioner: str, :class:`scipy.sparse.linalg.LinearOperator`
+
+    :arg tol: solver tolerance, default is ``1e-8``
+    :type tol: float
+
+    :arg maxiter: maximum number of iterations, default is 1000
+    :type maxiter: int
+
+    :arg seed: random seed for the initial guess, default is 0
+    :type seed: int"""
+
+    name = 'lobpcg'
+
+    def _solve(self, M, start, stop, preconditioner='jacobi', tol=1e-8,
+               maxiter=1000, seed=0, **kwargs):
+
+        try:
+            from scipy.sparse import linalg as scipy_sparse_la
+            from scipy.sparse import diags
+        except ImportError:
+            raise ImportError('failed to import scipy.sparse.linalg, '
+                              'which is required for sparse matrix '
+                              'decomposition')
+
+        dof = M.shape[0]
+        k = stop + 1
+        if 5 * k >= dof:
+            LOGGER.info('LOBPCG solver is not suitable for calculating {0} '
+                        'of {1} modes, dense solver is used instead.'
+                        .format(k, dof))
+            return DenseEigSolver()._solve(M, start, stop, **kwargs)
+
+        if isinstance(preconditioner, str):
+            if preconditioner != 'jacobi':
+                raise ValueError('preconditioner must be jacobi, None, or a '
+                                 'linear operator')
+            diag = np.array(M.diagonal(), float)
+            diag[diag == 0] = 1.
+            preconditioner = diags(1. / diag)
+
+        X = np.random.RandomState(seed).rand(dof, k)
+        values, vectors = scipy_sparse_la.lobpcg(M, X, M=preconditioner,
+                                                 tol=tol, maxiter=maxiter,
+                                                 largest=False)
+        order = values.argsort()
+        values = values[order][start:]
+        vectors = vectors[:, order][:, start:]
+
+        workspace = 9 * k * dof * 8
+        return values, vectors, workspace
+
+
+EIGSOLVERS = {
+    DenseEigSolver.name: DenseEigSolver,
+    LanczosEigSolver.name: LanczosEigSolver,
+    LOBPCGEigSolver.name: LOBPCGEigSolver,
+}
+
+
+def selectEigSolver(M, n_modes=None, method='auto', **kwargs):
+    """Returns an :class:`EigSolver` instance for diagonalizing *M*.
+
+    :arg method: ``'auto'``, ``'lapack'``, ``'lanczos'``, ``'lobpcg'``, or an
+        :class:`EigSolver` instance.  When ``'auto'``, dense matrices and
+        sparse matrices with fewer than :data:`DENSE_LIMIT` rows or for which
+        all modes are requested are diagonalized with the dense solver, sparse
+        matrices with more than :data:`LOBPCG_LIMIT` rows with the LOBPCG
+        solver, and remaining sparse matrices with the Lanczos solver.
+    :type method: str
+
+    Keyword arguments are passed to the solver."""
+
+    if isinstance(method, EigSolver):
+        return method
+
+    method = str(method).lower()
+    if method == 'auto':
+        dof = M.shape[0]
+        if not _issparse(M) or n_modes is None or dof <= DENSE_LIMIT:
+            method = DenseEigSolver.name
+        elif dof > LOBPCG_LIMIT:
+            method = LOBPCGEigSolver.name
+        else:
+            method = LanczosEigSolver.name
+
+    try:
+        solver = EIGSOLVERS[method]
+    except KeyError:
+        raise ValueError('method must be one of auto, {0}'
+                         .format(', '.join(sorted(EIGSOLVERS))))
+    return solver(**kwargs)
+
+
+def countZeroModes(M, is3d=False):
+    """Returns the number of zero modes of Kirchhoff or Hessian matrix *M*
+    without diagonalizing it.  Zero modes are counted from rigid-body motions
+    of disconnected components of the network, which are found using the
+    sparsity pattern of *M*.  Each component contributes one zero mode in
+    GNM, and 3, 5, or 6 zero modes in ANM for components with one, two, or
+    more nodes, respectively.
+
+    The count is exact for Kirchhoff matrices.  For Hessian matrices, it is
+    a lower bound, since a connected network may not be rigid, e.g. a chain
+    of nodes bends freely at each node."""
+
+    try:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import connected_components
+    except ImportError:
+        raise ImportError('scipy is required for counting zero modes')
+
+    if _issparse(M):
+        M = M.tocsr()
+    else:
+        M = csr_matrix(M)
+
+    if is3d:
+        n_nodes = M.shape[0] // 3
+        M = M.tocoo()
+        graph = csr_matrix((np.ones(M.nnz), (M.row // 3, M.col // 3)),
+                           shape=(n_nodes, n_nodes))
+    else:
+        graph = M
+
+    n_components, labels = connected_components(graph, directed=False)
+    if not is3d:
+        return n_components
+
+    sizes = np.bincount(labels, minlength=n_components)
+    return int(np.where(sizes == 1, 3, np.where(sizes == 2, 5, 6)).sum())
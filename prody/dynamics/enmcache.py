@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""This module defines an opt-in, content-addressed on-disk cache for normal
+modes calculated by :func:`.calcANM`, :func:`.calcGNM`, and :func:`.calcENM`.
+
+Cache is enabled and configured using :func:`.confProDy`::
+
+    confProDy(enm_cache=True)
+    confProDy(enm_cache_path='/scratch/enmcache')  # default ~/.prody/enmcache
+    confProDy(enm_cache_size=2048)  # in MB, default is 1024
+
+Each entry is stored in a folder named after a hash of model type, node
+coordinates, selection, cutoff, gamma, number of modes and other parameters.
+Eigenvectors are saved as a :file:`.npy` file and are memory-mapped when
+loaded.  When the total size of the cache exceeds the limit, least recently
+used entries are removed."""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from numbers import Number
+
+import numpy as np
+
+from prody import LOGGER, SETTINGS
+from prody.atomic import AtomSubset
+from prody.utilities import USERHOME
+
+__all__ = ['clearENMCache', 'pathENMCache']
+
+CACHE_VERSION = 1
+MB = 1024 * 1024
+
+ARRAYS = ('_array', '_eigvals', '_vars')
+SCALARS = ('_trace', '_cutoff', '_gamma', '_n_atoms', '_dof', '_n_modes')
+
+
+def pathENMCache():
+    """Returns path to the ENM cache folder, which is set using
+    ``confProDy(enm_cache_path=...)`` and by default is
+    :file:`~/.prody/enmcache`."""
+
+    path = SETTINGS.get('enm_cache_path', '')
+    if not path:
+        path = os.path.join(USERHOME or tempfile.gettempdir(), '.prody',
+                            'enmcache')
+    return path
+
+
+def clearENMCache():
+    """Remove all entries from the ENM cache."""
+
+    path = pathENMCache()
+    if os.path.isdir(path):
+        for name in os.listdir(path):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        LOGGER.info('ENM cache at {0} was cleared.'.format(path))
+
+
+def _isEnabled():
+
+    return bool(SETTINGS.get('enm_cache', False))
+
+
+def _selectionKey(select):
+
+    if isinstance(select, AtomSubset):
+        return hashlib.sha1(select._getIndices().tobytes()).hexdigest()
+    return None if select is None else str(select)
+
+
+def getENMCacheKey(model, atoms, select=None, cutoff=None, gamma=None,
+                   n_modes=None, **kwargs):
+    """Returns a key for the ENM cache, or **None** if cache is disabled or
+    parameters cannot be hashed reliably, e.g. when *gamma* is a function or
+    a :class:`.Gamma` instance.  *atoms* may be a coordinate array or an
+    object with ``_getCoords`` method.  Additional keyword arguments must
+    have numbers, strings, booleans or **None** as values."""
+
+    if not _isEnabled():
+        return None
+
+    try:
+        coords = atoms._getCoords()
+    except AttributeError:
+        coords = atoms
+    if coords is None:
+        return None
+
+    if not (gamma is None or isinstance(gamma, Number)):
+        LOGGER.debug('ENM cache is not used for custom gamma.')
+        return None
+
+    params = [('model', model.__name__), ('select', _selectionKey(select)),
+              ('cutoff', cutoff), ('gamma', gamma), ('n_modes', n_modes)]
+    for key in sorted(kwargs):
+        value = kwargs[key]
+        if not (value is None or isinstance(value, (Number, str, bool))):
+            LOGGER.debug('ENM cache is not used for {0} argument.'
+                         .format(key))
+            return None
+        params.append((key, value))
+
+    sha = hashlib.sha1()
+    sha.update(repr((CACHE_VERSION, params)).encode())
+    coords = np.ascontiguousarray(coords, dtype=float)
+    sha.update(repr(coords.shape).encode())
+    sha.update(coords.tobytes())
+    return sha.hexdigest()
+
+
+def loadCachedENM(key, cls, title):
+    """Returns an instance of *cls* with modes loaded from the ENM cache
+    entry *key*, or **None** if there is no such entry.  Eigenvectors are
+    memory-mapped in copy-on-write mode."""
+
+    if key is None:
+        return None
+
+    path = os.path.join(pathENMCache(), key)
+    meta_fn = os.path.join(path, 'meta.json')
+    try:
+        with open(meta_fn) as meta_file:
+            meta = json.load(meta_file)
+        arrays = {}
+        for attr in ARRAYS:
+            fn = os.path.join(path, attr[1:] + '.npy')
+            arrays[attr] = np.load(fn, mmap_mode='c' if attr == '_array'
+                                   else None)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if meta.get('class') != cls.__name__:
+        return None
+
+    model = cls(title)
+    dict_ = model.__dict__
+    dict_.update(arrays)
+    for attr in SCALARS:
+        if meta.get(attr) is not None:
+            dict_[attr] = meta[attr]
+
+    try:
+        os.utime(meta_fn, None)
+    except OSError:
+        pass
+    LOGGER.debug('Modes were loaded from ENM cache ({0}).'.format(key))
+    return model
+
+
+def saveCachedENM(key, model):
+    """Save modes of *model* in the ENM cache entry *key*, and evict least
+    recently used entries if the size limit is exceeded."""
+
+    if key is None or model._array is None:
+        return
+
+    root = pathENMCache()
+    path = os.path.join(root, key)
+    if os.path.isdir(path):
+        return
+
+    try:
+        if not os.path.isdir(root):
+            os.makedirs(root)
+        temp = tempfile.mkdtemp(prefix='.' + key, dir=root)
+    except OSError as err:
+        LOGGER.warning('Failed to write ENM cache at {0}: {1}'
+                       .format(root, err))
+        return
+
+    dict_ = model.__dict__
+    meta = {'class': model.__class__.__name__, 'version': CACHE_VERSION}
+    for attr in SCALARS:
+        value = dict_.get(attr)
+        if isinstance(value, np.generic):
+            value = value.item()
+        meta[attr] = value if isinstance(value, Number) else None
+    try:
+        for attr in ARRAYS:
+            np.save(os.path.join(temp, attr[1:] + '.npy'),
+                    np.ascontiguousarray(dict_[attr]))
+        with open(os.path.join(temp, 'meta.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.rename(temp, path)
+    except OSError:
+        # another process may have saved the same entry
+        shutil.rmtree(temp, ignore_errors=True)
+        return
+
+    evictENMCache()
+
+
+def evictENMCache(limit=None):
+    """Remove least recently used entries from the ENM cache until its size
+    is below *limit* (MB), which by default is the value set using
+    ``confProDy(enm_cache_size=...)``."""
+
+    if limit is None:
+        limit = SETTINGS.get('enm_cache_size', 1024)
+    limit = limit * MB
+
+    root = pathENMCache()
+    if not os.path.isdir(root):
+        return
+
+    entries = []
+    total = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        meta_fn = os.path.join(path, 'meta.json')
+        if name.startswith('.') or not os.path.isfile(meta_fn):
+            continue
+        size = sum(os.path.getsize(os.path.join(path, fn))
+                   for fn in os.listdir(path))
+        entries.append((os.path.getmtime(meta_fn), size, path))
+        total += size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        LOGGER.debug('ENM cache entry {0} was evicted.'
+                     .format(os.path.split(path)[1]))
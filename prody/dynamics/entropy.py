@@ -11,147 +11,170 @@ from prody.proteins import parsePDB
 from prody.atomic import AtomGroup, Selection
 from prody.ensemble import Ensemble, Conformation
 from prody.trajectory import TrajBase
-from prody.utilities import importLA
 from numpy import sqrt, arange, log, polyfit, array
 
 from .nma import NMA
+from .analysis import _mapBlocks, _checkNCPU
 
 
-__all__ = ['calcEntropyTransfer', 'calcOverallNetEntropyTransfer']
+__all__ = ['calcEntropyTransfer', 'calcAllEntropyTransfer',
+           'calcNetEntropyTransfer', 'calcOverallNetEntropyTransfer']
+
+
+def _checkModel(model):
 
-def calcEntropyTransfer(model, ind1, ind2, tau):
-    """This function calculates the entropy transfer from residue indice 
-    ind1 to ind2 for a given time constant tau based on GNM.  
-    """
     if not isinstance(model, NMA):
         raise TypeError('model must be a NMA instance')
     elif model.is3d():
         raise TypeError('model must be a 1-dimensional NMA instance')
 
-    linalg = importLA()
-    n_atoms = model.numAtoms()
-    n_modes = model.numModes()
 
-    eigvecs = model.getEigvecs().T
-    eigvals = model.getEigvals()
+def _transfer(cov_ii, cov_jj, cov_ij, lag_jj, lag_ij):
+    """Returns entropy transfer from *i* to *j* given equal-time covariances
+    and time-delayed covariances, which may be arrays broadcast to the shape
+    of the result."""
+
+    return 0.5 * (np.log(cov_jj ** 2 - lag_jj ** 2)
+                  - np.log(cov_ii * cov_jj ** 2
+                           + 2 * cov_ij * lag_jj * lag_ij
+                           - (lag_ij ** 2 + cov_ij ** 2) * cov_jj
+                           - lag_jj ** 2 * cov_ii)
+                  - np.log(cov_jj)
+                  + np.log(cov_ii * cov_jj - cov_ij ** 2))
+
+
+def _getModeArrays(model):
+
+    return model._getArray(), model.getEigvals()
 
+
+def calcEntropyTransfer(model, ind1, ind2, tau):
+    """This function calculates the entropy transfer from residue indice 
+    ind1 to ind2 for a given time constant tau based on GNM.  
+    """
+
+    _checkModel(model)
+
+    eigvecs, eigvals = _getModeArrays(model)
     tau_0 = 1
-    T = 0
-    dummy1 = 0
-    dummy2 = 0
-    for k in range(n_modes):
-        dummy1 += 1.0 / eigvals[k] * eigvecs[k,ind2] * eigvecs[k,ind2]
-        dummy2 += 1.0 / eigvals[k] * eigvecs[k,ind2] * eigvecs[k,ind2] * np.exp(-eigvals[k]*tau/tau_0)
-    T += 0.5 * np.log(dummy1**2 - dummy2**2)
-
-    dummy1 = 0
-    dummy2 = 0
-    dummy3 = 0 
-    dummy4 = 0 
-    dummy5 = 0 
-    dummy6 = 0 
-    dummy7 = 0 
-    dummy8 = 0 
-    dummy9 = 0 
-    dummy10 = 0 
-    for k in range(n_modes):
-        dummy1 += 1.0 / eigvals[k] * eigvecs[k,ind1] * eigvecs[k,ind1]
-        dummy2 += 1.0 / eigvals[k] * eigvecs[k,ind2] * eigvecs[k,ind2]
-        dummy3 += 1.0 / eigvals[k] * eigvecs[k,ind1] * eigvecs[k,ind2]
-        dummy4 += 1.0 / eigvals[k] * eigvecs[k,ind2] * eigvecs[k,ind2] * np.exp(-eigvals[k]*tau/tau_0)
-        dummy5 += 1.0 / eigvals[k] * eigvecs[k,ind1] * eigvecs[k,ind2] * np.exp(-eigvals[k]*tau/tau_0)  
-        dummy9 += 1.0 / eigvals[k] * eigvecs[k,ind2] * eigvecs[k,ind2] * np.exp(-eigvals[k]*tau/tau_0)       
-        
-    dummy6 = dummy5
-    dummy7 = dummy3 
-    dummy8 = dummy2
-    dummy10 = dummy1
-
-    T -= 0.5 * np.log(dummy1*dummy2**2+2*dummy3*dummy4*dummy5-(dummy6**2+dummy7**2)*dummy8-dummy9**2*dummy10)
-    T -= 0.5 * np.log(dummy2)
-    T += 0.5 * np.log(dummy1*dummy2-dummy3**2)
-    return T
+    weights = 1.0 / eigvals
+    lagged = weights * np.exp(-eigvals * tau / tau_0)
+
+    u1 = eigvecs[ind1]
+    u2 = eigvecs[ind2]
+    return _transfer(np.dot(weights, u1 * u1), np.dot(weights, u2 * u2),
+                     np.dot(weights, u1 * u2), np.dot(lagged, u2 * u2),
+                     np.dot(lagged, u1 * u2))
+
+
+def _calcAllTransfer(eigvecs, eigvals, cov, tau):
+
+    tau_0 = 1
+    lagged = np.dot(eigvecs * (np.exp(-eigvals * tau / tau_0) / eigvals),
+                    eigvecs.T)
+    diag = cov.diagonal()
+    lag_diag = lagged.diagonal()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropyTransfer = _transfer(diag[:, np.newaxis], diag, cov,
+                                    lag_diag, lagged)
+    np.fill_diagonal(entropyTransfer, 0)
+    return entropyTransfer
+
 
 def calcAllEntropyTransfer(model, tau):
     """This function calculates the net entropy transfer for a whole structure 
-    with a given time constant tau based on GNM.  
+    with a given time constant tau based on GNM.  Element ``[i, j]`` of the
+    returned matrix is the entropy transfer from *i* to *j*.  Covariances
+    needed for all pairs are calculated as two matrix products.
     """
-    if not isinstance(model, NMA):
-        raise TypeError('model must be a NMA instance')
-    elif model.is3d():
-        raise TypeError('model must be a 1-dimensional NMA instance')
 
-    linalg = importLA()
-    n_atoms = model.numAtoms()
-    n_modes = model.numModes()
+    _checkModel(model)
 
-    entropyTransfer = np.zeros((n_atoms,n_atoms))
-    for i in range(n_atoms):
-        for j in range(n_atoms):
-            if i != j:
-                entropyTransfer[i,j]=calcEntropyTransfer(model,i,j,tau)
+    eigvecs, eigvals = _getModeArrays(model)
+    cov = np.dot(eigvecs / eigvals, eigvecs.T)
+    return _calcAllTransfer(eigvecs, eigvals, cov, tau)
 
-    return entropyTransfer
 
 def calcNetEntropyTransfer(entropyTransfer):
-    n_atoms = entropyTransfer.shape[0]
+    """Returns net entropy transfer matrix, i.e. ``T[i, j] - T[j, i]``, for
+    a matrix calculated using :func:`.calcAllEntropyTransfer`."""
 
-    netEntropyTransfer = np.zeros((n_atoms,n_atoms))
-    for i in range(n_atoms):
-        for j in range(n_atoms):
-            netEntropyTransfer[i,j]=entropyTransfer[i,j]-entropyTransfer[j,i]
+    entropyTransfer = np.asarray(entropyTransfer)
+    return entropyTransfer - entropyTransfer.T
 
-    return netEntropyTransfer
 
-def calcOverallNetEntropyTransfer(model, turbo=False):
+def calcOverallNetEntropyTransfer(model, turbo=False, **kwargs):
     """This function calculates the net entropy transfer for a whole structure 
-    with a given time constant tau based on GNM.  
+    with a given time constant tau based on GNM.  Entropy transfer matrices
+    are integrated over time constants using the trapezoidal rule.  The
+    integral is accumulated as matrices are calculated, so memory usage does
+    not depend on the number of time constants.
+
+    :arg turbo: use all available processors, default is **False**
+    :type turbo: bool
+
+    :arg taus: time constants, default is ``1e-6`` and from 0.1 to 5.0 with
+        0.1 increments
+    :type taus: :class:`numpy.ndarray`
+
+    :arg n_cpu: number of threads that calculate matrices for different
+        time constants, by default 1, or number of processors when *turbo*
+        is **True**.  Matrices are added in the order of time constants, so
+        the result does not depend on *n_cpu*.
+    :type n_cpu: int
     """
-    if not isinstance(model, NMA):
-        raise TypeError('model must be a NMA instance')
-    elif model.is3d():
-        raise TypeError('model must be a 1-dimensional NMA instance')
 
-    linalg = importLA()
+    _checkModel(model)
+
     n_atoms = model.numAtoms()
-    n_modes = model.numModes()
-
-    tau_max = 5.0 
-    tau_step = 0.1
-    taus = np.arange(start=tau_step, stop=tau_max+1e-6, step=tau_step)
-    taus = np.insert(taus,0,0.000001)
-    numTaus = len(taus)
-    netEntropyTransfer = np.zeros((numTaus,n_atoms,n_atoms))
-    if turbo:
-        try:
-            from joblib import Parallel, delayed
-            import multiprocessing as mp
-        except: 
-            LOGGER.report('joblib and multiprocessing is not imported. Running' + 
-                'with sequential execution.')
-        LOGGER.timeit('_ent_trans')
-        n_cpu = mp.cpu_count()
-        netEntropyTransfer = Parallel(n_jobs=n_cpu)(delayed(calcAllEntropyTransfer)(model,taus[i]) \
-            for i in range(numTaus))
-        netEntropyTransfer = np.asarray(netEntropyTransfer)
-    
-    else:
-        LOGGER.timeit('_ent_trans')
-        for i in range(len(taus)):
-            netEntropyTransfer[i,:,:] = calcAllEntropyTransfer(model,taus[i])
 
-    LOGGER.report('Net Entropy Transfer calculation is completed in %.1fs.',
-                  '_ent_trans')
+    taus = kwargs.get('taus')
+    if taus is None:
+        tau_max = 5.0 
+        tau_step = 0.1
+        taus = np.arange(start=tau_step, stop=tau_max+1e-6, step=tau_step)
+        taus = np.insert(taus,0,0.000001)
+    taus = np.asarray(taus, float)
+    if taus.ndim != 1 or len(taus) < 2:
+        raise ValueError('taus must be a 1-dimensional array with at least '
+                         'two values')
+
+    n_cpu = kwargs.get('n_cpu')
+    if n_cpu is None:
+        if turbo:
+            from multiprocessing import cpu_count
+            n_cpu = cpu_count()
+        else:
+            n_cpu = 1
+    _checkNCPU(n_cpu)
+
+    # trapezoidal rule weights
+    steps = np.diff(taus)
+    weights = np.zeros(len(taus))
+    weights[:-1] += steps / 2
+    weights[1:] += steps / 2
+
+    eigvecs, eigvals = _getModeArrays(model)
+    cov = np.dot(eigvecs / eigvals, eigvecs.T)
 
     overallNetEntropyTransfer = np.zeros((n_atoms,n_atoms))
-
-    LOGGER.timeit('_num_int')
-    for i in range(n_atoms):
-        for j in range(n_atoms):
-            if i != j:
-                overallNetEntropyTransfer[i,j] = np.trapz(netEntropyTransfer[:,i,j],taus)
-    LOGGER.report('Numerical integration is completed in %.1fs.',
-                  '_num_int')
+    # matrices for up to n_cpu time constants are kept at a time
+    transfers = [None] * n_cpu
+
+    def calcTransfer(index):
+        entropyTransfer = _calcAllTransfer(eigvecs, eigvals, cov,
+                                           taus[index])
+        entropyTransfer *= weights[index]
+        transfers[index % n_cpu] = entropyTransfer
+
+    LOGGER.timeit('_ent_trans')
+    for start in range(0, len(taus), n_cpu):
+        indices = range(start, min(start + n_cpu, len(taus)))
+        _mapBlocks(calcTransfer, indices, n_cpu)
+        for index in indices:
+            overallNetEntropyTransfer += transfers[index % n_cpu]
+    LOGGER.report('Net Entropy Transfer calculation is completed in %.1fs.',
+                  '_ent_trans')
 
     return overallNetEntropyTransfer
 
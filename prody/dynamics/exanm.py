@@ -8,8 +8,9 @@ from prody.atomic import Atomic, AtomGroup
 from prody.utilities import importLA, checkCoords, copy
 from numpy import sqrt, zeros, array, ceil, dot
 
-from .anm import ANM
-from .gnm import checkENMParameters
+from .anm import ANM, assembleHessian
+from .gnm import checkENMParameters, findContactPairs
+from .gamma import vectorizeGamma
 from .editing import reduceModel
 
 LA = importLA()
@@ -217,27 +218,13 @@ class exANM(ANM):
 
         total_natoms = int(coords.shape[0])
         self._hessian = np.zeros((natoms*3, natoms*3), float)
-        total_hessian = np.zeros((total_natoms*3, total_natoms*3), float)
         cutoff, g, gamma = checkENMParameters(cutoff, gamma)
-        cutoff2 = cutoff * cutoff
-        for i in range(total_natoms):
-            res_i3 = i*3
-            res_i33 = res_i3+3
-            i_p1 = i+1
-            i2j_all = coords[i_p1:, :] - coords[i]
-            for j, dist2 in enumerate((i2j_all ** 2).sum(1)):
-                if dist2 > cutoff2:
-                    continue
-                i2j = i2j_all[j]
-                j += i_p1
-                g = gamma(dist2, i, j)
-                res_j3 = j*3
-                res_j33 = res_j3+3
-                super_element = np.outer(i2j, i2j) * (- g / dist2)
-                total_hessian[res_i3:res_i33, res_j3:res_j33] = super_element
-                total_hessian[res_j3:res_j33, res_i3:res_i33] = super_element
-                total_hessian[res_i3:res_i33, res_i3:res_i33] = total_hessian[res_i3:res_i33, res_i3:res_i33] - super_element
-                total_hessian[res_j3:res_j33, res_j3:res_j33] = total_hessian[res_j3:res_j33, res_j3:res_j33] - super_element
+        rows, cols, _ = findContactPairs(coords, cutoff, kdtree=False)
+        i2j = coords[cols] - coords[rows]
+        dist2 = (i2j ** 2).sum(1)
+        gammas = vectorizeGamma(g)(dist2, rows, cols)
+        total_hessian = assembleHessian(total_natoms, rows, cols, i2j, dist2,
+                                        gammas)[0]
 
         ss = total_hessian[:natoms*3, :natoms*3]
         so = total_hessian[:natoms*3, natoms*3:]
@@ -7,7 +7,7 @@ from os.path import abspath, join, isfile, isdir, split, splitext
 import numpy as np
 
 from prody import LOGGER, SETTINGS, PY3K
-from prody.atomic import Atomic, AtomGroup, AtomSubset
+from prody.atomic import Atomic, AtomGroup, AtomSubset, sliceAtoms
 from prody.utilities import openFile, isExecutable, which, PLATFORM, addext
 
 from .nma import NMA
@@ -20,6 +20,7 @@ from .exanm import exANM
 from .mode import Vector, Mode
 from .modeset import ModeSet
 from .editing import sliceModel, reduceModel
+from .enmcache import getENMCacheKey, loadCachedENM, saveCachedENM
 
 __all__ = ['parseArray', 'parseModes', 'parseSparseMatrix',
            'writeArray', 'writeModes',
@@ -466,30 +467,50 @@ def calcENM(atoms, select=None, model='anm', trim='trim', gamma=1.0,
         else:
             atoms = atoms.select(str(select))
     
-    enm = None
     if model == 'anm':
-        anm = ANM(title)
-        anm.buildHessian(atoms, gamma=gamma, **kwargs)
-        enm = anm
+        cls = ANM
     elif model == 'gnm':
-        gnm = GNM(title)
-        gnm.buildKirchhoff(atoms, gamma=gamma, **kwargs)
-        enm = gnm
+        cls = GNM
     else:
         raise TypeError('model should be either ANM or GNM instead of {0}'.format(model))
+
+    # modes are cached before slicing, and after reduction
+    reduce = select is not None and trim == 'reduce'
+    key = getENMCacheKey(cls, atoms, select if reduce else None, gamma=gamma,
+                         n_modes=n_modes, zeros=zeros, reduce=reduce,
+                         **kwargs)
+    enm = loadCachedENM(key, cls, title + ' reduced' if reduce else title)
+    if enm is not None:
+        if select is not None and trim == 'slice':
+            enm, atoms = sliceModel(enm, atoms, select)
+        elif reduce:
+            atoms = sliceAtoms(atoms, select)[1]
+        if cls is GNM:
+            enm.calcHinges()
+        return enm, atoms
+
+    enm = cls(title)
+    if cls is ANM:
+        enm.buildHessian(atoms, gamma=gamma, **kwargs)
+    else:
+        enm.buildKirchhoff(atoms, gamma=gamma, **kwargs)
     
     if select is None:
         enm.calcModes(n_modes=n_modes, zeros=zeros, turbo=turbo)
+        saveCachedENM(key, enm)
     else:
         if trim == 'slice':
             enm.calcModes(n_modes=n_modes, zeros=zeros, turbo=turbo)
+            saveCachedENM(key, enm)
             enm, atoms = sliceModel(enm, atoms, select)  
             if model == 'gnm':
                 enm.calcHinges()
         elif trim == 'reduce':
             enm, atoms = reduceModel(enm, atoms, select)
             enm.calcModes(n_modes=n_modes, zeros=zeros, turbo=turbo)
+            saveCachedENM(key, enm)
         else:
             enm.calcModes(n_modes=n_modes, zeros=zeros, turbo=turbo)
+            saveCachedENM(key, enm)
     
     return enm, atoms
@@ -9,6 +9,42 @@ from prody.atomic import Atomic
 __all__ = ['Gamma', 'GammaStructureBased', 'GammaVariableCutoff']
 
 
+def vectorizeGamma(gamma):
+    """Returns a function that accepts arrays of squared distances and node
+    indices, i.e. ``gammas(dist2, i, j)``, and returns an array of force
+    constants.
+
+    *gamma* may be a number, a :class:`Gamma` instance, or a custom function.
+    For :class:`Gamma` instances, :meth:`Gamma.gammas` is used.  Custom
+    functions are first called with arrays, and if they fail to handle arrays
+    (raise an exception or return an array with a wrong shape) they are
+    called once for each pair."""
+
+    if isinstance(gamma, Gamma):
+        return gamma.gammas
+
+    if callable(gamma):
+        def gammas(dist2, i, j):
+            dist2 = np.asarray(dist2, float)
+            try:
+                result = np.asarray(gamma(dist2, i, j), float)
+                result = np.broadcast_to(result, dist2.shape)
+            except Exception:
+                return _gammaPairwise(gamma, dist2, i, j)
+            return np.array(result)
+        return gammas
+
+    gamma = float(gamma)
+    return lambda dist2, i, j: np.full(len(dist2), gamma)
+
+
+def _gammaPairwise(gamma, dist2, i, j):
+    """Returns force constants calling scalar *gamma* once for each pair."""
+
+    return np.array([gamma(d2, i_, j_) for d2, i_, j_ in zip(dist2, i, j)],
+                    float)
+
+
 class Gamma(object):
 
     """Base class for facilitating use of atom type, residue type, or residue
@@ -31,6 +67,15 @@ class Gamma(object):
 
         pass
 
+    def gammas(self, dist2, i, j):
+        """Returns an array of force constants for arrays of squared distances
+        and node indices.
+
+        Derived classes should override this method with a vectorized
+        implementation, by default :meth:`gamma` is called for each pair."""
+
+        return _gammaPairwise(self.gamma, dist2, i, j)
+
 
 class GammaStructureBased(Gamma):
 
@@ -197,6 +242,32 @@ class GammaStructureBased(Gamma):
 
         return self._gamma
 
+    def gammas(self, dist2, i, j):
+        """Returns an array of force constants."""
+
+        dist2 = np.asarray(dist2, float)
+        i = np.asarray(i, int)
+        j = np.asarray(j, int)
+        sstr = self._sstr
+        ssid = self._ssid
+        rnum = self._rnum
+
+        sstr_i = sstr[i]
+        same = ssid[i] == ssid[j]
+        i_j = np.abs(rnum[j] - rnum[i])
+        helix = (same & (dist2 <= 49) &
+                 (((i_j <= 4) & (sstr_i == 'H')) |
+                  ((i_j <= 3) & (sstr_i == 'G')) |
+                  ((i_j <= 5) & (sstr_i == 'I'))))
+        sheet = ((~same) & (sstr_i == 'E') & (sstr[j] == 'E') &
+                 (dist2 <= 36))
+
+        gammas = np.full(dist2.shape, self._gamma)
+        gammas[helix] = self._helix
+        gammas[sheet] = self._sheet
+        gammas[dist2 <= 16] = self._connected
+        return gammas
+
 
 class GammaVariableCutoff(Gamma):
 
@@ -299,3 +370,13 @@ class GammaVariableCutoff(Gamma):
                   'effective cutoff:', str(cutoff), 'distance:',
                   str(dist2**0.5), 'gamma:', str(gamma)]))  # PY3K: OK
         return gamma
+
+    def gammas(self, dist2, i, j):
+        """Returns an array of force constants."""
+
+        if self._debug:
+            return super(GammaVariableCutoff, self).gammas(dist2, i, j)
+
+        dist2 = np.asarray(dist2, float)
+        cutoff = self._radii[i] + self._radii[j]
+        return np.where(dist2 < cutoff ** 2, self._gamma, 0.)
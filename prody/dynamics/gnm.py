@@ -14,84 +14,58 @@ from prody.kdtree import KDTree
 from prody.utilities import importLA, checkCoords, div0
 
 from .nma import NMA
-from .gamma import Gamma
+from .gamma import Gamma, vectorizeGamma
+from .eigsolvers import selectEigSolver, countZeroModes
+from .enmcache import getENMCacheKey, loadCachedENM, saveCachedENM
 
 __all__ = ['GNM', 'solveEig', 'calcGNM', 'MaskedGNM']
 
 ZERO = 1e-6
+CONTACT_BLOCK_SIZE = 2 ** 20
 
 
-def solveEig(M, n_modes=None, zeros=False, turbo=True, is3d=False):
-    linalg = importLA()
+def solveEig(M, n_modes=None, zeros=False, turbo=True, is3d=False, **kwargs):
+    """Returns eigenvalues, eigenvectors, and variances for the lowest
+    *n_modes* non-zero modes of Kirchhoff or Hessian matrix *M*.
+
+    :arg method: eigensolver backend, one of ``'auto'`` (default),
+        ``'lapack'``, ``'lanczos'``, ``'lobpcg'``, or an :class:`.EigSolver`
+        instance, see :func:`.selectEigSolver`
+    :type method: str
+
+    Other keyword arguments are passed to the eigensolver."""
+
     dof = M.shape[0]
 
     expct_n_zeros = 6 if is3d else 1
 
     if n_modes is None:
-        eigvals = None
+        stop = None
         n_modes = dof
     else:
         if n_modes >= dof:
-            eigvals = None
+            stop = None
             n_modes = dof
         else:
-            eigvals = (0, n_modes+expct_n_zeros-1)
+            stop = n_modes + expct_n_zeros - 1
 
-    def _eigh(M, eigvals=None, turbo=True):
-        if linalg.__package__.startswith('scipy'):
-            from scipy.sparse import issparse
-
-            if eigvals:
-                turbo = False
-            if not issparse(M):
-                values, vectors = linalg.eigh(M, turbo=turbo, eigvals=eigvals)
-            else:
-                try:
-                    from scipy.sparse import linalg as scipy_sparse_la
-                except ImportError:
-                    raise ImportError('failed to import scipy.sparse.linalg, '
-                                      'which is required for sparse matrix '
-                                      'decomposition')
-                if eigvals:
-                    j = eigvals[0]
-                    k = eigvals[-1] + 1
-                else:
-                    j = 0
-                    k = dof
-
-                if k >= dof:
-                    k -= 1
-                    LOGGER.warning('Cannot calculate all eigenvalues for sparse matrices, thus '
-                                   'the last eigenvalue is omitted. See scipy.sparse.linalg.eigsh '
-                                   'for more information')
-                values, vectors = scipy_sparse_la.eigsh(M, k=k, which='SA')
-                values = values[j:k]
-                vectors = vectors[:, j:k]
-        else:
-            if n_modes is not None:
-                LOGGER.info('Scipy is not found, all modes were calculated.')
-            else:
-                n_modes = dof
-            values, vectors = linalg.eigh(M)
-        return values, vectors
+    method = kwargs.pop('method', 'auto')
+    solver = selectEigSolver(M, None if stop is None else n_modes,
+                             method=method, **kwargs)
 
     def _calc_n_zero_modes(M):
-        from scipy.sparse import issparse
-
-        if not issparse(M):
+        # exact for GNM, a lower bound for ANM that is checked against
+        # eigenvalues below
+        try:
+            return countZeroModes(M, is3d)
+        except ImportError:
+            linalg = importLA()
+            if hasattr(M, 'toarray'):
+                M = M.toarray()
             w = linalg.eigvalsh(M)
-        else:
-            try:
-                from scipy.sparse import linalg as scipy_sparse_la
-            except ImportError:
-                raise ImportError('failed to import scipy.sparse.linalg, '
-                                    'which is required for sparse matrix '
-                                    'decomposition')
-            w, _ = scipy_sparse_la.eigsh(M, k=dof-1, which='SA')
-        n_zeros = sum(w < ZERO)
-        return n_zeros
-
-    values, vectors = _eigh(M, eigvals, turbo)
+            return sum(w < ZERO)
+
+    values, vectors = solver.solve(M, 0, stop, turbo=turbo)
     n_zeros = sum(values < ZERO)
 
     if n_zeros < n_modes + expct_n_zeros:
@@ -111,11 +85,17 @@ def solveEig(M, n_modes=None, zeros=False, turbo=True, is3d=False):
                 LOGGER.debug('%d zero eigenvalues detected.'%n_zeros)
             LOGGER.debug('Solving for additional eigenvalues...')
 
-            if n_modes < dof:
-                start = min(n_modes+expct_n_zeros, dof-1); end = min(n_modes+n_zeros-1, dof-1)
-                values_, vectors_ = _eigh(M, eigvals=(start, end))
-                values = np.concatenate((values, values_))
-                vectors = np.hstack((vectors, vectors_))
+            # solve until n_modes nonzero eigenvalues are calculated, zero
+            # modes are counted from eigenvalues
+            while n_modes < dof:
+                start = len(values); end = min(n_modes+n_zeros-1, dof-1)
+                if start <= end:
+                    values_, vectors_ = solver.solve(M, start, end)
+                    values = np.concatenate((values, values_))
+                    vectors = np.hstack((vectors, vectors_))
+                n_zeros = int(sum(values < ZERO))
+                if len(values) >= min(n_modes + n_zeros, dof):
+                    break
 
         # final_n_modes may exceed len(eigvals) - no need to fix for the sake of the simplicity of the code
         final_n_modes = n_zeros + n_modes
@@ -224,6 +204,75 @@ def checkENMParameters(cutoff, gamma):
     return cutoff, gamma, gamma_func
 
 
+def findContactPairs(coords, cutoff, kdtree=True):
+    """Returns indices of node pairs that are within *cutoff* distance of
+    each other and squared distances between them as three arrays, *rows*,
+    *cols*, and *dist2*.  Pairs are ordered by the first and then by the
+    second index, with first index always smaller than the second.  When
+    *kdtree* is **True**, all nodes are searched in a single batched
+    :meth:`.KDTree.searchCenters` call, otherwise distances are computed for
+    blocks of nodes."""
+
+    n_atoms = coords.shape[0]
+    if kdtree:
+        kdtree = KDTree(coords)
+        offsets, cols, dist = kdtree.searchCenters(float(cutoff), coords)
+        rows = np.repeat(np.arange(n_atoms), np.diff(offsets))
+        upper = rows < cols
+        cols = cols[upper].astype(int)
+        return rows[upper], cols, dist[upper] ** 2
+
+    cutoff2 = cutoff * cutoff
+    blocksize = max(1, CONTACT_BLOCK_SIZE // max(n_atoms, 1))
+    rows = [np.zeros(0, int)]
+    cols = [np.zeros(0, int)]
+    dist2s = [np.zeros(0)]
+    for start in range(0, n_atoms, blocksize):
+        stop = min(start + blocksize, n_atoms)
+        i2j = coords[np.newaxis, :, :] - coords[start:stop, np.newaxis, :]
+        dist2 = (i2j ** 2).sum(2)
+        upper = np.arange(n_atoms) > np.arange(start, stop)[:, np.newaxis]
+        which_i, which_j = np.nonzero(upper & (dist2 <= cutoff2))
+        rows.append(which_i + start)
+        cols.append(which_j)
+        dist2s.append(dist2[which_i, which_j])
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(dist2s)
+
+
+def assembleKirchhoff(n_atoms, rows, cols, gammas, sparse=False):
+    """Returns Kirchhoff matrix assembled from contact pairs and their force
+    constants.  Diagonal elements are accumulated in the order of pairs, so
+    the result is identical to adding pairs one at a time.  When *sparse* is
+    **True**, a :class:`scipy.sparse.csr_matrix` is returned."""
+
+    diag_index = np.empty(len(rows) * 2, int)
+    diag_index[0::2] = rows
+    diag_index[1::2] = cols
+    diag_gammas = np.zeros(n_atoms)
+    np.add.at(diag_gammas, diag_index, np.repeat(gammas, 2))
+    diag = np.arange(n_atoms)
+
+    if sparse:
+        try:
+            from scipy import sparse as scipy_sparse
+        except ImportError:
+            raise ImportError('failed to import scipy.sparse, which  is '
+                              'required for sparse matrix calculations')
+        kirchhoff = scipy_sparse.coo_matrix(
+            (np.concatenate([-gammas, -gammas, diag_gammas]),
+             (np.concatenate([rows, cols, diag]),
+              np.concatenate([cols, rows, diag]))),
+            shape=(n_atoms, n_atoms)).tocsr()
+        kirchhoff.sum_duplicates()
+        kirchhoff.eliminate_zeros()
+    else:
+        kirchhoff = np.zeros((n_atoms, n_atoms), 'd')
+        kirchhoff[rows, cols] = -gammas
+        kirchhoff[cols, rows] = -gammas
+        kirchhoff[diag, diag] = diag_gammas
+    return kirchhoff
+
+
 class GNM(GNMBase):
 
     """A class for Gaussian Network Model (GNM) analysis of proteins
@@ -308,50 +357,11 @@ class GNM(GNMBase):
 
         n_atoms = coords.shape[0]
         start = time.time()
-        sparse = kwargs.get('sparse', False)
-        if sparse:
-            try:
-                from scipy import sparse as scipy_sparse
-            except ImportError:
-                raise ImportError('failed to import scipy.sparse, which  is '
-                                  'required for sparse matrix calculations')
-            kirchhoff = scipy_sparse.lil_matrix((n_atoms, n_atoms))
-        else:
-            kirchhoff = np.zeros((n_atoms, n_atoms), 'd')
-
-        if kwargs.get('kdtree', True):
-            kdtree = KDTree(coords)
-            kdtree.search(cutoff)
-            dist2 = kdtree.getDistances() ** 2
-            r = 0
-            for i, j in kdtree.getIndices():
-                g = gamma(dist2[r], i, j)
-                kirchhoff[i, j] = -g
-                kirchhoff[j, i] = -g
-                kirchhoff[i, i] = kirchhoff[i, i] + g
-                kirchhoff[j, j] = kirchhoff[j, j] + g
-                r += 1
-        else:
-            LOGGER.info('Using slower method for building the Kirchhoff.')
-            cutoff2 = cutoff * cutoff
-            mul = np.multiply
-            for i in range(n_atoms):
-                xyz_i = coords[i, :]
-                i_p1 = i+1
-                i2j = coords[i_p1:, :] - xyz_i
-                mul(i2j, i2j, i2j)
-                for j, dist2 in enumerate(i2j.sum(1)):
-                    if dist2 > cutoff2:
-                        continue
-                    j += i_p1
-                    g = gamma(dist2, i, j)
-                    kirchhoff[i, j] = -g
-                    kirchhoff[j, i] = -g
-                    kirchhoff[i, i] = kirchhoff[i, i] + g
-                    kirchhoff[j, j] = kirchhoff[j, j] + g
-
-        if sparse:
-            kirchhoff = kirchhoff.tocsr()
+        rows, cols, dist2 = findContactPairs(coords, cutoff,
+                                             kdtree=kwargs.get('kdtree', True))
+        gammas = vectorizeGamma(g)(dist2, rows, cols)
+        kirchhoff = assembleKirchhoff(n_atoms, rows, cols, gammas,
+                                      sparse=kwargs.get('sparse', False))
 
         LOGGER.debug('Kirchhoff was built in {0:.2f}s.'
                      .format(time.time()-start))
@@ -477,7 +487,7 @@ class GNM(GNMBase):
         return self._commuteTime    
 
 
-    def calcModes(self, n_modes=20, zeros=False, turbo=True, hinges=True):
+    def calcModes(self, n_modes=20, zeros=False, turbo=True, hinges=True, **kwargs):
         """Calculate normal modes.  This method uses :func:`scipy.linalg.eigh`
         function to diagonalize the Kirchhoff matrix. When Scipy is not found,
         :func:`numpy.linalg.eigh` is used.
@@ -492,6 +502,10 @@ class GNM(GNMBase):
         :arg turbo: Use a memory intensive, but faster way to calculate modes.
         :type turbo: bool, default is **True**
 
+        :arg method: eigensolver backend, one of ``'auto'``, ``'lapack'``,
+            ``'lanczos'``, or ``'lobpcg'``, see :func:`.selectEigSolver`
+        :type method: str, default is ``'auto'``
+
         :arg hinges: Identify hinge sites after modes are computed.
         :type hinges: bool, default is **True**
         """
@@ -507,7 +521,7 @@ class GNM(GNMBase):
         self._clear()
         LOGGER.timeit('_gnm_calc_modes')
         values, vectors, vars = solveEig(self._kirchhoff, n_modes=n_modes, zeros=zeros, 
-                                         turbo=turbo, is3d=False)
+                                         turbo=turbo, is3d=False, **kwargs)
 
         self._eigvals = values
         self._array = vectors
@@ -658,10 +672,17 @@ def calcGNM(pdb, selstr='calpha', cutoff=15., gamma=1., n_modes=20,
     else:
         raise TypeError('pdb must be an atom container, not {0}'
                         .format(type(pdb)))
-    gnm = GNM(title)
     sel = ag.select(selstr)
-    gnm.buildKirchhoff(sel, cutoff, gamma)
-    gnm.calcModes(n_modes, zeros, hinges=hinges)
+    key = getENMCacheKey(GNM, sel, selstr, cutoff, gamma,
+                         n_modes, zeros=zeros)
+    gnm = loadCachedENM(key, GNM, title)
+    if gnm is None:
+        gnm = GNM(title)
+        gnm.buildKirchhoff(sel, cutoff, gamma)
+        gnm.calcModes(n_modes, zeros, hinges=hinges)
+        saveCachedENM(key, gnm)
+    elif hinges:
+        gnm.calcHinges()
     return gnm, sel
 
 class MaskedGNM(GNM):
@@ -827,6 +848,8 @@ class MaskedGNM(GNM):
         self._maskedarray = None
         super(MaskedGNM, self).setEigens(vectors, values)
 
-    def calcModes(self, n_modes=20, zeros=False, turbo=True, hinges=True):
+    def calcModes(self, n_modes=20, zeros=False, turbo=True, hinges=True,
+                  **kwargs):
         self._maskedarray = None
-        super(MaskedGNM, self).calcModes(n_modes, zeros, turbo, hinges)
+        super(MaskedGNM, self).calcModes(n_modes, zeros, turbo, hinges,
+                                         **kwargs)
@@ -82,6 +82,12 @@ class PCA(NMA):
         mean = None
         weights = None
         ensemble = None
+        if isinstance(coordsets, Ensemble) and isinstance(coordsets._confs,
+                                                          np.memmap):
+            self._buildCovarianceChunks(coordsets, **kwargs)
+            LOGGER.report('Covariance matrix calculated in %2fs.',
+                          '_prody_pca')
+            return
         if isinstance(coordsets, np.ndarray):
             if (coordsets.ndim != 3 or coordsets.shape[2] != 3 or
                     coordsets.dtype not in (np.float32, float)):
@@ -110,13 +116,11 @@ class PCA(NMA):
             coordsum = np.zeros(dof)
             LOGGER.progress('Building covariance', n_frames, '_prody_pca')
             align = not kwargs.get('aligned', False)
-            for frame in coordsets:
-                if align:
-                    frame.superpose()
-                coords = frame._getCoords().flatten()
-                coordsum += coords
-                cov += np.outer(coords, coords)
-                n_confs += 1
+            for coords, _, _ in coordsets.iterChunks(superpose=align):
+                coords = coords.reshape((len(coords), dof)).astype(float)
+                coordsum += coords.sum(0)
+                cov += np.dot(coords.T, coords)
+                n_confs += len(coords)
                 LOGGER.update(n_confs, label='_prody_pca')
             LOGGER.finish()
             cov /= n_confs
@@ -176,6 +180,71 @@ class PCA(NMA):
         self._n_atoms = n_atoms
         LOGGER.report('Covariance matrix calculated in %2fs.', '_prody_pca')
 
+    def _buildCovarianceChunks(self, ensemble, **kwargs):
+        """Build covariance matrix for *ensemble* reading conformations in
+        chunks, which is used for memory-mapped conformations.  Mean
+        coordinates are calculated in a first pass, and outer products of
+        deviations are accumulated in a second pass."""
+
+        n_confs = len(ensemble)
+        if n_confs < 3:
+            raise ValueError('coordsets must have more than 3 coordinate '
+                             'sets')
+        n_atoms = ensemble.numSelected()
+        if n_atoms < 3:
+            raise ValueError('coordsets must have more than 3 atoms')
+        dof = n_atoms * 3
+        LOGGER.info('Covariance is calculated using {0} coordinate sets.'
+                    .format(n_confs))
+
+        if isinstance(ensemble, PDBEnsemble):
+            chunks = ensemble._iterWeightedChunks
+        else:
+            def chunks():
+                for start, stop, confs in ensemble._iterChunks():
+                    yield start, stop, confs, None
+
+        mean = np.zeros((n_atoms, 3))
+        weightsum = np.zeros((n_atoms, 1))
+        for start, stop, confs, weights in chunks():
+            if weights is None:
+                mean += confs.sum(0)
+                weightsum += stop - start
+            else:
+                weights = weights > 0
+                mean += (confs * weights).sum(0)
+                weightsum += weights.sum(0)
+        mean /= weightsum
+
+        cov = np.zeros((dof, dof))
+        if isinstance(ensemble, PDBEnsemble):
+            divide_by = np.zeros((dof, dof))
+        else:
+            divide_by = n_confs
+        LOGGER.progress('Building covariance', n_confs, '_prody_pca')
+        for start, stop, confs, weights in chunks():
+            s = (stop - start, dof)
+            deviations = confs - mean
+            if weights is None:
+                cov += np.dot(deviations.reshape(s).T, deviations.reshape(s))
+            else:
+                weights = weights > 0
+                deviations = (deviations * weights).reshape(s)
+                cov += np.dot(deviations.T, deviations)
+                weights = weights.astype(float).repeat(3, axis=2).reshape(s)
+                divide_by += np.dot(weights.T, weights)
+            LOGGER.update(stop, label='_prody_pca')
+        LOGGER.finish()
+        cov /= divide_by
+        self._cov = cov
+
+        if kwargs.get('update_coords', False):
+            ensemble.setCoords(mean)
+
+        self._trace = self._cov.trace()
+        self._dof = dof
+        self._n_atoms = n_atoms
+
     def calcModes(self, n_modes=20, turbo=True):
         """Calculate principal (or essential) modes.  This method uses
         :func:`scipy.linalg.eigh`, or :func:`numpy.linalg.eigh`, function
@@ -247,6 +316,12 @@ class PCA(NMA):
         if not isinstance(coordsets, (Ensemble, Atomic, np.ndarray)):
             raise TypeError('coordsets must be an Ensemble, Atomic, Numpy '
                             'array instance')
+        if isinstance(coordsets, Ensemble) and isinstance(coordsets._confs,
+                                                          np.memmap):
+            self._performSVDChunks(coordsets)
+            LOGGER.debug('{0} modes were calculated in {1:.2f}s.'
+                         .format(self._n_modes, time.time()-start))
+            return
         if isinstance(coordsets, np.ndarray):
             if (coordsets.ndim != 3 or coordsets.shape[2] != 3 or
                     coordsets.dtype not in (np.float32, float)):
@@ -283,6 +358,56 @@ class PCA(NMA):
         LOGGER.debug('{0} modes were calculated in {1:.2f}s.'
                      .format(self._n_modes, time.time()-start))
 
+    def _performSVDChunks(self, ensemble):
+        """Calculate principal modes for *ensemble* reading conformations in
+        chunks, which is used for memory-mapped conformations.  Left singular
+        vectors of deviations from reference coordinates are calculated as
+        eigenvectors of the sum of outer products of deviations, which is
+        accumulated one chunk at a time."""
+
+        linalg = importLA()
+
+        n_confs = len(ensemble)
+        if n_confs < 3:
+            raise ValueError('coordsets must have more than 3 coordinate sets')
+        n_atoms = ensemble.numSelected()
+        if n_atoms < 3:
+            raise ValueError('coordsets must have more than 3 atoms')
+        dof = n_atoms * 3
+
+        if isinstance(ensemble, PDBEnsemble):
+            chunks = ensemble._iterWeightedChunks
+        else:
+            def chunks():
+                for start, stop, confs in ensemble._iterChunks():
+                    yield start, stop, confs, None
+
+        # deviations of missing atoms are zero, as in getDeviations
+        coords = ensemble._getCoords()
+        scatter = np.zeros((dof, dof))
+        for start, stop, confs, weights in chunks():
+            deviations = confs - coords
+            if weights is not None:
+                deviations *= weights > 0
+            deviations = deviations.reshape((stop - start, dof))
+            scatter += np.dot(deviations.T, deviations)
+
+        values, vectors = linalg.eigh(scatter)
+        # there are at most as many singular values as conformations
+        n_values = min(dof, n_confs)
+        values = values[::-1][:n_values] / n_confs
+        vectors = vectors[:, ::-1][:, :n_values]
+        self._dof = dof
+        self._n_atoms = n_atoms
+        # eigenvalues of the sum of outer products are accurate up to round
+        # off errors relative to the largest one
+        which = values > max(1e-18, dof * np.finfo(float).eps * values[0])
+        self._eigvals = values[which]
+        self._array = vectors[:, which]
+        self._vars = self._eigvals
+        self._trace = self._vars.sum()
+        self._n_modes = len(self._eigvals)
+
     def addEigenpair(self, eigenvector, eigenvalue=None):
         """Add eigen *vector* and eigen *value* pair(s) to the instance.
         If eigen *value* is omitted, it will be set to 1.  Eigenvalues
@@ -3,6 +3,7 @@
 from PCA and normal modes."""
 
 import time
+from threading import Lock
 
 import numpy as np
 
@@ -19,6 +20,7 @@ from .modeset import ModeSet
 from .mode import VectorBase, Mode, Vector
 from .gnm import GNMBase
 from .analysis import calcCovariance
+from .analysis import BLOCK_ELEMENTS, _checkNCPU, _getModeWeights, _mapBlocks
 
 __all__ = ['calcPerturbResponse']
 
@@ -39,6 +41,24 @@ def calcPerturbResponse(model, atoms=None, **kwargs):
     *model* and *atoms* must have the same number of atoms. *atoms* must be an
     :class:`.AtomGroup` instance. 
 
+    The response matrix is calculated directly from eigenvectors and
+    variances in blocks of rows, so the covariance matrix is never built.
+    Effectiveness and sensitivity are accumulated while blocks are
+    calculated.
+
+    :arg n_cpu: number of threads that calculate blocks, default is 1
+    :type n_cpu: int
+
+    :arg filename: name of a :file:`.npy` file for writing the matrix,
+        which is returned as a :class:`numpy.memmap`
+    :type filename: str
+
+    :arg out: an NxN array for writing the matrix
+    :type out: :class:`numpy.ndarray`
+
+    :arg blocksize: number of rows calculated at a time
+    :type blocksize: int
+
     .. [CA09] Atilgan C, Atilgan AR, Perturbation-Response Scanning
        Reveals Ligand Entry-Exit Mechanisms of Ferric Binding Protein.
        *PLoS Comput Biol* **2009** 5(10):e1000544.
@@ -51,7 +71,6 @@ def calcPerturbResponse(model, atoms=None, **kwargs):
     if isinstance(model, NMA) and len(model) == 0:
         raise ValueError('model must have normal modes calculated')
 
-    atoms = kwargs.get('atoms',None)
     if atoms is not None:
         if isinstance(atoms, Selection):
             atoms = atoms.copy()
@@ -60,63 +79,70 @@ def calcPerturbResponse(model, atoms=None, **kwargs):
         elif atoms.numAtoms() != model.numAtoms():
             raise ValueError('model and atoms must have the same number atoms')
 
-    n_atoms = model.numAtoms()
-    LOGGER.timeit('_prody_prs_all')
-    LOGGER.info('Calculating covariance matrix')
-    LOGGER.timeit('_prody_cov')
-
-    cov = model.getCovariance()
-
-    LOGGER.clear()
-    LOGGER.report('Covariance matrix calculated in %.1fs.', '_prody_cov')
-
-    LOGGER.info('Calculating perturbation response')
-    LOGGER.timeit('_prody_prs_mat')
-    if not model.is3d():
-        prs_matrix = cov**2
-
-    else:
-        cov_squared = cov**2
-        n_by_3n_cov_squared = np.zeros((n_atoms, 3 * n_atoms))
-        prs_matrix = np.zeros((n_atoms, n_atoms))
-        i3 = -3
-        i3p3 = 0
-        for i in range(n_atoms):
-            i3 += 3
-            i3p3 += 3
-            n_by_3n_cov_squared[i,:] = (cov_squared[i3:i3p3,:]).sum(0)
-
-        j3 = -3
-        j3p3 = 0
-        for j in range(n_atoms):
-            j3 += 3
-            j3p3 += 3                
-            prs_matrix[:,j] = (n_by_3n_cov_squared[:,j3:j3p3]).sum(1)
-
-    LOGGER.clear()
-    LOGGER.report('Perturbation response matrix calculated in %.1fs.',
-                  '_prody_prs_mat')
+    n_cpu = kwargs.get('n_cpu', 1)
+    _checkNCPU(n_cpu)
 
     suppress_diag = kwargs.get('suppress_diag', False)
     no_diag = kwargs.get('no_diag', suppress_diag)
-    #filename = kwargs.get('filename', None)
 
-    norm_prs_matrix = np.zeros((n_atoms, n_atoms))
-    self_dp = np.diag(prs_matrix)  
-    self_dp = self_dp.reshape(n_atoms, 1)
-    norm_prs_matrix = prs_matrix / np.repeat(self_dp, n_atoms, axis=1)
+    vectors, variances, is3d, n_atoms = _getModeWeights(model)
+    dim = 3 if is3d else 1
+
+    out = kwargs.get('out')
+    filename = kwargs.get('filename')
+    if out is None:
+        if filename:
+            out = np.lib.format.open_memmap(filename, mode='w+', dtype=float,
+                                            shape=(n_atoms, n_atoms))
+        else:
+            out = np.empty((n_atoms, n_atoms))
+    elif not isinstance(out, np.ndarray):
+        raise TypeError('out must be a Numpy array')
+    elif out.shape != (n_atoms, n_atoms):
+        raise ValueError('out.shape must be ({0}, {0})'.format(n_atoms))
+
+    blocksize = kwargs.get('blocksize')
+    if blocksize is None:
+        blocksize = max(1, BLOCK_ELEMENTS // max(dim * dim * n_atoms, 1))
+    blocksize = int(blocksize)
+    if blocksize < 1:
+        raise ValueError('blocksize must be a positive integer')
 
-    if no_diag:
-       # suppress the diagonal (self displacement) to facilitate
-       # visualizing the response profile
-       norm_prs_matrix = norm_prs_matrix - np.diag(np.diag(norm_prs_matrix))
-    
-    W = 1 - np.eye(n_atoms)
-    effectiveness = np.average(norm_prs_matrix, weights=W, axis=1)
-    sensitivity = np.average(norm_prs_matrix, weights=W, axis=0)
+    LOGGER.timeit('_prody_prs_all')
+    LOGGER.info('Calculating perturbation response')
 
-    #if filename:
-    #    np.savetxt(filename, norm_prs_matrix, delimiter='\t', fmt='%8.6f')
+    weighted = vectors * variances
+    vectorsT = vectors.T
+    effectiveness = np.zeros(n_atoms)
+    sensitivity = np.zeros(n_atoms)
+    lock = Lock()
+
+    def calcBlock(start):
+        stop = min(start + blocksize, n_atoms)
+        # rows of covariance matrix for atoms in the block, squared and
+        # summed over 3x3 submatrices for 3-d models
+        block = np.dot(weighted[start * dim:stop * dim], vectorsT) ** 2
+        if is3d:
+            block = block.reshape((stop - start, 3, n_atoms, 3)).sum(3).sum(1)
+
+        rows = arange(stop - start)
+        diag = rows + start
+        block /= block[rows, diag][:, np.newaxis]
+        self_dp = block[rows, diag]
+        block[rows, diag] = 0
+        effectiveness[start:stop] = block.sum(1)
+        colsum = block.sum(0)
+        if not no_diag:
+            block[rows, diag] = self_dp
+        out[start:stop] = block
+        with lock:
+            sensitivity[:] += colsum
+
+    _mapBlocks(calcBlock, range(0, n_atoms, blocksize), n_cpu)
+
+    if n_atoms > 1:
+        effectiveness /= n_atoms - 1
+        sensitivity /= n_atoms - 1
 
     LOGGER.report('Perturbation response scanning completed in %.1fs.',
                   '_prody_prs_all')
@@ -134,7 +160,7 @@ def calcPerturbResponse(model, atoms=None, **kwargs):
 
         #atoms.setData('prs_matrix', norm_prs_matrix)
 
-    return norm_prs_matrix, effectiveness, sensitivity
+    return out, effectiveness, sensitivity
 
 
 def calcDynamicFlexibilityIndex(prs_matrix, atoms, select):
@@ -3,20 +3,24 @@
 
 from numbers import Integral
 
-from numpy import dot, add, subtract, array, ndarray, sign, concatenate
-from numpy import zeros, ones, arange, isscalar, max, asarray
+from numpy import array, ndarray, concatenate
+from numpy import zeros, ones, empty, isscalar, max, asarray
 from numpy import newaxis, unique, repeat, sum
 
 from prody import LOGGER
 from prody.atomic import Atomic, sliceAtoms
 from prody.atomic.atomgroup import checkLabel
-from prody.measure import getRMSD
-from prody.utilities import importLA, checkCoords, checkWeights, copy
+from prody.measure import getRMSD, superposeCoordsets, calcPairwiseRMSDs
+from prody.utilities import checkCoords, checkWeights, copy
 
 from .conformation import *
 
 __all__ = ['Ensemble']
 
+ENSEMBLE_CHUNK = 2 ** 22
+"""Number of coordinate array elements in a chunk of conformations that are
+processed together, e.g. when conformations are memory-mapped."""
+
 class Ensemble(object):
 
     """A class for analysis of arbitrary conformational ensembles.
@@ -419,35 +423,36 @@ class Ensemble(object):
         """Returns a copy of coordinate set(s) at given *indices*, which may be
         an integer, a list of integers or **None**. **None** returns all
         coordinate sets.  For reference coordinates, use :meth:`getCoordinates`
-        method."""
+        method.  Memory-mapped conformations are returned as an array in
+        memory, which is filled in chunks."""
 
         if self._confs is None:
             return None
+        if indices is None:
+            n_atoms = self.numSelected() if selected else self._n_atoms
+            coords = empty((self._n_csets, n_atoms, 3), self._confs.dtype)
+            for start, stop, confs in self._iterChunks(selected=selected):
+                coords[start:stop] = confs
+            return coords
         if self._indices is None or not selected:
-            if indices is None:
-                return self._confs.copy()
+            try:
+                coords = self._confs[indices]
+            except IndexError:
+                pass
+            if coords.base is None:
+                return coords
             else:
-                try:
-                    coords = self._confs[indices]
-                except IndexError:
-                    pass
-                if coords.base is None:
-                    return coords
-                else:
-                    return coords.copy()
+                return array(coords)
         else:
             selids = self._indices
-            if indices is None:
-                return self._confs.take(selids, 1)
+            try:
+                coords = self._confs[indices, selids]
+            except IndexError:
+                pass
+            if coords.base is None:
+                return coords
             else:
-                try:
-                    coords = self._confs[indices, selids]
-                except IndexError:
-                    pass
-                if coords.base is None:
-                    return coords
-                else:
-                    return coords.copy()
+                return array(coords)
 
         raise IndexError('indices must be an integer, a list/array of '
                          'integers, a slice, or None')
@@ -474,6 +479,43 @@ class Ensemble(object):
         raise IndexError('indices must be an integer, a list/array of '
                          'integers, a slice, or None')
 
+    def _iterChunks(self, chunksize=None, selected=True):
+        """Yield *start* and *stop* indices and coordinate sets for chunks of
+        conformations.  Memory-mapped conformations are read from the disk one
+        chunk at a time.  By default, chunks contain about
+        :data:`ENSEMBLE_CHUNK` coordinate array elements."""
+
+        n_csets = self._n_csets
+        if chunksize is None:
+            chunksize = ENSEMBLE_CHUNK // (self._n_atoms * 3) or 1
+        indices = self._indices if selected else None
+        for start in range(0, n_csets, chunksize):
+            stop = min(start + chunksize, n_csets)
+            confs = self._confs[start:stop]
+            if indices is not None:
+                confs = confs[:, indices]
+            yield start, stop, confs
+
+    def _calcMeanCoordset(self):
+        """Returns mean coordinates of all atoms calculated in chunks.  When
+        conformations have their own weights, mean is weighted."""
+
+        weights = self._weights
+        if weights is not None and weights.ndim != 3:
+            weights = None
+        coordsum = zeros((self._n_atoms, 3))
+        if weights is None:
+            weightsum = self._n_csets
+        else:
+            weightsum = zeros((self._n_atoms, 1))
+        for start, stop, confs in self._iterChunks(selected=False):
+            if weights is None:
+                coordsum += confs.sum(0)
+            else:
+                coordsum += (confs * weights[start:stop]).sum(0)
+                weightsum += weights[start:stop].sum(0)
+        return coordsum / weightsum
+
     def delCoordset(self, index):
         """Delete a coordinate set from the ensemble."""
 
@@ -526,6 +568,10 @@ class Ensemble(object):
         :arg ref: index of the reference coordinate. If **None**, the average 
             coordinate will be assumed as the reference. Default is **None**
         :type ref: int
+
+        :arg method: method for calculating rotations, ``'svd'`` (default)
+            or ``'qcp'`` for quaternion characteristic polynomial method
+        :type method: str
         """
 
         ref = kwargs.pop('ref', None)
@@ -534,79 +580,36 @@ class Ensemble(object):
         if self._confs is None or len(self._confs) == 0:
             raise ValueError('conformations are not set, use `addCoordset`')
         LOGGER.timeit('_prody_ensemble')
-        self._superpose(ref=ref)  # trans kwarg is used by PDBEnsemble
+        self._superpose(ref=ref, **kwargs)  # trans kwarg is used by PDBEnsemble
         LOGGER.report('Superposition completed in %.2f seconds.',
                       '_prody_ensemble')
 
     def _superpose(self, **kwargs):
-        """Superpose conformations and update coordinates."""
+        """Superpose conformations and update coordinates.  Conformations
+        are superposed in chunks using :func:`.superposeCoordsets`."""
 
         ref = kwargs.pop('ref', None)
 
         indices = self._indices
         weights = self._weights
-        mobs = self._confs
         if indices is None:
-            idx = False
             tar = self._coords
-            movs = None
         else:
-            idx = True
             if self._weights is not None:
                 weights = weights[indices]
             tar = self._coords[indices]
-            movs = self._confs
-
-        linalg = importLA()
-        svd = linalg.svd
-        det = linalg.det
 
-        if weights is None:
-            if ref is None:
-                tar_com = tar.mean(0)
-            else:
+        tar_com = None
+        if ref is not None:
+            if weights is None:
                 tar_com = tar[ref]
-
-            tar_org = (tar - tar_com)
-            mob_org = zeros(tar_org.shape, dtype=mobs.dtype)
-            tar_org = tar_org.T
-        else:
-            weights_sum = weights.sum()
-            weights_dot = dot(weights.T, weights)
-            if ref is None:
-                tar_com = (tar * weights).sum(axis=0) / weights_sum
             else:
                 tar_com = (tar[ref] * weights[ref]).sum(axis=0) / sum(weights[ref])
-            tar_org = (tar - tar_com)
-            mob_org = zeros(tar_org.shape, dtype=mobs.dtype)
 
-        LOGGER.progress('Superposing ', len(mobs), '_prody_ensemble')
-        for i, mob in enumerate(mobs):
-            if idx:
-                mob = mob[indices]
-            if weights is None:
-                mob_com = mob.mean(0)
-                matrix = dot(tar_org, subtract(mob, mob_com, mob_org))
-            else:
-                mob_com = (mob * weights).sum(axis=0) / weights_sum
-                subtract(mob, mob_com, mob_org)
-                matrix = dot((tar_org * weights).T,
-                             (mob_org * weights)) / weights_dot
-
-            U, s, Vh = svd(matrix)
-            Id = array([[1, 0, 0], [0, 1, 0], [0, 0, sign(det(matrix))]])
-            rotation = dot(Vh.T, dot(Id, U.T))
-
-            if movs is None:
-                mobs[i] = dot(mob_org, rotation)
-                add(mobs[i], tar_com, mobs[i])
-            else:
-                add(dot(movs[i], rotation),
-                    (tar_com - dot(mob_com, rotation)), movs[i])
-            LOGGER.update(i + 1, label='_prody_ensemble')
-        LOGGER.finish()
+        superposeCoordsets(self._confs, tar, weights, indices, tar_com=tar_com,
+                           method=kwargs.get('method', 'svd'))
 
-    def iterpose(self, rmsd=0.0001):
+    def iterpose(self, rmsd=0.0001, **kwargs):
         """Iteratively superpose the ensemble until convergence.  Initially,
         all conformations are aligned with the reference coordinates.  Then
         mean coordinates are calculated, and are set as the new reference
@@ -618,7 +621,9 @@ class Ensemble(object):
 
         :arg rmsd: change in reference coordinates to determine convergence,
             default is 0.0001 Å RMSD
-        :type rmsd: float"""
+        :type rmsd: float
+
+        Keyword arguments, e.g. *method*, are passed to :meth:`superpose`."""
 
         if self._coords is None:
             raise AttributeError('coordinates are not set, use `setCoords`')
@@ -629,16 +634,9 @@ class Ensemble(object):
         LOGGER.timeit('_prody_ensemble')
         rmsdif = 1
         step = 0
-        weights = self._weights
-        if weights is not None and weights.ndim == 3:
-            weightsum = weights.sum(axis=0)
-        length = len(self)
         while rmsdif > rmsd:
-            self._superpose()
-            if weights is None:
-                newxyz = self._confs.sum(0) / length
-            else:
-                newxyz = (self._confs * weights).sum(0) / weightsum
+            self._superpose(**kwargs)
+            newxyz = self._calcMeanCoordset()
             rmsdif = getRMSD(self._coords, newxyz)
             self._coords = newxyz
             step += 1
@@ -650,22 +648,20 @@ class Ensemble(object):
     def getMSFs(self):
         """Returns mean square fluctuations (MSFs) for selected atoms.
         Conformations can be aligned using one of :meth:`superpose` or
-        :meth:`iterpose` methods prior to MSF calculation."""
+        :meth:`iterpose` methods prior to MSF calculation.  Conformations
+        are processed in chunks."""
 
         if self._confs is None:
             return
-        indices = self._indices
-        if indices is None:
-            mean = self._confs.mean(0)
-            ssqf = zeros(mean.shape)
-            for conf in self._confs:
-                ssqf += (conf - mean) ** 2
-        else:
-            mean = self._confs[:, indices].mean(0)
-            ssqf = zeros(mean.shape)
-            for conf in self._confs[:, indices]:
-                ssqf += (conf - mean) ** 2
-        return ssqf.sum(1) / self._n_csets
+        n_csets = self._n_csets
+        mean = zeros((self.numSelected(), 3))
+        for start, stop, confs in self._iterChunks():
+            mean += confs.sum(0)
+        mean /= n_csets
+        ssqf = zeros(mean.shape)
+        for start, stop, confs in self._iterChunks():
+            ssqf += ((confs - mean) ** 2).sum(0)
+        return ssqf.sum(1) / n_csets
 
     def getRMSFs(self):
         """Returns root mean square fluctuations (RMSFs) for selected atoms.
@@ -688,7 +684,7 @@ class Ensemble(object):
 
         return self._getCoordsets() - self._getCoords()
 
-    def getRMSDs(self, pairwise=False):
+    def getRMSDs(self, pairwise=False, **kwargs):
         """Returns root mean square deviations (RMSDs) for selected atoms.
         Conformations can be aligned using one of :meth:`superpose` or
         :meth:`iterpose` methods prior to RMSD calculation.
@@ -696,6 +692,10 @@ class Ensemble(object):
         :arg pairwise: if **True** then it will return pairwise RMSDs 
             as an n-by-n matrix. n is the number of conformations.
         :type pairwise: bool
+
+        Pairwise RMSDs are calculated using :func:`.calcPairwiseRMSDs`, and
+        keyword arguments *superpose*, *condensed*, *filename*, *out*, *n_cpu*
+        and *blocksize* are passed to it.
         """
 
         if self._confs is None or self._coords is None:
@@ -703,19 +703,21 @@ class Ensemble(object):
 
         indices = self._indices
         if indices is None:
-            indices = arange(self._confs.shape[1])
-        
-        weights = self._weights[indices] if self._weights is not None else None
-
-        if pairwise:
-            n_confs = self.numConfs()
-            RMSDs = zeros((n_confs, n_confs))
-            for i in range(n_confs):
-                for j in range(i+1, n_confs):
-                    RMSDs[i, j] = RMSDs[j, i] = getRMSD(self._confs[i, indices], self._confs[j, indices], weights)
+            weights = self._weights
+            coords = self._coords
         else:
-            RMSDs = getRMSD(self._coords[indices], self._confs[:, indices], weights)
+            weights = None if self._weights is None else self._weights[indices]
+            coords = self._coords[indices]
 
+        if pairwise:
+            # selected atoms are taken from each block of conformations, so
+            # memory-mapped conformations are not copied as a whole
+            return calcPairwiseRMSDs(self._confs, weights, indices=indices,
+                                     **kwargs)
+
+        RMSDs = zeros(self._n_csets)
+        for start, stop, confs in self._iterChunks():
+            RMSDs[start:stop] = getRMSD(coords, confs, weights)
         return RMSDs
 
     def setData(self, label, data):
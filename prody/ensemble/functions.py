@@ -2,6 +2,9 @@
 
 import os.path
 import time
+import json
+import pickle
+import struct
 from numbers import Integral
 
 import numpy as np
@@ -20,13 +23,25 @@ __all__ = ['saveEnsemble', 'loadEnsemble', 'trimPDBEnsemble',
            'calcOccupancies', 'showOccupancies', 'alignPDBEnsemble',
            'buildPDBEnsemble', 'refineEnsemble']
 
+RAW_MAGIC = b'PRODYENS'
+RAW_VERSION = 1
+RAW_PREAMBLE = '<8sIIQ'
+RAW_ALIGN = 4096
+RAW_ARRAYS = ('_confs', '_weights', '_coords', '_indices', '_trans')
+
 
 def saveEnsemble(ensemble, filename=None, **kwargs):
     """Save *ensemble* model data as :file:`filename.ens.npz`.  If *filename*
     is **None**, title of the *ensemble* will be used as the filename, after
     white spaces in the title are replaced with underscores.  Extension is
     :file:`.ens.npz`. Upon successful completion of saving, filename is
-    returned. This function makes use of :func:`~numpy.savez` function."""
+    returned. This function makes use of :func:`~numpy.savez` function.
+
+    :arg raw: save ensemble as :file:`filename.ens.raw` in an uncompressed
+        format, in which arrays are aligned and follow a small header, so
+        that conformations can be memory-mapped using
+        ``loadEnsemble(filename, mmap=True)``, default is **False**
+    :type raw: bool"""
 
     if not isinstance(ensemble, Ensemble):
         raise TypeError('invalid type for ensemble, {0}'
@@ -34,6 +49,7 @@ def saveEnsemble(ensemble, filename=None, **kwargs):
     if len(ensemble) == 0:
         raise ValueError('ensemble instance does not contain data')
 
+    raw = kwargs.pop('raw', False)
     dict_ = ensemble.__dict__
     attr_list = ['_title', '_confs', '_weights', '_coords', '_indices']
     if isinstance(ensemble, PDBEnsemble):
@@ -41,6 +57,19 @@ def saveEnsemble(ensemble, filename=None, **kwargs):
         attr_list.append('_trans')
     if filename is None:
         filename = ensemble.getTitle().replace(' ', '_')
+
+    if raw:
+        if not filename.endswith('.raw'):
+            if not filename.endswith('.ens'):
+                filename += '.ens'
+            filename += '.raw'
+        ostream = openFile(filename, 'wb', **kwargs)
+        try:
+            _writeRawEnsemble(ostream, ensemble)
+        finally:
+            ostream.close()
+        return filename
+
     attr_dict = {}
     for attr in attr_list:
         value = dict_[attr]
@@ -70,9 +99,152 @@ def saveEnsemble(ensemble, filename=None, **kwargs):
     return filename
 
 
+def _alignOffset(offset):
+
+    return -(-offset // RAW_ALIGN) * RAW_ALIGN
+
+
+def _writeRawEnsemble(ostream, ensemble):
+    """Write *ensemble* in raw format.  File starts with a preamble that
+    contains format identifier, version, header length and offset of data
+    section, which is followed by a JSON header.  Arrays are written without
+    compression in the data section at offsets that are multiples of
+    :data:`RAW_ALIGN`, and atoms, data and MSA are pickled."""
+
+    dict_ = ensemble.__dict__
+    objects = {'_atoms': dict_['_atoms'], '_data': dict_['_data'],
+               '_msa': dict_.get('_msa')}
+    objects = pickle.dumps(objects, protocol=2)
+
+    header = {'class': ensemble.__class__.__name__,
+              'title': ensemble.getTitle(),
+              'labels': dict_.get('_labels'),
+              'arrays': {}}
+    arrays = []
+    offset = 0
+    for attr in RAW_ARRAYS:
+        array = dict_.get(attr)
+        if array is None:
+            continue
+        header['arrays'][attr] = {'dtype': array.dtype.str,
+                                  'shape': list(array.shape),
+                                  'offset': offset}
+        arrays.append(array)
+        offset = _alignOffset(offset + array.nbytes)
+    header['objects'] = {'offset': offset, 'length': len(objects)}
+
+    header = json.dumps(header).encode('utf-8')
+    data_offset = _alignOffset(struct.calcsize(RAW_PREAMBLE) + len(header))
+    ostream.write(struct.pack(RAW_PREAMBLE, RAW_MAGIC, RAW_VERSION,
+                              len(header), data_offset))
+    ostream.write(header)
+    written = struct.calcsize(RAW_PREAMBLE) + len(header)
+    for array in arrays:
+        ostream.write(b'\0' * (data_offset - written))
+        written = data_offset
+        # large arrays, which may be memory-mapped, are written in chunks
+        if array.ndim > 1:
+            step = max(1, (1 << 24) // max(1, array[0].nbytes))
+        else:
+            step = max(1, len(array))
+        for start in range(0, len(array), step):
+            chunk = np.ascontiguousarray(array[start:start+step])
+            ostream.write(chunk.tobytes())
+            written += chunk.nbytes
+        data_offset = _alignOffset(written)
+    ostream.write(b'\0' * (data_offset - written))
+    ostream.write(objects)
+
+
+def _isRawEnsemble(filename):
+
+    try:
+        with open(filename, 'rb') as stream:
+            return stream.read(len(RAW_MAGIC)) == RAW_MAGIC
+    except (IOError, OSError, TypeError):
+        return False
+
+
+def _loadRawEnsemble(filename, mmap=False):
+    """Returns ensemble loaded from a raw format file.  When *mmap* is a mode
+    accepted by :class:`numpy.memmap`, conformations and their weights are
+    memory-mapped."""
+
+    size = struct.calcsize(RAW_PREAMBLE)
+    with open(filename, 'rb') as stream:
+        magic, version, header_len, data_offset = struct.unpack(
+            RAW_PREAMBLE, stream.read(size))
+        if magic != RAW_MAGIC:
+            raise ValueError('{0} is not a raw ensemble file'
+                             .format(filename))
+        if version > RAW_VERSION:
+            raise ValueError('{0} was saved in a newer raw ensemble format '
+                             '(version {1})'.format(filename, version))
+        header = json.loads(stream.read(header_len).decode('utf-8'))
+
+        arrays = {}
+        for attr, info in header['arrays'].items():
+            dtype = np.dtype(str(info['dtype']))
+            shape = tuple(info['shape'])
+            offset = data_offset + info['offset']
+            if mmap and attr in ('_confs', '_weights'):
+                arrays[attr] = np.memmap(filename, dtype=dtype, mode=mmap,
+                                         offset=offset, shape=shape)
+            else:
+                stream.seek(offset)
+                count = int(np.prod(shape))
+                arrays[attr] = np.fromfile(stream, dtype=dtype,
+                                           count=count).reshape(shape)
+
+        stream.seek(data_offset + header['objects']['offset'])
+        objects = pickle.loads(stream.read(header['objects']['length']))
+
+    if header['class'] == 'PDBEnsemble':
+        ensemble = PDBEnsemble(header['title'])
+    else:
+        ensemble = Ensemble(header['title'])
+
+    ensemble.setCoords(arrays['_coords'])
+    ensemble.setAtoms(objects['_atoms'])
+    ensemble._indices = arrays.get('_indices')
+    ensemble._data = objects['_data']
+
+    confs = arrays['_confs']
+    ensemble._confs = confs
+    ensemble._n_csets = len(confs)
+    ensemble._weights = arrays.get('_weights')
+    if isinstance(ensemble, PDBEnsemble):
+        ensemble._labels = list(header['labels'] or [])
+        ensemble._trans = arrays.get('_trans')
+        ensemble._msa = objects['_msa']
+    return ensemble
+
+
 def loadEnsemble(filename, **kwargs):
     """Returns ensemble instance loaded from *filename*.  This function makes
-    use of :func:`~numpy.load` function.  See also :func:`saveEnsemble`"""
+    use of :func:`~numpy.load` function.  See also :func:`saveEnsemble`
+
+    :arg mmap: memory-map conformations and their weights instead of reading
+        them into memory, **True** is the same as ``'c'`` and uses
+        copy-on-write, so that changes, e.g. by superposition, are not saved,
+        ``'r'`` opens file read-only and ``'r+'`` opens file for reading and
+        writing changes back to it, default is **False**.  Only files saved with
+        ``raw=True`` option can be memory-mapped.  Methods that modify the
+        number of conformations, such as :meth:`~.Ensemble.addCoordset`,
+        load conformations into memory.
+    :type mmap: bool, str"""
+
+    mmap = kwargs.pop('mmap', False)
+    if mmap is True:
+        mmap = 'c'
+    if mmap and mmap not in ('r', 'r+', 'c'):
+        raise ValueError('mmap must be True, False, or one of r, r+, c')
+
+    if _isRawEnsemble(filename):
+        return _loadRawEnsemble(filename, mmap)
+    if mmap:
+        raise ValueError('only ensembles saved with raw=True option can be '
+                         'memory-mapped')
 
     if not 'encoding' in kwargs:
         kwargs['encoding'] = 'latin1'
@@ -540,6 +712,9 @@ def refineEnsemble(ensemble, lower=.5, upper=10., **kwargs):
     :arg ref: the index or label of the reference conformation which will also be kept.
         Default is 0
     :type ref: int or str
+
+    :arg n_cpu: number of threads used for calculating pairwise RMSDs, default is 1
+    :type n_cpu: int
     """ 
 
     protected = kwargs.pop('protected', [])
@@ -574,7 +749,7 @@ def refineEnsemble(ensemble, lower=.5, upper=10., **kwargs):
         P = [ref_i] + P
 
     ### calculate pairwise RMSDs ###
-    RMSDs = ensemble.getRMSDs(pairwise=True)
+    RMSDs = ensemble.getRMSDs(pairwise=True, n_cpu=kwargs.pop('n_cpu', 1))
 
     def getRefinedIndices(A):
         deg = A.sum(axis=0)
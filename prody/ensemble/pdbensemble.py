@@ -5,7 +5,7 @@ import numpy as np
 
 from prody.sequence import MSA, Sequence
 from prody.atomic import Atomic, AtomGroup
-from prody.measure import getRMSD, getTransformation
+from prody.measure import getRMSD, superposeCoordsets, calcPairwiseRMSDs
 from prody.utilities import checkCoords, checkWeights, copy
 from prody import LOGGER
 
@@ -158,6 +158,10 @@ class PDBEnsemble(Ensemble):
     def superpose(self, **kwargs):
         """Superpose the ensemble onto the reference coordinates obtained by 
         :meth:`getCoords`.
+
+        :arg method: method for calculating rotations, ``'svd'`` (default)
+            or ``'qcp'`` for quaternion characteristic polynomial method
+        :type method: str
         """
 
         trans = kwargs.pop('trans', True)
@@ -166,14 +170,14 @@ class PDBEnsemble(Ensemble):
         if self._confs is None or len(self._confs) == 0:
             raise ValueError('conformations are not set, use `addCoordset`')
         LOGGER.timeit('_prody_ensemble')
-        self._superpose(trans=trans)  # trans kwarg is used by PDBEnsemble
+        self._superpose(trans=trans, **kwargs)  # trans kwarg is used by PDBEnsemble
         LOGGER.report('Superposition completed in %.2f seconds.',
                       '_prody_ensemble')
 
     def _superpose(self, **kwargs):
-        """Superpose conformations and update coordinates."""
+        """Superpose conformations and update coordinates.  Conformations
+        are superposed in chunks using :func:`.superposeCoordsets`."""
 
-        calcT = getTransformation
         if kwargs.get('trans', False):
             if self._trans is not None:
                 LOGGER.info('Existing transformations will be overwritten.')
@@ -184,29 +188,69 @@ class PDBEnsemble(Ensemble):
         if indices is None:
             weights = self._weights
             coords = self._coords
-            confs = self._confs
-            confs_selected = self._confs
         else:
-            weights = self._weights[:, indices]
+            weights = None if self._weights is None else self._weights[:, indices]
             coords = self._coords[indices]
-            confs = self._confs
-            confs_selected = self._confs[:, indices]
-
-        for i, conf in enumerate(confs_selected):
-            rmat, tvec = calcT(conf, coords, weights[i])
-            if trans is not None:
-                trans[i][:3, :3] = rmat
-                trans[i][:3, 3] = tvec
-            confs[i] = tvec + np.dot(confs[i], rmat.T)
+
+        rmats, tvecs = superposeCoordsets(self._confs, coords, weights, indices,
+                                          method=kwargs.get('method', 'svd'))
+        if trans is not None:
+            trans[:, :3, :3] = rmats
+            trans[:, :3, 3] = tvecs
         self._trans = trans
 
-    def iterpose(self, rmsd=0.0001):
+    def _calcSuperposedMean(self, **kwargs):
+        """Returns weighted mean coordinates of conformations superposed onto
+        reference coordinates.  Conformations are copied and superposed one
+        chunk at a time, so that they are left unchanged."""
+
+        indices = self._indices
+        coords = self._coords if indices is None else self._coords[indices]
+        coordsum = np.zeros((self._n_atoms, 3))
+        weightsum = np.zeros((self._n_atoms, 1))
+        for start, stop, confs in self._iterChunks(selected=False):
+            confs = np.array(confs)
+            weights = self._weights[start:stop]
+            superposeCoordsets(confs, coords, weights if indices is None
+                               else weights[:, indices], indices,
+                               method=kwargs.get('method', 'svd'))
+            coordsum += (confs * weights).sum(0)
+            weightsum += weights.sum(0)
+        return coordsum / weightsum
+
+    def _iterWeightedChunks(self, chunksize=None):
+        """Yield *start* and *stop* indices, coordinate sets, and weights of
+        selected atoms for chunks of conformations."""
+
+        indices = self._indices
+        for start, stop, confs in self._iterChunks(chunksize):
+            weights = self._weights[start:stop]
+            if indices is not None:
+                weights = weights[:, indices]
+            yield start, stop, confs, weights
+
+    def iterpose(self, rmsd=0.0001, **kwargs):
 
-        confs = self._confs.copy()
-        Ensemble.iterpose(self, rmsd)
-        self._confs = confs
+        if self._coords is None:
+            raise AttributeError('coordinates are not set, use `setCoords`')
+        if self._confs is None or len(self._confs) == 0:
+            raise AttributeError('conformations are not set, use'
+                                 '`addCoordset`')
+        LOGGER.info('Starting iterative superposition:')
+        LOGGER.timeit('_prody_ensemble')
+        rmsdif = 1
+        step = 0
+        while rmsdif > rmsd:
+            newxyz = self._calcSuperposedMean(**kwargs)
+            rmsdif = getRMSD(self._coords, newxyz)
+            self._coords = newxyz
+            step += 1
+            LOGGER.info('Step #{0}: RMSD difference = {1:.4e}'
+                        .format(step, rmsdif))
+        LOGGER.report('Iterative superposition completed in %.2fs.',
+                      '_prody_ensemble')
         LOGGER.info('Final superposition to calculate transformations.')
-        self.superpose()
+        self.superpose(**kwargs)
 
     iterpose.__doc__ = Ensemble.iterpose.__doc__
 
@@ -409,23 +453,28 @@ class PDBEnsemble(Ensemble):
         if self._confs is None:
             return None
 
+        coords = self._coords
+        selids = self._indices if selected else None
+        if selids is not None:
+            coords = coords[selids]
         if indices is None:
+            # memory-mapped conformations are read in chunks
+            confs = np.empty((self._n_csets, len(coords), 3),
+                             self._confs.dtype)
+            for start, stop, chunk in self._iterChunks(selected=selected):
+                confs[start:stop] = chunk
             indices = slice(None)
         else:
             indices = np.array([indices]).flatten()
-        coords = self._coords
-        if self._indices is None or not selected:
-            confs = self._confs[indices].copy()
-            for i, w in enumerate(self._weights[indices]):
-                which = w.flatten() == 0
-                confs[i, which] = coords[which]
-        else:
-            selids = self._indices
-            coords = coords[selids]
-            confs = self._confs[indices, selids].copy()
-            for i, w in enumerate(self._weights[indices]):
-                which = w[selids].flatten() == 0
-                confs[i, which] = coords[which]
+            if selids is None:
+                confs = self._confs[indices].copy()
+            else:
+                confs = self._confs[indices, selids].copy()
+        for i, w in enumerate(self._weights[indices]):
+            if selids is not None:
+                w = w[selids]
+            which = w.flatten() == 0
+            confs[i, which] = coords[which]
         return confs
 
     _getCoordsets = getCoordsets
@@ -476,30 +525,25 @@ class PDBEnsemble(Ensemble):
     def getMSFs(self):
         """Calculate and return mean square fluctuations (MSFs).
         Note that you might need to align the conformations using
-        :meth:`superpose` or :meth:`iterpose` before calculating MSFs."""
+        :meth:`superpose` or :meth:`iterpose` before calculating MSFs.
+        Conformations are processed in chunks."""
 
         if self._confs is None:
             return
-        indices = self._indices
-        if indices is None:
-            coords = self._coords
-            confs = self._confs
-            weights = self._weights > 0
-        else:
-            coords = self._coords[indices]
-            confs = self._confs[:, indices]
-            weights = self._weights[:, indices] > 0
-        weightsum = weights.sum(0)
-        mean = np.zeros(coords.shape)
-        for i, conf in enumerate(confs):
-            mean += conf * weights[i]
+        n_selected = self.numSelected()
+        mean = np.zeros((n_selected, 3))
+        weightsum = np.zeros((n_selected, 1))
+        for start, stop, confs, weights in self._iterWeightedChunks():
+            weights = weights > 0
+            mean += (confs * weights).sum(0)
+            weightsum += weights.sum(0)
         mean /= weightsum
         ssqf = np.zeros(mean.shape)
-        for i, conf in enumerate(confs):
-            ssqf += ((conf - mean) * weights[i]) ** 2
+        for start, stop, confs, weights in self._iterWeightedChunks():
+            ssqf += (((confs - mean) * (weights > 0)) ** 2).sum(0)
         return ssqf.sum(1) / weightsum.flatten()
 
-    def getRMSDs(self, pairwise=False):
+    def getRMSDs(self, pairwise=False, **kwargs):
         """Calculate and return root mean square deviations (RMSDs). Note that
         you might need to align the conformations using :meth:`superpose` or
         :meth:`iterpose` before calculating RMSDs.
@@ -507,30 +551,29 @@ class PDBEnsemble(Ensemble):
         :arg pairwise: if **True** then it will return pairwise RMSDs 
             as an n-by-n matrix. n is the number of conformations.
         :type pairwise: bool
+
+        Pairwise RMSDs are calculated using :func:`.calcPairwiseRMSDs` with
+        products of weights of each pair, and keyword arguments *condensed*,
+        *filename*, *out*, *n_cpu* and *blocksize* are passed to it.
         """
 
         if self._confs is None or self._coords is None:
             return None
 
-        indices = self._indices
-        if indices is None:
-            indices = np.arange(self._confs.shape[1])
-
-        weights = self._weights[:, indices] if self._weights is not None else None
         if pairwise:
-            n_confs = self.numConfs()
-            RMSDs = np.zeros((n_confs, n_confs))
-            for i in range(n_confs):
-                for j in range(i+1, n_confs):
-                    if weights is None:
-                        w = None
-                    else:
-                        wi = weights[i]; wj = weights[j]
-                        w = wi * wj
-                    RMSDs[i, j] = RMSDs[j, i] = getRMSD(self._confs[i, indices], self._confs[j, indices], w)
-        else:
-            RMSDs = getRMSD(self._coords[indices], self._confs[:, indices], weights)
-
+            indices = self._indices
+            weights = self._weights
+            if indices is not None and weights is not None:
+                weights = weights[:, indices]
+            # selected atoms are taken from each block of conformations, so
+            # memory-mapped conformations are not copied as a whole
+            return calcPairwiseRMSDs(self._confs, weights, indices=indices,
+                                     **kwargs)
+
+        coords = self._getCoords()
+        RMSDs = np.zeros(self._n_csets)
+        for start, stop, confs, weights in self._iterWeightedChunks():
+            RMSDs[start:stop] = getRMSD(coords, confs, weights)
         return RMSDs
 
     def setWeights(self, weights):
@@ -716,6 +716,177 @@ void KDTree_copy_radii(struct KDTree* tree, float *radii)
     }
 }
 
+/* Batched center search
+ *
+ * Unlike KDTree_search_center_radius, the functions below keep query state
+ * on the stack and in the caller supplied RadiusList, so that several
+ * threads may search the same tree at the same time. */
+
+struct RadiusList
+{
+    struct Radius* list;
+    long int count;
+    long int size;
+};
+
+static int RadiusList_append(struct RadiusList* hits, long int index, float value)
+{
+    if (hits->count==hits->size)
+    {
+        long int size = hits->size ? 2*hits->size : 64;
+        struct Radius* p = realloc(hits->list, size*sizeof(struct Radius));
+        if (p==NULL) return 0;
+        hits->list = p;
+        hits->size = size;
+    }
+    hits->list[hits->count].index = index;
+    hits->list[hits->count].value = value;
+    hits->count++;
+    return 1;
+}
+
+static int compare_radius(const void* self, const void* other)
+{
+    const struct Radius* p = (const struct Radius*)self;
+    const struct Radius* q = (const struct Radius*)other;
+
+    if (p->index < q->index) return -1;
+    if (p->index > q->index) return +1;
+    if (p->value < q->value) return -1;
+    if (p->value > q->value) return +1;
+    return 0;
+}
+
+static int KDTree_collect_points(struct KDTree* tree, struct Node *node,
+                                 float *center, float radius,
+                                 struct RadiusList* hits)
+{
+    int d;
+
+    if (Node_is_leaf(node))
+    {
+        long int i;
+        const float radius_sq = radius*radius;
+
+        for (i=node->_start; i<node->_end; i++)
+        {
+            struct DataPoint* data_point = tree->_data_point_list + i;
+            float r = KDTree_dist(center, data_point->_coord, tree->dim);
+            if (r<=radius_sq)
+            {
+                if (!RadiusList_append(hits, data_point->_index, sqrt(r)))
+                    return 0;
+            }
+        }
+        return 1;
+    }
+
+    /* points with coordinates equal to the cut value may be on both sides */
+    d = node->_cut_dim;
+    if (center[d]-radius<=node->_cut_value)
+    {
+        if (!KDTree_collect_points(tree, node->_left, center, radius, hits))
+            return 0;
+    }
+    if (center[d]+radius>=node->_cut_value)
+    {
+        if (!KDTree_collect_points(tree, node->_right, center, radius, hits))
+            return 0;
+    }
+    return 1;
+}
+
+int KDTree_get_dim(struct KDTree* tree)
+{
+    return tree->dim;
+}
+
+int KDTree_search_centers(struct KDTree* tree, const float *centers,
+                          long int n_centers, float radius,
+                          const float *unitcell, long int *offsets,
+                          long int **indices, float **radii, long int *count)
+{
+    long int c, i, j, start;
+    int k, d, n_images = 1;
+    const int dim = tree->dim;
+    float image[3];
+    struct RadiusList hits = {NULL, 0, 0};
+
+    *indices = NULL;
+    *radii = NULL;
+    *count = 0;
+    if (tree->_root==NULL || dim != 3) return 0;
+
+    /* with a unitcell, each center is searched in 27 periodic images */
+    if (unitcell) n_images = 27;
+
+    offsets[0] = 0;
+    for (c=0; c<n_centers; c++)
+    {
+        start = hits.count;
+        for (k=0; k<n_images; k++)
+        {
+            for (d=0; d<dim; d++)
+            {
+                image[d] = centers[c*dim+d];
+                if (unitcell)
+                {
+                    /* k enumerates shifts -1, 0, 1 along x, y, and z */
+                    int shift = (d==0 ? k/9 : (d==1 ? (k/3)%3 : k%3)) - 1;
+                    image[d] += shift*unitcell[d];
+                }
+            }
+            if (!KDTree_collect_points(tree, tree->_root, image, radius,
+                                       &hits))
+            {
+                if (hits.list) free(hits.list);
+                return 0;
+            }
+        }
+
+        /* sort by index and keep minimum distance to periodic images */
+        if (hits.count-start>1)
+        {
+            qsort(hits.list+start, hits.count-start, sizeof(struct Radius),
+                  compare_radius);
+            if (unitcell)
+            {
+                j = start;
+                for (i=start+1; i<hits.count; i++)
+                {
+                    if (hits.list[i].index!=hits.list[j].index)
+                        hits.list[++j] = hits.list[i];
+                }
+                hits.count = j+1;
+            }
+        }
+        offsets[c+1] = hits.count;
+    }
+
+    if (hits.count)
+    {
+        *indices = malloc(hits.count*sizeof(long int));
+        *radii = malloc(hits.count*sizeof(float));
+        if (*indices==NULL || *radii==NULL)
+        {
+            if (*indices) free(*indices);
+            if (*radii) free(*radii);
+            *indices = NULL;
+            *radii = NULL;
+            free(hits.list);
+            return 0;
+        }
+        for (i=0; i<hits.count; i++)
+        {
+            (*indices)[i] = hits.list[i].index;
+            (*radii)[i] = hits.list[i].value;
+        }
+        free(hits.list);
+    }
+    *count = hits.count;
+    return 1;
+}
+
 static int KDTree_test_neighbors(struct KDTree* tree, struct DataPoint* p1, struct DataPoint* p2)
 {
     float r;
@@ -8,6 +8,8 @@ int KDTree_set_data(struct KDTree* tree, float *coords, long int nr_points);
 long int KDTree_get_count(struct KDTree* tree);
 long int KDTree_neighbor_get_count(struct KDTree* tree);
 int KDTree_search_center_radius(struct KDTree* tree, float *coord, float radius);
+int KDTree_get_dim(struct KDTree* tree);
+int KDTree_search_centers(struct KDTree* tree, const float *centers, long int n_centers, float radius, const float *unitcell, long int *offsets, long int **indices, float **radii, long int *count);
 void KDTree_copy_indices(struct KDTree* tree, long *indices);
 void KDTree_copy_radii(struct KDTree* tree, float *radii);
 int KDTree_neighbor_search(struct KDTree* tree, float neighbor_radius, struct Neighbor** neighbors);
@@ -390,6 +390,126 @@ exit:
     return NULL;
 }
 
+static char PyTree_search_centers__doc__[] =
+"search_centers(centers, radius[, unitcell]) searches points within radius\n"
+"of each of (M, 3) float32 centers, optionally in periodic images of an\n"
+"orthorhombic unitcell.  Returns offsets, indices, and radii as bytearrays\n"
+"of C long, C long, and float values.  Neighbors of center i are at\n"
+"offsets[i]:offsets[i+1], sorted by index.  The GIL is released during\n"
+"the search.\n";
+
+static int
+check_float_buffer(PyObject* obj, Py_buffer* view, int ndim)
+{
+    char datatype;
+
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == -1)
+        return 0;
+    datatype = view->format[0];
+    switch (datatype) {
+        case '@':
+        case '=':
+        case '<':
+        case '>':
+        case '!': datatype = view->format[1]; break;
+        default: break;
+    }
+    if (datatype != 'f') {
+        PyErr_Format(PyExc_RuntimeError,
+            "array has incorrect data format ('%c', expected 'f')", datatype);
+        PyBuffer_Release(view);
+        return 0;
+    }
+    if (view->ndim != ndim || view->shape[ndim-1] != 3) {
+        PyErr_Format(PyExc_ValueError,
+            "array has incorrect shape (expected %s)",
+            ndim == 1 ? "(3,)" : "(M, 3)");
+        PyBuffer_Release(view);
+        return 0;
+    }
+    return 1;
+}
+
+static PyObject*
+PyTree_search_centers(PyTree* self, PyObject* args)
+{
+    PyObject *obj, *cell = Py_None;
+    PyObject *offsets, *indices, *radii;
+    double radius;
+    long int n, count;
+    long int *index_list;
+    float *radius_list;
+    const float *unitcell = NULL;
+    struct KDTree* tree = self->tree;
+    Py_buffer view, cellview;
+    int ok;
+
+    if(!PyArg_ParseTuple(args, "Od|O:KDTree_search_centers",
+                         &obj, &radius, &cell))
+        return NULL;
+
+    if(radius <= 0)
+    {
+        PyErr_SetString(PyExc_ValueError, "Radius must be positive.");
+        return NULL;
+    }
+    if (KDTree_get_dim(tree) != 3)
+    {
+        PyErr_SetString(PyExc_RuntimeError, "Tree must be three-dimensional.");
+        return NULL;
+    }
+
+    if (!check_float_buffer(obj, &view, 2)) return NULL;
+    if (cell != Py_None)
+    {
+        if (!check_float_buffer(cell, &cellview, 1))
+        {
+            PyBuffer_Release(&view);
+            return NULL;
+        }
+        unitcell = (const float *) cellview.buf;
+    }
+
+    n = view.shape[0];
+    offsets = PyByteArray_FromStringAndSize(NULL, (n+1)*sizeof(long int));
+    if (!offsets)
+    {
+        PyBuffer_Release(&view);
+        if (unitcell) PyBuffer_Release(&cellview);
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    ok = KDTree_search_centers(tree, (const float *) view.buf, n,
+                               (float) radius, unitcell,
+                               (long int *) PyByteArray_AS_STRING(offsets),
+                               &index_list, &radius_list, &count);
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&view);
+    if (unitcell) PyBuffer_Release(&cellview);
+    if (!ok)
+    {
+        Py_DECREF(offsets);
+        return PyErr_NoMemory();
+    }
+
+    indices = PyByteArray_FromStringAndSize((const char *) index_list,
+                                            count*sizeof(long int));
+    radii = PyByteArray_FromStringAndSize((const char *) radius_list,
+                                          count*sizeof(float));
+    if (index_list) free(index_list);
+    if (radius_list) free(radius_list);
+    if (!indices || !radii)
+    {
+        Py_DECREF(offsets);
+        Py_XDECREF(indices);
+        Py_XDECREF(radii);
+        return NULL;
+    }
+    return Py_BuildValue("NNN", offsets, indices, radii);
+}
+
 static PyObject*
 PyTree_neighbor_search(PyTree* self, PyObject* args)
 {
@@ -604,6 +724,7 @@ static PyMethodDef PyTree_methods[] = {
     {"get_count", (PyCFunction)PyTree_get_count, METH_NOARGS, NULL},
     {"set_data", (PyCFunction)PyTree_set_data, METH_VARARGS, NULL},
     {"search_center_radius", (PyCFunction)PyTree_search_center_radius, METH_VARARGS, NULL},
+    {"search_centers", (PyCFunction)PyTree_search_centers, METH_VARARGS, PyTree_search_centers__doc__},
     {"neighbor_get_count", (PyCFunction)PyTree_neighbor_get_count, METH_NOARGS, NULL},
     {"neighbor_search", (PyCFunction)PyTree_neighbor_search, METH_VARARGS, NULL},
     {"neighbor_simple_search", (PyCFunction)PyTree_neighbor_simple_search, METH_VARARGS, NULL},
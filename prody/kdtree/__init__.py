@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 """This module provides :class:`.KDTree` class as an interface to Thomas
-Hamelryck's KDTree C module distributed with Biopython."""
+Hamelryck's KDTree C module distributed with Biopython, and :class:`.CellList`
+class for neighbor search in triclinic unitcells."""
 
 from .kdtree import KDTree
+from .celllist import CellList, pickNeighborSearch
 
-__all__ = ['KDTree']
+__all__ = ['KDTree', 'CellList', 'pickNeighborSearch']
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""This module defines :class:`CellList` class for finding neighbors using a
+grid of cells, with periodic boundary conditions in orthorhombic or
+triclinic unitcells."""
+
+import numpy as np
+from numpy import ndarray
+
+from prody import LOGGER
+
+from .kdtree import KDTree, searchBlocks, concatNeighbors
+
+__all__ = ['CellList', 'pickNeighborSearch']
+
+# number of candidate pairs evaluated at a time
+CELLLIST_BLOCK_SIZE = 2 ** 21
+
+_ = np.array([-1, 0, 1])
+STENCIL = np.array([[x, y, z] for x in _ for y in _ for z in _])
+
+
+def getBoxVectors(unitcell):
+    """Returns box vectors as rows of a ``(3, 3)`` array for *unitcell*,
+    which may contain three orthorhombic box lengths, three lengths followed
+    by three angles in degrees, or three box vectors."""
+
+    unitcell = np.asarray(unitcell, float)
+    if unitcell.shape == (3,):
+        return np.diag(unitcell)
+    elif unitcell.shape == (3, 3):
+        return unitcell.copy()
+    elif unitcell.shape != (6,):
+        raise ValueError('unitcell.shape must be (3,), (6,), or (3, 3)')
+
+    a, b, c = unitcell[:3]
+    cosines = np.cos(np.radians(unitcell[3:]))
+    # so that orthogonal boxes have exact zeros
+    cosines[unitcell[3:] == 90] = 0
+    cos_alpha, cos_beta, cos_gamma = cosines
+    sin_gamma = np.sqrt(1 - cos_gamma ** 2)
+    box = np.zeros((3, 3))
+    box[0, 0] = a
+    box[1, 0] = b * cos_gamma
+    box[1, 1] = b * sin_gamma
+    box[2, 0] = c * cos_beta
+    box[2, 1] = c * (cos_alpha - cos_beta * cos_gamma) / sin_gamma
+    box[2, 2] = np.sqrt(max(c ** 2 - box[2, 0] ** 2 - box[2, 1] ** 2, 0))
+    return box
+
+
+class CellList(object):
+
+    """A linked-cell neighbor search that can handle periodic boundary
+    conditions in orthorhombic and triclinic unitcells.  Space is divided
+    into cells whose widths are at least the search radius, so points within
+    the radius of a center are in the cell of the center or in the 26 cells
+    around it.  :class:`CellList` has the same interface as :class:`.KDTree`,
+    and handles triclinic unitcells, which :class:`.KDTree` does not.
+
+    Cells are assigned when a search is made, and are kept for later
+    searches with similar radii.  When coordinates of the next trajectory
+    frame are set using :meth:`update`, points are moved between cells
+    without building the grid again."""
+
+    def __init__(self, coords, **kwargs):
+        """
+        :arg coords: coordinate array with shape ``(N, 3)``, where N is number
+            of atoms
+        :type coords: :class:`numpy.ndarray`, :class:`.Atomic`, :class:`.Frame`
+
+        :arg unitcell: unitcell with three orthorhombic box lengths with shape
+            ``(3,)``, lengths and angles with shape ``(6,)``, or box vectors
+            as rows of an array with shape ``(3, 3)``
+        :type unitcell: :class:`numpy.ndarray`"""
+
+        unitcell = kwargs.get('unitcell')
+        if not isinstance(coords, ndarray):
+            if unitcell is None:
+                try:
+                    unitcell = coords.getUnitcell()
+                except AttributeError:
+                    pass
+                else:
+                    if unitcell is not None:
+                        LOGGER.info('Unitcell information from {0} will be '
+                                    'used.'.format(str(coords)))
+            try:
+                coords = coords.getCoords()
+            except AttributeError:
+                raise TypeError('coords must be a Numpy array or must have '
+                                'getCoords attribute')
+
+        coords = np.array(coords, float)
+        if coords.ndim != 2:
+            raise Exception('coords.ndim must be 2')
+        if coords.shape[-1] != 3:
+            raise Exception('coords.shape must be (N,3)')
+
+        self._coords = coords
+        self._pending = None
+        self._box = None
+        if unitcell is not None:
+            self._setBox(unitcell)
+
+        self._radius = None
+        self._shape = None
+        self._origin = None
+        self._lengths = None
+        self._frac = None
+        self._cells = None
+        self._order = None
+        self._starts = None
+
+        self._indices = None
+        self._distances = None
+        self._none = kwargs.pop('none', lambda: None)
+        try:
+            self._none()
+        except TypeError:
+            raise TypeError('none argument must be callable')
+        self._oncall = kwargs.pop('oncall', 'both')
+        assert self._oncall in ('both', 'dist'), 'oncall must be both or dist'
+
+    def _setBox(self, unitcell):
+
+        box = getBoxVectors(unitcell)
+        volume = abs(np.linalg.det(box))
+        if volume == 0:
+            raise ValueError('unitcell must have a non-zero volume')
+        self._box = box
+        self._inverse = np.linalg.inv(box)
+        # distances between opposite faces of the unitcell
+        self._widths = volume / np.sqrt((np.cross(box[[1, 2, 0]],
+                                                  box[[2, 0, 1]]) ** 2).sum(1))
+
+    def __call__(self, radius, center=None):
+        """Shorthand method for searching and retrieving results."""
+
+        self.search(radius, center)
+        if self._oncall == 'both':
+            return self.getIndices(), self.getDistances()
+        elif self._oncall == 'dist':
+            return self.getDistances()
+
+    def update(self, coords, unitcell=None):
+        """Set coordinates of the same points, e.g. for the next frame of a
+        trajectory, and *unitcell* when it changes.  *coords* are read and
+        points are moved between cells at the time of the next search, so
+        calling this method repeatedly costs nothing."""
+
+        if coords.shape != self._coords.shape:
+            raise ValueError('coords.shape must be {0}'
+                             .format(self._coords.shape))
+        if unitcell is not None:
+            if self._box is None:
+                raise ValueError('unitcell cannot be set for a cell list '
+                                 'built without one')
+            self._setBox(unitcell)
+        self._pending = coords
+
+    def _getFractions(self, coords):
+        """Returns fractional coordinates of *coords* on the grid, which are
+        wrapped into the unitcell when there is one."""
+
+        if self._box is None:
+            return (coords - self._origin) / self._lengths
+        frac = np.dot(coords, self._inverse)
+        frac -= np.floor(frac)
+        return frac
+
+    def _assignCells(self, frac):
+
+        shape = self._shape
+        cells = np.minimum((frac * shape).astype(int), shape - 1)
+        return (cells[:, 0] * shape[1] + cells[:, 1]) * shape[2] + cells[:, 2]
+
+    def _bin(self, radius):
+        """Assign points to cells that are at least *radius* wide."""
+
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._coords = np.array(pending, float)
+
+        if self._order is not None and 2 * radius >= self._radius:
+            if self._box is None:
+                widths = self._lengths
+            else:
+                widths = self._widths
+            if radius <= (widths / self._shape).min():
+                if pending is None:
+                    return
+                frac = self._getFractions(self._coords)
+                if self._box is not None or (frac.min() >= 0 and
+                                             frac.max() <= 1):
+                    # points move a little between frames, so cell indices
+                    # are nearly sorted and a stable sort is fast
+                    cells = self._assignCells(frac)
+                    order = self._order
+                    order = order[cells[order].argsort(kind='mergesort')]
+                    self._setCells(frac, cells, order)
+                    return
+
+        coords = self._coords
+        if self._box is None:
+            self._origin = coords.min(0)
+            self._lengths = np.maximum(coords.max(0) - self._origin, radius)
+            widths = self._lengths
+        else:
+            widths = self._widths
+
+        shape = np.maximum(np.floor(widths / radius).astype(int), 1)
+        # coarser cells are still valid, grid is limited to avoid having
+        # many more cells than points
+        max_cells = max(27, 2 * len(coords))
+        if shape.prod() > max_cells:
+            scale = (shape.prod() / float(max_cells)) ** (1. / 3)
+            shape = np.maximum(np.floor(shape / scale).astype(int), 1)
+        self._shape = shape
+        self._radius = radius
+
+        frac = self._getFractions(coords)
+        cells = self._assignCells(frac)
+        self._setCells(frac, cells, cells.argsort(kind='mergesort'))
+
+    def _setCells(self, frac, cells, order):
+
+        self._frac = frac
+        self._cells = cells
+        self._order = order
+        counts = np.bincount(cells, minlength=self._shape.prod())
+        self._starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def search(self, radius, center=None):
+        """Search pairs within *radius* of each other or points within *radius*
+        of *center*.
+
+        :arg radius: distance (Å)
+        :type radius: float
+
+        :arg center: a point in Cartesian coordinate system
+        :type center: :class:`numpy.ndarray`"""
+
+        if center is not None:
+            if not isinstance(center, ndarray):
+                raise TypeError('center must be a Numpy array instance')
+            if center.shape != (3,):
+                raise ValueError('center.shape must be (3,)')
+            _, indices, distances = self.searchCenters(radius, center)
+        else:
+            if self._pending is not None:
+                coords = np.asarray(self._pending, float)
+            else:
+                coords = self._coords
+            offsets, cols, distances = self.searchCenters(radius, coords)
+            rows = np.repeat(np.arange(len(coords)), np.diff(offsets))
+            upper = rows < cols
+            indices = np.column_stack([rows[upper], cols[upper]])
+            distances = distances[upper]
+        self._indices = indices
+        self._distances = distances
+
+    def searchCenters(self, radius, centers, n_cpu=1):
+        """Search points within *radius* of each of *centers* in a single
+        call.  See :meth:`.KDTree.searchCenters` for details.
+
+        :arg radius: distance (Å)
+        :type radius: float
+
+        :arg centers: points in Cartesian coordinate system, with shape
+            ``(M, 3)`` or ``(3,)``
+        :type centers: :class:`numpy.ndarray`
+
+        :arg n_cpu: number of threads that search blocks of *centers*,
+            default is 1
+        :type n_cpu: int"""
+
+        if not isinstance(radius, (float, int)):
+            raise TypeError('radius must be a number')
+        if radius <= 0:
+            raise TypeError('radius must be a positive number')
+        if not isinstance(n_cpu, int) or n_cpu < 1:
+            raise ValueError('n_cpu must be a positive integer')
+
+        centers = np.asarray(centers, float)
+        if centers.shape == (3,):
+            centers = centers.reshape((1, 3))
+        elif centers.ndim != 2 or centers.shape[1] != 3:
+            raise ValueError('centers.shape must be (M, 3) or (3,)')
+
+        radius = float(radius)
+        self._bin(radius)
+
+        # size blocks of centers by the expected number of candidates
+        occupancy = max(1, len(self._coords) // self._shape.prod())
+        size = max(1, CELLLIST_BLOCK_SIZE // (27 * occupancy))
+
+        def search(block):
+            return concatNeighbors([self._searchBlock(radius,
+                                                      block[i:i + size])
+                                    for i in range(0, max(len(block), 1),
+                                                   size)])
+
+        return searchBlocks(search, centers, n_cpu)
+
+    def _searchBlock(self, radius, centers):
+
+        shape = self._shape
+        pbc = self._box is not None
+        frac = self._getFractions(centers)
+        cells = np.floor(frac * shape).astype(int)
+        if pbc:
+            cells = np.minimum(cells, shape - 1)
+
+        # (M, 27, 3) cells around centers
+        around = cells[:, np.newaxis, :] + STENCIL
+        if pbc:
+            # periodic image of the cell, in units of box vectors
+            images = np.floor_divide(around, shape)
+            around -= images * shape
+            valid = None
+        else:
+            valid = ((around >= 0) & (around < shape)).all(2)
+            around[~valid] = 0
+        around = ((around[:, :, 0] * shape[1] + around[:, :, 1]) * shape[2] +
+                  around[:, :, 2])
+
+        starts = self._starts[around]
+        counts = self._starts[around + 1] - starts
+        if valid is not None:
+            counts[~valid] = 0
+        starts, counts = starts.ravel(), counts.ravel()
+
+        # expand (center, cell) pairs into (center, point) candidates
+        total = counts.sum()
+        which = np.repeat(np.arange(len(starts)), counts)
+        position = (np.arange(total) -
+                    np.repeat(np.cumsum(counts) - counts, counts) +
+                    np.repeat(starts, counts))
+        points = self._order[position]
+        center = which // 27
+
+        if pbc:
+            diff = (self._frac[points] + images.reshape((-1, 3))[which] -
+                    frac[center])
+            diff = np.dot(diff, self._box)
+        else:
+            diff = self._coords[points] - centers[center]
+        dist2 = (diff ** 2).sum(1)
+
+        keep = dist2 <= radius * radius
+        center, points, dist2 = center[keep], points[keep], dist2[keep]
+
+        order = np.lexsort((dist2, points, center))
+        center, points, dist2 = center[order], points[order], dist2[order]
+        if pbc and (shape < 3).any():
+            # a point may be found in more than one periodic image, the
+            # closest one is kept
+            first = np.ones(len(points), bool)
+            first[1:] = (center[1:] != center[:-1]) | (points[1:] != points[:-1])
+            center, points, dist2 = center[first], points[first], dist2[first]
+
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(center,
+                                                     minlength=len(centers)))])
+        return offsets, points, np.sqrt(dist2)
+
+    def getIndices(self):
+        """Returns array of indices for points or pairs, depending on the type
+        of the most recent search."""
+
+        if self.getCount():
+            return self._indices
+        return self._none()
+
+    def getDistances(self):
+        """Returns array of distances."""
+
+        if self.getCount():
+            return self._distances
+        return self._none()
+
+    def getCount(self):
+        """Returns number of points or pairs."""
+
+        if self._indices is None:
+            return 0
+        return len(self._indices)
+
+
+def pickNeighborSearch(coords, unitcell=None, **kwargs):
+    """Returns a :class:`.KDTree` or a :class:`.CellList` for *coords*.  A
+    cell list is returned only for triclinic unitcells, which k-d trees do
+    not handle.  *unitcell* may contain box lengths, lengths and angles, or
+    box vectors.  Other keyword arguments are passed to the constructor."""
+
+    # KDTree is faster at all system sizes otherwise, e.g. building and
+    # searching 5 A around each of 200000 atoms at water density takes 4.5 s
+    # (8.1 s with orthorhombic PBC) with KDTree and 14.7 s (22.8 s) with
+    # CellList
+    if unitcell is not None:
+        box = getBoxVectors(unitcell)
+        lengths = box.diagonal()
+        if (box != np.diag(lengths)).any():
+            return CellList(coords, unitcell=box, **kwargs)
+        unitcell = lengths
+    return KDTree(coords, unitcell=unitcell, **kwargs)
@@ -2,7 +2,8 @@
 """This module defines :class:`KDTree` class for dealing with atomic coordinate
 sets and handling periodic boundary conditions."""
 
-from numpy import array, ndarray, concatenate, empty
+from numpy import array, ndarray, concatenate, empty, zeros, frombuffer
+from numpy import ascontiguousarray, array_split, cumsum
 
 from prody import LOGGER
 
@@ -252,6 +253,77 @@ class KDTree(object):
                 self._pdbkeys = list(_dict)
 
 
+    def searchCenters(self, radius, centers, n_cpu=1):
+        """Search points within *radius* of each of *centers* in a single
+        call.  Unlike :meth:`search`, results are returned rather than stored,
+        so :meth:`getIndices` and :meth:`getDistances` are not affected.
+
+        :arg radius: distance (Å)
+        :type radius: float
+
+        :arg centers: points in Cartesian coordinate system, with shape
+            ``(M, 3)`` or ``(3,)``
+        :type centers: :class:`numpy.ndarray`
+
+        :arg n_cpu: number of threads that search blocks of *centers*,
+            default is 1
+        :type n_cpu: int
+
+        Returns *offsets*, *indices*, and *distances* arrays in compressed
+        sparse row form.  Neighbors of center *i* are
+        ``indices[offsets[i]:offsets[i+1]]``, sorted, and their distances are
+        ``distances[offsets[i]:offsets[i+1]]``.  When a unitcell is set,
+        minimum distances to periodic images of centers are returned."""
+
+        if not isinstance(radius, (float, int)):
+            raise TypeError('radius must be a number')
+        if radius <= 0:
+            raise TypeError('radius must be a positive number')
+        if not isinstance(n_cpu, int) or n_cpu < 1:
+            raise ValueError('n_cpu must be a positive integer')
+
+        centers = ascontiguousarray(centers, dtype='f')
+        if centers.shape == (3,):
+            centers = centers.reshape((1, 3))
+        elif centers.ndim != 2 or centers.shape[1] != 3:
+            raise ValueError('centers.shape must be (M, 3) or (3,)')
+
+        search = getattr(self._kdtree, 'search_centers', None)
+        if search is None:
+            return self._searchCenters(radius, centers)
+
+        unitcell = self._unitcell
+        if unitcell is not None:
+            unitcell = ascontiguousarray(unitcell, dtype='f')
+        radius = float(radius)
+
+        def searchBlock(block):
+            offsets, indices, radii = search(block, radius, unitcell)
+            return (frombuffer(offsets, 'l'), frombuffer(indices, 'l'),
+                    frombuffer(radii, 'f'))
+
+        return searchBlocks(searchBlock, centers, n_cpu)
+
+    def _searchCenters(self, radius, centers):
+        """Search *centers* one at a time, for C modules that do not support
+        batched search."""
+
+        offsets = zeros(len(centers) + 1, int)
+        indices = []
+        radii = []
+        for i, center in enumerate(centers):
+            self.search(radius, center.astype(float))
+            if self.getCount():
+                found = array(self.getIndices(), int)
+                order = found.argsort()
+                indices.append(found[order])
+                radii.append(array(self.getDistances(), 'f')[order])
+                offsets[i + 1] = len(found)
+        offsets = cumsum(offsets)
+        if indices:
+            return offsets, concatenate(indices), concatenate(radii)
+        return offsets, zeros(0, int), zeros(0, 'f')
+
     def getIndices(self):
         """Returns array of indices for points or pairs, depending on the type
         of the most recent search."""
@@ -313,3 +385,34 @@ def get_KDTree_radii(kdtree):
             radii = empty(n, 'f')
             kdtree.get_radii(radii)
     return radii
+
+
+def searchBlocks(search, centers, n_cpu=1):
+    """Returns neighbors of *centers* in compressed sparse row form, found by
+    calling *search* for blocks of centers using *n_cpu* threads."""
+
+    if n_cpu == 1 or len(centers) < 2 * n_cpu:
+        return search(centers)
+
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(n_cpu)
+    try:
+        results = pool.map(search, array_split(centers, n_cpu))
+    finally:
+        pool.close()
+        pool.join()
+    return concatNeighbors(results)
+
+
+def concatNeighbors(results):
+    """Returns neighbors of consecutive blocks of centers, each given as
+    *offsets*, *indices*, and *distances* arrays, joined into one block."""
+
+    if len(results) == 1:
+        return results[0]
+    shifts = cumsum([0] + [len(indices) for _, indices, _ in results])
+    offsets = concatenate([results[0][0][:1]] +
+                          [offsets[1:] + shift for (offsets, _, _), shift
+                           in zip(results, shifts)])
+    return (offsets, concatenate([indices for _, indices, _ in results]),
+            concatenate([radii for _, _, radii in results]))
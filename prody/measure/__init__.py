@@ -69,4 +69,5 @@ from . import transform
 from .transform import *
 __all__.extend(transform.__all__)
 
-from .transform import getRMSD, getTransformation
+from .transform import getRMSD, getTransformation, getTransformations
+from .transform import superposeCoordsets
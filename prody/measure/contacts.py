@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 """ This module defines a class and function for identifying contacts."""
 
-from numpy import array, ndarray
+from numpy import array, ndarray, unique, repeat, arange
 
 from prody.atomic import Atomic, Atom, AtomGroup, AtomSubset, Selection
-from prody.kdtree import KDTree
+from prody.kdtree import pickNeighborSearch
 from prody.utilities import rangeString
 
 __all__ = ['Contacts', 'iterNeighbors', 'findNeighbors']
@@ -16,15 +16,17 @@ class Contacts(object):
     of instantiation."""
 
     def __init__(self, atoms, unitcell=None):
-        """*atoms* must be an :class:`.Atomic` instance.  When an orthorhombic
-        *unitcell* array is given"""
+        """*atoms* must be an :class:`.Atomic` instance.  When a *unitcell*
+        array is given, periodic boundary conditions are taken into account.
+        Neighbors are searched using :func:`.pickNeighborSearch`."""
 
         try:
             self._acsi = atoms.getACSIndex()
         except AttributeError:
             try:
                 self._ag = atoms.getAtoms()
-                unitcell = unitcell or atoms.getUnitcell()[:3]
+                if unitcell is None:
+                    unitcell = atoms.getUnitcell()
                 self._indices = atoms.getSelection()
             except AttributeError:
                 try:
@@ -38,7 +40,8 @@ class Contacts(object):
                                          '(3,).')
                     self._ag = None
                     self._indices = None
-                    self._kdtree = KDTree(atoms, unitcell=unitcell)
+                    self._kdtree = pickNeighborSearch(atoms,
+                                                      unitcell=unitcell)
             else:
                 if self._ag is not None:
                     self._acsi = self._ag.getACSIndex()
@@ -46,18 +49,20 @@ class Contacts(object):
                         self._indices = self._indices.getIndices()
                 else:
                     self._acsi = None
-                self._kdtree = KDTree(atoms._getCoords(),
-                                      unitcell=unitcell)
+                self._kdtree = pickNeighborSearch(atoms._getCoords(),
+                                                  unitcell=unitcell)
         else:
             try:
                 self._ag = atoms.getAtomGroup()
             except AttributeError:
                 self._ag = atoms
                 self._indices = None
-                self._kdtree = KDTree(atoms._getCoords(), unitcell=unitcell)
+                self._kdtree = pickNeighborSearch(atoms._getCoords(),
+                                                  unitcell=unitcell)
             else:
                 self._indices = atoms._getIndices()
-                self._kdtree = KDTree(atoms._getCoords(), unitcell=unitcell)
+                self._kdtree = pickNeighborSearch(atoms._getCoords(),
+                                                  unitcell=unitcell)
         self._unitcell = unitcell
         self._atoms = atoms
 
@@ -93,21 +98,11 @@ class Contacts(object):
             if center is None:
                 raise ValueError('center does not have coordinate data')
 
-        search = self._kdtree.search
-        get_indices = self._kdtree.getIndices
-        get_count = self._kdtree.getCount
-        indices = set()
-        update = indices.update
-        radius = float(radius)
-        for xyz in center:
-            search(radius, xyz)
-            if get_count():
-                update(get_indices())
-        indices = list(indices)
-        if indices:
-            indices.sort()
+        _, indices, _ = self._kdtree.searchCenters(float(radius), center)
+        indices = unique(indices)
+        if len(indices):
             if self._ag is None:
-                return array(indices)
+                return indices
             else:
                 if self._indices is not None:
                     indices = self._indices[indices]
@@ -133,8 +128,8 @@ def iterNeighbors(atoms, radius, atoms2=None, unitcell=None):
     distance between them.  If *atoms2* is also provided, one atom from *atoms*
     and another from *atoms2* will be yielded.  If one of *atoms* or *atoms2*
     is a coordinate array, pairs of indices and distances will be yielded.
-    When orthorhombic *unitcell* dimensions are provided, periodic boundary
-    conditions will be taken into account (see :class:`.KDTree` and also
+    When *unitcell* dimensions are provided, periodic boundary conditions will
+    be taken into account (see :class:`.KDTree`, :class:`.CellList`, and also
     :func:`wrapAtoms` for details).  If *atoms* is a :class:`.Frame` instance
     and *unitcell* is not provided, unitcell information from frame will be
     if available."""
@@ -150,7 +145,7 @@ def iterNeighbors(atoms, radius, atoms2=None, unitcell=None):
             ndim, shape = atoms.ndim, atoms.shape
         except AttributeError:
             try:
-                uc = atoms.getUnitcell()[:3]
+                uc = atoms.getUnitcell()
             except AttributeError:
                 raise TypeError('atoms must be an Atomic or Frame instance or '
                                 'a coordinate array')
@@ -191,14 +186,19 @@ def iterNeighbors(atoms, radius, atoms2=None, unitcell=None):
         if len(coords) <= 1:
             raise ValueError('atoms must be more than 1')
 
-        kdtree = KDTree(coords, unitcell=unitcell, none=list)
+        kdtree = pickNeighborSearch(coords, unitcell=unitcell, none=list)
+        offsets, cols, dists = kdtree.searchCenters(radius, coords)
+        rows = repeat(arange(len(coords)), offsets[1:] - offsets[:-1])
+        upper = rows < cols
+        pairs = zip(rows[upper].tolist(), cols[upper].tolist(),
+                    dists[upper].tolist())
 
         _dict = {}
         if ag is None:
-            for (i, j), r in zip(*kdtree(radius)):
+            for i, j, r in pairs:
                 yield (i, j, r)
         else:
-            for (i, j), r in zip(*kdtree(radius)):
+            for i, j, r in pairs:
                 a1 = _dict.get(i)
                 if a1 is None:
                     a1 = Atom(ag, index(i), acsi)
@@ -243,35 +243,42 @@ def iterNeighbors(atoms, radius, atoms2=None, unitcell=None):
         if coords2.ndim == 1:
             coords2 = array([coords2])
         if len(coords) >= len(coords2):
-            kdtree = KDTree(coords, unitcell=unitcell, none=list)
+            kdtree = pickNeighborSearch(coords, unitcell=unitcell, none=list)
+            offsets, found, dists = kdtree.searchCenters(radius, coords2)
+            found, dists = found.tolist(), dists.tolist()
             _dict = {}
             if ag is None or ag2 is None:
-                for j, xyz in enumerate(coords2):
-                    for i, r in zip(*kdtree(radius, xyz)):
-                        yield (i, j, r)
+                for j in range(len(coords2)):
+                    for k in range(offsets[j], offsets[j + 1]):
+                        yield (found[k], j, dists[k])
             else:
-                for a2 in atoms2.iterAtoms():
-                    for i, r in zip(*kdtree(radius, a2._getCoords())):
+                for j, a2 in enumerate(atoms2.iterAtoms()):
+                    for k in range(offsets[j], offsets[j + 1]):
+                        i = found[k]
                         a1 = _dict.get(i)
                         if a1 is None:
                             a1 = Atom(ag, index(i), acsi)
                             _dict[i] = a1
-                        yield (a1, a2, r)
+                        yield (a1, a2, dists[k])
         else:
-            kdtree = KDTree(coords2, unitcell=unitcell, none=list)
+            kdtree = pickNeighborSearch(coords2, unitcell=unitcell,
+                                        none=list)
+            offsets, found, dists = kdtree.searchCenters(radius, coords)
+            found, dists = found.tolist(), dists.tolist()
             _dict = {}
             if ag is None or ag2 is None:
-                for i, xyz in enumerate(coords):
-                    for j, r in zip(*kdtree(radius, xyz)):
-                        yield (i, j, r)
+                for i in range(len(coords)):
+                    for k in range(offsets[i], offsets[i + 1]):
+                        yield (i, found[k], dists[k])
             else:
-                for a1 in atoms.iterAtoms():
-                    for i, r in zip(*kdtree(radius, a1._getCoords())):
-                        a2 = _dict.get(i)
+                for i, a1 in enumerate(atoms.iterAtoms()):
+                    for k in range(offsets[i], offsets[i + 1]):
+                        j = found[k]
+                        a2 = _dict.get(j)
                         if a2 is None:
-                            a2 = Atom(ag2, index2(i), acsi2)
-                            _dict[i] = a2
-                        yield (a1, a2, r)
+                            a2 = Atom(ag2, index2(j), acsi2)
+                            _dict[j] = a2
+                        yield (a1, a2, dists[k])
 
 
 def findNeighbors(atoms, radius, atoms2=None, unitcell=None):
@@ -559,12 +559,11 @@ def calcMSF(coordsets):
                         '_prody_calcMSF')
         ncsets = 0
         coordsets.reset()
-        for frame in coordsets:
-            frame.superpose()
-            coords = frame._getCoords()
-            total += coords
-            sqsum += coords ** 2
-            ncsets += 1
+        for coords, _, _ in coordsets.iterChunks(superpose=True):
+            coords = coords.astype(float)
+            total += coords.sum(0)
+            sqsum += (coords ** 2).sum(0)
+            ncsets += len(coords)
             LOGGER.update(ncsets, label='_prody_calcMSF')
         LOGGER.finish()
         msf = (sqsum/ncsets - (total/ncsets)**2).sum(1)
@@ -13,6 +13,7 @@ linalg = importLA()
 
 __all__ = ['Transformation', 'applyTransformation', 'alignCoordsets',
            'calcRMSD', 'calcTransformation', 'superpose',
+           'calcPairwiseRMSDs', 'iterPairwiseRMSDs',
            'moveAtoms', 'wrapAtoms',
            'printRMSD']
 
@@ -162,6 +163,246 @@ def getTransformation(mob, tar, weights=None):
     return rotation, tar_com - np.dot(mob_com, rotation.T)
 
 
+SUPERPOSE_CHUNK = 2 ** 22
+"""Number of coordinate elements processed at a time by
+:func:`superposeCoordsets`."""
+
+
+def _getRotationsSVD(matrices):
+    """Returns rotation matrices for stacked cross-covariance *matrices*,
+    ``mob.T * tar``, using singular value decomposition."""
+
+    U, _, Vh = np.linalg.svd(matrices)
+    d = np.sign(np.linalg.det(np.matmul(U, Vh)))
+    U[:, :, 2] *= d[:, np.newaxis]
+    return np.matmul(U, Vh).transpose(0, 2, 1)
+
+
+def _det3(M):
+    """Returns determinants of stacked 3x3 matrices."""
+
+    return (M[..., 0, 0] * (M[..., 1, 1] * M[..., 2, 2] -
+                            M[..., 1, 2] * M[..., 2, 1]) -
+            M[..., 0, 1] * (M[..., 1, 0] * M[..., 2, 2] -
+                            M[..., 1, 2] * M[..., 2, 0]) +
+            M[..., 0, 2] * (M[..., 1, 0] * M[..., 2, 1] -
+                            M[..., 1, 1] * M[..., 2, 0]))
+
+
+def _det4(M):
+    """Returns determinants of stacked 4x4 matrices."""
+
+    m = [[M[..., i, j] for j in range(4)] for i in range(4)]
+    s0 = m[0][0] * m[1][1] - m[1][0] * m[0][1]
+    s1 = m[0][0] * m[1][2] - m[1][0] * m[0][2]
+    s2 = m[0][0] * m[1][3] - m[1][0] * m[0][3]
+    s3 = m[0][1] * m[1][2] - m[1][1] * m[0][2]
+    s4 = m[0][1] * m[1][3] - m[1][1] * m[0][3]
+    s5 = m[0][2] * m[1][3] - m[1][2] * m[0][3]
+    c5 = m[2][2] * m[3][3] - m[3][2] * m[2][3]
+    c4 = m[2][1] * m[3][3] - m[3][1] * m[2][3]
+    c3 = m[2][1] * m[3][2] - m[3][1] * m[2][2]
+    c2 = m[2][0] * m[3][3] - m[3][0] * m[2][3]
+    c1 = m[2][0] * m[3][2] - m[3][0] * m[2][2]
+    c0 = m[2][0] * m[3][1] - m[3][0] * m[2][1]
+    return s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0
+
+
+def _getKeyMatrices(S):
+    """Returns stacked 4x4 key matrices of QCP method for stacked
+    cross-covariance matrices *S*."""
+
+    Sxx, Sxy, Sxz = S[..., 0, 0], S[..., 0, 1], S[..., 0, 2]
+    Syx, Syy, Syz = S[..., 1, 0], S[..., 1, 1], S[..., 1, 2]
+    Szx, Szy, Szz = S[..., 2, 0], S[..., 2, 1], S[..., 2, 2]
+
+    K = np.empty(S.shape[:-2] + (4, 4))
+    K[..., 0, 0] = Sxx + Syy + Szz
+    K[..., 1, 1] = Sxx - Syy - Szz
+    K[..., 2, 2] = -Sxx + Syy - Szz
+    K[..., 3, 3] = -Sxx - Syy + Szz
+    K[..., 0, 1] = K[..., 1, 0] = Syz - Szy
+    K[..., 0, 2] = K[..., 2, 0] = Szx - Sxz
+    K[..., 0, 3] = K[..., 3, 0] = Sxy - Syx
+    K[..., 1, 2] = K[..., 2, 1] = Sxy + Syx
+    K[..., 1, 3] = K[..., 3, 1] = Szx + Sxz
+    K[..., 2, 3] = K[..., 3, 2] = Syz + Szy
+    return K
+
+
+def _getQCPEigenvalues(S, K, start=None, tol=1e-11, maxiter=50):
+    """Returns largest eigenvalues of key matrices *K* calculated using
+    Newton-Raphson iterations on their characteristic polynomials starting
+    from upper bounds *start*."""
+
+    # P(l) = l**4 + c2 * l**2 + c1 * l + c0
+    c2 = -2 * (S ** 2).sum(-1).sum(-1)
+    c1 = -8 * _det3(S)
+    c0 = _det4(K)
+
+    # eigenvalues of K sum to zero, so largest one is bounded by
+    # sqrt(3/4 * sum of squares of eigenvalues) = sqrt(-1.5 * c2)
+    bound = np.sqrt(-1.5 * c2)
+    lmax = bound if start is None else np.minimum(start, bound)
+    for _ in range(maxiter):
+        l2 = lmax * lmax
+        P = (l2 + c2) * l2 + c1 * lmax + c0
+        dP = 4 * l2 * lmax + 2 * c2 * lmax + c1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(dP != 0, P / dP, 0.)
+        lmax = lmax - step
+        if (np.abs(step) <= tol * np.maximum(np.abs(lmax), 1.)).all():
+            break
+    return lmax
+
+
+def _getRotationsQCP(matrices):
+    """Returns rotation matrices for stacked cross-covariance *matrices*,
+    ``mob.T * tar``, using the quaternion characteristic polynomial (QCP)
+    method [DLT05]_.  Largest eigenvalue of the key matrix of each pair is
+    found by Newton-Raphson iterations on its characteristic polynomial, and
+    the corresponding quaternion is obtained from the adjugate of the
+    shifted key matrix.
+
+    .. [DLT05] Theobald DL. Rapid calculation of RMSDs using a
+       quaternion-based characteristic polynomial.
+       *Acta Crystallogr A* **2005** 61(Pt 4):478-480."""
+
+    S = matrices
+    n = len(S)
+    K = _getKeyMatrices(S)
+    lmax = _getQCPEigenvalues(S, K)
+
+    A = K - lmax[:, np.newaxis, np.newaxis] * np.eye(4)
+    # columns of adjugate of A are eigenvectors for lmax, cofactors are
+    # calculated for all columns and the one with the largest norm is used
+    rows = [[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]]
+    cofactors = np.empty((n, 4, 4))
+    for i in range(4):
+        for j in range(4):
+            minor = A[:, rows[i]][:, :, rows[j]]
+            cofactors[:, i, j] = (-1) ** (i + j) * _det3(minor)
+    norms = (cofactors ** 2).sum(2)
+    best = norms.argmax(1)
+    q = cofactors[np.arange(n), best]
+    qnorm = np.sqrt(norms[np.arange(n), best])
+
+    scale = np.abs(lmax) + np.abs(A).max(2).max(1) + 1.
+    degenerate = qnorm < 1e-6 * scale ** 3
+    if degenerate.any():
+        _, vectors = np.linalg.eigh(K[degenerate])
+        q[degenerate] = vectors[:, :, -1]
+        qnorm[degenerate] = 1.
+    q /= qnorm[:, np.newaxis]
+
+    q0, q1, q2, q3 = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    R = np.empty((n, 3, 3))
+    R[:, 0, 0] = q0 * q0 + q1 * q1 - q2 * q2 - q3 * q3
+    R[:, 1, 1] = q0 * q0 - q1 * q1 + q2 * q2 - q3 * q3
+    R[:, 2, 2] = q0 * q0 - q1 * q1 - q2 * q2 + q3 * q3
+    R[:, 0, 1] = 2 * (q1 * q2 - q0 * q3)
+    R[:, 1, 0] = 2 * (q1 * q2 + q0 * q3)
+    R[:, 0, 2] = 2 * (q1 * q3 + q0 * q2)
+    R[:, 2, 0] = 2 * (q1 * q3 - q0 * q2)
+    R[:, 1, 2] = 2 * (q2 * q3 - q0 * q1)
+    R[:, 2, 1] = 2 * (q2 * q3 + q0 * q1)
+    return R
+
+
+def getTransformations(mobs, tar, weights=None, tar_com=None, method='svd'):
+    """Returns rotation matrices and translation vectors that superpose each
+    coordinate set in *mobs* onto *tar*, following conventions of
+    :func:`getTransformation`, i.e. ``mobs[i] * R[i].T + t[i]``.  *weights*
+    may be shared by all coordinate sets, i.e. have shape ``(n_atoms, 1)``,
+    or be given for each set, i.e. have shape ``(n_csets, n_atoms, 1)``.
+    *tar_com* may be given to override center of *tar*.  Rotations are
+    calculated using stacked singular value decompositions (``'svd'``) or
+    QCP method (``'qcp'``)."""
+
+    mobsT = mobs.transpose(0, 2, 1)
+    if weights is None or weights.ndim == 2:
+        # centering of mobile coordinates is applied to cross-covariance
+        # matrices as a rank-1 correction to avoid copying coordinates
+        if weights is None:
+            mob_com = mobs.mean(1)
+            if tar_com is None:
+                tar_com = tar.mean(0)
+            tar_org = tar - tar_com
+        else:
+            weights_sum = weights.sum()
+            mob_com = np.dot(mobsT, weights[:, 0]) / weights_sum
+            if tar_com is None:
+                tar_com = (tar * weights).sum(axis=0) / weights_sum
+            tar_org = (tar - tar_com) * (weights * weights)
+        matrices = np.matmul(mobsT, tar_org)
+        matrices -= mob_com[:, :, np.newaxis] * tar_org.sum(0)
+    else:
+        weights_sum = weights.sum(1)
+        mob_com = np.matmul(mobsT, weights)[:, :, 0] / weights_sum
+        if tar_com is None:
+            tar_com = np.dot(weights[:, :, 0], tar) / weights_sum
+        if np.ndim(tar_com) == 2:
+            tar_org = tar - tar_com[:, np.newaxis]
+        else:
+            tar_org = tar - tar_com
+        mob_org = mobs - mob_com[:, np.newaxis]
+        matrices = np.matmul((mob_org * (weights * weights)).transpose(0, 2, 1),
+                             tar_org)
+
+    if method == 'svd':
+        rotations = _getRotationsSVD(matrices)
+    elif method == 'qcp':
+        rotations = _getRotationsQCP(matrices)
+    else:
+        raise ValueError('method must be svd or qcp')
+
+    translations = tar_com - np.einsum('ni,nji->nj', mob_com, rotations)
+    return rotations, translations
+
+
+def superposeCoordsets(confs, tar, weights=None, indices=None, **kwargs):
+    """Superpose coordinate sets in *confs* onto *tar* in place and return
+    rotations and translations.  When *indices* are given, transformations
+    are calculated using the indexed atoms and applied to all atoms.
+    Coordinate sets are processed in chunks, so that temporary arrays have
+    at most :data:`SUPERPOSE_CHUNK` elements.  *weights*, *tar_com* and
+    *method* are passed to :func:`getTransformations`.
+
+    :arg chunksize: number of coordinate sets processed at a time
+    :type chunksize: int"""
+
+    tar_com = kwargs.get('tar_com')
+    method = kwargs.get('method', 'svd')
+    n_csets, n_atoms = confs.shape[:2]
+
+    chunksize = kwargs.get('chunksize')
+    if chunksize is None:
+        chunksize = max(1, SUPERPOSE_CHUNK // (n_atoms * 3 or 1))
+    chunksize = int(chunksize)
+    if chunksize < 1:
+        raise ValueError('chunksize must be a positive integer')
+
+    rotations = np.zeros((n_csets, 3, 3))
+    translations = np.zeros((n_csets, 3))
+    per_conf = weights is not None and weights.ndim == 3
+
+    LOGGER.progress('Superposing ', n_csets, '_prody_superpose')
+    for start in range(0, n_csets, chunksize):
+        stop = min(start + chunksize, n_csets)
+        chunk = confs[start:stop]
+        mobs = chunk if indices is None else chunk[:, indices]
+        rots, trans = getTransformations(
+            mobs, tar, weights[start:stop] if per_conf else weights,
+            tar_com=tar_com, method=method)
+        chunk[:] = np.matmul(chunk, rots.transpose(0, 2, 1)) + \
+            trans[:, np.newaxis]
+        rotations[start:stop] = rots
+        translations[start:stop] = trans
+        LOGGER.update(stop, label='_prody_superpose')
+    LOGGER.finish()
+    return rotations, translations
+
+
 def applyTransformation(transformation, atoms):
     """Returns *atoms* after applying *transformation*.  If *atoms*
     is a :class:`.Atomic` instance, it will be returned after
@@ -434,6 +675,249 @@ def getRMSD(ref, tar, weights=None):
                 return np.sqrt(rmsd / weights.sum(1).flatten())
 
 
+PAIRWISE_BLOCK = 2 ** 20
+"""Approximate number of pairs processed at a time by
+:func:`iterPairwiseRMSDs`."""
+
+PAIRWISE_CHUNK = 2 ** 22
+"""Approximate number of coordinates read from coordinate sets at a time by
+:func:`iterPairwiseRMSDs`."""
+
+
+def _checkPairwiseWeights(weights, n_csets, n_atoms):
+
+    if weights is None:
+        return None
+    weights = np.asarray(weights, float)
+    if weights.ndim == 1:
+        weights = weights.reshape((n_atoms, 1))
+    if weights.shape not in ((n_atoms, 1), (n_csets, n_atoms, 1)):
+        raise ValueError('weights must have shape ({0}, 1) or ({1}, {0}, 1)'
+                         .format(n_atoms, n_csets))
+    return weights
+
+
+def iterPairwiseRMSDs(coordsets, weights=None, superpose=False, **kwargs):
+    """Yields ``(start, stop, rmsds)`` tuples for blocks of rows of the
+    pairwise RMSD matrix of *coordsets*, where *rmsds* is an array of RMSDs
+    of coordinate sets from *start* to *stop* with coordinate sets from
+    *start* to the last one, i.e. only the upper triangle of the matrix is
+    calculated.  Blocks are yielded in order.
+
+    RMSDs are calculated using matrix products of coordinate arrays.  When
+    *superpose* is **True**, RMSD after optimal superposition of each pair
+    is calculated using the quaternion characteristic polynomial (QCP)
+    method without calculating rotations.
+
+    :arg coordsets: coordinate sets with shape ``(n_csets, n_atoms, 3)``
+    :type coordsets: :class:`numpy.ndarray`
+
+    :arg weights: atomic weights with shape ``(n_atoms, 1)``, or weights
+        for each coordinate set with shape ``(n_csets, n_atoms, 1)``, in which
+        case product of weights of each pair is used and *superpose* is not
+        supported
+    :type weights: :class:`numpy.ndarray`
+
+    :arg superpose: superpose each pair before calculating RMSD, default is
+        **False**
+    :type superpose: bool
+
+    :arg n_cpu: number of threads calculating blocks, default is 1
+    :type n_cpu: int
+
+    :arg blocksize: number of rows in a block
+    :type blocksize: int
+
+    :arg indices: indices of atoms that are used from each coordinate set,
+        which avoids copying a selection of memory-mapped coordinate sets
+    :type indices: :class:`numpy.ndarray`"""
+
+    n_csets, n_atoms = coordsets.shape[:2]
+    indices = kwargs.get('indices')
+    if indices is not None:
+        n_atoms = len(indices)
+    weights = _checkPairwiseWeights(weights, n_csets, n_atoms)
+    per_conf = weights is not None and weights.ndim == 3
+    if superpose and per_conf:
+        raise ValueError('superposition is not supported when weights are '
+                         'given for each coordinate set')
+
+    n_cpu = kwargs.get('n_cpu', 1)
+    if not isinstance(n_cpu, int) or n_cpu < 1:
+        raise ValueError('n_cpu must be a positive integer')
+
+    blocksize = kwargs.get('blocksize')
+    if blocksize is None:
+        # QCP works with a 4x4 key matrix for each pair
+        pairs = PAIRWISE_BLOCK // 16 if superpose else PAIRWISE_BLOCK
+        blocksize = max(1, pairs // max(n_csets, 1))
+        if n_cpu > 1:
+            blocksize = min(blocksize, -(-n_csets // (4 * n_cpu)))
+    blocksize = int(blocksize)
+    if blocksize < 1:
+        raise ValueError('blocksize must be a positive integer')
+
+    # coordinate sets are read in chunks, so that memory-mapped arrays are
+    # not loaded into memory as a whole
+    chunksize = max(1, PAIRWISE_CHUNK // max(n_atoms * 3, 1))
+    chunks = [slice(start, min(start + chunksize, n_csets))
+              for start in range(0, n_csets, chunksize)]
+
+    def read(which):
+        coords = np.asarray(coordsets[which], float)
+        return coords if indices is None else coords[:, indices]
+
+    if weights is None or per_conf:
+        total = float(n_atoms)
+    else:
+        total = weights.sum()
+
+    if superpose:
+        def prepare(which):
+            coords = read(which)
+            if weights is None:
+                coords = coords - coords.mean(1)[:, np.newaxis]
+                weighted = coords
+            else:
+                coords = coords - (np.einsum('nai,a->ni', coords,
+                                             weights[:, 0])
+                                   / total)[:, np.newaxis]
+                weighted = coords * weights
+            # component-wise coordinate arrays, used for cross-covariances
+            return ([np.ascontiguousarray(coords[:, :, i]) for i in range(3)],
+                    [np.ascontiguousarray(weighted[:, :, i])
+                     for i in range(3)],
+                    (coords * weighted).sum(2).sum(1))
+
+        # G = sum of weighted squared coordinates
+        G = np.concatenate([prepare(which)[2] for which in chunks])
+    else:
+        # subtracting the mean conformation reduces cancellation errors
+        mean = np.zeros((n_atoms, 3))
+        for which in chunks:
+            mean += read(which).sum(0)
+        mean /= n_csets
+
+        def prepare(which):
+            coords = read(which) - mean
+            if per_conf:
+                sqsum = (coords ** 2).sum(2)
+                coords = coords * weights[which]
+            else:
+                if weights is not None:
+                    coords *= np.sqrt(weights)
+                sqsum = (coords ** 2).sum(2).sum(1)
+            return coords.reshape((len(coords), n_atoms * 3)), sqsum
+
+        sqsum = np.concatenate([prepare(which)[1] for which in chunks])
+        if per_conf:
+            W = weights[:, :, 0]
+            WS = W * sqsum
+
+    def calcMSDs(rows, cols, row_data):
+        if superpose:
+            comps, wcomps, _ = prepare(cols)
+            S = np.empty((rows.stop - rows.start, cols.stop - cols.start,
+                          3, 3))
+            for i in range(3):
+                for j in range(3):
+                    S[:, :, i, j] = np.dot(row_data[1][i], comps[j].T)
+            lmax = _getQCPEigenvalues(S, _getKeyMatrices(S),
+                                      (G[rows, np.newaxis] + G[cols]) / 2)
+            return (G[rows, np.newaxis] + G[cols] - 2 * lmax) / total
+        coords = prepare(cols)[0]
+        if per_conf:
+            msd = (np.dot(WS[rows], W[cols].T) + np.dot(W[rows], WS[cols].T) -
+                   2 * np.dot(row_data[0], coords.T))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                msd /= np.dot(W[rows], W[cols].T)
+            return msd
+        return (sqsum[rows, np.newaxis] + sqsum[cols] -
+                2 * np.dot(row_data[0], coords.T)) / total
+
+    def calcBlock(start):
+        stop = min(start + blocksize, n_csets)
+        rows = slice(start, stop)
+        row_data = prepare(rows)
+        msd = np.empty((stop - start, n_csets - start))
+        for first in range(start, n_csets, chunksize):
+            last = min(first + chunksize, n_csets)
+            msd[:, first - start:last - start] = calcMSDs(
+                rows, slice(first, last), row_data)
+        np.maximum(msd, 0, msd)
+        rmsds = np.sqrt(msd, msd)
+        diag = np.arange(stop - start)
+        rmsds[diag, diag] = 0
+        return start, stop, rmsds
+
+    starts = range(0, n_csets, blocksize)
+    if n_cpu == 1 or len(starts) == 1:
+        for start in starts:
+            yield calcBlock(start)
+    else:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(n_cpu, len(starts)))
+        try:
+            for block in pool.imap(calcBlock, starts):
+                yield block
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def calcPairwiseRMSDs(coordsets, weights=None, superpose=False, **kwargs):
+    """Returns pairwise RMSD matrix of *coordsets*.  RMSDs are calculated
+    in blocks using :func:`iterPairwiseRMSDs`, see its documentation for
+    *weights*, *superpose*, *n_cpu*, *blocksize*, and *indices* arguments.
+
+    :arg condensed: return a condensed distance vector, which contains upper
+        triangle of the matrix as accepted by :mod:`scipy.cluster.hierarchy`,
+        default is **False**
+    :type condensed: bool
+
+    :arg filename: name of a :file:`.npy` file for writing the result,
+        which is returned as a :class:`numpy.memmap`
+    :type filename: str
+
+    :arg out: an array for writing the result
+    :type out: :class:`numpy.ndarray`"""
+
+    try:
+        n_csets = coordsets.shape[0]
+    except AttributeError:
+        raise TypeError('coordsets must be a numpy array')
+
+    condensed = kwargs.pop('condensed', False)
+    filename = kwargs.pop('filename', None)
+    out = kwargs.pop('out', None)
+
+    if condensed:
+        shape = (n_csets * (n_csets - 1) // 2,)
+    else:
+        shape = (n_csets, n_csets)
+    if out is None:
+        if filename:
+            out = np.lib.format.open_memmap(filename, mode='w+', dtype=float,
+                                            shape=shape)
+        else:
+            out = np.empty(shape)
+    elif not isinstance(out, np.ndarray):
+        raise TypeError('out must be a numpy array')
+    elif out.shape != shape:
+        raise ValueError('out.shape must be {0}'.format(shape))
+
+    for start, stop, rmsds in iterPairwiseRMSDs(coordsets, weights,
+                                                superpose, **kwargs):
+        if condensed:
+            for k, i in enumerate(range(start, stop)):
+                offset = i * n_csets - i * (i + 1) // 2
+                out[offset:offset + n_csets - i - 1] = rmsds[k, k + 1:]
+        else:
+            out[start:stop, start:] = rmsds
+            out[start:, start:stop] = rmsds.T
+    return out
+
+
 def printRMSD(reference, target=None, weights=None, log=True, msg=None):
     """Print RMSD to the screen.  If *target* has multiple coordinate sets,
     minimum, maximum and mean RMSD values are printed.  If *log* is **True**
@@ -459,11 +943,14 @@ def printRMSD(reference, target=None, weights=None, log=True, msg=None):
         write(msg + 'RMSD: {0:.2f}'.format(rmsd))
 
 
-def alignCoordsets(atoms, weights=None):
+def alignCoordsets(atoms, weights=None, **kwargs):
     """Returns *atoms* after superposing coordinate sets onto its active
     coordinate set.  Transformations will be calculated for *atoms* and
     applied to its :class:`.AtomGroup`, when applicable.  Optionally,
-    atomic *weights* can be passed for weighted superposition."""
+    atomic *weights* can be passed for weighted superposition.  Coordinate
+    sets are superposed in chunks, rotations are calculated using singular
+    value decomposition by default, or ``method='qcp'`` can be passed to use
+    quaternion characteristic polynomial method."""
 
     try:
         acsi, n_csets = atoms.getACSIndex(), atoms.numCoordsets()
@@ -481,15 +968,27 @@ def alignCoordsets(atoms, weights=None):
         ag = atoms
     agacsi = ag.getACSIndex()
 
-    tar = atoms._getCoords()
-    for i in range(n_csets):
-        if i == acsi:
-            continue
-        atoms.setACSIndex(i)
-        ag.setACSIndex(i)
-        calcTransformation(atoms, tar, weights).apply(ag)
-    atoms.setACSIndex(acsi)
-    ag.setACSIndex(agacsi)
+    if isinstance(atoms, AtomMap):
+        tar = atoms._getCoords()
+        for i in range(n_csets):
+            if i == acsi:
+                continue
+            atoms.setACSIndex(i)
+            ag.setACSIndex(i)
+            calcTransformation(atoms, tar, weights).apply(ag)
+        atoms.setACSIndex(acsi)
+        ag.setACSIndex(agacsi)
+        return atoms
+
+    tar = atoms.getCoords()
+    if weights is not None:
+        weights = checkWeights(weights, len(tar))
+    indices = None if ag is atoms else atoms._getIndices()
+    coordsets = ag._getCoordsets()
+    for others in (coordsets[:acsi], coordsets[acsi + 1:]):
+        if len(others):
+            superposeCoordsets(others, tar, weights, indices, **kwargs)
+    ag._setTimeStamp()
     return atoms
 
 
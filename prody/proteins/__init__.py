@@ -21,6 +21,12 @@ Following functions can be used to handle local PDB files:
   * :func:`.findPDBFiles` - return a dictionary containing files in a path
   * :func:`.iterPDBFilenames` - yield file names in a path or local PDB mirror
 
+Contents of these folders can be indexed on disk by setting
+``confProDy(pdb_index=True)``, see :mod:`.pdbindex`:
+
+  * :func:`.pathPDBIndex` - path to the index file
+  * :func:`.clearPDBIndex` - remove all folders from the index
+
 
 Blast search PDB
 ================
@@ -44,6 +50,7 @@ Parse/write PDB files
 Following ProDy functions are for parsing and writing :file:`.pdb` files:
 
   * :func:`.parsePDB` - parse :file:`.pdb` formated file
+  * :func:`.iterPDBs` - parse many :file:`.pdb` files one by one
   * :func:`.parsePDBStream` - parse :file:`.pdb` formated stream
   * :func:`.writePDB` - write :file:`.pdb` formatted file
   * :func:`.writePDBStream`  write :file:`.pdb` formated stream
@@ -54,6 +61,12 @@ functions come as bonus features:
   * :func:`.writePQR` - write atomic data to a file in :file:`.pqr` format
   * :func:`.parsePQR` - parse atomic data from files in :file:`.pqr` format
 
+Structures parsed from files can be cached on disk by setting
+``confProDy(structure_cache=True)``, see :mod:`.structcache`:
+
+  * :func:`.pathStructureCache` - path to the cache folder
+  * :func:`.clearStructureCache` - remove all cached structures
+
 
 .. seealso::
 
@@ -68,6 +81,7 @@ Following ProDy functions are for parsing :file:`.cif` files:
 
   * :func:`.parseCIF` - parse :file:`.cif` formated file
   * :func:`.parseCIFStream` - parse :file:`.cif` formated stream
+  * :func:`.parseCIFCategory` - parse a data category, e.g. a loop
 
 .. seealso::
 
@@ -167,6 +181,10 @@ from . import localpdb
 from .localpdb import *
 __all__.extend(localpdb.__all__)
 
+from . import pdbindex
+from .pdbindex import *
+__all__.extend(pdbindex.__all__)
+
 from . import wwpdb
 from .wwpdb import *
 __all__.extend(wwpdb.__all__)
@@ -219,6 +237,10 @@ from . import ciffile
 from .ciffile import *
 __all__.extend(ciffile.__all__)
 
+from . import structcache
+from .structcache import *
+__all__.extend(structcache.__all__)
+
 from . import starfile
 from .starfile import *
 __all__.extend(starfile.__all__)
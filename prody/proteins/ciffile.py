@@ -6,6 +6,7 @@
 
 from collections import defaultdict
 import os.path
+import re
 
 
 import numpy as np
@@ -18,8 +19,10 @@ from prody import LOGGER, SETTINGS
 
 from .header import getHeaderDict, buildBiomolecules, assignSecstr
 from .localpdb import fetchPDB
+from .structcache import (getStructureCacheKey, loadCachedStructure,
+                          saveCachedStructure)
 
-__all__ = ['parseCIFStream', 'parseCIF',]
+__all__ = ['parseCIFStream', 'parseCIF', 'parseCIFCategory']
 
 class CIFParseError(Exception):
     pass
@@ -93,9 +96,13 @@ def parseCIF(pdb, **kwargs):
         if len(title) == 7 and title.startswith('pdb'):
             title = title[3:]
         kwargs['title'] = title
-    cif = openFile(pdb, 'rt')
-    result = parseCIFStream(cif, **kwargs)
-    cif.close()
+    key = getStructureCacheKey(pdb, 'cif', kwargs)
+    result = loadCachedStructure(key)
+    if result is None:
+        cif = openFile(pdb, 'rt')
+        result = parseCIFStream(cif, **kwargs)
+        cif.close()
+        saveCachedStructure(key, result)
     return result
 
 def parseCIFStream(stream, **kwargs):
@@ -167,6 +174,160 @@ def parseCIFStream(stream, **kwargs):
 
 parseCIFStream.__doc__ += _parseCIFdoc
 
+def parseCIFCategory(cif, category, **kwargs):
+    """Returns a dictionary mapping field names of *category* in an mmCIF
+    file to arrays of strings holding their values, or **None** when the
+    category is not found.  Both loops and categories given as field name
+    and value pairs are parsed, e.g. ``parseCIFCategory('1abc.cif',
+    '_struct_conf', fields=['beg_label_seq_id', 'end_label_seq_id'])``.
+
+    :arg cif: a filename or a stream of CIF lines, i.e. anything that
+        implements the method ``readlines``
+    :type cif: str
+
+    :arg category: category name, e.g. ``'_atom_site'``
+    :type category: str
+
+    :arg fields: names of fields to return, without the category prefix,
+        by default all fields are returned
+    :type fields: list"""
+
+    if not isinstance(category, str):
+        raise TypeError('category must be a string')
+    if not category.startswith('_'):
+        category = '_' + category
+    fields = kwargs.get('fields')
+    if fields is not None:
+        fields = set(fields)
+
+    if hasattr(cif, 'readlines'):
+        lines = cif.readlines()
+    else:
+        stream = openFile(cif, 'rt')
+        lines = stream.readlines()
+        stream.close()
+    return _parseCIFLoop(lines, category, fields)
+
+def _parseCIFLoop(lines, category, fields=None):
+    """Returns a dictionary mapping field names of loop *category* (e.g.
+    ``'_atom_site'``) to arrays of strings holding their values.  Only
+    columns named in *fields* are converted to arrays, when it is given.
+    Quoted values and multi-line text fields are handled.  **None** is
+    returned when *category* is not found in *lines*.
+
+    :arg lines: CIF lines"""
+
+    prefix = category + '.'
+    names = []
+    header = False
+    for start, line in enumerate(lines):
+        if line.startswith(prefix):
+            if not header:
+                # category is not a loop, values follow field names
+                return _parseCIFPairs(lines[start:], prefix, fields)
+            names.append(line.split()[0][len(prefix):])
+        elif names:
+            break
+        else:
+            header = (line.startswith('loop_') or
+                      header and line.startswith('_'))
+    else:
+        if not names:
+            return None
+        start = len(lines)
+
+    text = False
+    for stop in range(start, len(lines)):
+        line = lines[stop]
+        if line[:1] == ';':
+            text = not text
+        elif text:
+            continue
+        elif line[:1] in ('_', '#') or line.startswith('loop_'):
+            break
+    else:
+        stop = len(lines)
+
+    tokens = _splitCIFLines(lines[start:stop])
+
+    n_fields = len(names)
+    if len(tokens) % n_fields:
+        raise CIFParseError('number of values in {0} loop is not a multiple '
+                            'of the number of fields'.format(category))
+
+    loop = {}
+    for j, name in enumerate(names):
+        if fields is None or name in fields:
+            loop[name] = np.array(tokens[j::n_fields], dtype=str)
+    return loop
+
+
+_CIFTOKEN = re.compile(r"""'[^\n]*?'(?=\s|\Z)|"[^\n]*?"(?=\s|\Z)|\S+""")
+
+
+def _unquoteCIF(token):
+
+    if len(token) > 1 and token[0] in '\'"' and token[-1] == token[0]:
+        return token[1:-1]
+    return token
+
+
+def _splitCIFLines(lines):
+    """Returns unquoted tokens in *lines* including multi-line text fields,
+    which start and end with a line beginning with a semicolon.  Runs of
+    lines without quotes are split at once, and only lines with quotes
+    are tokenized using a regular expression."""
+
+    tokens = []
+    plain = []
+    text = None
+    for line in lines:
+        if line[:1] == ';':
+            if text is None:
+                text = [line[1:].rstrip('\r\n')]
+                continue
+            tokens.extend(' '.join(plain).split())
+            plain = []
+            tokens.append('\n'.join(text).strip())
+            text = None
+            line = line[1:]
+        elif text is not None:
+            text.append(line.rstrip('\r\n'))
+            continue
+        if '"' in line or "'" in line:
+            tokens.extend(' '.join(plain).split())
+            plain = []
+            tokens.extend([_unquoteCIF(token)
+                           for token in _CIFTOKEN.findall(line)])
+        else:
+            plain.append(line)
+    tokens.extend(' '.join(plain).split())
+    return tokens
+
+
+def _parseCIFPairs(lines, prefix, fields):
+    """Returns a dictionary for a category that is given as field name and
+    value pairs instead of a loop, starting at the first line of *lines*."""
+
+    block = []
+    text = False
+    for line in lines:
+        if line[:1] == ';':
+            text = not text
+        elif not (text or line.startswith(prefix)) and (
+                line[:1] in ('_', '#') or line.startswith('loop_')):
+            break
+        block.append(line)
+
+    tokens = _splitCIFLines(block)
+    loop = {}
+    for name, value in zip(tokens[::2], tokens[1::2]):
+        name = name[len(prefix):]
+        if fields is None or name in fields:
+            loop[name] = np.array([value], dtype=str)
+    return loop
+
+
 def _parseCIFLines(atomgroup, lines, model, chain, subset,
                    altloc_torf):
     """Returns an AtomGroup. See also :func:`.parsePDBStream()`.
@@ -181,50 +342,28 @@ def _parseCIFLines(atomgroup, lines, model, chain, subset,
             subset = flags.BACKBONE
         protein_resnames = flags.AMINOACIDS
 
-    asize = 0
-    i = 0
-    models = []
-    nModels = 0
-    fields = {}
-    fieldCounter = -1
-    foundModelNumFieldID = False
-    foundAtomBlock = False
-    doneAtomBlock = False
-    while not doneAtomBlock:
-        line = lines[i]
-        if line[:11] == '_atom_site.':
-            fieldCounter += 1
-            fields[line.split('.')[1].strip()] = fieldCounter
-
-        if line.startswith('ATOM') or line.startswith('HETATM'):
-            if not foundAtomBlock:
-                foundAtomBlock = True
-                start = i
-            models.append(line.split()[fields['pdbx_PDB_model_num']])
-            if models[asize] != models[asize-1]:
-                nModels += 1
-            asize += 1
-        else:
-            if foundAtomBlock:
-                doneAtomBlock = True
-        i += 1
-    stop = i-1
-    if nModels == 0: nModels = 1
-
-    if model is not None and model != 1:
-        for i in range(start, stop):
-            if str(models[i]) != model and str(models[i+1]) == model:
-                start = i+1
-            if str(models[i]) == model and str(models[i+1]) != model:
-                stop = i+1
-                break
-        if not str(model) in models:
+    loop = _parseCIFLoop(lines, '_atom_site', _CIFFIELDS)
+    if loop is None:
+        return atomgroup
+    missing = [name for name in _CIFFIELDS if name not in loop]
+    if missing:
+        raise CIFParseError('_atom_site loop does not have field(s) {0}'
+                            .format(', '.join(missing)))
+
+    models = loop['pdbx_PDB_model_num'].astype(int)
+    which = np.ones(len(models), bool)
+    if model is not None:
+        which = models == model
+        if not which.any():
             raise CIFParseError('model {0} is not found'.format(model))
 
-    addcoords = False
-    if atomgroup.numCoordsets() > 0:
-        addcoords = True
- 
+    if subset is not None:
+        which &= np.isin(loop['auth_atom_id'], list(subset))
+        which &= np.isin(loop['auth_comp_id'], list(protein_resnames))
+
+    if chain is not None:
+        which &= _isSubstring(loop['auth_asym_id'], chain)
+
     if isinstance(altloc_torf, str):
         if altloc_torf.strip() != 'A':
             LOGGER.info('Parsing alternate locations {0}.'
@@ -232,103 +371,82 @@ def _parseCIFLines(atomgroup, lines, model, chain, subset,
             which_altlocs = '.' + ''.join(altloc_torf.split())
         else:
             which_altlocs = '.A'
-        altloc_torf = False
     else:
         which_altlocs = '.A'
-        altloc_torf = True
-
-    coordinates = np.zeros((asize, 3), dtype=float)
-    atomnames = np.zeros(asize, dtype=ATOMIC_FIELDS['name'].dtype)
-    resnames = np.zeros(asize, dtype=ATOMIC_FIELDS['resname'].dtype)
-    resnums = np.zeros(asize, dtype=ATOMIC_FIELDS['resnum'].dtype)
-    chainids = np.zeros(asize, dtype=ATOMIC_FIELDS['chain'].dtype)
-    hetero = np.zeros(asize, dtype=bool)
-    termini = np.zeros(asize, dtype=bool)
-    altlocs = np.zeros(asize, dtype=ATOMIC_FIELDS['altloc'].dtype)
-    icodes = np.zeros(asize, dtype=ATOMIC_FIELDS['icode'].dtype)
-    serials = np.zeros(asize, dtype=ATOMIC_FIELDS['serial'].dtype)
-    elements = np.zeros(asize, dtype=ATOMIC_FIELDS['element'].dtype)
-    bfactors = np.zeros(asize, dtype=ATOMIC_FIELDS['beta'].dtype)
-    occupancies = np.zeros(asize, dtype=ATOMIC_FIELDS['occupancy'].dtype)
-
-    n_atoms = atomgroup.numAtoms()
-    if n_atoms > 0:
-        asize = n_atoms
-
-    acount = 0
-    for line in lines[start:stop]:
-        startswith = line.split()[fields['group_PDB']]
-
-        atomname = line.split()[fields['auth_atom_id']]
-        resname = line.split()[fields['auth_comp_id']]
-
-        if subset is not None:
-            if not (atomname in subset and resname in protein_resnames):
-                continue
-
-        chID = line.split()[fields['auth_asym_id']]
-        if chain is not None:
-            if not chID in chain:
-                continue
-
-        alt = line.split()[fields['label_alt_id']]
-        if alt not in which_altlocs:
-            continue
-
-        if model is not None:
-            if int(models[acount]) < model:
-                continue
-            elif int(models[acount]) > model:
-                break
-
-        coordinates[acount] = [line.split()[fields['Cartn_x']], \
-                              line.split()[fields['Cartn_y']], \
-                              line.split()[fields['Cartn_z']]]
-        atomnames[acount] = atomname
-        resnames[acount] = resname
-        resnums[acount] = line.split()[fields['auth_seq_id']]
-        chainids[acount] = chID
-        hetero[acount] = startswith == 'HETATM' # True or False
-        if chainids[acount] != chainids[acount-1]: termini[acount] = True
-        altlocs[acount] = alt
-        icodes[acount] = line.split()[fields['pdbx_PDB_ins_code']]
-        if icodes[acount] == '?': icodes[acount] = ''
-        serials[acount] = line.split()[fields['id']]
-        elements[acount] = line.split()[fields['type_symbol']]
-        bfactors[acount] = line.split()[fields['B_iso_or_equiv']]
-        occupancies[acount] = line.split()[fields['occupancy']]
-        
-        acount += 1
-
-    if model is not None:
-        nModels = 1
-
-    modelSize = acount//nModels
+    which &= _isSubstring(loop['label_alt_id'], which_altlocs)
+
+    which = which.nonzero()[0]
+    models = models[which]
+    starts = np.concatenate(([0], (np.diff(models) != 0).nonzero()[0] + 1,
+                             [len(models)]))
+    n_atoms = starts[1]
+    first = which[:n_atoms]
+
+    coordinates = np.zeros((len(which), 3), dtype=float)
+    for j, name in enumerate(('Cartn_x', 'Cartn_y', 'Cartn_z')):
+        coordinates[:, j] = loop[name][which]
+    coordsets = [coordinates[:n_atoms]]
+    for m, (start, stop) in enumerate(zip(starts[1:-1], starts[2:])):
+        if stop - start == n_atoms:
+            coordsets.append(coordinates[start:stop])
+        else:
+            LOGGER.warn('Discarding model {0}, which contains {1} {2} atoms '
+                        'than the first model does.'
+                        .format(models[start], abs(stop - start - n_atoms),
+                                'more' if stop - start > n_atoms else 'fewer'))
+
+    chainids = loop['auth_asym_id'][first].astype(
+        ATOMIC_FIELDS['chain'].dtype)
+    termini = np.zeros(n_atoms, dtype=bool)
+    if n_atoms:
+        termini[0] = chainids[0] != ''
+        termini[1:] = chainids[1:] != chainids[:-1]
+    icodes = loop['pdbx_PDB_ins_code'][first].astype(
+        ATOMIC_FIELDS['icode'].dtype)
+    icodes[icodes == '?'] = ''
+    elements = loop['type_symbol'][first].astype(
+        ATOMIC_FIELDS['element'].dtype)
 
-    if addcoords:
-        atomgroup.addCoordset(coordinates[:modelSize])
+    if atomgroup.numCoordsets() > 0:
+        atomgroup.addCoordset(coordsets[0])
     else:
-        atomgroup._setCoords(coordinates[:modelSize])
-
-    atomgroup.setNames(atomnames[:modelSize])
-    atomgroup.setResnames(resnames[:modelSize])
-    atomgroup.setResnums(resnums[:modelSize])
-    atomgroup.setChids(chainids[:modelSize])
-    atomgroup.setFlags('hetatm', hetero[:modelSize])
-    atomgroup.setFlags('pdbter', termini[:modelSize])
-    atomgroup.setAltlocs(altlocs[:modelSize])
-    atomgroup.setIcodes(icodes[:modelSize])
-    atomgroup.setSerials(serials[:modelSize])
-
-    atomgroup.setElements(elements[:modelSize])
+        atomgroup._setCoords(coordsets[0])
+
+    atomgroup.setNames(loop['auth_atom_id'][first])
+    atomgroup.setResnames(loop['auth_comp_id'][first])
+    atomgroup.setResnums(loop['auth_seq_id'][first].astype(
+        ATOMIC_FIELDS['resnum'].dtype))
+    atomgroup.setChids(chainids)
+    atomgroup.setFlags('hetatm', loop['group_PDB'][first] == 'HETATM')
+    atomgroup.setFlags('pdbter', termini)
+    atomgroup.setAltlocs(loop['label_alt_id'][first])
+    atomgroup.setIcodes(icodes)
+    atomgroup.setSerials(loop['id'][first].astype(
+        ATOMIC_FIELDS['serial'].dtype))
+
+    atomgroup.setElements(elements)
     from prody.utilities.misctools import getMasses
-    atomgroup.setMasses(getMasses(elements[:modelSize]))
-    atomgroup.setBetas(bfactors[:modelSize])
-    atomgroup.setOccupancies(occupancies[:modelSize])
+    atomgroup.setMasses(getMasses(elements))
+    atomgroup.setBetas(loop['B_iso_or_equiv'][first].astype(
+        ATOMIC_FIELDS['beta'].dtype))
+    atomgroup.setOccupancies(loop['occupancy'][first].astype(
+        ATOMIC_FIELDS['occupancy'].dtype))
 
-    for n in range(1,nModels):
-        atomgroup.addCoordset(coordinates[n*modelSize:(n+1)*modelSize])
+    for coords in coordsets[1:]:
+        atomgroup.addCoordset(coords)
 
     return atomgroup
 
 
+_CIFFIELDS = ('group_PDB', 'id', 'type_symbol', 'label_alt_id', 'Cartn_x',
+              'Cartn_y', 'Cartn_z', 'occupancy', 'B_iso_or_equiv',
+              'pdbx_PDB_ins_code', 'auth_seq_id', 'auth_comp_id',
+              'auth_asym_id', 'auth_atom_id', 'pdbx_PDB_model_num')
+
+
+def _isSubstring(values, string):
+    """Returns a boolean array marking *values* that are substrings of
+    *string*, evaluating each unique value once."""
+
+    unique, inverse = np.unique(values, return_inverse=True)
+    return np.array([value in string for value in unique], bool)[inverse]
@@ -10,7 +10,7 @@ from prody import LOGGER
 from prody.atomic import ATOMIC_FIELDS
 from prody.atomic import Atomic, AtomGroup
 from prody.atomic import getSequence
-from prody.measure import Transformation
+from prody.atomic import flags
 from prody.utilities import openFile
 
 from .localpdb import fetchPDB
@@ -1031,7 +1031,7 @@ def assignSecstr(header, atoms, coil=False):
     return atoms
 
 
-def buildBiomolecules(header, atoms, biomol=None):
+def buildBiomolecules(header, atoms, biomol=None, **kwargs):
     """Returns *atoms* after applying biomolecular transformations from *header*
     dictionary.  Biomolecular transformations are applied to all coordinate
     sets in the molecule.
@@ -1050,6 +1050,14 @@ def buildBiomolecules(header, atoms, biomol=None):
     :class:`.AtomGroup` instances will be returned in a tuple.
 
     Note that atoms in biomolecules are ordered according to chain identifiers.
+
+    :arg lazy: if **True**, instead of :class:`.AtomGroup` instances,
+        generators are returned that yield ``(indices, coordsets)`` tuples,
+        one transformation at a time, where *indices* are indices of atoms
+        that the transformation applies to and *coordsets* is an array of
+        their transformed coordinates with shape ``(n_csets, n_atoms, 3)``,
+        default is **False**
+    :type lazy: bool
     """
 
     if not isinstance(header, dict):
@@ -1066,6 +1074,7 @@ def buildBiomolecules(header, atoms, biomol=None):
     if not isinstance(atoms, AtomGroup):
         atoms = atoms.copy()
 
+    lazy = kwargs.get('lazy', False)
     biomols = []
     if biomol is None:
         keys = list(biomt)
@@ -1080,8 +1089,6 @@ def buildBiomolecules(header, atoms, biomol=None):
 
     keys.sort()
     for i in keys:
-        segnm = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'*20)
-        ags = []
         mt = biomt[i]
         # mt is a list, first item is list of chain identifiers
         # following items are lines corresponding to transformation
@@ -1091,38 +1098,17 @@ def buildBiomolecules(header, atoms, biomol=None):
                         'applied'.format(i))
             continue
 
-        for times in range(int((len(mt)) / 4)):
-            rotation = np.zeros((3, 3))
-            translation = np.zeros(3)
-            line0 = np.fromstring(mt[times*4+1], sep=' ')
-            rotation[0, :] = line0[:3]
-            translation[0] = line0[3]
-            line1 = np.fromstring(mt[times*4+2], sep=' ')
-            rotation[1, :] = line1[:3]
-            translation[1] = line1[3]
-            line2 = np.fromstring(mt[times*4+3], sep=' ')
-            rotation[2, :] = line2[:3]
-            translation[2] = line2[3]
-            t = Transformation(rotation, translation)
-
-            newag = atoms.select('chain ' + ' '.join(mt[0])).copy()
-            if newag is None:
-                continue
-            newag.all.setSegnames(segnm.pop(0))
-            for acsi in range(newag.numCoordsets()):
-                newag.setACSIndex(acsi)
-                newag = t.apply(newag)
-            newag.setACSIndex(0)
-            ags.append(newag)
-
-        if ags:
-            newag = ags.pop(0)
-            while ags:
-                newag += ags.pop(0)
-            newag.setTitle('{0} biomolecule {1}'
-                           .format(atoms.getTitle(), i))
-            biomols.append(newag)
-            
+        operators = _getBiomolOperators(atoms, mt)
+        if not operators:
+            continue
+        if lazy:
+            biomols.append(_iterBiomolCoords(atoms, operators))
+            continue
+
+        newag = _buildBiomolecule(atoms, operators)
+        newag.setTitle('{0} biomolecule {1}'.format(atoms.getTitle(), i))
+        biomols.append(newag)
+
     if biomols:
         if len(biomols) == 1:
             return biomols[0]
@@ -1130,3 +1116,107 @@ def buildBiomolecules(header, atoms, biomol=None):
             return biomols
     else:
         return None
+
+
+def _getBiomolOperators(atoms, mt):
+    """Returns a list of ``(indices, operators)`` pairs, where *indices* are
+    of *atoms* in chains that *operators* apply to, and *operators* is an
+    array with shape ``(n_ops, 3, 4)`` holding rotation matrices and
+    translation vectors.  Consecutive transformations applied to the same
+    chains are grouped together."""
+
+    chids = atoms._getChids()
+    operators = []
+    for k in range(0, len(mt), 4):
+        matrix = np.array([np.fromstring(line, sep=' ')[:4]
+                           for line in mt[k+1:k+4]])
+        if operators and operators[-1][0] == mt[k]:
+            operators[-1][1].append(matrix)
+        else:
+            operators.append((mt[k], [matrix]))
+
+    groups = []
+    for chains, matrices in operators:
+        if chids is None:
+            indices = np.zeros(0, int)
+        else:
+            indices = np.isin(chids, chains).nonzero()[0]
+        if len(indices):
+            groups.append((indices, np.array(matrices)))
+    return groups
+
+
+def _transformBiomol(coordsets, operators):
+    """Returns *coordsets* transformed by each of *operators*, in an array
+    with shape ``(n_csets, n_ops, n_atoms, 3)``."""
+
+    rotations = operators[:, :, :3].transpose(0, 2, 1)
+    return (np.matmul(coordsets[:, np.newaxis], rotations) +
+            operators[np.newaxis, :, np.newaxis, :, 3])
+
+
+def _iterBiomolCoords(atoms, groups):
+    """Yield indices of atoms and their coordinate sets for each
+    transformation in *groups*."""
+
+    coordsets = atoms._getCoordsets()
+    for indices, operators in groups:
+        coords = coordsets[:, indices]
+        for operator in operators:
+            yield (indices,
+                   _transformBiomol(coords, operator[np.newaxis])[:, 0])
+
+
+def _buildBiomolecule(atoms, groups):
+    """Returns an :class:`.AtomGroup` with copies of *atoms* transformed as
+    described by *groups*.  Each transformation is assigned a distinct
+    segment name."""
+
+    indices = np.concatenate([np.tile(idx, len(ops)) for idx, ops in groups])
+    sizes = np.concatenate([[len(idx)] * len(ops) for idx, ops in groups])
+    n_csets = atoms.numCoordsets()
+
+    newag = AtomGroup(atoms.getTitle())
+    if n_csets:
+        coordsets = np.zeros((n_csets, len(indices), 3))
+        start = 0
+        source = atoms._getCoordsets()
+        for idx, operators in groups:
+            stop = start + len(idx) * len(operators)
+            coordsets[:, start:stop] = _transformBiomol(
+                source[:, idx], operators).reshape((n_csets, -1, 3))
+            start = stop
+        newag._setCoords(coordsets)
+
+    for label in atoms.getDataLabels():
+        if label in ATOMIC_FIELDS and ATOMIC_FIELDS[label].readonly:
+            continue
+        newag._data[label] = atoms._getData(label)[indices]
+
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    newag.setSegnames(np.repeat(letters[np.arange(len(sizes)) % 26], sizes))
+
+    skip = set()
+    for label in atoms.getFlagLabels():
+        if label not in skip:
+            newag._setFlags(label, atoms._getFlags(label)[indices])
+            skip.update(flags.ALIASES.get(label, [label]))
+
+    bonds = atoms._bonds
+    if bonds is not None:
+        mapping = np.zeros(atoms.numAtoms(), int)
+        newbonds = []
+        start = 0
+        for idx, operators in groups:
+            mapping.fill(-1)
+            mapping[idx] = np.arange(len(idx))
+            trimmed = mapping[bonds]
+            trimmed = trimmed[(trimmed >= 0).all(1)]
+            for operator in operators:
+                newbonds.append(trimmed + start)
+                start += len(idx)
+        newbonds = np.concatenate(newbonds)
+        if len(newbonds):
+            newag.setBonds(newbonds)
+
+    return newag
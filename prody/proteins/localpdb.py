@@ -1,9 +1,8 @@
 # -*- coding: utf-8 -*-
 """This module defines functions for handling local PDB folders."""
 
-from glob import glob, iglob
 from os.path import sep as pathsep
-from os.path import abspath, isdir, isfile, join, split, splitext, normpath
+from os.path import abspath, isdir, join, split, splitext, normpath
 
 from prody import LOGGER, SETTINGS
 from prody.utilities import makePath, gunzip, relpath, copyFile, isWritable
@@ -11,6 +10,7 @@ from prody.utilities import sympath
 
 from . import wwpdb
 from .wwpdb import checkIdentifiers, fetchPDBviaFTP, fetchPDBviaHTTP
+from .pdbindex import listFolder, listFolders, findFiles, addFiles
 
 
 __all__ = ['pathPDBFolder', 'pathPDBMirror',
@@ -168,24 +168,30 @@ def fetchPDBfromMirror(*pdb, **kwargs):
     append = filenames.append
     success = 0
     failure = 0
+    mirrored = [join(mirror, ftp_divided, pdb[1:3],
+                     ftp_prefix + pdb + ftp_pdbext)
+                for pdb in identifiers if pdb is not None]
+    exists = iter(zip(mirrored, findFiles(mirrored)))
+    written = []
     for pdb in identifiers:
         if pdb is None:
             append(None)
             continue
-        fn = join(mirror, ftp_divided, pdb[1:3],
-                  ftp_prefix + pdb + ftp_pdbext)
-        if isfile(fn):
+        fn, found = next(exists)
+        if found:
             if folder or not compressed:
                 if compressed:
                     fn = copyFile(fn, join(folder or '.',
                                              pdb + extension + '.gz'))
                 else:
                     fn = gunzip(fn, join(folder or '.', pdb + extension))
+                written.append(fn)
             append(normpath(fn))
             success += 1
         else:
             append(None)
             failure += 1
+    addFiles(written)
 
     if len(identifiers) == 1:
         fn = filenames[0]
@@ -205,8 +211,9 @@ def fetchPDB(*pdb, **kwargs):
     then in local PDB folder and mirror, if they are available.  If *copy*
     is set **True**, files will be copied into *folder*.  If *compressed* is
     **False**, all files will be decompressed.  See :func:`pathPDBFolder` and
-    :func:`pathPDBMirror` for managing local resources, :func:`.fetchPDBviaFTP`
-    and :func:`.fetchPDBviaHTTP` for downloading files from PDB servers."""
+    :func:`pathPDBMirror` for managing local resources, :mod:`.pdbindex` for
+    indexing them, :func:`.fetchPDBviaFTP` and :func:`.fetchPDBviaHTTP` for
+    downloading files from PDB servers."""
 
     if len(pdb) == 1 and isinstance(pdb[0], list):
         pdb = pdb[0]
@@ -256,6 +263,7 @@ def fetchPDB(*pdb, **kwargs):
                 filenames[i] = gunzip(fn, splitext(fn)[0])
             else:
                 not_found.append((i, pdb))
+        addFiles([filenames[i] for i, pdb in decompress])
 
     if not not_found:
         return filenames[0] if len(identifiers) == 1 else filenames
@@ -265,20 +273,24 @@ def fetchPDB(*pdb, **kwargs):
     if local_folder:
         local_folder, is_divided = local_folder
         temp, not_found = not_found, []
-        for i, pdb in temp:
-            if is_divided:
-                fn = join(local_folder, pdb[1:3], 'pdb' + pdb + '.pdb.gz')
-            else:
-                fn = join(local_folder, pdb + '.pdb.gz')
-            if isfile(fn):
+        if is_divided:
+            fns = [join(local_folder, pdb[1:3], 'pdb' + pdb + '.pdb.gz')
+                   for i, pdb in temp]
+        else:
+            fns = [join(local_folder, pdb + '.pdb.gz') for i, pdb in temp]
+        written = []
+        for (i, pdb), fn, found in zip(temp, fns, findFiles(fns)):
+            if found:
                 if copy or not compressed and compressed is not None:
                     if compressed:
                         fn = copyFile(fn, join(folder, pdb + 'pdb.gz'))
                     else:
                         fn = gunzip(fn, join(folder, pdb + '.pdb'))
+                    written.append(fn)
                 filenames[i] = normpath(fn)
             else:
                 not_found.append((i, pdb))
+        addFiles(written)
 
     if not not_found:
         if len(identifiers) == 1:
@@ -364,6 +376,7 @@ def fetchPDB(*pdb, **kwargs):
     if fns:
         for i, fn in zip([i for i, pdb in not_found], fns):
             filenames[i] = fn
+        addFiles(fns)
 
     return filenames[0] if len(identifiers) == 1 else filenames
 
@@ -383,13 +396,13 @@ def iterPDBFilenames(path=None, sort=False, unique=True, **kwargs):
         if path is None:
             raise ValueError('path must be specified or PDB mirror path '
                              'must be set')
+        divided = join(path, 'data/structures/divided/pdb/')
+        folders = [join(divided, name) for name in listFolder(divided)]
+        pdbs = [join(folder, name)
+                for folder, names in listFolders(folders).items()
+                for name in names if name.endswith('.ent.gz')]
         if sort:
-            pdbs = glob(join(path, 'data/structures/divided/pdb/',
-                        '*/*.ent.gz'))
             pdbs.sort(reverse=kwargs.get('reverse'))
-        else:
-            pdbs = iglob(join(path, 'data/structures/divided/pdb/',
-                        '*/*.ent.gz'))
         for fn in pdbs:
             yield fn
     else:
@@ -403,7 +416,8 @@ def iterPDBFilenames(path=None, sort=False, unique=True, **kwargs):
             pdbext = compile('\.(pdb|ent)\.gz$', IGNORECASE)
         else:
             pdbext = compile('\.(pdb|ent)$', IGNORECASE)
-        pdbs = [pdb for pdb in iglob(join(path, '*')) if pdbext.search(pdb)]
+        pdbs = [join(path, name) for name in listFolder(path)
+                if pdbext.search(name)]
         if sort:
             pdbs.sort(reverse=kwargs.get('reverse'))
         for fn in pdbs:
@@ -3,7 +3,7 @@
 
 .. _PDB files: http://www.wwpdb.org/documentation/format32/v3.2.html"""
 
-from collections import defaultdict
+from collections import defaultdict, deque
 import os.path
 import time
 from numbers import Integral
@@ -18,13 +18,20 @@ from prody import LOGGER, SETTINGS
 
 from .header import getHeaderDict, buildBiomolecules, assignSecstr, isHelix, isSheet
 from .localpdb import fetchPDB
+from .structcache import (getStructureCacheKey, loadCachedStructure,
+                          saveCachedStructure, _saveAtoms, _loadAtoms)
 
-__all__ = ['parsePDBStream', 'parsePDB', 'parseChainsList', 'parsePQR',
+__all__ = ['parsePDBStream', 'parsePDB', 'iterPDBs', 'parseChainsList',
+           'parsePQR',
            'writePDBStream', 'writePDB', 'writeChainsList', 'writePQR',
            'writePQRStream']
 
 MAX_N_ATOM = 99999 
 
+BATCH_WINDOW = 4
+"""Number of structures per worker process that are submitted for parsing
+ahead of the one being yielded by :func:`.iterPDBs`."""
+
 class PDBParseError(Exception):
     pass
 
@@ -93,6 +100,15 @@ def parsePDB(*pdb, **kwargs):
         If needed, PDB files are downloaded using :func:`.fetchPDB()` function.
     
     You can also provide arguments that you would like passed on to fetchPDB().
+
+    When multiple structures are parsed, results are returned in a list in
+    the order of *pdb*, and a structure that fails to be parsed is reported
+    and returned as **None**.  They can be fetched and parsed concurrently
+    in *n_cpu* worker processes, see also :func:`.iterPDBs`.
+
+    :arg n_cpu: number of worker processes used for parsing multiple
+        structures, default is 1
+    :type n_cpu: int
     """
 
     n_pdb = len(pdb)
@@ -102,27 +118,20 @@ def parsePDB(*pdb, **kwargs):
             n_pdb = len(pdb)
             
     if n_pdb == 1:
+        kwargs.pop('n_cpu', None)
         return _parsePDB(pdb[0], **kwargs)
     else:
+        n_cpu = kwargs.pop('n_cpu', 1)
+        batch = _getBatchKwargs(n_pdb, kwargs)
         results = []
-        lstkwargs = {}
-        for key in kwargs:
-            argval = kwargs.get(key)
-            if np.isscalar(argval):
-                argval = [argval]*n_pdb
-            lstkwargs[key] = argval
 
         start = time.time()
         LOGGER.progress('Retrieving {0} PDB structures...'
                     .format(n_pdb), n_pdb, '_prody_parsePDB')
-        for i, p in enumerate(pdb):
-            kwargs = {}
-            for key in lstkwargs:
-                kwargs[key] = lstkwargs[key][i]
-            c = kwargs.get('chain','')
-            LOGGER.update(i, 'Retrieving {0}...'.format(p+c), 
+        for i, result in enumerate(_iterBatch(pdb, batch, n_cpu)):
+            c = batch[i].get('chain') or ''
+            LOGGER.update(i, 'Retrieving {0}...'.format(pdb[i]+c), 
                           label='_prody_parsePDB')
-            result = _parsePDB(p, **kwargs)
             if not isinstance(result, tuple):
                 if isinstance(result, dict):
                     result = (None, result)
@@ -130,28 +139,147 @@ def parsePDB(*pdb, **kwargs):
                     result = (result, None)
             results.append(result)
 
-        results = list(zip(*results))
         LOGGER.finish()
-       
-        for i in reversed(range(len(results))):
-            if all(j is None for j in results[i]):
-                results.pop(i)
-        if len(results) == 1:
-            results = results[0]
-        results = list(results)
-
-        model = kwargs.get('model')
-        header = kwargs.get('header', False)
-        if model != 0 and header:
-            numPdbs = len(results[0])
+
+        # structures that fail to be parsed keep their slots as None
+        numPdbs = sum(result[0] is not None or result[1] is not None
+                      for result in results)
+        atoms = tuple(result[0] for result in results)
+        headers = tuple(result[1] for result in results)
+        model = batch[-1].get('model') if batch else None
+        header = batch[-1].get('header', False) if batch else False
+        if model == 0:
+            results = list(headers)
+        elif header:
+            results = [atoms, headers]
         else:
-            numPdbs = len(results)
+            results = list(atoms)
 
         LOGGER.info('{0} PDBs were parsed in {1:.2f}s.'
                      .format(numPdbs, time.time()-start))
 
         return results
 
+def iterPDBs(*pdb, **kwargs):
+    """Yield results of parsing PDB files or identifiers in *pdb* one by one,
+    in the given order, as :func:`.parsePDB` returns them for a single
+    structure.  This is useful for long lists of structures that need not be
+    kept in memory at once.  A structure that fails to be parsed is reported
+    and yielded as **None**.
+
+    Keyword arguments are passed to :func:`.parsePDB`.  An argument given as
+    a list provides a value for each structure.
+
+    :arg n_cpu: number of worker processes that fetch and parse structures
+        concurrently, default is 1.  Arrays parsed in a worker process are
+        passed back in memory-mapped files in a temporary folder, which is
+        in shared memory (:file:`/dev/shm`) when available.
+    :type n_cpu: int"""
+
+    if len(pdb) == 1 and isListLike(pdb[0]):
+        pdb = pdb[0]
+    n_cpu = kwargs.pop('n_cpu', 1)
+    if not isinstance(n_cpu, Integral) or n_cpu < 1:
+        raise ValueError('n_cpu must be a positive integer')
+    return _iterBatch(pdb, _getBatchKwargs(len(pdb), kwargs), n_cpu)
+
+def _getBatchKwargs(n_pdb, kwargs):
+    """Returns a list of keyword arguments for parsing each of *n_pdb*
+    structures.  Values given as lists are distributed."""
+
+    batch = [{} for i in range(n_pdb)]
+    for key, argval in kwargs.items():
+        if argval is None or np.isscalar(argval):
+            argval = [argval]*n_pdb
+        elif len(argval) != n_pdb:
+            raise ValueError('{0} must have one value for each of {1} '
+                             'structures'.format(key, n_pdb))
+        for i in range(n_pdb):
+            batch[i][key] = argval[i]
+    return batch
+
+def _iterBatch(pdbs, batch, n_cpu=1):
+    """Yield results of parsing *pdbs* with keyword arguments in *batch*,
+    using *n_cpu* worker processes."""
+
+    if not isinstance(n_cpu, Integral) or n_cpu < 1:
+        raise ValueError('n_cpu must be a positive integer')
+
+    if n_cpu == 1 or len(pdbs) < 2:
+        for pdb, kwargs in zip(pdbs, batch):
+            yield _parseBatchItem(pdb, kwargs)
+        return
+
+    from multiprocessing import Pool
+    from shutil import rmtree
+    import tempfile
+    shm = '/dev/shm'
+    folder = tempfile.mkdtemp(prefix='prody_batch',
+                              dir=shm if os.path.isdir(shm) else None)
+    tasks = [(pdb, kwargs, os.path.join(folder, str(i)))
+             for i, (pdb, kwargs) in enumerate(zip(pdbs, batch))]
+    n_cpu = min(n_cpu, len(tasks))
+    pool = Pool(n_cpu)
+    # at most BATCH_WINDOW tasks per process are submitted ahead of the
+    # consumer, so that results that are not yet used do not pile up
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append((task, pool.apply_async(_parseBatchTask, (task,))))
+            if len(pending) >= BATCH_WINDOW * n_cpu:
+                task, result = pending.popleft()
+                yield _loadBatchResult(task, *result.get())
+        while pending:
+            task, result = pending.popleft()
+            yield _loadBatchResult(task, *result.get())
+    finally:
+        pool.terminate()
+        pool.join()
+        rmtree(folder, ignore_errors=True)
+
+def _parseBatchItem(pdb, kwargs):
+    """Returns result of parsing *pdb*, or **None** after reporting the error
+    if it fails."""
+
+    try:
+        return _parsePDB(pdb, **kwargs)
+    except Exception as err:
+        LOGGER.warn('{0} could not be parsed: {1}'.format(pdb, err))
+
+def _parseBatchTask(task):
+    """Parse a structure in a worker process.  Arrays of an :class:`.AtomGroup`
+    are saved in a folder, and the header, a description of saved arrays,
+    and an error message, if any, are returned."""
+
+    pdb, kwargs, path = task
+    try:
+        result = _parsePDB(pdb, **kwargs)
+        atoms = result[0] if isinstance(result, tuple) else result
+        if not isinstance(atoms, AtomGroup):
+            return None, result, None
+        os.mkdir(path)
+        meta = _saveAtoms(path, atoms)
+    except Exception as err:
+        return None, None, '{0}: {1}'.format(type(err).__name__, err)
+
+    meta['tuple'] = isinstance(result, tuple)
+    return meta, result[1] if meta['tuple'] else None, None
+
+def _loadBatchResult(task, meta, result, error):
+    """Returns result of parsing a structure in a worker process."""
+
+    if error is not None:
+        LOGGER.warn('{0} could not be parsed: {1}'.format(task[0], error))
+        return None
+    if meta is None:
+        return result
+    atoms = _loadAtoms(task[2], meta)
+    from shutil import rmtree
+    rmtree(task[2], ignore_errors=True)
+    if meta['tuple']:
+        return atoms, result
+    return atoms
+
 def _getPDBid(pdb):
     l = len(pdb)
     if l == 4:
@@ -191,11 +319,15 @@ def _parsePDB(pdb, **kwargs):
         if len(title) == 7 and title.startswith('pdb'):
             title = title[3:]
         kwargs['title'] = title
-    pdb = openFile(pdb, 'rt')
     if chain != '':
         kwargs['chain'] = chain
-    result = parsePDBStream(pdb, **kwargs)
-    pdb.close()
+    key = getStructureCacheKey(pdb, 'pdb', kwargs)
+    result = loadCachedStructure(key)
+    if result is None:
+        pdb = openFile(pdb, 'rt')
+        result = parsePDBStream(pdb, **kwargs)
+        pdb.close()
+        saveCachedStructure(key, result)
     return result
 
 parsePDB.__doc__ += _parsePDBdoc
@@ -353,6 +485,11 @@ def parsePQR(filename, **kwargs):
         ag = AtomGroup(title + title_suffix)
         n_csets = 0
 
+    key = getStructureCacheKey(filename, 'pqr', kwargs)
+    result = loadCachedStructure(key)
+    if result is not None:
+        return result
+
     pqr = openFile(filename, 'rt')
     lines = pqr.readlines()
     pqr.close()
@@ -363,6 +500,7 @@ def parsePQR(filename, **kwargs):
         LOGGER.report('{0} atoms and {1} coordinate sets were '
                       'parsed in %.2fs.'.format(ag.numAtoms(),
                       ag.numCoordsets() - n_csets))
+        saveCachedStructure(key, ag)
         return ag
     else:
         return None
@@ -401,6 +539,37 @@ def _parsePDBLines(atomgroup, lines, split, model, chain, subset,
         asize = n_atoms
     else:
         asize = len(lines) - split
+    start = split
+    stop = len(lines)
+    nmodel = 0
+    # if a specific model is requested, skip lines until that one
+    if isPDB and model is not None and model != 1:
+        for i in range(split, len(lines)):
+            if lines[i][:5] == 'MODEL':
+                nmodel += 1
+                if model == nmodel:
+                    start = i+1
+                    stop = len(lines)
+                    break
+        if nmodel != model:
+            raise PDBParseError('model {0} is not found'.format(model))
+    if isinstance(altloc_torf, str):
+        if altloc_torf.strip() != 'A':
+            LOGGER.info('Parsing alternate locations {0}.'
+                        .format(altloc_torf))
+            which_altlocs = ' ' + ''.join(altloc_torf.split())
+        else:
+            which_altlocs = ' A'
+        altloc_torf = False
+    else:
+        which_altlocs = ' A'
+        altloc_torf = True
+
+    if isPDB and n_atoms == 0:
+        if _parsePDBRecords(atomgroup, lines, start, model, chain, subset,
+                            which_altlocs, altloc_torf, bonds) is not None:
+            return atomgroup
+
     addcoords = False
     if atomgroup.numCoordsets() > 0:
         addcoords = True
@@ -428,32 +597,6 @@ def _parsePDBLines(atomgroup, lines, split, model, chain, subset,
 
     asize = 2000 # increase array length by this much when needed
 
-    start = split
-    stop = len(lines)
-    nmodel = 0
-    # if a specific model is requested, skip lines until that one
-    if isPDB and model is not None and model != 1:
-        for i in range(split, len(lines)):
-            if lines[i][:5] == 'MODEL':
-                nmodel += 1
-                if model == nmodel:
-                    start = i+1
-                    stop = len(lines)
-                    break
-        if nmodel != model:
-            raise PDBParseError('model {0} is not found'.format(model))
-    if isinstance(altloc_torf, str):
-        if altloc_torf.strip() != 'A':
-            LOGGER.info('Parsing alternate locations {0}.'
-                        .format(altloc_torf))
-            which_altlocs = ' ' + ''.join(altloc_torf.split())
-        else:
-            which_altlocs = ' A'
-        altloc_torf = False
-    else:
-        which_altlocs = ' A'
-        altloc_torf = True
-
     acount = 0
     coordsets = None
     altloc = defaultdict(list)
@@ -635,21 +778,7 @@ def _parsePDBLines(atomgroup, lines, split, model, chain, subset,
                         np.zeros(asize, ATOMIC_FIELDS['radius'].dtype)))
         elif startswith == 'CONECT':
             if bonds is not None:
-                atom_serial = line[6:11]
-                bonded1_serial = line[11:16]
-                bonds.append([int(atom_serial), int(bonded1_serial)])
-                
-                bonded2_serial = line[16:21]
-                if len(bonded2_serial.strip()):
-                    bonds.append([int(atom_serial), int(bonded2_serial)])
-
-                bonded3_serial = line[21:26]
-                if len(bonded3_serial.strip()):
-                    bonds.append([int(atom_serial), int(bonded3_serial)])
-                    
-                bonded4_serial = line[27:31]
-                if len(bonded4_serial.strip()):
-                    bonds.append([int(atom_serial), int(bonded4_serial)])
+                _parseConect(line, bonds)
 
         elif not onlycoords and (startswith == 'TER   ' or
             startswith.strip() == 'TER'):
@@ -854,6 +983,269 @@ def _parsePDBLines(atomgroup, lines, split, model, chain, subset,
 
     return atomgroup
 
+def _parseConect(line, bonds):
+    """Append bonded atom serial number pairs in CONECT *line* to *bonds*."""
+
+    atom_serial = line[6:11]
+    bonded1_serial = line[11:16]
+    bonds.append([int(atom_serial), int(bonded1_serial)])
+
+    bonded2_serial = line[16:21]
+    if len(bonded2_serial.strip()):
+        bonds.append([int(atom_serial), int(bonded2_serial)])
+
+    bonded3_serial = line[21:26]
+    if len(bonded3_serial.strip()):
+        bonds.append([int(atom_serial), int(bonded3_serial)])
+
+    bonded4_serial = line[27:31]
+    if len(bonded4_serial.strip()):
+        bonds.append([int(atom_serial), int(bonded4_serial)])
+
+
+def _sliceColumns(table, first, last):
+    """Returns byte strings in columns *first* to *last* of rows of *table*,
+    a byte matrix with one line per row."""
+
+    return np.ascontiguousarray(table[:, first:last]).view(
+        'S{0}'.format(last - first)).ravel()
+
+
+def _padColumns(table):
+    """Replace null bytes padding short lines and line ends in *table* with
+    spaces."""
+
+    table[(table == 0) | (table == 10) | (table == 13)] = 32
+
+
+def _parsePDBRecords(atomgroup, lines, start, model, chain, subset,
+                     which_altlocs, altloc_torf, bonds):
+    """Returns *atomgroup* after parsing coordinate lines as a fixed-width
+    byte matrix, one line per row, using array operations and boolean masks
+    for model, chain, subset, and altloc filtering.  **None** is returned and
+    *atomgroup* is left untouched if lines are irregular, e.g. truncated or
+    carrying unreadable numbers, so that :func:`_parsePDBLines` parses them
+    one by one."""
+
+    try:
+        table = np.array(lines[start:], dtype='S80')
+    except UnicodeError:
+        return None
+    n_lines = len(table)
+    if not n_lines:
+        return None
+    table = table.view(np.uint8).reshape((n_lines, 80))
+    heads = table[:, :6].copy()
+    _padColumns(heads)
+    if (np.isin(heads, (9, 11, 12)).any() or
+        ((heads[:, 0] == 32) & (heads != 32).any(1)).any()):
+        return None
+    records = _sliceColumns(heads, 0, 6)
+    hetatm = records == b'HETATM'
+    atoms = (hetatm | (records == b'ATOM  ')).nonzero()[0]
+    if not len(atoms):
+        return None
+    # short lines are padded with null bytes, so they end before column 54
+    if (table[atoms, 53] == 0).any():
+        return None
+
+    select = np.ones(len(atoms), bool)
+    if subset:
+        names = np.char.strip(_sliceColumns(table[atoms, :21], 12, 16))
+        resnames = np.char.strip(_sliceColumns(table[atoms, :21], 17, 21))
+        select &= np.isin(names, [name.encode() for name in subset])
+        select &= np.isin(resnames, [resname.encode()
+                                     for resname in flags.AMINOACIDS])
+    if chain is not None:
+        select &= np.isin(table[atoms, 21], [ord(ch) for ch in chain])
+    keep = select & np.isin(table[atoms, 16],
+                            [ord(ch) for ch in which_altlocs])
+    reject = select & ~keep
+
+    kept = np.zeros(n_lines, bool)
+    kept[atoms[keep]] = True
+    counts = kept.cumsum()
+    n_kept = counts[-1]
+    if not n_kept:
+        return None
+
+    # lines [0, first) hold the first model and lines [0, scan) and
+    # [rescan, n_lines) are those _parsePDBLines would visit
+    first = scan = rescan = n_lines
+    multi = False
+    ends = (_sliceColumns(heads, 0, 3) == b'END').nonzero()[0]
+    ends = ends[np.diff(np.concatenate(([0], counts[ends]))) > 0]
+    if len(ends):
+        first = ends[0]
+        if model is not None:
+            scan = first
+            if bonds is not None:
+                conect = (records[first:] == b'CONECT').nonzero()[0]
+                rescan = first + (conect[0] if len(conect) else 1)
+                if np.isin(records[rescan:], (b'ATOM  ', b'HETATM', b'TER   ',
+                                              b'ANISOU', b'SIGUIJ')).any():
+                    return None
+        elif n_lines - first - 1 < counts[first]:
+            scan = first
+        else:
+            multi = True
+
+    inmodel = keep & (atoms < first)
+    data = table[atoms[inmodel]]
+    _padColumns(data)
+    n_atoms = len(data)
+    bounds = counts[ends]
+    if multi:
+        # models larger than the first one, or atoms following a model that
+        # _parsePDBLines takes to be the last one, are dealt with line by line
+        sizes = np.diff(np.concatenate(([0], bounds, [n_kept])))
+        if (sizes > n_atoms).any():
+            return None
+        full = sizes[1:-1] == n_atoms
+        if (full & (n_lines - ends[1:] - 1 < n_atoms) &
+            (bounds[1:] < n_kept)).any():
+            return None
+        xyz = table[atoms[keep], :54]
+    else:
+        xyz = data
+
+    ter = (records[:first] == b'TER   ').nonzero()[0]
+    anisou = (records[:first] == b'ANISOU').nonzero()[0]
+    siguij = (records[:first] == b'SIGUIJ').nonzero()[0]
+    occupancies = np.zeros(n_atoms, ATOMIC_FIELDS['occupancy'].dtype)
+    bfactors = np.zeros(n_atoms, ATOMIC_FIELDS['beta'].dtype)
+    occ_blank = (data[:, 54:60] == 32).all(1)
+    beta_blank = (data[:, 60:66] == 32).all(1)
+    try:
+        coordinates = np.zeros((len(xyz), 3), dtype=float)
+        for k, col in enumerate((30, 38, 46)):
+            coordinates[:, k] = _sliceColumns(xyz, col, col + 8).astype(float)
+        resnums = _sliceColumns(data, 22, 26).astype(
+            ATOMIC_FIELDS['resnum'].dtype)
+        occupancies[~occ_blank] = _sliceColumns(
+            data[~occ_blank], 54, 60).astype(float)
+        bfactors[~beta_blank] = _sliceColumns(
+            data[~beta_blank], 60, 66).astype(float)
+        anisous = []
+        for which, dtype in ((anisou, ATOMIC_FIELDS['anisou'].dtype),
+                             (siguij, ATOMIC_FIELDS['siguij'].dtype)):
+            if not len(which):
+                anisous.append(None)
+                continue
+            values = np.zeros((n_atoms, 6), dtype=dtype)
+            index = counts[which] - 1
+            cards = table[which[index >= 0]]
+            index = index[index >= 0]
+            _padColumns(cards)
+            for k, (col, end) in enumerate(((28, 35), (35, 42), (43, 49),
+                                            (49, 56), (56, 63), (63, 70))):
+                values[index, k] = _sliceColumns(cards, col,
+                                                 end).astype(float)
+            anisous.append(values)
+    except ValueError:
+        return None
+    anisou, siguij = anisous
+
+    processed = np.arange(n_lines)
+    processed = (processed < scan) | (processed >= rescan)
+    if bonds is not None:
+        conect = []
+        for i in (processed & (records == b'CONECT')).nonzero()[0]:
+            _parseConect(lines[start + i], conect)
+
+    lineno = atoms[inmodel] + start
+    try:
+        serials = _sliceColumns(data, 6, 11).astype(
+            ATOMIC_FIELDS['serial'].dtype)
+    except ValueError:
+        serials = np.zeros(n_atoms, dtype=ATOMIC_FIELDS['serial'].dtype)
+        for acount, i in enumerate(lineno):
+            try:
+                serials[acount] = int(lines[i][6:11])
+            except ValueError:
+                try:
+                    serials[acount] = int(lines[i][6:11], 16)
+                except ValueError:
+                    LOGGER.warn('failed to parse serial number in line {0}'
+                                .format(i))
+                    serials[acount] = serials[acount-1]+1
+    for i in lineno[occ_blank]:
+        LOGGER.warn('failed to parse occupancy at line {0}'.format(i))
+    for i in lineno[beta_blank]:
+        LOGGER.warn('failed to parse beta-factor at line {0}'.format(i))
+
+    termini = np.zeros(n_atoms, dtype=bool)
+    index = counts[ter] - 1
+    termini[index[index >= 0]] = True
+
+    atomnames = np.char.strip(_sliceColumns(data, 12, 16)).astype(
+        ATOMIC_FIELDS['name'].dtype)
+    resnames = np.char.strip(_sliceColumns(data, 17, 21)).astype(
+        ATOMIC_FIELDS['resname'].dtype)
+    chainids = _sliceColumns(data, 21, 22).astype(
+        ATOMIC_FIELDS['chain'].dtype)
+    elements = np.char.strip(_sliceColumns(data, 76, 78)).astype(
+        ATOMIC_FIELDS['element'].dtype)
+
+    altlocs = [defaultdict(list), defaultdict(list)]
+    rejected = atoms[reject]
+    for i in rejected[processed[rejected]]:
+        line = lines[start + i]
+        altlocs[int(multi and i > first)][line[16]].append((line, start + i))
+
+    if multi:
+        stored = np.repeat(np.concatenate(([True], full,
+                                           [sizes[-1] == n_atoms])), sizes)
+        nmodel = 1
+        for size in sizes[1:-1]:
+            if size < n_atoms:
+                LOGGER.warn('Discarding model {0}, which contains {1} fewer '
+                            'atoms than the first model does.'
+                            .format(nmodel+1, n_atoms-size))
+            else:
+                nmodel += 1
+        if not stored.all():
+            coordinates = coordinates[stored]
+        coordinates = coordinates.reshape((-1, n_atoms, 3))
+    else:
+        atomgroup._setCoords(coordinates)
+
+    atomgroup.setNames(atomnames)
+    atomgroup.setResnames(resnames)
+    atomgroup.setResnums(resnums)
+    atomgroup.setChids(chainids)
+    atomgroup.setFlags('hetatm', hetatm[atoms[inmodel]])
+    atomgroup.setFlags('pdbter', termini)
+    atomgroup.setAltlocs(_sliceColumns(data, 16, 17).astype(
+        ATOMIC_FIELDS['altloc'].dtype))
+    atomgroup.setIcodes(np.char.strip(_sliceColumns(data, 26, 27)).astype(
+        ATOMIC_FIELDS['icode'].dtype))
+    atomgroup.setSerials(serials)
+    atomgroup.setBetas(bfactors)
+    atomgroup.setOccupancies(occupancies)
+    atomgroup.setSegnames(np.char.strip(_sliceColumns(data, 72, 76)).astype(
+        ATOMIC_FIELDS['segment'].dtype))
+    atomgroup.setElements(elements)
+    from prody.utilities.misctools import getMasses
+    atomgroup.setMasses(getMasses(elements))
+    if anisou is not None:
+        atomgroup.setAnisous(anisou / 10000)
+    if siguij is not None:
+        atomgroup.setAnistds(siguij / 10000)
+
+    if altlocs[0] and altloc_torf:
+        _evalAltlocs(atomgroup, altlocs[0], chainids, resnums, resnames,
+                     atomnames)
+    if multi:
+        atomgroup._setCoords(coordinates)
+        if altlocs[1] and altloc_torf:
+            _evalAltlocs(atomgroup, altlocs[1], chainids, resnums, resnames,
+                         atomnames)
+    if bonds is not None:
+        bonds.extend(conect)
+    return atomgroup
+
+
 def _evalAltlocs(atomgroup, altloc, chainids, resnums, resnames, atomnames):
     altloc_keys = list(altloc)
     altloc_keys.sort()
@@ -928,13 +1320,75 @@ SHEETLINE = ('SHEET  {strand:3d} {sheetID:>3s}{numStrands:2d} '
              '{initResName:3s} {initChainID:1s}{initSeqNum:4d}{initICode:1s} '
              '{endResName:3s} {endChainID:1s}{endSeqNum:4d}{endICode:1s}{sense:2d} \n')
 
-PDBLINE_LT100K = ('%-6s%5d %-4s%1s%-4s%1s%4d%1s   '
-                  '%8.3f%8.3f%8.3f%6.2f%6.2f      '
-                  '%4s%2s\n')
+PDBHEAD_LT100K = '%-6s%5d %-4s%1s%-4s%1s%4d%1s   '
+PDBHEAD_GE100K = '%-6s%5x %-4s%1s%-4s%1s%4d%1s   '
+PDBTAIL = '%6.2f%6.2f      %4s%2s\n'
+
+PDBLINE_LT100K = PDBHEAD_LT100K + '%8.3f%8.3f%8.3f' + PDBTAIL
+
+PDBLINE_GE100K = PDBHEAD_GE100K + '%8.3f%8.3f%8.3f' + PDBTAIL
 
-PDBLINE_GE100K = ('%-6s%5x %-4s%1s%-4s%1s%4d%1s   '
-                  '%8.3f%8.3f%8.3f%6.2f%6.2f      '
-                  '%4s%2s\n')
+
+def _formatCoords(coords):
+    """Returns *coords* formatted as ``'%8.3f'`` fields in a byte matrix with
+    24 columns per atom, or **None** if a value needs more than 8 columns.
+    Values are rounded to integer multiples of 0.001 using :func:`numpy.rint`,
+    except those close to halfway between two, which are formatted by Python
+    to get exactly the same output."""
+
+    n_atoms = len(coords)
+    coords = np.asarray(coords, dtype=float).reshape(-1)
+    finite = np.isfinite(coords)
+    scaled = np.abs(np.where(finite, coords, 0)) * 1000
+    negative = np.signbit(coords)
+    if (scaled >= np.where(negative, 999999.5, 9999999.5)).any():
+        return None
+    exact = (~finite | (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6))
+
+    integer, fraction = np.divmod(np.rint(scaled).astype(np.int64), 1000)
+    text = np.zeros((len(coords), 8), np.uint8)
+    text.fill(32)
+    text[:, 4] = 46
+    text[:, 5] = 48 + fraction // 100
+    text[:, 6] = 48 + fraction // 10 % 10
+    text[:, 7] = 48 + fraction % 10
+    lead = np.zeros(len(coords), int)
+    lead.fill(3)
+    text[:, 3] = 48 + integer % 10
+    for col, power in ((2, 10), (1, 100), (0, 1000)):
+        which = integer >= power
+        text[which, col] = 48 + integer[which] // power % 10
+        lead[which] = col
+    which = negative.nonzero()[0]
+    text[which, lead[which] - 1] = 45
+
+    for i in exact.nonzero()[0]:
+        field = '%8.3f' % coords[i]
+        if len(field) != 8:
+            return None
+        text[i] = np.frombuffer(field.encode(), np.uint8)
+    return text.reshape((n_atoms, 24))
+
+
+def _tabulateLines(heads, tails, width):
+    """Returns a byte matrix with rows holding strings from *heads* and *tails*
+    with *width* blank columns between them, or **None** if strings in either
+    list are not ASCII or differ in length."""
+
+    if not len(heads):
+        return None
+    columns = []
+    for strings in (heads, tails):
+        if len(set(map(len, strings))) > 1:
+            return None
+        try:
+            strings = np.array(strings, dtype='S')
+        except UnicodeError:
+            return None
+        columns.append(strings.view(np.uint8).reshape((len(strings), -1)))
+    blank = np.zeros((len(heads), width), np.uint8)
+    blank.fill(32)
+    return np.concatenate((columns[0], blank, columns[1]), 1)
 
 
 _writePDBdoc = """
@@ -1189,26 +1643,47 @@ def writePDBStream(stream, atoms, csets=None, **kwargs):
         pass
 
     # write atoms
+    # columns other than coordinates are formatted once, and coordinates of
+    # each model are placed into a byte matrix holding these invariant columns
+    n_dec = MAX_N_ATOM if n_atoms > MAX_N_ATOM else n_atoms
+    over = (np.asarray(serials[:n_dec]) > MAX_N_ATOM).nonzero()[0]
+    if len(over):
+        n_dec = over[0]
+
+    def formatHeads(altlocs):
+        fields = zip(*[np.asarray(values[:n_atoms]).tolist() for values in
+                       (hetero, serials, atomnames, altlocs, resnames,
+                        chainids, resnums, icodes)])
+        return [(PDBHEAD_LT100K if i < n_dec else PDBHEAD_GE100K) % values
+                for i, values in enumerate(fields)]
+
+    tails = [PDBTAIL % values for values in
+             zip(*[np.asarray(values).tolist() for values in
+                   (occupancies, bfactors, segments, elements)])]
+    heads = formatHeads(altlocs)
+    table = _tabulateLines(heads, tails, 24)
+
     multi = len(coordsets) > 1
     write = stream.write
     for m, coords in enumerate(coordsets):
-        pdbline = PDBLINE_LT100K
-        if multi:
-            write('MODEL{0:9d}\n'.format(m+1))
-        for i, xyz in enumerate(coords):
-            if pdbline != PDBLINE_GE100K and (i == MAX_N_ATOM or serials[i] > MAX_N_ATOM):
-                LOGGER.warn('Indices are exceeding 99999 and hexadecimal format is being used')
-                pdbline = PDBLINE_GE100K
-            write(pdbline % (hetero[i], serials[i],
-                             atomnames[i], altlocs[i],
-                             resnames[i], chainids[i], resnums[i],
-                             icodes[i],
-                             xyz[0], xyz[1], xyz[2],
-                             occupancies[i], bfactors[i],
-                             segments[i], elements[i]))
+        if n_dec < n_atoms:
+            LOGGER.warn('Indices are exceeding 99999 and hexadecimal format '
+                        'is being used')
+        if m == 1 and any(altloc.strip() for altloc in altlocs):
+            heads = formatHeads(np.zeros(n_atoms, s_or_u + '1'))
+            table = _tabulateLines(heads, tails, 24)
+
+        columns = None if table is None else _formatCoords(coords)
+        if columns is None:
+            lines = ''.join([heads[i] + '%8.3f%8.3f%8.3f' % tuple(xyz) +
+                             tails[i] for i, xyz in enumerate(coords)])
+        else:
+            start = table.shape[1] - len(tails[0]) - 24
+            table[:, start:start+24] = columns
+            lines = table.tobytes().decode()
         if multi:
-            write('ENDMDL\n')
-            altlocs = np.zeros(n_atoms, s_or_u + '1')
+            lines = 'MODEL{0:9d}\n'.format(m+1) + lines + 'ENDMDL\n'
+        write(lines)
 
 writePDBStream.__doc__ += _writePDBdoc
 
@@ -1281,16 +1756,27 @@ def writePQRStream(stream, atoms, **kwargs):
     if altlocs is None:
         altlocs = np.zeros(n_atoms, s_or_u + '1')
 
-    format = ('{0:6s} {1:5d} {2:4s} {3:1s}' +
-              '{4:4s} {5:1s} {6:4d} {7:1s}   ' +
-              '{8:8.3f} {9:8.3f} {10:8.3f}' +
-              '{11:8.4f} {12:7.4f}\n').format
+    format = '{0:6s} {1:5d} {2:4s} {3:1s}{4:4s} {5:1s} {6:4d} {7:1s}   '.format
+    heads = [format(*values) for values in zip(*[
+        np.asarray(values).tolist() for values in
+        (hetero, np.arange(1, n_atoms + 1), atomnames, altlocs, resnames,
+         chainids, np.asarray(resnums, int), icodes)])]
+    format = '{0:8.4f} {1:7.4f}\n'.format
+    tails = [format(*values) for values in
+             zip(np.asarray(charges).tolist(), np.asarray(radii).tolist())]
     coords = atoms._getCoords()
-    write = stream.write
-    for i, xyz in enumerate(coords):
-        write(format(hetero[i], i+1, atomnames[i], altlocs[i],
-                     resnames[i], chainids[i], int(resnums[i]),
-                     icodes[i], xyz[0], xyz[1], xyz[2], charges[i], radii[i]))
+
+    table = _tabulateLines(heads, tails, 26)
+    columns = None if table is None else _formatCoords(coords)
+    if columns is None:
+        lines = ''.join([heads[i] + '%8.3f %8.3f %8.3f' % tuple(xyz) +
+                         tails[i] for i, xyz in enumerate(coords)])
+    else:
+        start = table.shape[1] - len(tails[0]) - 26
+        for j in range(3):
+            table[:, start+9*j:start+9*j+8] = columns[:, 8*j:8*j+8]
+        lines = table.tobytes().decode()
+    stream.write(lines)
 
 def writePQR(filename, atoms, **kwargs):
     """Write *atoms* in PQR format to a file with name *filename*.  Only
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""This module defines an opt-in persistent index of files in the working
+folder, local PDB folder, and local PDB mirror, which is used by
+:func:`.fetchPDB`, :func:`.fetchPDBfromMirror`, :func:`.findPDBFiles`, and
+:func:`.iterPDBFilenames` instead of scanning folders on every call.
+
+Index is enabled and configured using :func:`.confProDy`::
+
+    confProDy(pdb_index=True)
+    confProDy(pdb_index_path='/scratch/pdbindex.sqlite')
+
+Index is an SQLite database that keeps contents of each folder that was
+looked up together with its modification time.  A folder is listed again
+only when its modification time changes, i.e. when files are added to or
+removed from it, and only names that were added or removed are updated.
+Folders modified within the last few seconds are listed on every lookup,
+since further changes may not update a coarse grained modification time.
+Files written by :func:`.fetchPDB` and :func:`.fetchPDBfromMirror` are
+added to the index directly, so that a job's own downloads do not cause
+their folder to be listed again."""
+
+import os
+import time
+import tempfile
+from os.path import abspath, join, split, isdir, isfile
+
+from prody import LOGGER, SETTINGS
+from prody.utilities import USERHOME, openSQLite
+
+__all__ = ['clearPDBIndex', 'pathPDBIndex']
+
+INDEX_VERSION = 1
+RACY_MTIME = 2
+
+_CONNECTION = {}
+
+
+def pathPDBIndex():
+    """Returns path to the PDB index file, which is set using
+    ``confProDy(pdb_index_path=...)`` and by default is
+    :file:`~/.prody/pdbindex.sqlite`."""
+
+    path = SETTINGS.get('pdb_index_path', '')
+    if not path:
+        path = join(USERHOME or tempfile.gettempdir(), '.prody',
+                    'pdbindex.sqlite')
+    return path
+
+
+def clearPDBIndex():
+    """Remove all folders from the PDB index."""
+
+    _closeIndex()
+    path = pathPDBIndex()
+    if isfile(path):
+        os.remove(path)
+        LOGGER.info('PDB index at {0} was cleared.'.format(path))
+
+
+def _isEnabled():
+
+    return bool(SETTINGS.get('pdb_index', False))
+
+
+def _closeIndex():
+
+    conn = _CONNECTION.pop('conn', None)
+    _CONNECTION.clear()
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _openIndex():
+    """Returns a connection to the index database, or **None** if index is
+    disabled or cannot be opened.  Connections are not shared with forked
+    processes."""
+
+    if not _isEnabled():
+        return None
+
+    import sqlite3
+    path = pathPDBIndex()
+    key = (path, os.getpid())
+    current = _CONNECTION.get('key')
+    if current == key:
+        return _CONNECTION['conn']
+    if current is not None and current[1] == key[1]:
+        _closeIndex()
+    else:
+        _CONNECTION.clear()
+
+    try:
+        folder = split(path)[0]
+        if folder and not isdir(folder):
+            os.makedirs(folder)
+        conn = openSQLite(path)
+        conn.execute('CREATE TABLE IF NOT EXISTS folders '
+                     '(path TEXT PRIMARY KEY, mtime REAL, version INTEGER)')
+        conn.execute('CREATE TABLE IF NOT EXISTS files '
+                     '(folder TEXT, name TEXT, PRIMARY KEY (folder, name))')
+        conn.execute('CREATE TEMP TABLE lookup (folder TEXT, name TEXT)')
+        conn.commit()
+    except (OSError, sqlite3.Error) as err:
+        LOGGER.warning('Failed to open PDB index at {0}: {1}'
+                       .format(path, err))
+        return None
+
+    _CONNECTION['key'] = key
+    _CONNECTION['conn'] = conn
+    return conn
+
+
+def _listdir(path):
+
+    try:
+        return [name for name in os.listdir(path) if not name.startswith('.')]
+    except OSError:
+        return []
+
+
+def _updateIndex(conn, folders):
+    """List *folders*, which are absolute paths, whose modification time
+    differs from the one recorded in the index, and record their contents."""
+
+    now = time.time()
+    recorded = {}
+    _setLookup(conn, ((folder, '') for folder in folders))
+    for path, mtime, version in conn.execute(
+            'SELECT f.path, f.mtime, f.version FROM folders f '
+            'JOIN lookup l ON f.path = l.folder'):
+        recorded[path] = mtime if version == INDEX_VERSION else None
+    conn.commit()
+
+    updates = []
+    for folder in folders:
+        try:
+            mtime = os.stat(folder).st_mtime
+        except OSError:
+            mtime = -1.
+        if folder in recorded and recorded[folder] == mtime:
+            continue
+        if now - mtime < RACY_MTIME:
+            mtime = None
+        updates.append((folder, mtime))
+
+    if not updates:
+        return
+
+    with conn:
+        for folder, mtime in updates:
+            names = set(_listdir(folder))
+            indexed = set(name for name, in conn.execute(
+                'SELECT name FROM files WHERE folder = ?', (folder,)))
+            conn.executemany('DELETE FROM files WHERE folder = ? AND '
+                             'name = ?', ((folder, name)
+                                          for name in indexed - names))
+            conn.executemany('INSERT INTO files VALUES (?, ?)',
+                             ((folder, name) for name in names - indexed))
+            conn.execute('INSERT OR REPLACE INTO folders VALUES (?, ?, ?)',
+                         (folder, mtime, INDEX_VERSION))
+    LOGGER.debug('PDB index was updated for {0} folder(s).'
+                 .format(len(updates)))
+
+
+def addFiles(filenames):
+    """Record *filenames*, which were just written, in the index.  Files are
+    added only to folders that are already indexed, and modification times
+    of these folders are updated, so that they are not listed again at the
+    next lookup.  **None** items are ignored."""
+
+    conn = _openIndex()
+    if conn is None:
+        return
+
+    import sqlite3
+    folders = {}
+    for fn in filenames:
+        if fn:
+            folder, name = split(abspath(fn))
+            folders.setdefault(folder, []).append(name)
+    try:
+        with conn:
+            for folder, names in folders.items():
+                row = conn.execute('SELECT version FROM folders WHERE '
+                                   'path = ?', (folder,)).fetchone()
+                if row is None or row[0] != INDEX_VERSION:
+                    continue
+                try:
+                    mtime = os.stat(folder).st_mtime
+                except OSError:
+                    continue
+                conn.executemany('INSERT OR IGNORE INTO files VALUES (?, ?)',
+                                 ((folder, name) for name in names))
+                conn.execute('UPDATE folders SET mtime = ? WHERE path = ?',
+                             (mtime, folder))
+    except sqlite3.Error as err:
+        LOGGER.warning('PDB index could not be used: {0}'.format(err))
+        _closeIndex()
+
+
+def _setLookup(conn, pairs):
+
+    conn.execute('DELETE FROM lookup')
+    conn.executemany('INSERT INTO lookup VALUES (?, ?)', pairs)
+
+
+def listFolders(folders):
+    """Returns a dictionary that maps each of *folders* to a list of names of
+    files and folders it contains, excluding hidden ones."""
+
+    folders = list(set(folders))
+    conn = _openIndex()
+    if conn is not None:
+        import sqlite3
+        paths = list(set(abspath(folder) for folder in folders))
+        try:
+            _updateIndex(conn, paths)
+            listing = dict((path, []) for path in paths)
+            _setLookup(conn, ((path, '') for path in paths))
+            for path, name in conn.execute(
+                    'SELECT f.folder, f.name FROM files f '
+                    'JOIN lookup l ON f.folder = l.folder'):
+                listing[path].append(name)
+            conn.commit()
+            return dict((folder, listing[abspath(folder)])
+                        for folder in folders)
+        except sqlite3.Error as err:
+            LOGGER.warning('PDB index could not be used: {0}'.format(err))
+            _closeIndex()
+
+    return dict((folder, _listdir(folder)) for folder in folders)
+
+
+def listFolder(folder):
+    """Returns a list of names of files and folders in *folder*, excluding
+    hidden ones."""
+
+    return listFolders([folder])[folder]
+
+
+def findFiles(filenames):
+    """Returns a list of booleans showing whether each of *filenames* exists.
+    When index is enabled, all files are looked up in a single query."""
+
+    conn = _openIndex()
+    if conn is not None:
+        import sqlite3
+        pairs = [split(fn) for fn in filenames]
+        paths = dict((folder, abspath(folder))
+                     for folder in set(folder for folder, _ in pairs))
+        pairs = [(paths[folder], name) for folder, name in pairs]
+        try:
+            _updateIndex(conn, list(set(paths.values())))
+            _setLookup(conn, pairs)
+            found = set(conn.execute(
+                'SELECT l.folder, l.name FROM lookup l JOIN files f '
+                'ON f.folder = l.folder AND f.name = l.name'))
+            conn.commit()
+            return [pair in found for pair in pairs]
+        except sqlite3.Error as err:
+            LOGGER.warning('PDB index could not be used: {0}'.format(err))
+            _closeIndex()
+
+    return [isfile(fn) for fn in filenames]
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""This module defines an opt-in on-disk cache for structures parsed by
+:func:`.parsePDB`, :func:`.parseCIF`, and :func:`.parsePQR`.
+
+Cache is enabled and configured using :func:`.confProDy`::
+
+    confProDy(structure_cache=True)
+    confProDy(structure_cache_path='/scratch/structcache')
+    confProDy(structure_cache_size=4096)  # in MB, default is 1024
+
+Each entry is stored in a folder named after a hash of the path,
+modification time and size of the parsed file, and parsing arguments.
+Atomic data, coordinate sets, flags and bonds are saved as :file:`.npy`
+files that are memory-mapped in copy-on-write mode when loaded, and header
+data is pickled.  When the total size of the cache exceeds the limit, least
+recently used entries are removed."""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from numbers import Number
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy as np
+
+from prody import LOGGER, SETTINGS
+from prody.atomic import AtomGroup, ATOMIC_FIELDS
+from prody.utilities import USERHOME
+
+__all__ = ['clearStructureCache', 'pathStructureCache']
+
+CACHE_VERSION = 1
+MB = 1024 * 1024
+
+SETTING_KEYS = ('auto_bonds', 'auto_secondary')
+SKIP_DATA = set(['numbonds', 'fragindex'])
+
+
+def pathStructureCache():
+    """Returns path to the structure cache folder, which is set using
+    ``confProDy(structure_cache_path=...)`` and by default is
+    :file:`~/.prody/structcache`."""
+
+    path = SETTINGS.get('structure_cache_path', '')
+    if not path:
+        path = os.path.join(USERHOME or tempfile.gettempdir(), '.prody',
+                            'structcache')
+    return path
+
+
+def clearStructureCache():
+    """Remove all entries from the structure cache."""
+
+    path = pathStructureCache()
+    if os.path.isdir(path):
+        for name in os.listdir(path):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        LOGGER.info('Structure cache at {0} was cleared.'.format(path))
+
+
+def _isEnabled():
+
+    return bool(SETTINGS.get('structure_cache', False))
+
+
+def getStructureCacheKey(filename, parser, kwargs):
+    """Returns a key for the structure cache, or **None** if cache is
+    disabled, *filename* cannot be accessed, or parsing arguments in
+    *kwargs* cannot be hashed reliably, e.g. when an :class:`.AtomGroup`
+    is passed as *ag*."""
+
+    if not _isEnabled() or 'ag' in kwargs:
+        return None
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+
+    params = [('parser', parser), ('path', os.path.realpath(filename)),
+              ('mtime', stat.st_mtime), ('size', stat.st_size)]
+    for key in SETTING_KEYS:
+        params.append((key, SETTINGS.get(key)))
+    for key in sorted(kwargs):
+        value = kwargs[key]
+        if not (value is None or isinstance(value, (Number, str, bool))):
+            LOGGER.debug('Structure cache is not used for {0} argument.'
+                         .format(key))
+            return None
+        params.append((key, value))
+
+    return hashlib.sha1(repr((CACHE_VERSION, params)).encode()).hexdigest()
+
+
+def loadCachedStructure(key):
+    """Returns the structure saved in the cache entry *key*, i.e. an
+    :class:`.AtomGroup`, a header dictionary, or a tuple of both, or
+    **None** if there is no such entry."""
+
+    if key is None:
+        return None
+
+    path = os.path.join(pathStructureCache(), key)
+    meta_fn = os.path.join(path, 'meta.json')
+    try:
+        with open(meta_fn) as meta_file:
+            meta = json.load(meta_file)
+        atoms = header = None
+        if meta['atoms']:
+            atoms = _loadAtoms(path, meta)
+        if meta['header']:
+            with open(os.path.join(path, 'header.pkl'), 'rb') as pkl:
+                header = pickle.load(pkl)
+    except (IOError, OSError, ValueError, KeyError, EOFError,
+            pickle.UnpicklingError):
+        return None
+
+    try:
+        os.utime(meta_fn, None)
+    except OSError:
+        pass
+    LOGGER.debug('Structure was loaded from cache ({0}).'.format(key))
+
+    if meta['tuple']:
+        return atoms, header
+    return header if atoms is None else atoms
+
+
+def _loadAtoms(path, meta):
+
+    def load(name):
+        array = np.load(os.path.join(path, name + '.npy'), mmap_mode='c')
+        return array.view(np.ndarray)
+
+    ag = AtomGroup(meta['title'])
+    ag._n_atoms = meta['n_atoms']
+    if meta['n_csets']:
+        ag._coords = load('coordinates')
+        ag._n_csets = meta['n_csets']
+        ag._acsi = 0
+        ag._setTimeStamp()
+        ag.setCSLabels(meta['cslabels'])
+    for label in meta['data']:
+        ag._data[label] = load('data_' + label)
+    for label in meta['flags']:
+        ag._setFlags(label, load('flags_' + label))
+    if meta['bonds']:
+        ag._bonds = load('bonds')
+        ag._bmap = load('bmap')
+        ag._data['numbonds'] = load('numbonds')
+    return ag
+
+
+def saveCachedStructure(key, result):
+    """Save *result* of parsing a structure, which may be an
+    :class:`.AtomGroup`, a header dictionary, or a tuple of both, in the
+    cache entry *key*, and evict least recently used entries if the size
+    limit is exceeded."""
+
+    if key is None:
+        return
+
+    atoms = header = None
+    if isinstance(result, tuple) and len(result) == 2:
+        atoms, header = result
+    elif isinstance(result, dict):
+        header = result
+    else:
+        atoms = result
+    if not (atoms is None or isinstance(atoms, AtomGroup)):
+        # e.g. a list of biomolecules
+        return
+    if atoms is None and header is None:
+        return
+
+    root = pathStructureCache()
+    path = os.path.join(root, key)
+    if os.path.isdir(path):
+        return
+
+    try:
+        if not os.path.isdir(root):
+            os.makedirs(root)
+        temp = tempfile.mkdtemp(prefix='.' + key, dir=root)
+    except OSError as err:
+        LOGGER.warning('Failed to write structure cache at {0}: {1}'
+                       .format(root, err))
+        return
+
+    meta = {'version': CACHE_VERSION, 'atoms': atoms is not None,
+            'header': header is not None, 'tuple': isinstance(result, tuple)}
+    try:
+        if atoms is not None:
+            meta.update(_saveAtoms(temp, atoms))
+        if meta['header']:
+            with open(os.path.join(temp, 'header.pkl'), 'wb') as pkl:
+                pickle.dump(header, pkl, pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(temp, 'meta.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.rename(temp, path)
+    except (OSError, TypeError, AttributeError, pickle.PicklingError):
+        # another process may have saved the same entry, or header data
+        # could not be pickled
+        shutil.rmtree(temp, ignore_errors=True)
+        return
+
+    evictStructureCache()
+
+
+def _saveAtoms(path, ag):
+
+    def save(name, array):
+        np.save(os.path.join(path, name + '.npy'), np.ascontiguousarray(array))
+
+    meta = {'title': ag.getTitle(), 'n_atoms': ag.numAtoms(),
+            'n_csets': ag.numCoordsets(), 'cslabels': ag.getCSLabels(),
+            'data': [], 'flags': [], 'bonds': False}
+    if meta['n_csets']:
+        save('coordinates', ag._getCoordsets())
+    for label in ag.getDataLabels():
+        if label in SKIP_DATA or (label in ATOMIC_FIELDS and
+                                  ATOMIC_FIELDS[label].readonly):
+            continue
+        save('data_' + label, ag._getData(label))
+        meta['data'].append(label)
+    for label in ag.getFlagLabels():
+        save('flags_' + label, ag._getFlags(label))
+        meta['flags'].append(label)
+    if ag._bonds is not None and ag._bmap is not None:
+        save('bonds', ag._bonds)
+        save('bmap', ag._bmap)
+        save('numbonds', ag._data['numbonds'])
+        meta['bonds'] = True
+    return meta
+
+
+def evictStructureCache(limit=None):
+    """Remove least recently used entries from the structure cache until its
+    size is below *limit* (MB), which by default is the value set using
+    ``confProDy(structure_cache_size=...)``."""
+
+    if limit is None:
+        limit = SETTINGS.get('structure_cache_size', 1024)
+    limit = limit * MB
+
+    root = pathStructureCache()
+    if not os.path.isdir(root):
+        return
+
+    entries = []
+    total = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        meta_fn = os.path.join(path, 'meta.json')
+        if name.startswith('.') or not os.path.isfile(meta_fn):
+            continue
+        size = sum(os.path.getsize(os.path.join(path, fn))
+                   for fn in os.listdir(path))
+        entries.append((os.path.getmtime(meta_fn), size, path))
+        total += size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        LOGGER.debug('Structure cache entry {0} was evicted.'
+                     .format(os.path.split(path)[1]))
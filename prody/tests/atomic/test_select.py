@@ -546,3 +546,48 @@ def testGetBoolArray():
     ca = pdb3mht.ca
     assert_equal(len(ca), len(SELECT.getBoolArray(ca, 'index 510')))
 
+
+
+class TestSelectCache(unittest.TestCase):
+
+    """Test caching of compiled selection strings."""
+
+    def setUp(self):
+
+        self.select = prody.Select()
+
+    def testHitsAndMisses(self):
+
+        select = self.select
+        selstr = 'name CA and resnum 10 to 50'
+        first = select.getBoolArray(pdb3mht, selstr)
+        second = select.getBoolArray(pdb3mht, selstr)
+        assert_equal(first, second)
+        info = select.getCacheInfo()
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['size'], 1)
+
+    def testCoordinateChanges(self):
+
+        select = self.select
+        ag = pdb3mht.copy()
+        selstr = 'x > 0 and within 5 of name CA'
+        before = select.getBoolArray(ag, selstr)
+        ag.setCoords(ag.getCoords() * -1)
+        after = select.getBoolArray(ag, selstr)
+        assert_equal(after, SELECT.getBoolArray(ag, selstr))
+        self.assertFalse((before == after).all())
+        self.assertEqual(select.getCacheInfo()['hits'], 1)
+
+    def testMacroInvalidation(self):
+
+        select = self.select
+        prody.defSelectionMacro('cachetest', 'name CA')
+        n_ca = select.getBoolArray(pdb3mht, 'cachetest and protein').sum()
+        prody.defSelectionMacro('cachetest', 'name CB')
+        n_cb = select.getBoolArray(pdb3mht, 'cachetest and protein').sum()
+        prody.delSelectionMacro('cachetest')
+        self.assertEqual(n_ca, len(pdb3mht.select('name CA and protein')))
+        self.assertEqual(n_cb, len(pdb3mht.select('name CB and protein')))
+        self.assertEqual(select.getCacheInfo()['hits'], 0)
@@ -70,6 +70,16 @@ DATA_FILES = {
         'atoms': 167,
         'models': 3
     },
+    'xtc': {
+        'file': 'xtc2k39_truncated.xtc',
+        'atoms': 167,
+        'models': 3
+    },
+    'trr': {
+        'file': 'trr2k39_truncated.trr',
+        'atoms': 167,
+        'models': 3
+    },
     'anm1ubi_hessian': {
         'file': 'anm1ubi_hessian.coo',
     },
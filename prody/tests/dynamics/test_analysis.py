@@ -0,0 +1,67 @@
+"""This module contains unit tests for :mod:`~prody.dynamics.analysis`."""
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from prody.dynamics import calcGNM, calcANM
+from prody.dynamics import calcCrossCorr, calcCovariance, calcDistFlucts
+
+from prody.tests import unittest
+from prody.tests.datafiles import parseDatafile
+
+from prody import LOGGER
+
+LOGGER.verbosity = 'none'
+
+ATOMS = parseDatafile('1ubi').protein.copy()
+ANM = calcANM(ATOMS)[0]
+GNM = calcGNM(ATOMS)[0]
+
+ATOL = 1e-12
+
+
+def crossCorr(model):
+
+    cov = model.getCovariance()
+    if model.is3d():
+        n_atoms = model.numAtoms()
+        cov = cov.reshape((n_atoms, 3, n_atoms, 3)).trace(axis1=1, axis2=3)
+    diag = np.sqrt(cov.diagonal())
+    return cov, cov / np.outer(diag, diag)
+
+
+class TestCrossCorr(unittest.TestCase):
+
+    def testSerial(self):
+
+        for model in (ANM, GNM):
+            cov, cc = crossCorr(model)
+            assert_allclose(calcCrossCorr(model), cc, rtol=0, atol=ATOL)
+            assert_allclose(calcCrossCorr(model, norm=False), cov,
+                            rtol=0, atol=ATOL)
+
+    def testParallelBlocks(self):
+
+        for model in (ANM, GNM):
+            assert_allclose(calcCrossCorr(model, n_cpu=3, blocksize=7),
+                            calcCrossCorr(model), rtol=0, atol=ATOL)
+
+    def testOut(self):
+
+        out = np.zeros((ANM.numAtoms(), ANM.numAtoms()))
+        result = calcCrossCorr(ANM[:5], n_cpu=2, out=out)
+        self.assertIs(result, out)
+        assert_allclose(out, calcCrossCorr(ANM[:5]), rtol=0, atol=ATOL)
+
+    def testDistFlucts(self):
+
+        cc = calcCrossCorr(GNM, norm=False)
+        diag = cc.diagonal()
+        expected = diag[:, np.newaxis] + diag - 2 * cc
+        assert_allclose(calcDistFlucts(GNM, norm=False, n_cpu=2, blocksize=5),
+                        expected, rtol=0, atol=ATOL)
+
+    def testCovariance(self):
+
+        assert_allclose(calcCovariance(ANM, n_cpu=2, blocksize=11),
+                        ANM.getCovariance(), rtol=0, atol=ATOL)
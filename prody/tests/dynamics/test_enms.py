@@ -8,8 +8,10 @@ try:
 except ImportError:
     from numpy.testing import dec
 
+import os
+
 from prody import *
-from prody import LOGGER
+from prody import LOGGER, SETTINGS
 from prody.tests import unittest
 from prody.tests.datafiles import *
 
@@ -291,7 +293,151 @@ class TestANM(TestGNM):
                         err_msg='slow method does not reproduce same Hessian')
         assert_equal(slow._getKirchhoff(), anm._getKirchhoff(),
                      'slow method does not reproduce same Kirchhoff')
-    
+
+    def testBuildHessianKDTree(self):
+        fast = ANM()
+        fast.buildHessian(ATOMS, kdtree=True)
+        assert_allclose(fast._getHessian(), anm._getHessian(),
+                        rtol=0, atol=ATOL,
+                        err_msg='KDTree method does not reproduce same Hessian')
+        assert_equal(fast._getKirchhoff(), anm._getKirchhoff(),
+                     'KDTree method does not reproduce same Kirchhoff')
+
+    def testBuildHessianSparse(self):
+        sparse = ANM()
+        sparse.buildHessian(ATOMS, sparse=True)
+        assert_equal(sparse._getHessian().toarray(), anm._getHessian(),
+                     'sparse method does not reproduce same Hessian')
+        assert_equal(sparse._getKirchhoff().toarray(), anm._getKirchhoff(),
+                     'sparse method does not reproduce same Kirchhoff')
+
+
+class TestGamma(unittest.TestCase):
+
+    def setUp(self):
+
+        n_atoms = len(COORDS)
+        self.rows, self.cols = np.triu_indices(n_atoms, 1)
+        i2j = COORDS[self.cols] - COORDS[self.rows]
+        self.dist2 = (i2j ** 2).sum(1)
+
+    def assertGammas(self, gamma):
+
+        expected = [gamma.gamma(d2, i, j)
+                    for d2, i, j in zip(self.dist2, self.rows, self.cols)]
+        assert_equal(gamma.gammas(self.dist2, self.rows, self.cols), expected,
+                     'vectorized gamma does not reproduce pairwise values')
+
+    def testStructureBased(self):
+
+        atoms = ATOMS.copy()
+        atoms.setSecstrs(np.array(list('CHHHHHHHHHHHHCCEEEEECCCEEEEEGGGC' *
+                                       3))[:len(atoms)])
+        self.assertGammas(GammaStructureBased(atoms))
+
+    def testVariableCutoff(self):
+
+        names = np.array(['CA', 'P'] * len(ATOMS))[:len(ATOMS)]
+        self.assertGammas(GammaVariableCutoff(names, P=10))
+
+    def testScalarFunction(self):
+
+        def gamma(dist2, i, j):
+            if dist2 < 49:
+                return 2.
+            return 1.
+
+        gnm = GNM()
+        gnm.buildKirchhoff(ATOMS, gamma=gamma)
+        kirchhoff = gnm._getKirchhoff()
+        dist2 = ((COORDS[:, np.newaxis] - COORDS) ** 2).sum(2)
+        assert_equal(kirchhoff[(dist2 < 49) & (dist2 > 0)], -2.,
+                     'scalar gamma function did not fall back to pairwise')
+        assert_equal(kirchhoff[(dist2 >= 49) & (GNM_KIRCHHOFF != 0)], -1.,
+                     'scalar gamma function did not fall back to pairwise')
+
+
+class TestEigSolvers(unittest.TestCase):
+
+    def testSparseBackends(self):
+
+        for method in ('lapack', 'lanczos', 'lobpcg'):
+            model = ANM()
+            model.buildHessian(ATOMS, sparse=True)
+            model.calcModes(10, method=method)
+            assert_allclose(model.getEigvals(), anm[6:16].getEigvals(),
+                            rtol=0, atol=ATOL,
+                            err_msg=method + ' failed to get eigenvalues')
+            _temp = np.abs((model.getEigvecs() *
+                            anm[6:16].getEigvecs()).sum(0))
+            assert_allclose(_temp, np.ones(10), rtol=0, atol=ATOL,
+                            err_msg=method + ' failed to get eigenvectors')
+
+    def testCountZeroModes(self):
+
+        coords = np.concatenate([COORDS, COORDS + 1000.])
+        model = ANM()
+        model.buildHessian(coords)
+        self.assertEqual(countZeroModes(model._getHessian(), is3d=True), 12)
+        self.assertEqual(countZeroModes(model._getKirchhoff()), 2)
+        model.calcModes(5, method='lanczos')
+        assert_allclose(model.getEigvals(), anm[6:9].getEigvals().repeat(2)[:5],
+                        rtol=0, atol=ATOL,
+                        err_msg='failed to skip zero modes')
+
+    def testFloppyNetwork(self):
+
+        # a linear chain has more zero modes than rigid-body motions
+        coords = np.zeros((10, 3))
+        coords[:, 0] = np.arange(10) * 10.
+        model = ANM()
+        model.buildHessian(coords, cutoff=15.)
+        self.assertEqual(countZeroModes(model._getHessian(), is3d=True), 6)
+        values = np.linalg.eigvalsh(model._getHessian())
+        n_zeros = (values < 1e-6).sum()
+        self.assertGreater(n_zeros, 6)
+        for method in ('lapack', 'lanczos'):
+            model.calcModes(3, method=method)
+            assert_allclose(model.getEigvals(),
+                            values[n_zeros:n_zeros + 3], rtol=0, atol=ATOL,
+                            err_msg=method + ' failed to skip zero modes')
+
+
+class TestENMCache(unittest.TestCase):
+
+    def setUp(self):
+
+        from tempfile import mkdtemp
+        self.settings = dict((key, SETTINGS.get(key))
+                             for key in ('enm_cache', 'enm_cache_path'))
+        SETTINGS['enm_cache'] = True
+        SETTINGS['enm_cache_path'] = mkdtemp()
+
+    def tearDown(self):
+
+        from shutil import rmtree
+        rmtree(SETTINGS['enm_cache_path'])
+        SETTINGS.update(self.settings)
+
+    def testCalcANM(self):
+
+        calculated, _ = calcANM(ATOMS, n_modes=10)
+        cached, _ = calcANM(ATOMS, n_modes=10)
+        self.assertIsNone(cached._getHessian())
+        assert_equal(cached.getEigvecs(), calculated.getEigvecs(),
+                     'cached eigenvectors do not match')
+        assert_equal(cached.getVariances(), calculated.getVariances(),
+                     'cached variances do not match')
+
+    def testCalcGNMParameters(self):
+
+        calcGNM(ATOMS, cutoff=10.)
+        self.assertEqual(len(os.listdir(SETTINGS['enm_cache_path'])), 1)
+        calcGNM(ATOMS, cutoff=8.)
+        self.assertEqual(len(os.listdir(SETTINGS['enm_cache_path'])), 2)
+        calcGNM(ATOMS, cutoff=10.)
+        self.assertEqual(len(os.listdir(SETTINGS['enm_cache_path'])), 2)
+
 
 class TestGNMCalcModes(unittest.TestCase):
 
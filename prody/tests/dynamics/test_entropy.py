@@ -0,0 +1,60 @@
+"""This module contains unit tests for :mod:`~prody.dynamics.entropy`."""
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from prody.dynamics import GNM
+from prody.dynamics import calcEntropyTransfer, calcAllEntropyTransfer
+from prody.dynamics import calcNetEntropyTransfer
+from prody.dynamics import calcOverallNetEntropyTransfer
+
+from prody.tests import unittest
+from prody.tests.datafiles import parseDatafile
+
+from prody import LOGGER
+
+LOGGER.verbosity = 'none'
+
+GNM_MODEL = GNM()
+GNM_MODEL.buildKirchhoff(parseDatafile('1ubi_ca')[:40])
+GNM_MODEL.calcModes(None)
+
+TAUS = np.array([1e-6, 0.5, 1., 2.])
+
+
+class TestEntropyTransfer(unittest.TestCase):
+
+    def testAllPairs(self):
+
+        transfer = calcAllEntropyTransfer(GNM_MODEL, 0.5)
+        assert_equal(transfer.diagonal(), 0)
+        for i, j in [(0, 1), (3, 20), (39, 7)]:
+            assert_allclose(transfer[i, j],
+                            calcEntropyTransfer(GNM_MODEL, i, j, 0.5),
+                            rtol=1e-8)
+
+    def testNet(self):
+
+        transfer = calcAllEntropyTransfer(GNM_MODEL, 1.)
+        net = calcNetEntropyTransfer(transfer)
+        assert_allclose(net, -net.T)
+        assert_allclose(net[4, 9], transfer[4, 9] - transfer[9, 4])
+
+    def testOverall(self):
+
+        expected = np.trapz([calcAllEntropyTransfer(GNM_MODEL, tau)
+                             for tau in TAUS], TAUS, axis=0)
+        for n_cpu in (1, 3):
+            assert_allclose(calcOverallNetEntropyTransfer(GNM_MODEL,
+                                                          taus=TAUS,
+                                                          n_cpu=n_cpu),
+                            expected, rtol=1e-10, atol=1e-14)
+
+    def testOverallNCPU(self):
+
+        serial = calcOverallNetEntropyTransfer(GNM_MODEL, taus=TAUS)
+        assert_equal(calcOverallNetEntropyTransfer(GNM_MODEL, taus=TAUS,
+                                                   n_cpu=3), serial)
+        for n_cpu in (0, -1):
+            self.assertRaises(ValueError, calcOverallNetEntropyTransfer,
+                              GNM_MODEL, taus=TAUS, n_cpu=n_cpu)
@@ -0,0 +1,71 @@
+"""This module contains unit tests for :mod:`~prody.dynamics.perturb`."""
+
+import os
+from tempfile import mkdtemp
+from shutil import rmtree
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from prody.dynamics import calcANM, calcGNM, calcPerturbResponse
+
+from prody.tests import unittest
+from prody.tests.datafiles import parseDatafile
+
+from prody import LOGGER
+
+LOGGER.verbosity = 'none'
+
+ATOMS = parseDatafile('1ubi').protein.copy()
+ANM = calcANM(ATOMS)[0]
+GNM = calcGNM(ATOMS)[0]
+
+RTOL = 1e-10
+
+
+def perturbResponse(model):
+
+    n_atoms = model.numAtoms()
+    prs = model.getCovariance() ** 2
+    if model.is3d():
+        prs = prs.reshape((n_atoms, 3, n_atoms, 3)).sum(3).sum(1)
+    prs /= prs.diagonal()[:, np.newaxis]
+    off = prs - np.diag(prs.diagonal())
+    return prs, off.sum(1) / (n_atoms - 1), off.sum(0) / (n_atoms - 1)
+
+
+class TestPerturbResponse(unittest.TestCase):
+
+    def testResults(self):
+
+        for model in (ANM, GNM):
+            expected = perturbResponse(model)
+            for kwargs in ({}, {'n_cpu': 3, 'blocksize': 7}):
+                result = calcPerturbResponse(model, **kwargs)
+                for res, exp in zip(result, expected):
+                    assert_allclose(res, exp, rtol=RTOL)
+
+    def testNoDiag(self):
+
+        prs = calcPerturbResponse(ANM, no_diag=True, blocksize=10)[0]
+        assert_equal(prs.diagonal(), 0)
+
+    def testFilename(self):
+
+        folder = mkdtemp()
+        try:
+            filename = os.path.join(folder, 'prs.npy')
+            prs = calcPerturbResponse(GNM, filename=filename, n_cpu=2)[0]
+            self.assertIsInstance(prs, np.memmap)
+            del prs
+            assert_allclose(np.load(filename), perturbResponse(GNM)[0],
+                            rtol=RTOL)
+        finally:
+            rmtree(folder)
+
+    def testAtoms(self):
+
+        atoms = ATOMS.ca.copy()
+        _, effectiveness, sensitivity = calcPerturbResponse(ANM, atoms)
+        assert_equal(atoms.getData('effectiveness'), effectiveness)
+        assert_equal(atoms.getData('sensitivity'), sensitivity)
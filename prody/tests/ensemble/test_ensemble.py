@@ -7,6 +7,8 @@ import numpy as np
 from numpy import arange
 from numpy.testing import assert_equal, assert_allclose
 
+from prody.measure import superposeCoordsets, getRMSD
+
 from . import ATOMS, COORDS, ENSEMBLE, ENSEMBLEW
 from . import ENSEMBLE_RMSD, ENSEMBLE_SUPERPOSE
 from . import ATOL, RTOL
@@ -119,6 +121,49 @@ class TestEnsemble(TestCase):
                         rtol=0, atol=1e-3,
                         err_msg='failed to superpose coordinate sets')
 
+    def testGetRMSDsPairwise(self):
+
+        coordsets = ENSEMBLE.getCoordsets()
+        n_confs = len(coordsets)
+        expected = np.zeros((n_confs, n_confs))
+        for i in range(n_confs):
+            for j in range(n_confs):
+                expected[i, j] = getRMSD(coordsets[i], coordsets[j])
+        assert_allclose(ENSEMBLE.getRMSDs(pairwise=True), expected,
+                        rtol=0, atol=1e-10,
+                        err_msg='failed to calculate pairwise RMSDs')
+        assert_allclose(ENSEMBLE.getRMSDs(pairwise=True, n_cpu=2, blocksize=1),
+                        expected, rtol=0, atol=1e-10,
+                        err_msg='failed to calculate pairwise RMSDs in blocks')
+
+    def testGetRMSDsPairwiseSuperpose(self):
+
+        rmsds = ENSEMBLE.getRMSDs(pairwise=True, superpose=True)
+        for i, conf in enumerate(ENSEMBLE.getCoordsets()):
+            ensemble = ENSEMBLE[:]
+            ensemble.setCoords(conf)
+            ensemble.superpose()
+            assert_allclose(rmsds[i], ensemble.getRMSDs(), rtol=0, atol=1e-8,
+                            err_msg='failed to calculate superposed RMSDs')
+
+    def testSuperposeQCP(self):
+
+        ensemble = ENSEMBLE[:]
+        ensemble.superpose(method='qcp')
+        assert_allclose(ensemble.getRMSDs(), ENSEMBLE_SUPERPOSE,
+                        rtol=0, atol=1e-3,
+                        err_msg='failed to superpose coordinate sets')
+
+    def testSuperposeChunks(self):
+
+        ensemble = ENSEMBLE[:]
+        ensemble.superpose()
+        chunked = ENSEMBLE[:]
+        superposeCoordsets(chunked._confs, chunked._coords, chunksize=2)
+        assert_allclose(chunked.getCoordsets(), ensemble.getCoordsets(),
+                        rtol=0, atol=1e-10,
+                        err_msg='failed to superpose coordinate sets in chunks')
+
     def testDelCoordsetMiddle(self):
 
         ensemble = ENSEMBLE[:]
@@ -1,10 +1,15 @@
 """This module contains unit tests for :mod:`~prody.ensemble`."""
 
-from prody.tests import TestCase
+import os
+
+import numpy as np
+from numpy.testing import assert_equal, assert_allclose
 
-from numpy.testing import assert_equal
+from prody.tests import TestCase
+from prody.tests.datafiles import TEMPDIR
 
-from prody import calcOccupancies, trimPDBEnsemble, PDBEnsemble
+from prody import calcOccupancies, trimPDBEnsemble, PDBEnsemble, Ensemble
+from prody import saveEnsemble, loadEnsemble, PCA
 from . import PDBENSEMBLE, WEIGHTS, ENSEMBLE, ATOMS, PDBENSEMBLEA
 
 
@@ -47,3 +52,146 @@ class TestTrimPDBEnsemble(TestCase):
         assert_equal(msa1.getArray(), msa2.getArray(), 
                     'soft trimPDBEnsemble returns a wrong result')
 
+
+class TestSaveLoadEnsemble(TestCase):
+
+    def setUp(self):
+
+        self.filenames = []
+
+    def tearDown(self):
+
+        for filename in self.filenames:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def save(self, ensemble, name, **kwargs):
+
+        filename = saveEnsemble(ensemble, os.path.join(TEMPDIR, name),
+                                **kwargs)
+        self.filenames.append(filename)
+        return filename
+
+    def testNpz(self):
+
+        filename = self.save(ENSEMBLE, 'test_ensemble')
+        self.assertTrue(filename.endswith('.ens.npz'))
+        ensemble = loadEnsemble(filename)
+        assert_equal(ensemble.getCoordsets(), ENSEMBLE.getCoordsets())
+        self.assertRaises(ValueError, loadEnsemble, filename, mmap=True)
+
+    def testRaw(self):
+
+        filename = self.save(PDBENSEMBLEA, 'test_pdbensemble', raw=True)
+        self.assertTrue(filename.endswith('.ens.raw'))
+        ensemble = loadEnsemble(filename)
+        self.assertIsInstance(ensemble, PDBEnsemble)
+        self.assertNotIsInstance(ensemble._confs, np.memmap)
+        assert_equal(ensemble.getCoordsets(), PDBENSEMBLEA.getCoordsets())
+        assert_equal(ensemble.getWeights(), PDBENSEMBLEA.getWeights())
+        assert_equal(ensemble.getCoords(), PDBENSEMBLEA.getCoords())
+        self.assertEqual(ensemble.getLabels(), PDBENSEMBLEA.getLabels())
+        self.assertEqual(ensemble.getTitle(), PDBENSEMBLEA.getTitle())
+        self.assertEqual(ensemble.numAtoms(), PDBENSEMBLEA.numAtoms())
+        assert_equal(ensemble.getMSA().getArray(),
+                     PDBENSEMBLEA.getMSA().getArray())
+
+    def testMmap(self):
+
+        filename = self.save(ENSEMBLE, 'test_ensemble_mmap', raw=True)
+        ensemble = loadEnsemble(filename, mmap=True)
+        self.assertIsInstance(ensemble._confs, np.memmap)
+        coordsets = ensemble.getCoordsets()
+        self.assertNotIsInstance(coordsets, np.memmap)
+        assert_equal(coordsets, ENSEMBLE.getCoordsets())
+        assert_allclose(ensemble.getMSFs(), ENSEMBLE.getMSFs(),
+                        rtol=0, atol=1e-10)
+
+        ensemble._iterChunks = lambda chunksize=None, selected=True: \
+            Ensemble._iterChunks(ensemble, 2, selected)
+        pca = PCA()
+        pca.buildCovariance(ensemble)
+        expected = PCA()
+        expected.buildCovariance(ENSEMBLE)
+        assert_allclose(pca.getCovariance(), expected.getCovariance(),
+                        rtol=0, atol=1e-10)
+
+        assert_allclose(ensemble.getRMSDs(), ENSEMBLE.getRMSDs(),
+                        rtol=0, atol=1e-10)
+        ensemble.setAtoms(ensemble.getAtoms()[:10])
+        copied = ENSEMBLE[:]
+        copied.setAtoms(copied.getAtoms()[:10])
+        assert_allclose(ensemble.getRMSDs(pairwise=True),
+                        copied.getRMSDs(pairwise=True), rtol=0, atol=1e-10)
+        ensemble.setAtoms(None)
+        copied.setAtoms(None)
+
+        copied.superpose()
+        ensemble.superpose()
+        self.assertIsInstance(ensemble._confs, np.memmap)
+        assert_allclose(ensemble.getCoordsets(), copied.getCoordsets(),
+                        rtol=0, atol=1e-10)
+        # changes are not written to the file in copy-on-write mode
+        assert_equal(loadEnsemble(filename)._confs, ENSEMBLE._confs)
+
+    def testMmapSVD(self):
+
+        filename = self.save(ENSEMBLE, 'test_ensemble_svd', raw=True)
+        ensemble = loadEnsemble(filename, mmap='r')
+        ensemble._iterChunks = lambda chunksize=None, selected=True: \
+            Ensemble._iterChunks(ensemble, 2, selected)
+        pca = PCA()
+        pca.performSVD(ensemble)
+        expected = PCA()
+        expected.performSVD(ENSEMBLE)
+        self.assertEqual(pca.numModes(), expected.numModes())
+        assert_allclose(pca.getEigvals(), expected.getEigvals(),
+                        rtol=1e-10, atol=0)
+        assert_allclose(np.abs(pca.getArray()), np.abs(expected.getArray()),
+                        rtol=0, atol=1e-8)
+
+        filename = self.save(PDBENSEMBLE, 'test_pdbensemble_svd', raw=True)
+        ensemble = loadEnsemble(filename, mmap='r')
+        pca.performSVD(ensemble)
+        expected.performSVD(PDBENSEMBLE)
+        self.assertEqual(pca.numModes(), expected.numModes())
+        assert_allclose(pca.getEigvals(), expected.getEigvals(),
+                        rtol=1e-10, atol=0)
+
+    def testMmapPDBEnsemble(self):
+
+        filename = self.save(PDBENSEMBLE, 'test_pdbensemble_mmap', raw=True)
+        ensemble = loadEnsemble(filename, mmap='r+')
+        self.assertIsInstance(ensemble._confs, np.memmap)
+        self.assertIsInstance(ensemble._weights, np.memmap)
+        ensemble._iterChunks = lambda chunksize=None, selected=True: \
+            Ensemble._iterChunks(ensemble, 3, selected)
+        assert_allclose(ensemble.getMSFs(), PDBENSEMBLE.getMSFs(),
+                        rtol=0, atol=1e-10)
+        assert_allclose(ensemble.getRMSDs(), PDBENSEMBLE.getRMSDs(),
+                        rtol=0, atol=1e-10)
+        assert_allclose(ensemble.getRMSDs(pairwise=True),
+                        PDBENSEMBLE.getRMSDs(pairwise=True),
+                        rtol=0, atol=1e-10)
+        assert_equal(ensemble.getCoordsets(), PDBENSEMBLE.getCoordsets())
+
+        pca = PCA()
+        pca.buildCovariance(ensemble)
+        expected = PCA()
+        expected.buildCovariance(PDBENSEMBLE)
+        assert_allclose(pca.getCovariance(), expected.getCovariance(),
+                        rtol=0, atol=1e-10)
+
+        copied = PDBENSEMBLE[:]
+        copied.iterpose()
+        ensemble.iterpose()
+        assert_allclose(ensemble.getCoordsets(), copied.getCoordsets(),
+                        rtol=0, atol=1e-8)
+        assert_allclose(ensemble.getCoords(), copied.getCoords(),
+                        rtol=0, atol=1e-8)
+
+        # superposed conformations are written to the file in r+ mode
+        # since iterpose leaves conformations unchanged until final
+        # superposition
+        ensemble._confs.flush()
+        assert_equal(loadEnsemble(filename)._confs, ensemble._confs)
@@ -0,0 +1,104 @@
+"""This module contains unit tests for :mod:`~prody.kdtree.celllist` module."""
+
+import numpy as np
+from numpy import array
+from numpy.testing import assert_allclose, assert_array_equal
+
+from prody.tests import unittest
+from prody.kdtree import KDTree, CellList, pickNeighborSearch
+from prody.kdtree.celllist import getBoxVectors
+
+ATOL = 1e-4
+RTOL = 0
+
+np.random.seed(7)
+COORDS = np.random.uniform(0, 30, (1000, 3))
+CENTERS = np.random.uniform(-3, 33, (50, 3))
+UNITCELL = array([30., 30., 30.])
+TRICLINIC = array([30., 32., 34., 75., 85., 100.])
+
+
+def bruteForce(coords, center, radius, box=None):
+
+    diff = coords - center
+    if box is not None:
+        frac = np.dot(diff, np.linalg.inv(box))
+        frac -= np.round(frac)
+        images = array([[x, y, z] for x in (-1, 0, 1) for y in (-1, 0, 1)
+                        for z in (-1, 0, 1)])
+        dist = np.sqrt((np.dot(frac[:, np.newaxis, :] + images, box) ** 2)
+                       .sum(2)).min(1)
+    else:
+        dist = np.sqrt((diff ** 2).sum(1))
+    indices = (dist <= radius).nonzero()[0]
+    return indices, dist[indices]
+
+
+class TestCellList(unittest.TestCase):
+
+    def testCentersNoPBC(self):
+
+        kdtree = KDTree(COORDS)
+        celllist = CellList(COORDS)
+        for radius in (2.5, 6.):
+            expected = kdtree.searchCenters(radius, CENTERS)
+            result = celllist.searchCenters(radius, CENTERS)
+            assert_array_equal(result[0], expected[0])
+            assert_array_equal(result[1], expected[1])
+            assert_allclose(result[2], expected[2], rtol=RTOL, atol=ATOL)
+
+    def testCentersPBC(self):
+
+        kdtree = KDTree(COORDS, unitcell=UNITCELL)
+        celllist = CellList(COORDS, unitcell=UNITCELL)
+        expected = kdtree.searchCenters(5., CENTERS)
+        result = celllist.searchCenters(5., CENTERS)
+        assert_array_equal(result[0], expected[0])
+        assert_array_equal(result[1], expected[1])
+        assert_allclose(result[2], expected[2], rtol=RTOL, atol=ATOL)
+
+    def testTriclinic(self):
+
+        box = getBoxVectors(TRICLINIC)
+        coords = np.dot(np.random.uniform(0, 1, (1000, 3)), box)
+        celllist = CellList(coords, unitcell=TRICLINIC)
+        for center in CENTERS[:10]:
+            celllist.search(5., center)
+            indices, dist = bruteForce(coords, center, 5., box)
+            assert_array_equal(celllist.getIndices(), indices)
+            assert_allclose(celllist.getDistances(), dist,
+                            rtol=RTOL, atol=ATOL)
+
+    def testPairs(self):
+
+        celllist = CellList(COORDS)
+        celllist.search(2.)
+        kdtree = KDTree(COORDS)
+        kdtree.search(2.)
+        self.assertEqual(celllist.getCount(), kdtree.getCount())
+        self.assertEqual(set(map(tuple, celllist.getIndices())),
+                         set(tuple(sorted(pair))
+                             for pair in kdtree.getIndices()))
+
+    def testUpdate(self):
+
+        celllist = CellList(COORDS, unitcell=UNITCELL)
+        celllist.searchCenters(5., CENTERS)
+        coords = COORDS + np.random.normal(0, 0.5, COORDS.shape)
+        celllist.update(coords)
+        expected = CellList(coords, unitcell=UNITCELL).searchCenters(5.,
+                                                                     CENTERS)
+        result = celllist.searchCenters(5., CENTERS)
+        assert_array_equal(result[0], expected[0])
+        assert_array_equal(result[1], expected[1])
+
+    def testPick(self):
+
+        self.assertIsInstance(pickNeighborSearch(COORDS), KDTree)
+        self.assertIsInstance(pickNeighborSearch(COORDS, UNITCELL), KDTree)
+        self.assertIsInstance(pickNeighborSearch(COORDS, TRICLINIC),
+                              CellList)
+        large = np.random.uniform(0, 60, (25000, 3))
+        self.assertIsInstance(pickNeighborSearch(large), KDTree)
+        self.assertIsInstance(pickNeighborSearch(large, [60., 60., 60.]),
+                              KDTree)
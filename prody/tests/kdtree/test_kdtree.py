@@ -40,6 +40,32 @@ class TestKDTree(unittest.TestCase):
                             rtol=RTOL, atol=ATOL,
                             err_msg='KDTree all search failed')
 
+    def testSearchCenters(self):
+
+        kdtree = self.kdtree
+        centers = self.coords[::3] + 0.25
+        offsets, indices, radii = kdtree.searchCenters(2.5, centers)
+        self.assertEqual(len(offsets), len(centers) + 1)
+        for i, center in enumerate(centers):
+            kdtree.search(2.5, center)
+            expected = kdtree.getIndices()
+            expected.sort()
+            found = indices[offsets[i]:offsets[i+1]]
+            self.assertEqual(list(found), list(expected))
+            dist = ((self.coords[found] - center)**2).sum(1)**0.5
+            assert_allclose(radii[offsets[i]:offsets[i+1]], dist,
+                            rtol=RTOL, atol=ATOL,
+                            err_msg='KDTree batched search failed')
+
+    def testSearchCentersThreads(self):
+
+        kdtree = self.kdtree
+        centers = self.coords + 0.5
+        serial = kdtree.searchCenters(1.75, centers)
+        threaded = kdtree.searchCenters(1.75, centers, n_cpu=3)
+        for a, b in zip(serial, threaded):
+            self.assertEqual(list(a), list(b))
+
 
 COORDS = array([[-1., -1., 0.],
                 [-1.,  5., 0.],
@@ -73,3 +99,11 @@ class TestKDTreePBC(unittest.TestCase):
         KDTREE_PBC.search(2)
         self.assertEqual(8, KDTREE_PBC.getCount())
 
+    def testCentersPBC(self):
+
+        offsets, indices, radii = KDTREE_PBC.searchCenters(2,
+                                      array([[2., 2., 0.], [-1., -1., 0.]]))
+        self.assertEqual(list(offsets), [0, 5, 9])
+        self.assertEqual(list(indices[:5]), [0, 1, 2, 3, 4])
+        self.assertEqual(list(indices[5:]), [0, 1, 2, 3])
+
@@ -1,13 +1,16 @@
 """This module contains unit tests for :mod:`prody.measure.transform` module.
 """
 
+import numpy as np
 from numpy import zeros, ones, eye, all
-from numpy.testing import assert_equal
+from numpy.testing import assert_equal, assert_allclose
 
 from prody.tests import unittest
 from prody.tests.datafiles import parseDatafile
 
-from prody.measure import moveAtoms, wrapAtoms
+from prody.measure import moveAtoms, wrapAtoms, alignCoordsets
+from prody.measure import calcRMSD, getTransformation, getTransformations
+from prody.measure import calcPairwiseRMSDs, iterPairwiseRMSDs
 
 UBI = parseDatafile('1ubi')
 
@@ -52,3 +55,120 @@ class TestWrapAtoms(unittest.TestCase):
         diff = xyz - UBI.getCoords()
         self.assertTrue(all(diff == unitcell))
 
+
+class TestGetTransformations(unittest.TestCase):
+
+    def setUp(self):
+
+        ATOMS = parseDatafile('multi_model_truncated', subset='ca')
+        self.tar = ATOMS.getCoords()
+        self.mobs = ATOMS.getCoordsets()[1:]
+        self.weights = np.random.RandomState(0).rand(len(self.tar), 1)
+
+    def assertTransformations(self, weights, method):
+
+        rotations, translations = getTransformations(self.mobs, self.tar,
+                                                     weights, method=method)
+        for i, mob in enumerate(self.mobs):
+            if weights is None or weights.ndim == 2:
+                w = weights
+            else:
+                w = weights[i]
+            rotation, translation = getTransformation(mob, self.tar, w)
+            assert_allclose(rotations[i], rotation, rtol=0, atol=1e-10)
+            assert_allclose(translations[i], translation, rtol=0, atol=1e-10)
+
+    def testSVD(self):
+
+        self.assertTransformations(None, 'svd')
+        self.assertTransformations(self.weights, 'svd')
+
+    def testQCP(self):
+
+        self.assertTransformations(None, 'qcp')
+        self.assertTransformations(self.weights, 'qcp')
+
+    def testPerConformationWeights(self):
+
+        weights = np.random.RandomState(1).rand(len(self.mobs),
+                                                len(self.tar), 1)
+        self.assertTransformations(weights, 'svd')
+        self.assertTransformations(weights, 'qcp')
+
+    def testAlignCoordsets(self):
+
+        atoms = parseDatafile('multi_model_truncated')
+        atoms.setACSIndex(1)
+        calphas = atoms.ca
+        expected = []
+        for i in range(atoms.numCoordsets()):
+            calphas.setACSIndex(i)
+            expected.append(calcRMSD(calphas, calphas.getCoordsets(1)))
+        calphas.setACSIndex(1)
+        alignCoordsets(calphas, method='qcp')
+        self.assertEqual(calphas.getACSIndex(), 1)
+        rmsds = calcRMSD(calphas.getCoordsets(1), calphas.getCoordsets())
+        self.assertTrue(all(rmsds <= np.array(expected) + 1e-6))
+        assert_allclose(rmsds[1], 0)
+
+
+class TestPairwiseRMSDs(unittest.TestCase):
+
+    def setUp(self):
+
+        self.coordsets = parseDatafile('multi_model_truncated',
+                                       subset='ca').getCoordsets()
+        self.weights = np.random.RandomState(0).rand(len(self.coordsets),
+                                                     self.coordsets.shape[1],
+                                                     1)
+
+    def testPerConformationWeights(self):
+
+        rmsds = calcPairwiseRMSDs(self.coordsets, self.weights)
+        for i, xyz in enumerate(self.coordsets):
+            for j, other in enumerate(self.coordsets):
+                weights = self.weights[i] * self.weights[j]
+                expected = 0 if i == j else calcRMSD(xyz, other, weights)
+                assert_allclose(rmsds[i, j], expected, rtol=0, atol=1e-10)
+
+    def testCondensed(self):
+
+        from scipy.spatial.distance import squareform
+        rmsds = calcPairwiseRMSDs(self.coordsets, superpose=True)
+        condensed = calcPairwiseRMSDs(self.coordsets, superpose=True,
+                                      condensed=True, blocksize=1)
+        assert_allclose(squareform(condensed), rmsds, rtol=0, atol=1e-12)
+
+    def testIterator(self):
+
+        rmsds = calcPairwiseRMSDs(self.coordsets)
+        for start, stop, block in iterPairwiseRMSDs(self.coordsets,
+                                                    blocksize=2, n_cpu=2):
+            assert_allclose(block, rmsds[start:stop, start:], rtol=0,
+                            atol=1e-12)
+
+    def testMemoryMapChunks(self):
+
+        import os
+        import tempfile
+        from prody.measure import transform
+
+        handle, filename = tempfile.mkstemp(suffix='.npy')
+        os.close(handle)
+        np.save(filename, self.coordsets)
+        chunk = transform.PAIRWISE_CHUNK
+        try:
+            mapped = np.load(filename, mmap_mode='r')
+            for kwargs in [{}, {'superpose': True},
+                           {'weights': self.weights}]:
+                rmsds = calcPairwiseRMSDs(self.coordsets, **kwargs)
+                # read coordinate sets of the mapped array two at a time
+                transform.PAIRWISE_CHUNK = 2 * self.coordsets.shape[1] * 3
+                assert_allclose(calcPairwiseRMSDs(mapped, blocksize=3,
+                                                  **kwargs),
+                                rmsds, rtol=0, atol=1e-10)
+                transform.PAIRWISE_CHUNK = chunk
+            del mapped
+        finally:
+            transform.PAIRWISE_CHUNK = chunk
+            os.remove(filename)
@@ -0,0 +1,124 @@
+"""This module contains unit tests for :mod:`~prody.proteins.ciffile`."""
+
+from numpy.testing import *
+
+from prody import *
+from prody import LOGGER
+from prody.proteins.ciffile import CIFParseError, _parseCIFLoop
+from prody.proteins.ciffile import _splitCIFLines
+from prody.utilities import createStringIO
+from prody.tests import unittest
+
+LOGGER.verbosity = 'none'
+
+CIF = """data_TEST
+#
+_entry.id TEST
+#
+loop_
+_struct_keywords.entry_id
+_struct_keywords.text
+TEST
+;DNA,
+multi-line keywords
+;
+#
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.type_symbol
+_atom_site.label_alt_id
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+_atom_site.occupancy
+_atom_site.B_iso_or_equiv
+_atom_site.pdbx_PDB_ins_code
+_atom_site.auth_seq_id
+_atom_site.auth_comp_id
+_atom_site.auth_asym_id
+_atom_site.auth_atom_id
+_atom_site.pdbx_PDB_model_num
+ATOM   1 N . 1.000 2.000 3.000 1.00 10.00 ? 1 ALA A N     1
+ATOM   2 C A 2.000 3.000 4.000 0.50 11.00 ? 1 ALA A CA    1
+ATOM   3 C B 2.100 3.100 4.100 0.50 11.00 ? 1 ALA A CA    1
+ATOM   4 P . 5.000 6.000 7.000 1.00 12.00 B 2 DA  B "O5'" 1
+HETATM 5 O . 8.000 9.000 1.000 1.00 13.00 ? 3 HOH B 'O'   1
+ATOM   1 N . 1.500 2.000 3.000 1.00 10.00 ? 1 ALA A N     2
+ATOM   2 C A 2.500 3.000 4.000 0.50 11.00 ? 1 ALA A CA    2
+ATOM   3 C B 2.600 3.100 4.100 0.50 11.00 ? 1 ALA A CA    2
+ATOM   4 P . 5.500 6.000 7.000 1.00 12.00 B 2 DA  B "O5'" 2
+HETATM 5 O . 8.500 9.000 1.000 1.00 13.00 ? 3 HOH B 'O'   2
+#
+"""
+
+
+def parseCIFText(text, **kwargs):
+
+    stream = createStringIO()
+    stream.write(text)
+    stream.seek(0)
+    return parseCIFStream(stream, **kwargs)
+
+
+class TestParseCIFStream(unittest.TestCase):
+
+    def testUsualCase(self):
+
+        ag = parseCIFText(CIF)
+        self.assertEqual(ag.numAtoms(), 4)
+        self.assertEqual(ag.numCoordsets(), 2)
+        assert_equal(ag.getNames(), ['N', 'CA', "O5'", 'O'])
+        assert_equal(ag.getAltlocs(), ['.', 'A', '.', '.'])
+        assert_equal(ag.getIcodes(), ['', '', 'B', ''])
+        assert_equal(ag.getFlags('hetatm'), [False, False, False, True])
+        assert_equal(ag.getCoordsets(1)[:, 0], [1.5, 2.5, 5.5, 8.5])
+
+    def testModelArgument(self):
+
+        ag = parseCIFText(CIF, model=2)
+        self.assertEqual(ag.numCoordsets(), 1)
+        assert_equal(ag.getCoords()[:, 0], [1.5, 2.5, 5.5, 8.5])
+        self.assertRaises(CIFParseError, parseCIFText, CIF, model=3)
+
+    def testFilters(self):
+
+        ag = parseCIFText(CIF, chain='A', altloc='B')
+        assert_equal(ag.getAltlocs(), ['.', 'B'])
+        assert_equal(ag.getCoords()[1], [2.1, 3.1, 4.1])
+        ag = parseCIFText(CIF, subset='ca')
+        assert_equal(ag.getSerials(), [2])
+
+
+class TestParseCIFLoop(unittest.TestCase):
+
+    def testTextField(self):
+
+        loop = _parseCIFLoop(CIF.splitlines(True), '_struct_keywords')
+        assert_equal(loop['text'], ['DNA,\nmulti-line keywords'])
+
+    def testPairs(self):
+
+        loop = _parseCIFLoop(CIF.splitlines(True), '_entry')
+        assert_equal(loop['id'], ['TEST'])
+        self.assertIsNone(_parseCIFLoop(CIF.splitlines(True), '_cell'))
+
+    def testSplitLines(self):
+
+        # only lines with quotes are tokenized using regular expression
+        lines = ['a b\n', "c 'd e'\n", 'f\n', ';g\n', 'h\n', '; i\n', 'j\n']
+        assert_equal(_splitCIFLines(lines),
+                     ['a', 'b', 'c', 'd e', 'f', 'g\nh', 'i', 'j'])
+
+    def testParseCIFCategory(self):
+
+        stream = createStringIO()
+        stream.write(CIF)
+        stream.seek(0)
+        loop = parseCIFCategory(stream, 'atom_site',
+                                fields=['auth_atom_id', 'label_alt_id'])
+        self.assertEqual(set(loop), set(['auth_atom_id', 'label_alt_id']))
+        assert_equal(loop['auth_atom_id'][3:5], ["O5'", 'O'])
+        assert_equal(loop['label_alt_id'][:3], ['.', 'A', 'B'])
+        stream.seek(0)
+        self.assertIsNone(parseCIFCategory(stream, '_cell'))
@@ -1,5 +1,6 @@
 """This module contains unit tests for :mod:`~prody.proteins`."""
 
+import numpy as np
 from numpy.testing import *
 
 from prody import *
@@ -40,7 +41,42 @@ class TestParsePDBHeaderOnly(unittest.TestCase):
         self.header = None
 
 
+class TestBuildBiomolecules(unittest.TestCase):
 
+    def setUp(self):
+
+        self.atoms = parsePDB(pathDatafile('pdb2k39_truncated.pdb'))
+        self.header = {'biomoltrans': {'1': [
+            ['A'], '  1.000000  0.000000  0.000000        0.00000',
+            '  0.000000  1.000000  0.000000        0.00000',
+            '  0.000000  0.000000  1.000000        0.00000',
+            ['A'], ' -1.000000  0.000000  0.000000       10.00000',
+            '  0.000000 -1.000000  0.000000        0.00000',
+            '  0.000000  0.000000  1.000000       -5.00000']}}
+
+    def testTransformations(self):
+
+        coords = self.atoms.getCoordsets()
+        biomol = buildBiomolecules(self.header, self.atoms)
+        n_atoms = self.atoms.numAtoms()
+        self.assertEqual(biomol.numAtoms(), 2 * n_atoms)
+        self.assertEqual(biomol.numCoordsets(), self.atoms.numCoordsets())
+        assert_equal(biomol.getCoordsets()[:, :n_atoms], coords)
+        assert_allclose(biomol.getCoordsets()[:, n_atoms:],
+                        coords * [-1, -1, 1] + [10, 0, -5])
+        assert_equal(biomol.getSegnames(), ['A'] * n_atoms + ['B'] * n_atoms)
+        assert_equal(biomol.getNames()[n_atoms:], self.atoms.getNames())
+
+    def testLazy(self):
+
+        biomol = buildBiomolecules(self.header, self.atoms)
+        parts = list(buildBiomolecules(self.header, self.atoms, lazy=True))
+        self.assertEqual(len(parts), 2)
+        n_atoms = self.atoms.numAtoms()
+        for indices, coordsets in parts:
+            assert_equal(indices, np.arange(n_atoms))
+        assert_allclose(np.concatenate([coordsets for _, coordsets in parts],
+                                       1), biomol.getCoordsets())
 
 
 if __name__ == '__main__':
@@ -77,3 +77,90 @@ class TestFetchPDB(unittest.TestCase):
                 os.remove(fn)
             except:
                 pass
+
+
+class TestPDBIndex(unittest.TestCase):
+
+    def setUp(self):
+
+        from tempfile import mkdtemp
+        from prody import SETTINGS
+        self.settings = dict((key, SETTINGS.get(key)) for key in
+                             ('pdb_index', 'pdb_index_path',
+                              'pdb_mirror_path', 'pdb_mirror_format'))
+        self.path = mkdtemp()
+        SETTINGS['pdb_index'] = True
+        SETTINGS['pdb_index_path'] = os.path.join(self.path, 'index.sqlite')
+        self.folder = os.path.join(self.path, 'folder')
+        self.mirror = os.path.join(self.path, 'mirror')
+        os.mkdir(self.folder)
+        for fn in ('1abc.pdb', '1abc.pdb.gz', 'pdb2abc.ent.gz', 'notes.txt'):
+            open(os.path.join(self.folder, fn), 'w').close()
+        divided = os.path.join(self.mirror, 'data', 'structures', 'divided',
+                               'pdb')
+        for pdb in ('1abc', '2abc', '3xyz'):
+            folder = os.path.join(divided, pdb[1:3])
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            open(os.path.join(folder, 'pdb' + pdb + '.ent.gz'), 'w').close()
+        SETTINGS['pdb_mirror_path'] = self.mirror
+        SETTINGS['pdb_mirror_format'] = None
+
+    def tearDown(self):
+
+        from shutil import rmtree
+        from prody import SETTINGS
+        clearPDBIndex()
+        rmtree(self.path)
+        SETTINGS.update(self.settings)
+
+    def testFindPDBFiles(self):
+
+        from prody import SETTINGS
+        indexed = findPDBFiles(self.folder)
+        self.assertEqual(set(indexed), set(['1abc', '2abc']))
+        self.assertTrue(os.path.isfile(pathPDBIndex()))
+        SETTINGS['pdb_index'] = False
+        self.assertEqual(findPDBFiles(self.folder), indexed)
+        SETTINGS['pdb_index'] = True
+
+        fn = os.path.join(self.folder, '3abc.pdb')
+        open(fn, 'w').close()
+        os.utime(self.folder, None)
+        self.assertEqual(findPDBFiles(self.folder)['3abc'], fn)
+        os.remove(fn)
+        self.assertNotIn('3abc', findPDBFiles(self.folder))
+
+    def testMirror(self):
+
+        fns = fetchPDBfromMirror('1abc', '3xyz', '1xyz', '2abc')
+        self.assertEqual([fn is not None for fn in fns],
+                         [True, True, False, True])
+        self.assertEqual(len(list(iterPDBFilenames())), 3)
+        fns = fetchPDB(['3xyz', '1abc'], folder=self.folder)
+        self.assertEqual(fns, [os.path.join(self.folder, pdb + '.pdb.gz')
+                               for pdb in ('3xyz', '1abc')])
+        self.assertTrue(os.path.isfile(fns[0]))
+
+    def testOwnDownloads(self):
+
+        import time
+        from prody.proteins import pdbindex
+        past = time.time() - 10
+        os.utime(self.folder, (past, past))
+        self.assertNotIn('3xyz', findPDBFiles(self.folder))
+        fn = fetchPDB('3xyz', folder=self.folder, copy=True)
+        self.assertEqual(fn, os.path.join(self.folder, '3xyz.pdb.gz'))
+
+        # copied file is recorded, so folder is not listed again
+        listdir = pdbindex._listdir
+        listed = []
+        def _listdir(path):
+            listed.append(path)
+            return listdir(path)
+        pdbindex._listdir = _listdir
+        try:
+            self.assertEqual(findPDBFiles(self.folder)['3xyz'], fn)
+        finally:
+            pdbindex._listdir = listdir
+        self.assertEqual(listed, [])
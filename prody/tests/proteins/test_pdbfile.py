@@ -11,7 +11,8 @@ except ImportError:
 
 from prody import *
 from prody import LOGGER
-from prody.utilities import which
+from prody.proteins import pdbfile
+from prody.utilities import which, createStringIO
 from prody.tests import TEMPDIR, unittest
 from prody.tests.datafiles import *
 
@@ -251,3 +252,192 @@ class TestParsePDBAltloc(unittest.TestCase):
 
         self.assertEqual(len(parsePDB(self.pdbfile, altloc='C')), 496,
             'failed to parse alternate locations C correctly')
+
+
+class TestParsePDBRecords(unittest.TestCase):
+
+    def parseLines(self, path, **kwargs):
+        """Parse *path* reading coordinate lines one by one."""
+
+        records = pdbfile._parsePDBRecords
+        pdbfile._parsePDBRecords = lambda *args: None
+        try:
+            return parsePDB(path, **kwargs)
+        finally:
+            pdbfile._parsePDBRecords = records
+
+    def assertSameAtoms(self, path, **kwargs):
+
+        atoms = parsePDB(path, **kwargs)
+        lines = self.parseLines(path, **kwargs)
+        assert_equal(atoms.getCoordsets(), lines.getCoordsets())
+        for getter in ('getNames', 'getResnames', 'getResnums', 'getChids',
+                       'getAltlocs', 'getIcodes', 'getSerials', 'getBetas',
+                       'getOccupancies', 'getSegnames', 'getElements',
+                       'getMasses', 'getAnisous'):
+            assert_equal(getattr(atoms, getter)(), getattr(lines, getter)(),
+                         getter + ' returned different values')
+        for label in ('hetatm', 'pdbter'):
+            assert_equal(atoms.getFlags(label), lines.getFlags(label))
+        self.assertEqual(atoms.numBonds(), lines.numBonds())
+
+    def testMultiModel(self):
+
+        path = pathDatafile('pdb2k39_truncated.pdb')
+        self.assertSameAtoms(path)
+        self.assertSameAtoms(path, model=2)
+        self.assertSameAtoms(path, subset='ca')
+
+    def testAltlocs(self):
+
+        path = pathDatafile('pdb1ejg.pdb')
+        for altloc in ('A', 'B', 'C'):
+            self.assertSameAtoms(path, altloc=altloc)
+
+    def testHetatmChain(self):
+
+        path = pathDatafile('pdb3mht.pdb')
+        self.assertSameAtoms(path)
+        self.assertSameAtoms(path, chain='A', subset='bb')
+        self.assertSameAtoms(path, get_bonds=True)
+
+
+class TestFormatCoords(unittest.TestCase):
+
+    def testRounding(self):
+
+        coords = np.array([[0.0005, -0.0005, 0.0015], [-0.0, 1e-7, -1e-7],
+                           [123.4565, -999.9994, 9999.9994],
+                           [np.nan, np.inf, -np.inf]])
+        coords = np.concatenate([coords, np.random.uniform(-999, 9999,
+                                                           (100, 3))])
+        expected = ''.join(['%8.3f%8.3f%8.3f' % tuple(xyz) for xyz in coords])
+        result = pdbfile._formatCoords(coords).tobytes().decode()
+        self.assertEqual(result, expected)
+
+    def testOverflow(self):
+
+        self.assertIsNone(pdbfile._formatCoords(np.array([[9999.9996, 0, 0]])))
+        self.assertIsNone(pdbfile._formatCoords(np.array([[0, -999.9996, 0]])))
+
+    def testWriteOverflow(self):
+
+        atoms = parsePDB(pathDatafile('pdb2k39_truncated.pdb'), model=1)
+        coords = atoms.getCoords()
+        coords[0] = [12345.6784, -1000., 0.]
+        atoms.setCoords(coords)
+        stream = createStringIO()
+        writePDBStream(stream, atoms)
+        lines = [line for line in stream.getvalue().splitlines()
+                 if line.startswith('ATOM')]
+        self.assertEqual(lines[0][30:56], '12345.678-1000.000   0.000')
+        self.assertEqual(lines[1][30:54], '%8.3f%8.3f%8.3f' % tuple(coords[1]))
+
+
+class TestStructureCache(unittest.TestCase):
+
+    def setUp(self):
+
+        from tempfile import mkdtemp
+        from prody import SETTINGS
+        self.settings = dict((key, SETTINGS.get(key)) for key in
+                             ('structure_cache', 'structure_cache_path'))
+        SETTINGS['structure_cache'] = True
+        SETTINGS['structure_cache_path'] = mkdtemp()
+        self.path = pathDatafile('pdb3mht.pdb')
+
+    def tearDown(self):
+
+        from shutil import rmtree
+        from prody import SETTINGS
+        rmtree(SETTINGS['structure_cache_path'])
+        SETTINGS.update(self.settings)
+
+    def testParsePDB(self):
+
+        parsed, header = parsePDB(self.path, header=True, bonds=True)
+        cached, cached_header = parsePDB(self.path, header=True, bonds=True)
+        self.assertEqual(len(os.listdir(pathStructureCache())), 1)
+        self.assertEqual(cached.getTitle(), parsed.getTitle())
+        assert_equal(cached.getCoordsets(), parsed.getCoordsets())
+        for label in ('name', 'resnum', 'chain', 'serial', 'beta'):
+            assert_equal(cached.getData(label), parsed.getData(label))
+        assert_equal(cached.getFlags('hetatm'), parsed.getFlags('hetatm'))
+        self.assertEqual(cached.numBonds(), parsed.numBonds())
+        assert_equal(list(cached._iterBonds()), list(parsed._iterBonds()))
+        self.assertEqual(set(cached_header), set(header))
+
+        cached.setCoords(cached.getCoords() + 1)
+        assert_equal(parsePDB(self.path).getCoords(), parsed.getCoords())
+
+    def testArguments(self):
+
+        parsePDB(self.path)
+        parsePDB(self.path, subset='ca')
+        parsePDB(self.path, subset='ca')
+        self.assertEqual(len(os.listdir(pathStructureCache())), 2)
+        clearStructureCache()
+        self.assertEqual(len(os.listdir(pathStructureCache())), 0)
+
+
+class TestParsePDBBatch(unittest.TestCase):
+
+    def setUp(self):
+
+        self.paths = [pathDatafile('pdb3mht.pdb'),
+                      pathDatafile('pdb2k39_truncated.pdb'),
+                      pathDatafile('pdb1ubi.pdb')]
+        self.bad = os.path.join(TEMPDIR, 'empty.pdb')
+        open(self.bad, 'w').close()
+
+    def tearDown(self):
+
+        os.remove(self.bad)
+
+    def testOrder(self):
+
+        expected = [parsePDB(path) for path in self.paths]
+        for n_cpu in (1, 2):
+            result = parsePDB(self.paths + [self.bad] + self.paths[:1],
+                              n_cpu=n_cpu)
+            self.assertEqual(len(result), 5)
+            self.assertIsNone(result[3])
+            for ag, parsed in zip(result[:3] + result[4:], expected):
+                self.assertEqual(ag.getTitle(), parsed.getTitle())
+                assert_equal(ag.getCoordsets(), parsed.getCoordsets())
+                assert_equal(ag.getNames(), parsed.getNames())
+
+    def testIterPDBs(self):
+
+        result = list(iterPDBs(self.paths, n_cpu=2, subset='ca',
+                               header=True))
+        for (ag, header), path in zip(result, self.paths):
+            parsed = parsePDB(path, subset='ca')
+            assert_equal(ag.getCoordsets(), parsed.getCoordsets())
+            self.assertIsInstance(header, dict)
+        self.assertRaises(ValueError, iterPDBs, self.paths, n_cpu=0)
+
+    def testWindow(self):
+
+        window = pdbfile.BATCH_WINDOW
+        pdbfile.BATCH_WINDOW = 1
+        try:
+            paths = (self.paths + [self.bad]) * 2
+            result = list(iterPDBs(paths, n_cpu=2))
+        finally:
+            pdbfile.BATCH_WINDOW = window
+        self.assertEqual(len(result), len(paths))
+        for ag, path in zip(result, paths):
+            if path == self.bad:
+                self.assertIsNone(ag)
+            else:
+                self.assertEqual(ag.numAtoms(), parsePDB(path).numAtoms())
+
+    def testAllFail(self):
+
+        for n_cpu in (1, 2):
+            self.assertEqual(parsePDB([self.bad] * 3, n_cpu=n_cpu),
+                             [None] * 3)
+            self.assertEqual(parsePDB([self.bad] * 3, header=True,
+                                      n_cpu=n_cpu),
+                             [(None,) * 3, (None,) * 3])
@@ -3,13 +3,33 @@
 from os.path import join
 from prody.tests import TestCase
 
+from numpy import array, arange, concatenate
 from numpy.testing import assert_equal, assert_allclose
 
-from prody import DCDFile, writeDCD, parseDCD
+from prody import DCDFile, Trajectory, writeDCD, parseDCD, mapTrajectory
 
 from prody.tests import TEMPDIR
+from prody.tests.datafiles import pathDatafile
 from prody.tests.ensemble import ALLATOMS, ENSEMBLE, RTOL, ATOL, DCD
 
+DCD_FILE = pathDatafile('dcd')
+
+
+def sumChunk(coords, unitcells, indices):
+
+    return coords.sum(0)
+
+
+def listChunk(coords, unitcells, indices):
+
+    return [(indices, coords, unitcells)]
+
+
+def addResults(result, other):
+
+    return result + other
+
+
 class TestDCDFile(TestCase):
 
     def setUp(self):
@@ -46,3 +66,212 @@ class TestDCDFile(TestCase):
         assert_allclose(coordsets[:n_csets], ENSEMBLE._getCoordsets(),
                         rtol=RTOL, atol=ATOL,
                         err_msg='failed to parse DCD file correctly')
+
+
+class TestDCDFileMmap(TestCase):
+
+    def setUp(self):
+
+        self.dcd = join(TEMPDIR, 'temp_mmap.dcd')
+        dcd = DCDFile(self.dcd, 'w')
+        self.unitcells = []
+        for i, xyz in enumerate(ALLATOMS.getCoordsets()):
+            unitcell = array([50. + i, 60., 70., 90., 90. - i, 90.])
+            self.unitcells.append(unitcell.copy())
+            dcd.write(xyz, unitcell)
+        dcd.close()
+        self.unitcells = array(self.unitcells)
+
+    def testGetCoordsets(self):
+
+        dcd = DCDFile(self.dcd)
+        mapped = DCDFile(self.dcd, mmap=True)
+        for indices in (None, 1, slice(1, None, 2), [2, 0, 2]):
+            assert_equal(mapped.getCoordsets(indices),
+                         dcd.getCoordsets(indices))
+        self.assertEqual(mapped.nextIndex(), 0)
+
+    def testSelection(self):
+
+        dcd = DCDFile(self.dcd)
+        mapped = DCDFile(self.dcd, mmap=True)
+        dcd.setAtoms(ALLATOMS.ca)
+        mapped.setAtoms(ALLATOMS.ca)
+        for indices in (None, slice(None, None, 2), [0, 2]):
+            assert_equal(mapped.getCoordsets(indices),
+                         dcd.getCoordsets(indices))
+
+    def testView(self):
+
+        mapped = DCDFile(self.dcd, mmap=True)
+        coordsets = mapped._getCoordsets(slice(1, None))
+        self.assertFalse(coordsets.flags.owndata)
+        self.assertFalse(coordsets.flags.writeable)
+        assert_equal(coordsets, DCDFile(self.dcd).getCoordsets()[1:])
+
+    def testIteration(self):
+
+        dcd = DCDFile(self.dcd)
+        mapped = DCDFile(self.dcd, mmap=True)
+        mapped.skip(1)
+        dcd.skip(1)
+        for frame, expected in zip(mapped, dcd):
+            assert_equal(frame._getCoords(), expected._getCoords())
+            assert_equal(frame.getUnitcell(), expected.getUnitcell())
+
+    def testUnitcells(self):
+
+        dcd = DCDFile(self.dcd)
+        unitcells = dcd.getUnitcells()
+        assert_allclose(unitcells[:, :3], self.unitcells[:, :3])
+        assert_equal(DCDFile(self.dcd, mmap=True).getUnitcells([1]),
+                     unitcells[[1]])
+        frame = dcd.getFrame(2)
+        assert_equal(frame.getUnitcell(), unitcells[2])
+
+
+class TestIterChunks(TestCase):
+
+    def setUp(self):
+
+        self.dcd = join(TEMPDIR, 'temp_chunks.dcd')
+        dcd = DCDFile(self.dcd, 'w')
+        for i, xyz in enumerate(ALLATOMS.getCoordsets()):
+            dcd.write(xyz, array([50. + i, 60., 70., 90., 90., 90.]))
+        dcd.close()
+
+    def testChunks(self):
+
+        for mmap in (False, True):
+            dcd = DCDFile(self.dcd, mmap=mmap)
+            dcd.setAtoms(ALLATOMS.ca)
+            expected = dcd.getCoordsets()
+            unitcells = dcd.getUnitcells()
+            dcd.skip(1)
+            chunks = list(dcd.iterChunks(chunksize=1))
+            self.assertEqual(len(chunks), len(expected) - 1)
+            for i, (coords, unitcell, indices) in enumerate(chunks):
+                assert_equal(indices, [i + 1])
+                assert_equal(coords, expected[i + 1:i + 2])
+                assert_equal(unitcell, unitcells[i + 1:i + 2])
+            self.assertEqual(dcd.nextIndex(), len(expected))
+
+    def testTrajectory(self):
+
+        traj = Trajectory(self.dcd)
+        traj.addFile(DCD_FILE)
+        expected = traj.getCoordsets()
+        chunks = list(traj.iterChunks(chunksize=2))
+        assert_equal(concatenate([chunk[2] for chunk in chunks]),
+                     arange(len(traj)))
+        assert_equal(concatenate([chunk[0] for chunk in chunks]), expected)
+        self.assertEqual(traj.nextIndex(), len(traj))
+
+    def testSuperpose(self):
+
+        dcd = DCDFile(self.dcd, astype=float)
+        dcd.setAtoms(ALLATOMS.ca)
+        dcd.setCoords(ALLATOMS.getCoordsets(1))
+        expected = []
+        for frame in dcd:
+            frame.superpose()
+            expected.append(frame.getCoords())
+        dcd.reset()
+        coords = concatenate([chunk[0] for chunk in
+                              dcd.iterChunks(chunksize=2, superpose=True)])
+        assert_allclose(coords, expected, rtol=0, atol=1e-10)
+
+
+class TestPrefetch(TestCase):
+
+    def setUp(self):
+
+        self.dcd = join(TEMPDIR, 'temp_prefetch.dcd')
+        dcd = DCDFile(self.dcd, 'w')
+        for i in range(4):
+            for xyz in ALLATOMS.getCoordsets():
+                dcd.write(xyz + i, array([50. + i, 60., 70., 90., 90., 90.]))
+        dcd.close()
+
+    def testNavigation(self):
+
+        dcd = DCDFile(self.dcd)
+        expected = dcd.getCoordsets()
+        # one frame per block to test reading across blocks
+        prefetched = DCDFile(self.dcd, prefetch=2, prefetch_bytes=1)
+        assert_equal(prefetched.getCoordsets(), expected)
+        assert_equal(prefetched.getCoordsets([1, 7, 11]), expected[[1, 7, 11]])
+        assert_equal(next(prefetched)._getCoords(), expected[0])
+        prefetched.skip(5)
+        assert_equal(prefetched.nextCoordset(), expected[6])
+        prefetched.goto(2)
+        assert_equal(next(prefetched)._getCoords(), expected[2])
+        prefetched.goto(-1)
+        assert_equal(prefetched.nextCoordset(), expected[-1])
+        self.assertIsNone(prefetched.nextCoordset())
+        prefetched.reset()
+        coords = concatenate([chunk[0] for chunk in
+                              prefetched.iterChunks(chunksize=5)])
+        assert_equal(coords, expected)
+        prefetched.close()
+
+    def testTrajectory(self):
+
+        traj = Trajectory(self.dcd, prefetch=True)
+        traj.addFile(DCD_FILE)
+        expected = Trajectory(self.dcd)
+        expected.addFile(DCD_FILE)
+        assert_equal(traj.getCoordsets(), expected.getCoordsets())
+        for frame, other in zip(traj, expected):
+            assert_equal(frame._getCoords(), other._getCoords())
+            assert_equal(frame.getUnitcell(), other.getUnitcell())
+        traj.close()
+
+
+class TestMapTrajectory(TestCase):
+
+    def setUp(self):
+
+        self.dcd = join(TEMPDIR, 'temp_map.dcd')
+        dcd = DCDFile(self.dcd, 'w')
+        for i, xyz in enumerate(ALLATOMS.getCoordsets()):
+            dcd.write(xyz, array([50. + i, 60., 70., 90., 90., 90.]))
+        dcd.close()
+        self.traj = Trajectory(self.dcd)
+        self.traj.addFile(DCD_FILE)
+        self.traj.setAtoms(ALLATOMS.ca)
+
+    def testOrder(self):
+
+        chunks = list(self.traj.iterChunks(chunksize=2))
+        for n_cpu in (1, 2):
+            result = mapTrajectory(self.traj, listChunk, addResults,
+                                   chunksize=2, n_cpu=n_cpu)
+            self.assertEqual(len(result), len(chunks))
+            for (indices, coords, unitcells), chunk in zip(result, chunks):
+                assert_equal(indices, chunk[2])
+                assert_equal(coords, chunk[0])
+                assert_equal(unitcells, chunk[1])
+
+    def testReduce(self):
+
+        expected = self.traj.getCoordsets().sum(0)
+        serial = mapTrajectory(self.traj, sumChunk, addResults,
+                               chunksize=3, n_cpu=1)
+        parallel = mapTrajectory(self.traj, sumChunk, addResults,
+                                 chunksize=3, n_cpu=2)
+        assert_allclose(serial, expected, rtol=1e-6)
+        assert_equal(parallel, serial)
+        results = mapTrajectory(self.traj, sumChunk, chunksize=3, n_cpu=2)
+        assert_equal(sum(results[1:], results[0]), serial)
+
+    def testSuperpose(self):
+
+        dcd = DCDFile(self.dcd, astype=float)
+        dcd.setAtoms(ALLATOMS.ca)
+        dcd.setCoords(ALLATOMS.getCoordsets(1))
+        expected = concatenate([chunk[0] for chunk in
+                                dcd.iterChunks(superpose=True)])
+        result = mapTrajectory(dcd, sumChunk, addResults, chunksize=1,
+                               superpose=True, n_cpu=2)
+        assert_allclose(result, expected.sum(0), rtol=0, atol=1e-10)
@@ -0,0 +1,101 @@
+"""This module contains unit tests for :mod:`~prody.trajectory.trrfile`."""
+
+from os.path import join
+from struct import pack
+
+from numpy import array, concatenate, diag
+from numpy.testing import assert_equal, assert_allclose
+
+from prody import TRRFile, Trajectory
+from prody.tests import TestCase, TEMPDIR
+from prody.tests.datafiles import pathDatafile
+from prody.tests.ensemble import ALLATOMS
+
+
+def writeFrame(out, step, coords=None, velocs=None, box=None, dtype='>f4'):
+    """Write a TRR frame with given arrays in Å."""
+
+    n_atoms = ALLATOMS.numAtoms()
+    arrays = [(array(each, float) / 10).astype(dtype) if each is not None
+              else array([], dtype) for each in (box, coords, velocs)]
+    sizes = [each.nbytes for each in arrays]
+    out.write(pack('>iii', 1993, 13, 12) + b'GMX_trn_file')
+    out.write(pack('>13i', 0, 0, sizes[0], 0, 0, 0, 0, sizes[1], sizes[2], 0,
+                   n_atoms, step, 0))
+    out.write(array([step * 0.002, 0], dtype).tobytes())
+    for each in arrays:
+        out.write(each.tobytes())
+
+
+class TestTRRFile(TestCase):
+
+    def setUp(self):
+
+        self.trr = join(TEMPDIR, 'temp.trr')
+        self.coords = ALLATOMS.getCoordsets()
+        self.velocs = self.coords[::-1] / 100
+
+    def write(self, dtype='>f4'):
+
+        with open(self.trr, 'wb') as out:
+            for i, xyz in enumerate(self.coords):
+                writeFrame(out, i * 10, xyz, self.velocs[i],
+                           diag([50. + i, 60., 70.]), dtype=dtype)
+                # frames without coordinates are not indexed
+                writeFrame(out, i * 10 + 5, velocs=self.velocs[i],
+                           dtype=dtype)
+
+    def testRead(self):
+
+        self.write()
+        trr = TRRFile(self.trr)
+        self.assertEqual(trr.numFrames(), len(self.coords))
+        self.assertEqual(trr.getFrameFreq(), 10)
+        assert_allclose(trr.getTimestep(), 0.002, rtol=1e-5)
+        assert_allclose(trr.getCoordsets(), self.coords, rtol=1e-6)
+        frame = trr.getFrame(1)
+        assert_allclose(frame.getVelocities(), self.velocs[1], rtol=1e-6)
+        assert_allclose(frame.getUnitcell(), [51., 60., 70., 90., 90., 90.],
+                        rtol=1e-6)
+        self.assertRaises(ValueError, TRRFile, self.trr, 'w')
+
+    def testDouble(self):
+
+        self.write('>f8')
+        trr = TRRFile(self.trr)
+        coords = trr.getCoordsets()
+        self.assertEqual(coords.dtype, float)
+        assert_allclose(coords, self.coords, rtol=1e-12)
+
+    def testChunks(self):
+
+        self.write()
+        traj = Trajectory(self.trr)
+        traj.setAtoms(ALLATOMS.ca)
+        expected = traj.getCoordsets()
+        chunks = list(traj.iterChunks(chunksize=2))
+        assert_equal(concatenate([chunk[0] for chunk in chunks]), expected)
+        assert_allclose(concatenate([chunk[1] for chunk in chunks])[:, 0],
+                        [50., 51., 52.], rtol=1e-6)
+
+    def testDatafile(self):
+
+        # written using xdrfile library of GROMACS, with a frame that
+        # contains only velocities after the first one
+        trr = TRRFile(pathDatafile('trr'))
+        self.assertEqual(trr.numFrames(), len(self.coords))
+        self.assertEqual(trr.getFrameFreq(), 500)
+        assert_allclose(trr.getTimestep(), 0.002, rtol=1e-5)
+        assert_allclose(trr.getCoordsets(), self.coords, rtol=0, atol=1e-5)
+        frame = trr.getFrame(2)
+        assert_allclose(frame.getVelocities(),
+                        self.coords[2] - self.coords[0], rtol=0, atol=1e-5)
+        assert_allclose(frame.getUnitcell(), [70., 60., 70., 90., 90., 80.],
+                        rtol=1e-6)
+        self.assertIsNone(trr.getFrame(0).getVelocities())
+
+    def testInitFailure(self):
+
+        self.assertRaises(ValueError, TRRFile, pathDatafile('trr'), 'w')
+        # an instance that failed before opening its file is deleted quietly
+        TRRFile.__new__(TRRFile).__del__()
@@ -0,0 +1,146 @@
+"""This module contains unit tests for :mod:`~prody.trajectory.xtcfile`."""
+
+from os.path import join
+
+from numpy import array, concatenate
+from numpy.testing import assert_equal, assert_allclose
+
+from prody import XTCFile, DCDFile, Trajectory, mapTrajectory
+from prody.tests import TestCase, TEMPDIR
+from prody.tests.datafiles import pathDatafile
+from prody.tests.ensemble import ALLATOMS
+
+# half of 0.001 nm, the default precision, and float32 error
+XTC_ATOL = 0.00501
+
+
+def sumChunk(coords, unitcells, indices):
+
+    return coords.sum(0)
+
+
+def addResults(result, other):
+
+    return result + other
+
+
+class TestXTCFile(TestCase):
+
+    def setUp(self):
+
+        self.xtc = join(TEMPDIR, 'temp.xtc')
+        self.coords = ALLATOMS.getCoordsets()
+        xtc = XTCFile(self.xtc, 'w')
+        for i, xyz in enumerate(self.coords):
+            xtc.write(xyz, array([50. + i, 60., 70., 90., 90., 80.]),
+                      timestep=0.002, firsttimestep=100, framefreq=500)
+        xtc.close()
+
+    def testRead(self):
+
+        xtc = XTCFile(self.xtc)
+        self.assertEqual(xtc.numFrames(), len(self.coords))
+        self.assertEqual(xtc.numAtoms(), ALLATOMS.numAtoms())
+        self.assertEqual(xtc.getFirstTimestep(), 100)
+        self.assertEqual(xtc.getFrameFreq(), 500)
+        assert_allclose(xtc.getTimestep(), 0.002, rtol=1e-5)
+        assert_allclose(xtc.getCoords(), self.coords[0], rtol=0,
+                        atol=XTC_ATOL)
+        assert_allclose(xtc.getCoordsets(), self.coords, rtol=0,
+                        atol=XTC_ATOL)
+        xtc.close()
+
+    def testNavigation(self):
+
+        xtc = XTCFile(self.xtc, astype=float)
+        expected = xtc.getCoordsets()
+        self.assertEqual(expected.dtype, float)
+        frame = xtc.getFrame(2)
+        assert_equal(frame.getCoords(), expected[2])
+        assert_allclose(frame.getUnitcell(), [52., 60., 70., 90., 90., 80.],
+                        rtol=1e-6)
+        xtc.goto(1)
+        assert_equal(xtc.nextCoordset(), expected[1])
+        xtc.reset()
+        xtc.skip(2)
+        self.assertEqual(xtc.nextIndex(), 2)
+        assert_equal(next(xtc).getCoords(), expected[2])
+        self.assertIsNone(next(xtc))
+
+    def testChunks(self):
+
+        xtc = XTCFile(self.xtc)
+        xtc.setAtoms(ALLATOMS.ca)
+        expected = xtc.getCoordsets()
+        chunks = list(xtc.iterChunks(chunksize=2))
+        assert_equal(concatenate([chunk[2] for chunk in chunks]), [0, 1, 2])
+        assert_equal(concatenate([chunk[0] for chunk in chunks]), expected)
+        assert_allclose(chunks[1][1], [[52., 60., 70., 90., 90., 80.]],
+                        rtol=1e-6)
+
+    def testTrajectory(self):
+
+        traj = Trajectory(self.xtc)
+        traj.addFile(pathDatafile('dcd'))
+        self.assertEqual(traj.numFrames(), 2 * len(self.coords))
+        coords = traj.getCoordsets()
+        assert_allclose(coords[:3], self.coords, rtol=0, atol=XTC_ATOL)
+        assert_equal(coords[3:], DCDFile(pathDatafile('dcd')).getCoordsets())
+        result = mapTrajectory(traj, sumChunk, addResults, chunksize=2,
+                               n_cpu=2)
+        assert_allclose(result, coords.sum(0), rtol=1e-6)
+
+    def testAppend(self):
+
+        xtc = XTCFile(self.xtc, 'a')
+        xtc.write(self.coords[0])
+        xtc.close()
+        xtc = XTCFile(self.xtc)
+        self.assertEqual(xtc.numFrames(), len(self.coords) + 1)
+        self.assertEqual(xtc.getFrameFreq(), 500)
+        xtc.goto(-1)
+        frame = next(xtc)
+        assert_allclose(frame.getCoords(), self.coords[0], rtol=0,
+                        atol=XTC_ATOL)
+        self.assertIsNone(frame.getUnitcell())
+
+    def testPrecision(self):
+
+        xtc = XTCFile(self.xtc, 'w', precision=100000.)
+        xtc.write(self.coords)
+        xtc.close()
+        assert_allclose(XTCFile(self.xtc).getCoordsets(), self.coords,
+                        rtol=0, atol=1e-4)
+
+    def testFewAtoms(self):
+
+        # coordinates of up to 9 atoms are not compressed
+        xtc = XTCFile(self.xtc, 'w')
+        xtc.write(self.coords[:, :9])
+        xtc.close()
+        assert_allclose(XTCFile(self.xtc).getCoordsets(),
+                        self.coords[:, :9], rtol=1e-6)
+
+    def testTruncated(self):
+
+        with open(self.xtc, 'rb') as inp:
+            data = inp.read()
+        with open(self.xtc, 'wb') as out:
+            out.write(data[:-10])
+        xtc = XTCFile(self.xtc)
+        self.assertEqual(xtc.numFrames(), len(self.coords) - 1)
+        assert_allclose(xtc.getCoordsets(), self.coords[:-1], rtol=0,
+                        atol=XTC_ATOL)
+
+    def testDatafile(self):
+
+        # written using xdrfile library of GROMACS
+        xtc = XTCFile(pathDatafile('xtc'))
+        self.assertEqual(xtc.numFrames(), len(self.coords))
+        self.assertEqual(xtc.numAtoms(), ALLATOMS.numAtoms())
+        self.assertEqual(xtc.getFrameFreq(), 500)
+        assert_allclose(xtc.getTimestep(), 0.002, rtol=1e-5)
+        assert_allclose(xtc.getCoordsets(), self.coords, rtol=0,
+                        atol=XTC_ATOL)
+        assert_allclose(xtc.getFrame(1).getUnitcell(),
+                        [60., 60., 70., 90., 90., 80.], rtol=1e-6)
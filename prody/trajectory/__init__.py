@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
-"""This module defines classes for handling trajectory files in DCD format.
+"""This module defines classes for handling trajectory files in DCD format,
+and in XTC and TRR formats of GROMACS.
 
 
 Parse/write DCD files
@@ -9,6 +10,12 @@ Parse/write DCD files
   * :func:`.parseDCD`
   * :func:`.writeDCD`
 
+Parse/write GROMACS files
+===============================================================================
+
+  * :class:`.XTCFile`
+  * :class:`.TRRFile`
+
 Parse structure files
 ===============================================================================
 
@@ -24,6 +31,11 @@ Handle frame data
 
   * :class:`.Frame`
 
+Process frames in parallel
+===============================================================================
+
+  * :func:`.mapTrajectory`
+
 Examples
 ===============================================================================
 
@@ -58,6 +70,14 @@ from . import dcdfile
 from .dcdfile import *
 __all__.extend(dcdfile.__all__)
 
+from . import xtcfile
+from .xtcfile import *
+__all__.extend(xtcfile.__all__)
+
+from . import trrfile
+from .trrfile import *
+__all__.extend(trrfile.__all__)
+
 from . import frame
 from .frame import *
 __all__.extend(frame.__all__)
@@ -66,5 +86,9 @@ from . import psffile
 from .psffile import *
 __all__.extend(psffile.__all__)
 
-TRAJFILE = {'dcd': DCDFile}
+from . import mapreduce
+from .mapreduce import *
+__all__.extend(mapreduce.__all__)
+
+TRAJFILE = {'dcd': DCDFile, 'xtc': XTCFile, 'trr': TRRFile}
 
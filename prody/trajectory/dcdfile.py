@@ -5,6 +5,7 @@
 
 import os
 from time import time
+from numbers import Integral
 from struct import calcsize, unpack, pack
 from os.path import getsize
 import datetime
@@ -42,17 +43,77 @@ class DCDFile(TrajFile):
     the reference coordinate set.  This class has been tested for 32-bit DCD
     files.  32-bit floating-point coordinate array can be casted automatically
     to a specified type, such as 64-bit float, using *astype* keyword argument,
-    i.e. ``astype=float``, using :meth:`ndarray.astype` method."""
+    i.e. ``astype=float``, using :meth:`ndarray.astype` method.
+
+    When file is opened for reading with ``mmap=True`` argument, whole file
+    is memory-mapped.  Then, coordinate sets are gathered from the map
+    without seeking frame by frame, and :meth:`_getCoordsets` returns views
+    of the map when possible.
+
+    Alternatively, ``prefetch=True`` argument makes frames to be read ahead
+    in a background thread, so that reading overlaps with calculations.
+    Number of blocks of frames read ahead can be given instead of **True**
+    (default is :data:`.PREFETCH_DEPTH`), and *prefetch_bytes* argument
+    limits the total size of blocks in flight (default is
+    :data:`.PREFETCH_BYTES`).  Moving to a frame that is not read ahead,
+    e.g. using :meth:`goto`, restarts reading from that frame."""
 
     def __init__(self, filename, mode='rb', **kwargs):
 
         TrajFile.__init__(self, filename, mode)
         self._astype = kwargs.get('astype', None)
+        self._mmap = None
         if not self._mode.startswith('w'):
             self._parseHeader()
+            if kwargs.get('mmap', False):
+                if not self._mode.startswith('r'):
+                    raise ValueError('only files opened for reading can be '
+                                     'memory-mapped')
+                self._mmap = self._mapFile()
+            elif kwargs.get('prefetch', False):
+                if not self._mode.startswith('r'):
+                    raise ValueError('only files opened for reading can be '
+                                     'prefetched')
+                self._prefetch(kwargs['prefetch'],
+                               kwargs.get('prefetch_bytes'))
 
     __init__.__doc__ = TrajFile.__init__.__doc__
 
+    def _mapFile(self):
+        """Returns a read-only memory map of frames and two strided views,
+        coordinates with shape ``(n_frames, 3, n_atoms)`` and unit cell
+        records with shape ``(n_frames, 6)``, or **None** for the latter when
+        file does not contain unit cell data."""
+
+        n_csets = self._n_csets
+        if not n_csets:
+            raise ValueError('DCD file does not contain any frames')
+        endian = self._endian
+        if isinstance(endian, bytes):
+            endian = endian.decode()
+        dtype = np.dtype(self._dtype)
+        if endian:
+            dtype = dtype.newbyteorder(endian)
+        frames = np.memmap(self._filename, dtype=dtype, mode='r',
+                           offset=self._first_byte,
+                           shape=(n_csets,
+                                  self._bytes_per_frame // self._itemsize))
+        first = 56 // self._itemsize if self._unitcell else 0
+        n_atoms = self._n_atoms
+        xyz = frames[:, first:].reshape((n_csets, 3, n_atoms + 2))
+        xyz = xyz[:, :, 1:-1]
+        if self._unitcell:
+            # unit cell is a record of 6 doubles, 4 bytes after frame start
+            dtype = np.dtype(np.float64)
+            if endian:
+                dtype = dtype.newbyteorder(endian)
+            unitcells = np.ndarray((n_csets, 6), dtype, buffer=frames,
+                                   offset=4,
+                                   strides=(self._bytes_per_frame, 8))
+        else:
+            unitcells = None
+        return frames, xyz, unitcells
+
     def _parseHeader(self):
         """Read the header information from a dcd file.
         Input: fd - a file struct opened for binary reading.
@@ -270,12 +331,17 @@ class DCDFile(TrajFile):
 
         n_floats = self._n_floats
         n_atoms = self._n_atoms
-        xyz = fromstring(self._file.read(self._itemsize * n_floats),
-                            self._dtype)
-        if len(xyz) != n_floats:
-            return None
-        xyz = xyz.reshape((3, n_atoms+2)).T[1:-1,:]
-        xyz = xyz.reshape((n_atoms, 3))
+        if self._mmap is None:
+            xyz = fromstring(self._file.read(self._itemsize * n_floats),
+                                self._dtype)
+            if len(xyz) != n_floats:
+                return None
+            xyz = xyz.reshape((3, n_atoms+2)).T[1:-1,:]
+            xyz = xyz.reshape((n_atoms, 3))
+        else:
+            # file position is kept in sync for mixing with skip and goto
+            self._file.seek(self._itemsize * n_floats, 1)
+            xyz = np.array(self._mmap[1][self._nfi].T)
         if self._ag is not None:
             self._ag._setCoords(xyz, self._title + ' frame ' + str(self._nfi),
                                 overwrite=True)
@@ -290,17 +356,105 @@ class DCDFile(TrajFile):
     def _nextUnitcell(self):
 
         if self._unitcell:
-            self._file.read(4)
-            unitcell = fromstring(self._file.read(48), dtype=np.float64)
-            unitcell = unitcell[[0,2,5,1,3,4]]
-            if np.all(abs(unitcell[3:]) <= 1):
-                # This file was generated by CHARMM, or by NAMD > 2.5, with the angle */
-                # cosines of the periodic cell angles written to the DCD file.        */
-                # This formulation improves rounding behavior for orthogonal cells    */
-                # so that the angles end up at precisely 90 degrees, unlike acos().   */
-                unitcell[3:] = 90. - np.arcsin(unitcell[3:]) * 90 / PISQUARE
-            self._file.read(4)
-            return unitcell
+            if self._mmap is None:
+                self._file.read(4)
+                unitcell = fromstring(self._file.read(48), dtype=np.float64)
+                self._file.read(4)
+            else:
+                self._file.seek(56, 1)
+                unitcell = self._mmap[2][self._nfi]
+            return _convertUnitcells(unitcell)
+
+    def getUnitcells(self, indices=None):
+        """Returns unit cells of frames at given *indices*, which may be an
+        integer, a list of integers, a slice or **None**, as an array with
+        shape ``(n_frames, 6)``.  Unit cell records are read from a memory
+        map of the file.  **None** is returned if the file does not contain
+        unit cell data."""
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        if not self._unitcell:
+            return None
+        mmap = self._mmap or self._mapFile()
+        indices = _checkFrameIndices(indices)
+        return _convertUnitcells(mmap[2][indices])
+
+    def _iterChunks(self, chunksize):
+        """Yield chunks of frames as described in :meth:`.iterChunks`.  Each
+        chunk is read with a single call, or sliced from the memory map."""
+
+        # sizes are derived from the item size as in _mapFile, so that
+        # double precision files are handled as well
+        n_floats = self._bytes_per_frame // self._itemsize
+        first = 56 // self._itemsize if self._unitcell else 0
+        n_atoms = self._n_atoms
+        indices = self._indices
+        while self._nfi < self._n_csets:
+            start = self._nfi
+            n_csets = min(chunksize, self._n_csets - start)
+            if self._mmap is None:
+                data = fromstring(self._file.read(self._bytes_per_frame *
+                                                  n_csets), self._dtype)
+                if len(data) < n_floats * n_csets:
+                    LOGGER.warning('DCD is corrupt, {0} out of {1} frames '
+                                   'were parsed.'.format(
+                                       start + len(data) // n_floats,
+                                       self._n_csets))
+                    n_csets = len(data) // n_floats
+                    self._n_csets = start + n_csets
+                    if not n_csets:
+                        return
+                    data = data[:n_floats * n_csets]
+                data = data.reshape((n_csets, n_floats))
+                if self._unitcell:
+                    # unit cell is a record of 6 doubles, 4 bytes after
+                    # frame start
+                    unitcells = np.ndarray((n_csets, 6), np.float64,
+                                           buffer=data, offset=4,
+                                           strides=(self._bytes_per_frame,
+                                                    8)).copy()
+            else:
+                self._file.seek(self._bytes_per_frame * n_csets, 1)
+                data = self._mmap[0][start:start + n_csets]
+                if self._unitcell:
+                    unitcells = self._mmap[2][start:start + n_csets]
+            self._nfi = start + n_csets
+
+            if self._unitcell:
+                unitcells = _convertUnitcells(unitcells)
+                data = data[:, first:]
+            else:
+                unitcells = None
+            xyz = data.reshape((n_csets, 3, n_atoms + 2))[:, :, 1:-1]
+            if indices is not None:
+                xyz = xyz[:, :, indices]
+            xyz = xyz.transpose(0, 2, 1)
+            if self._astype is not None and self._astype != xyz.dtype:
+                xyz = xyz.astype(self._astype)
+            else:
+                xyz = np.array(xyz)
+            yield xyz, unitcells, np.arange(start, start + n_csets)
+
+    def _getCoordsets(self, indices=None):
+        """Returns coordinate sets of selected atoms at given *indices* from
+        the memory map, which must be enabled using ``mmap=True`` argument.
+        When all atoms are selected and *indices* is a slice, a read-only
+        view of the map is returned.  Otherwise coordinates are gathered
+        in a single indexing operation."""
+
+        if self._mmap is None:
+            raise ValueError('DCD file is not memory-mapped')
+        xyz = self._mmap[1]
+        indices = _checkFrameIndices(indices)
+        atoms = self._indices
+        if atoms is None:
+            xyz = xyz[indices]
+        elif isinstance(indices, slice):
+            xyz = xyz[indices][:, :, atoms]
+        else:
+            xyz = xyz[np.ix_(indices, np.arange(3), atoms)]
+        return xyz.transpose(0, 2, 1)
 
     def getCoordsets(self, indices=None):
         """Returns coordinate sets at given *indices*. *indices* may be an
@@ -309,6 +463,11 @@ class DCDFile(TrajFile):
 
         if self._closed:
             raise ValueError('I/O operation on closed file')
+        if self._mmap is not None:
+            xyz = self._getCoordsets(indices)
+            if self._astype is not None and self._astype != xyz.dtype:
+                return xyz.astype(self._astype)
+            return np.array(xyz)
         if (self._indices is None and
             (indices is None or indices == slice(None))):
             nfi = self._nfi
@@ -470,6 +629,44 @@ class DCDFile(TrajFile):
             self._file.flush()
             os.fsync(self._file.fileno())
 
+    def close(self):
+
+        self._mmap = None
+        TrajFile.close(self)
+
+    close.__doc__ = TrajBase.close.__doc__
+
+
+def _checkFrameIndices(indices):
+    """Returns frame *indices* in a form suitable for indexing memory-mapped
+    frames.  Lists and arrays are sorted and repeated values are removed, as
+    in :meth:`.TrajFile.getCoordsets`."""
+
+    if indices is None:
+        return slice(None)
+    elif isinstance(indices, Integral):
+        return [indices]
+    elif isinstance(indices, slice):
+        return indices
+    elif isinstance(indices, (list, np.ndarray)):
+        return np.unique(indices)
+    raise TypeError('indices must be an integer or a list of integers')
+
+
+def _convertUnitcells(unitcells):
+    """Returns unit cells with lengths followed by angles from raw DCD unit
+    cell records.  *unitcells* may be a single record or an array of them."""
+
+    unitcells = unitcells[..., [0,2,5,1,3,4]]
+    angles = unitcells[..., 3:]
+    # This file was generated by CHARMM, or by NAMD > 2.5, with the angle */
+    # cosines of the periodic cell angles written to the DCD file.        */
+    # This formulation improves rounding behavior for orthogonal cells    */
+    # so that the angles end up at precisely 90 degrees, unlike acos().   */
+    cosines = np.all(abs(angles) <= 1, axis=-1)
+    angles[cosines] = 90. - np.arcsin(angles[cosines]) * 90 / PISQUARE
+    return unitcells
+
 def parseDCD(filename, start=None, stop=None, step=None, astype=None):
     """Parse CHARMM format DCD files (also NAMD 2.1 and later).  Returns an
     :class:`Ensemble` instance. Conformations in the ensemble will be ordered
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""This module defines a function for calculating per-frame quantities from
+trajectory files in parallel processes."""
+
+from numbers import Integral
+
+from prody import LOGGER
+
+from .trajbase import TRAJ_CHUNK
+from .trajfile import TrajFile
+from .trajectory import Trajectory
+
+__all__ = ['mapTrajectory']
+
+_WORKER = {}
+
+
+def _getTasks(traj, chunksize):
+    """Returns a list of tasks for ranges of frames of files in *traj*.  Each
+    task is a tuple of filename, keyword arguments for opening the file,
+    index of the first frame of the file in *traj*, and indices of the first
+    and the last (excluded) frames of the range in the file."""
+
+    if isinstance(traj, Trajectory):
+        files = traj._trajectories
+    elif isinstance(traj, TrajFile):
+        files = [traj]
+    else:
+        raise TypeError('traj must be a trajectory file or a Trajectory '
+                        'instance')
+    tasks = []
+    offset = 0
+    for each in files:
+        options = {'astype': getattr(each, '_astype', None)}
+        n_frames = each.numFrames()
+        for start in range(0, n_frames, chunksize):
+            tasks.append((each._filename, options, offset, start,
+                          min(start + chunksize, n_frames)))
+        offset += n_frames
+    return tasks
+
+
+def _initWorker(func, indices, coords, weights, superpose):
+
+    _WORKER.clear()
+    _WORKER.update(func=func, indices=indices, coords=coords,
+                   weights=weights, superpose=superpose, files={})
+
+
+def _mapChunk(task):
+    """Returns result of applying mapped function to a range of frames of a
+    file.  Files are opened once in each worker process."""
+
+    filename, kwargs, offset, start, stop = task
+    files = _WORKER['files']
+    try:
+        traj = files[filename]
+    except KeyError:
+        from . import openTrajFile
+        traj = files[filename] = openTrajFile(filename, **kwargs)
+        traj._indices = _WORKER['indices']
+        if _WORKER['coords'] is not None:
+            traj._coords = _WORKER['coords']
+        traj._weights = _WORKER['weights']
+
+    traj.goto(start)
+    for coords, unitcells, indices in traj.iterChunks(
+            chunksize=stop - start, superpose=_WORKER['superpose']):
+        return _WORKER['func'](coords, unitcells, indices + offset)
+
+
+def mapTrajectory(traj, func, reducer=None, **kwargs):
+    """Returns results of applying *func* to chunks of frames of *traj*,
+    which may be a trajectory file, such as :class:`.DCDFile`, or a
+    :class:`.Trajectory` with multiple files.  Frames of each file are split
+    into ranges, and each range is read and processed in a worker process
+    that opens the file on its own.  *func* is called as ``func(coords,
+    unitcells, indices)`` with arguments as yielded by
+    :meth:`.TrajBase.iterChunks`, where *indices* are indices of frames in
+    *traj*.  Atom selection, reference coordinates and weights of *traj* are
+    used in workers.  *func* and *reducer* must be picklable, i.e. they must
+    be defined at the top level of a module.
+
+    When *reducer* is **None**, a list of results for chunks is returned in
+    the order of frames.  Otherwise, results are combined using *reducer* in
+    the order of frames, e.g. ``reducer(reducer(r0, r1), r2)``, so that the
+    outcome does not depend on the order in which workers finish.
+
+    :arg chunksize: number of frames in a chunk, by default chunks contain
+        about :data:`.TRAJ_CHUNK` coordinate array elements
+    :type chunksize: int
+
+    :arg superpose: superpose frames onto reference coordinates, default is
+        **False**
+    :type superpose: bool
+
+    :arg n_cpu: number of worker processes, default is number of processors,
+        chunks are processed in the current process when it is 1
+    :type n_cpu: int"""
+
+    n_selected = traj.numSelected()
+    chunksize = kwargs.get('chunksize')
+    if chunksize is None:
+        chunksize = TRAJ_CHUNK // (n_selected * 3 or 1) or 1
+    if not isinstance(chunksize, Integral) or chunksize < 1:
+        raise ValueError('chunksize must be a positive integer')
+
+    n_cpu = kwargs.get('n_cpu')
+    if n_cpu is None:
+        from multiprocessing import cpu_count
+        n_cpu = cpu_count()
+    if not isinstance(n_cpu, Integral) or n_cpu < 1:
+        raise ValueError('n_cpu must be a positive integer')
+
+    tasks = _getTasks(traj, chunksize)
+
+    superpose = bool(kwargs.get('superpose', False))
+    coords = traj._coords
+    if superpose and coords is None:
+        raise ValueError('reference coordinates are not set')
+    initargs = (func, traj._indices, coords, traj._weights, superpose)
+
+    n_frames = sum(task[4] - task[3] for task in tasks)
+    LOGGER.progress('Mapping {0} frames'.format(n_frames), n_frames,
+                    '_prody_mapTrajectory')
+    pool = None
+    if n_cpu == 1 or len(tasks) < 2:
+        _initWorker(*initargs)
+        results = (_mapChunk(task) for task in tasks)
+    else:
+        from multiprocessing import Pool
+        pool = Pool(min(n_cpu, len(tasks)), _initWorker, initargs)
+        results = pool.imap(_mapChunk, tasks)
+
+    try:
+        reduced = []
+        done = 0
+        for task, result in zip(tasks, results):
+            if reducer is None:
+                reduced.append(result)
+            elif done:
+                reduced = reducer(reduced, result)
+            else:
+                reduced = result
+            done += task[4] - task[3]
+            LOGGER.update(done, label='_prody_mapTrajectory')
+    finally:
+        if pool is None:
+            _WORKER.clear()
+        else:
+            # all tasks are done unless an exception was raised
+            pool.terminate()
+            pool.join()
+    LOGGER.finish()
+    return reduced
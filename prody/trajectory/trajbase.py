@@ -2,15 +2,20 @@
 """This module defines base class for trajectory handling."""
 
 from numbers import Integral
-from numpy import ndarray, unique
+from numpy import ndarray, unique, array, arange, matmul, newaxis
 
 from prody.ensemble import Ensemble
+from prody.measure import getTransformations
 from prody.utilities import checkCoords, checkWeights
 
 from .frame import Frame
 
 __all__ = ['TrajBase']
 
+TRAJ_CHUNK = 2 ** 22
+"""Default number of coordinate array elements in chunks of frames yielded
+by :meth:`.TrajBase.iterChunks`."""
+
 
 class TrajBase(object):
 
@@ -306,6 +311,60 @@ class TrajBase(object):
         while self._nfi < self._n_csets:
             yield self.nextCoordset()
 
+    def iterChunks(self, chunksize=None, superpose=False):
+        """Yield chunks of frames for (selected) atoms.  Each chunk is a tuple
+        of coordinate sets with shape ``(n_frames, n_selected, 3)``, unit
+        cells with shape ``(n_frames, 6)`` or **None** when trajectory does
+        not have unit cell data, and indices of frames.  Iteration starts
+        from the next frame in line.  Coordinates of a linked atom group are
+        not updated.
+
+        :arg chunksize: number of frames in a chunk, by default chunks
+            contain about :data:`TRAJ_CHUNK` coordinate array elements
+        :type chunksize: int
+
+        :arg superpose: superpose frames onto the reference coordinates, all
+            frames in a chunk are superposed at once using atom weights if
+            they are set, default is **False**
+        :type superpose: bool"""
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        if chunksize is None:
+            chunksize = TRAJ_CHUNK // (self.numSelected() * 3 or 1) or 1
+        chunksize = int(chunksize)
+        if chunksize < 1:
+            raise ValueError('chunksize must be a positive integer')
+        if superpose:
+            tar = self._getCoords()
+            if tar is None:
+                raise ValueError('reference coordinates are not set')
+            weights = self._getWeights()
+        for coords, unitcells, indices in self._iterChunks(chunksize):
+            if superpose:
+                rots, trans = getTransformations(coords, tar, weights)
+                coords[:] = matmul(coords, rots.transpose(0, 2, 1)) + \
+                    trans[:, newaxis]
+            yield coords, unitcells, indices
+
+    def _iterChunks(self, chunksize):
+        """Yield chunks of frames as described in :meth:`iterChunks`.  Frames
+        are read one at a time, derived classes may read chunks at once."""
+
+        while self._nfi < self._n_csets:
+            start = self._nfi
+            coords = []
+            unitcells = []
+            while self._nfi < self._n_csets and len(coords) < chunksize:
+                frame = next(self)
+                coords.append(frame.getCoords())
+                unitcells.append(frame._getUnitcell())
+            if unitcells[0] is None:
+                unitcells = None
+            else:
+                unitcells = array(unitcells)
+            yield array(coords), unitcells, arange(start, self._nfi)
+
     def getCoordsets(self, indices=None):
         """Returns coordinate sets at given *indices*. *indices* may be an
         integer, a list of ordered integers or **None**. **None** returns all
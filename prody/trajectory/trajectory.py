@@ -20,7 +20,8 @@ class Trajectory(TrajBase):
     def __init__(self, name, **kwargs):
         """Trajectory can be instantiated with a *name* or a filename. When
         name is a valid path to a trajectory file it will be opened for
-        reading."""
+        reading.  Keyword arguments, such as *astype* or *prefetch*, are
+        passed to the classes of trajectory files, e.g. :class:`.DCDFile`."""
 
         TrajBase.__init__(self, name)
         self._trajectory = None
@@ -93,8 +94,8 @@ class Trajectory(TrajBase):
     link.__doc__ = TrajBase.link.__doc__
 
     def addFile(self, filename, **kwargs):
-        """Add a file to the trajectory instance. Currently only DCD files
-        are supported."""
+        """Add a file to the trajectory instance. DCD, XTC, and TRR files are
+        supported."""
 
         if not isinstance(filename, str):
             raise ValueError('filename must be a string')
@@ -171,6 +172,22 @@ class Trajectory(TrajBase):
 
     getCoordsets.__doc__ = TrajBase.getCoordsets.__doc__
 
+    def _iterChunks(self, chunksize):
+        """Yield chunks of frames from files in turn.  Chunks do not span
+        multiple files."""
+
+        while self._nfi < self._n_csets:
+            traj = self._trajectory
+            while traj._nfi == traj._n_csets:
+                self._nextFile()
+                traj = self._trajectory
+            offset = self._nfi - traj._nfi
+            for coords, unitcells, indices in traj._iterChunks(chunksize):
+                self._nfi = offset + traj._nfi
+                yield coords, unitcells, indices + offset
+            if self._cfi + 1 >= self._n_files:
+                break
+
     def __next__(self):
 
         if self._closed:
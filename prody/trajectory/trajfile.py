@@ -3,6 +3,12 @@
 
 from os.path import isfile, abspath, split, splitext
 from numbers import Integral
+from threading import Thread, Event
+
+try:
+    from queue import Queue, Empty, Full
+except ImportError:
+    from Queue import Queue, Empty, Full
 
 import numpy as np
 
@@ -13,12 +19,147 @@ from .trajbase import TrajBase
 
 __all__ = ['TrajFile']
 
+PREFETCH_DEPTH = 4
+"""Default number of blocks that are read ahead when prefetching."""
+
+PREFETCH_BYTES = 64 * 1024 * 1024
+"""Default limit for bytes in flight when prefetching."""
+
+
+class PrefetchFile(object):
+
+    """A read-only file-like object that reads blocks of a file ahead in a
+    background thread and keeps at most *depth* of them in a queue.  Reads
+    that follow the previous ones are served from the queue.  Seeking is
+    lazy, and when a read follows a seek to a position outside of the
+    prefetched window, the queue is invalidated and reading ahead restarts
+    from the new position."""
+
+    def __init__(self, filename, position=0, blocksize=1024 * 1024,
+                 depth=PREFETCH_DEPTH):
+
+        self.name = filename
+        self._blocksize = int(blocksize)
+        self._depth = int(depth)
+        self._pos = position
+        self._block = b''
+        self._block_pos = position
+        self._next_pos = position
+        self._thread = None
+        self._stop = None
+        self._queue = None
+        self.closed = False
+
+    def _run(self, position, queue, stop):
+
+        with open(self.name, 'rb') as stream:
+            stream.seek(position)
+            while not stop.is_set():
+                data = stream.read(self._blocksize)
+                while not stop.is_set():
+                    try:
+                        queue.put((position, data), timeout=0.05)
+                    except Full:
+                        continue
+                    break
+                if not data:
+                    break
+                position += len(data)
+
+    def _start(self, position):
+
+        self._halt()
+        self._queue = Queue(self._depth)
+        self._stop = Event()
+        self._next_pos = position
+        self._thread = Thread(target=self._run,
+                              args=(position, self._queue, self._stop))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _halt(self):
+
+        if self._thread is not None:
+            self._stop.set()
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.01)
+                except Empty:
+                    pass
+            self._thread.join()
+            self._thread = None
+
+    def _advance(self):
+        """Make current block contain the read position, and return **False**
+        at the end of file."""
+
+        pos = self._pos
+        window = self._blocksize * (self._depth + 1)
+        if self._thread is None or not (self._next_pos <= pos <
+                                        self._next_pos + window):
+            self._start(pos)
+        while True:
+            position, data = self._queue.get()
+            self._block_pos = position
+            self._block = data
+            self._next_pos = position + len(data)
+            if not data:
+                self._thread.join()
+                self._thread = None
+                return False
+            if self._next_pos > pos:
+                return True
+
+    def read(self, size=-1):
+
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        chunks = []
+        while size != 0:
+            offset = self._pos - self._block_pos
+            if not 0 <= offset < len(self._block):
+                if not self._advance():
+                    break
+                offset = self._pos - self._block_pos
+            # memoryview slices avoid a copy before joining
+            if size < 0:
+                data = memoryview(self._block)[offset:]
+            else:
+                data = memoryview(self._block)[offset:offset + size]
+                size -= len(data)
+            chunks.append(data)
+            self._pos += len(data)
+        return b''.join(chunks)
+
+    def seek(self, offset, whence=0):
+
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            with open(self.name, 'rb') as stream:
+                stream.seek(offset, 2)
+                offset = stream.tell()
+        self._pos = offset
+        return offset
+
+    def tell(self):
+
+        return self._pos
+
+    def close(self):
+
+        self._halt()
+        self._block = b''
+        self.closed = True
+
 
 class TrajFile(TrajBase):
 
     """A base class for trajectory file classes:
 
-      * :class:`.DCDFile`"""
+      * :class:`.DCDFile`
+      * :class:`.XTCFile`
+      * :class:`.TRRFile`"""
 
 
     def __init__(self, filename, mode='r'):
@@ -53,6 +194,7 @@ class TrajFile(TrajBase):
         self._bytes_per_frame = None
         self._first_byte = None
         self._dtype = np.float32
+        self._astype = None
 
         self._timestep = 1
         self._first_ts = 0
@@ -61,7 +203,8 @@ class TrajFile(TrajBase):
 
     def __del__(self):
 
-        if self._file is not None:
+        # file is not set when __init__ fails early
+        if getattr(self, '_file', None) is not None:
             self._file.close()
 
     def __repr__(self):
@@ -89,6 +232,25 @@ class TrajFile(TrajBase):
         return '<{0}: {1} ({2}{3}{4})>'.format(
                    self.__class__.__name__, self._title, link, next, atoms)
 
+    def _prefetch(self, depth=None, nbytes=None):
+        """Read file ahead in a background thread using a :class:`PrefetchFile`
+        that keeps at most *depth* blocks of whole frames and a total of
+        about *nbytes* bytes in flight."""
+
+        if depth is None or depth is True:
+            depth = PREFETCH_DEPTH
+        depth = int(depth)
+        if depth < 1:
+            raise ValueError('prefetch depth must be a positive integer')
+        if nbytes is None:
+            nbytes = PREFETCH_BYTES
+        # queued blocks, block being read and block being consumed
+        n_frames = int(nbytes) // ((depth + 2) * self._bytes_per_frame) or 1
+        position = self._file.tell()
+        self._file.close()
+        self._file = PrefetchFile(self._filename, position,
+                                  n_frames * self._bytes_per_frame, depth)
+
     def getFilename(self, absolute=False):
         """Returns relative path to the current file. For absolute path,
         pass ``absolute=True`` argument."""
@@ -138,9 +300,10 @@ class TrajFile(TrajBase):
         self.reset()
 
         n_atoms = self.numSelected()
-        coords = np.zeros((len(indices), n_atoms, 3), self._dtype)
+        coords = np.zeros((len(indices), n_atoms, 3),
+                          self._astype or self._dtype)
 
-        prev = 0
+        prev = -1
         next = self.nextCoordset
         for i, index in enumerate(indices):
             diff = index - prev
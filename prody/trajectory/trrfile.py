@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""This module defines a class for handling trajectory files in `TRR format`_
+of GROMACS.
+
+.. _TRR format: http://manual.gromacs.org/documentation/current/reference-manual/file-formats.html#trr"""
+
+from struct import unpack, error
+
+import numpy as np
+
+from prody import LOGGER
+
+from .xdrfile import XDRFile
+
+__all__ = ['TRRFile']
+
+TRR_MAGIC = 1993
+
+
+class TRRFile(XDRFile):
+
+    """A class for reading GROMACS TRR files, which contain coordinates,
+    velocities, and forces in full precision.  Only frames that contain
+    coordinates are considered, and velocities are set for frames when they
+    are present.  First frame is parsed at instantiation and its coordinates
+    are set as the reference coordinate set.  Coordinates are 32-bit or
+    64-bit floating-point numbers depending on the file, which may be casted
+    to another type, using *astype* keyword argument, e.g. ``astype=float``.
+    Offsets of frames are indexed when the file is opened, so that
+    :meth:`goto` and :meth:`getFrame` take constant time."""
+
+    _format = 'TRR'
+
+    def __init__(self, filename, mode='rb', **kwargs):
+
+        if not mode.startswith('r'):
+            raise ValueError('TRR files can only be opened for reading')
+        XDRFile.__init__(self, filename, mode, **kwargs)
+
+    __init__.__doc__ = XDRFile.__init__.__doc__
+
+    def _indexFrames(self, stream):
+
+        offsets = []
+        steps = []
+        times = []
+        n_atoms = None
+        stream.seek(0, 2)
+        size = stream.tell()
+        position = end = 0
+        while position < size:
+            stream.seek(position)
+            header = stream.read(128)
+            try:
+                (length, sizes, natoms, step, time,
+                 dtype) = _parseFrameHeader(header)
+            except (error, ValueError):
+                break
+            except IOError:
+                raise IOError('{0} is not a valid TRR file, frame at byte {1} '
+                              'has an unexpected magic number'
+                              .format(self._filename, position))
+            frame_size = length + sum(sizes.values())
+            if position + frame_size > size:
+                break
+            if sizes['x']:
+                if n_atoms is None:
+                    n_atoms = natoms
+                elif natoms != n_atoms:
+                    raise IOError('frames of {0} must have the same number '
+                                  'of atoms'.format(self._filename))
+                offsets.append(position)
+                steps.append(step)
+                times.append(time)
+                end = position + frame_size
+            position += frame_size
+        if position < size:
+            LOGGER.warning('TRR file is corrupt, {0} frames were indexed.'
+                           .format(len(offsets)))
+        offsets.append(end)
+        return (n_atoms or 0, np.array(offsets, np.int64), np.array(steps),
+                np.array(times))
+
+    def _decodeFrame(self, data, offset):
+
+        length, sizes, natoms, step, time, dtype = _parseFrameHeader(
+            memoryview(data)[offset:offset + 128])
+        position = offset + length
+        if sizes['box']:
+            box = np.frombuffer(data, dtype, 9, position).reshape((3, 3))
+        else:
+            box = np.zeros((3, 3))
+        position += sizes['box'] + sizes['vir'] + sizes['pres']
+        xyz = np.frombuffer(data, dtype, natoms * 3, position)
+        xyz = xyz.reshape((natoms, 3)).astype(dtype.newbyteorder('='))
+        position += sizes['x']
+        velocs = None
+        if sizes['v']:
+            velocs = np.frombuffer(data, dtype, natoms * 3, position)
+            velocs = velocs.reshape((natoms, 3)).astype(xyz.dtype)
+        return xyz, box, velocs
+
+
+def _parseFrameHeader(data):
+    """Returns length of frame header, a dictionary of sizes of data blocks,
+    number of atoms, step, time and data type of real numbers in the frame
+    that starts with header bytes in *data*."""
+
+    magic, slen, length = unpack('>iii', data[:12])
+    if magic != TRR_MAGIC:
+        raise IOError('unexpected magic number')
+    # version string is padded to a multiple of 4 bytes
+    position = 12 + (length + 3) // 4 * 4
+    values = unpack('>13i', data[position:position + 52])
+    position += 52
+    sizes = dict(zip(['ir', 'e', 'box', 'vir', 'pres', 'top', 'sym', 'x',
+                      'v', 'f'], values[:10]))
+    natoms, step = values[10:12]
+    if sizes['box']:
+        realsize = sizes['box'] // 9
+    else:
+        realsize = 4
+        for key in ('x', 'v', 'f'):
+            if sizes[key]:
+                realsize = sizes[key] // (natoms * 3)
+                break
+    dtype = np.dtype('>f8' if realsize == 8 else '>f4')
+    time = float(np.frombuffer(data, dtype, 1, position)[0])
+    return position + 2 * realsize, sizes, natoms, step, time, dtype
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""This module defines a base class for trajectory files in XDR based formats
+of GROMACS, i.e. XTC and TRR, whose frames may differ in size."""
+
+import os
+from os.path import abspath
+from numbers import Integral
+
+import numpy as np
+
+from .frame import Frame
+from .trajbase import TrajBase
+from .trajfile import TrajFile
+
+__all__ = []
+
+# indices of files keyed by absolute path, size and modification time
+_INDEX_CACHE = {}
+
+
+class XDRFile(TrajFile):
+
+    """A base class for GROMACS trajectory files, i.e. :class:`.XTCFile` and
+    :class:`.TRRFile`.  Frames of these files may differ in size, so offsets
+    of frames are indexed when a file is opened for reading, which makes
+    :meth:`goto` and :meth:`getFrame` constant time operations.  Indices are
+    cached for the session by path, size, and modification time of files,
+    so opening a file again does not scan it.  Coordinates, velocities, and
+    box vectors are converted from nm to Å.
+
+    Like for :class:`.DCDFile`, *astype* and *prefetch* arguments may be
+    used for casting coordinates and reading frames ahead."""
+
+    def __init__(self, filename, mode='rb', **kwargs):
+
+        TrajFile.__init__(self, filename, mode)
+        self._astype = kwargs.get('astype', None)
+        self._offsets = np.zeros(1, np.int64)
+        self._unitcell = False
+        if kwargs.get('mmap', False):
+            raise ValueError('{0} files cannot be memory-mapped'
+                             .format(self._format))
+        if not self._mode.startswith('w'):
+            self._parseHeader()
+            if kwargs.get('prefetch', False):
+                if not self._mode.startswith('r'):
+                    raise ValueError('only files opened for reading can be '
+                                     'prefetched')
+                if self._n_csets:
+                    self._prefetch(kwargs['prefetch'],
+                                   kwargs.get('prefetch_bytes'))
+
+    __init__.__doc__ = TrajFile.__init__.__doc__
+
+    def _indexFrames(self, stream):
+        """Returns number of atoms and arrays of offsets, steps, and times of
+        frames by scanning frame headers in *stream*.  Offsets array has an
+        extra element, end of the last frame.  A warning is logged when the
+        last frame is truncated."""
+
+        raise NotImplementedError
+
+    def _decodeFrame(self, data, offset):
+        """Returns coordinates, box vectors, and velocities or **None** from
+        the frame starting at *offset* in *data*.  Values are in nm."""
+
+        raise NotImplementedError
+
+    def _getIndex(self):
+        """Returns index of frames built using :meth:`_indexFrames`, from the
+        cache when the file is indexed before."""
+
+        stat = os.stat(self._filename)
+        key = (abspath(self._filename), stat.st_size, stat.st_mtime)
+        try:
+            index = _INDEX_CACHE[key]
+        except KeyError:
+            with open(self._filename, 'rb') as stream:
+                index = _INDEX_CACHE[key] = self._indexFrames(stream)
+        return index
+
+    def _parseHeader(self):
+        """Index frames and parse the first frame."""
+
+        n_atoms, offsets, steps, times = self._getIndex()
+        self._n_atoms = n_atoms
+        self._offsets = offsets
+        self._n_csets = n_csets = len(offsets) - 1
+        self._first_byte = int(offsets[0])
+        self._nfi = 0
+        if not n_csets:
+            return
+        self._bytes_per_frame = int(offsets[-1] - offsets[0]) // n_csets or 1
+        self._first_ts = int(steps[0])
+        if n_csets > 1 and steps[1] > steps[0]:
+            self._framefreq = int(steps[1] - steps[0])
+            self._timestep = float(times[1] - times[0]) / self._framefreq
+
+        self._file.seek(self._first_byte)
+        data = self._file.read(int(offsets[1] - offsets[0]))
+        self._dtype = self._decodeFrame(data, 0)[0].dtype
+        self._file.seek(self._first_byte)
+        xyz, unitcell, velocs = self._nextFrame()
+        self._coords = xyz
+        self._unitcell = unitcell is not None
+        self.reset()
+
+    def hasUnitcell(self):
+
+        return self._unitcell
+
+    hasUnitcell.__doc__ = TrajBase.hasUnitcell.__doc__
+
+    def _nextFrame(self):
+        """Returns coordinates, unit cell, and velocities of the next frame,
+        and sets coordinates of linked atom group."""
+
+        nfi = self._nfi
+        offsets = self._offsets
+        data = self._file.read(int(offsets[nfi + 1] - offsets[nfi]))
+        xyz, box, velocs = self._decodeFrame(data, 0)
+        if self._astype is not None and self._astype != xyz.dtype:
+            xyz = xyz.astype(self._astype)
+        xyz *= 10
+        if velocs is not None:
+            velocs *= 10
+        unitcell = None
+        if box.any():
+            unitcell = _convertBoxes(box)
+        if self._ag is not None:
+            self._ag._setCoords(xyz, self._title + ' frame ' + str(nfi),
+                                overwrite=True)
+        self._nfi += 1
+        return xyz, unitcell, velocs
+
+    def __next__(self):
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        nfi = self._nfi
+        if nfi < self._n_csets:
+            coords, unitcell, velocs = self._nextFrame()
+            if self._ag is None:
+                frame = Frame(self, nfi, coords, unitcell, velocs)
+            else:
+                frame = self._frame
+                Frame.__init__(frame, self, nfi, None, unitcell, velocs)
+            return frame
+
+    __next__.__doc__ = TrajBase.__next__.__doc__
+    next = __next__
+
+    def nextCoordset(self):
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        if self._nfi < self._n_csets:
+            xyz = self._nextFrame()[0]
+            if self._indices is None:
+                return xyz
+            else:
+                return xyz[self._indices]
+
+    nextCoordset.__doc__ = TrajBase.nextCoordset.__doc__
+
+    def _iterChunks(self, chunksize):
+        """Yield chunks of frames as described in :meth:`.iterChunks`.  Bytes
+        of frames in a chunk are read with a single call."""
+
+        indices = self._indices
+        dtype = self._dtype if self._astype is None else self._astype
+        while self._nfi < self._n_csets:
+            start = self._nfi
+            stop = min(start + chunksize, self._n_csets)
+            offsets = self._offsets[start:stop + 1] - self._offsets[start]
+            data = self._file.read(int(offsets[-1]))
+            coords = np.zeros((stop - start, self.numSelected(), 3), dtype)
+            boxes = np.zeros((stop - start, 3, 3))
+            for i in range(stop - start):
+                xyz, boxes[i] = self._decodeFrame(data, int(offsets[i]))[:2]
+                if indices is None:
+                    coords[i] = xyz
+                else:
+                    coords[i] = xyz[indices]
+            coords *= 10
+            unitcells = None
+            if self._unitcell:
+                unitcells = _convertBoxes(boxes)
+            self._nfi = stop
+            yield coords, unitcells, np.arange(start, stop)
+
+    def skip(self, n):
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        if not isinstance(n, Integral):
+            raise ValueError('n must be an integer')
+        if n > 0:
+            self.goto(min(self._nfi + n, self._n_csets))
+
+    skip.__doc__ = TrajBase.skip.__doc__
+
+    def goto(self, n):
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        if not isinstance(n, Integral):
+            raise ValueError('n must be an integer')
+        n_csets = self._n_csets
+        if n < 0:
+            n = n_csets + n
+        if n < 0:
+            n = 0
+        elif n > n_csets:
+            n = n_csets
+        self._file.seek(int(self._offsets[n]))
+        self._nfi = n
+
+    goto.__doc__ = TrajBase.goto.__doc__
+
+
+def _convertBoxes(boxes):
+    """Returns unit cells with lengths in Å followed by angles in degrees from
+    box vectors in nm.  *boxes* may be a single box or an array of them."""
+
+    boxes = np.asarray(boxes, float) * 10
+    lengths = np.sqrt((boxes ** 2).sum(-1))
+    unitcells = np.zeros(boxes.shape[:-2] + (6,))
+    unitcells[..., :3] = lengths
+    # alpha is between b and c, beta is between a and c, and so on
+    for i, (j, k) in enumerate(((1, 2), (0, 2), (0, 1))):
+        norms = lengths[..., j] * lengths[..., k]
+        dots = (boxes[..., j, :] * boxes[..., k, :]).sum(-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            angles = np.degrees(np.arccos(np.clip(dots / norms, -1, 1)))
+        unitcells[..., 3 + i] = np.where(norms > 0, angles, 90.)
+    return unitcells
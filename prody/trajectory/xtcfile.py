@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""This module defines a class for handling trajectory files in `XTC format`_
+of GROMACS.
+
+.. _XTC format: http://manual.gromacs.org/documentation/current/reference-manual/file-formats.html#xtc"""
+
+from struct import pack, unpack
+
+import numpy as np
+
+from prody import LOGGER
+from prody.utilities import checkCoords
+
+from .xdrfile import XDRFile
+
+__all__ = ['XTCFile']
+
+XTC_MAGIC = 1995
+
+XTC_PRECISION = 1000.
+"""Default precision of coordinates written to XTC files, i.e. coordinates in
+nm are rounded to 3 decimal places."""
+
+
+class XTCFile(XDRFile):
+
+    """A class for reading and writing GROMACS XTC files, which contain
+    compressed coordinates with a precision that is set when the file is
+    written.  Frames are decompressed using a C extension.  First frame is
+    parsed at instantiation and its coordinates are set as the reference
+    coordinate set.  Coordinates are 32-bit floating-point numbers, which
+    may be casted to another type, using *astype* keyword argument, e.g.
+    ``astype=float``.  Offsets of frames are indexed when the file is
+    opened, so that :meth:`goto` and :meth:`getFrame` take constant time.
+
+    When writing, *precision* keyword argument sets the number of decimal
+    places for coordinates in nm, default is :data:`.XTC_PRECISION`."""
+
+    _format = 'XTC'
+
+    def __init__(self, filename, mode='rb', **kwargs):
+
+        self._precision = float(kwargs.pop('precision', XTC_PRECISION))
+        XDRFile.__init__(self, filename, mode, **kwargs)
+
+    __init__.__doc__ = XDRFile.__init__.__doc__
+
+    def _indexFrames(self, stream):
+
+        offsets = []
+        steps = []
+        times = []
+        n_atoms = None
+        stream.seek(0, 2)
+        size = stream.tell()
+        position = 0
+        while position < size:
+            stream.seek(position)
+            header = stream.read(92)
+            if len(header) < 56:
+                break
+            magic, natoms, step, time = unpack('>iiif', header[:16])
+            if magic != XTC_MAGIC:
+                raise IOError('{0} is not a valid XTC file, frame {1} has '
+                              'an unexpected magic number'
+                              .format(self._filename, len(offsets)))
+            if n_atoms is None:
+                n_atoms = natoms
+            elif natoms != n_atoms:
+                raise IOError('frames of {0} must have the same number of '
+                              'atoms'.format(self._filename))
+            if natoms <= 9:
+                frame_size = 56 + 12 * natoms
+            elif len(header) < 92:
+                break
+            else:
+                n_bytes = unpack('>i', header[88:])[0]
+                frame_size = 92 + (n_bytes + 3) // 4 * 4
+            if position + frame_size > size:
+                break
+            offsets.append(position)
+            steps.append(step)
+            times.append(time)
+            position += frame_size
+        if position < size:
+            LOGGER.warning('XTC file is corrupt, {0} frames were indexed.'
+                           .format(len(offsets)))
+        offsets.append(position)
+        return (n_atoms or 0, np.array(offsets, np.int64), np.array(steps),
+                np.array(times))
+
+    def _decodeFrame(self, data, offset):
+
+        n_atoms = self._n_atoms
+        box = np.frombuffer(data, '>f4', 9, offset + 16).reshape((3, 3))
+        xyz = np.zeros((n_atoms, 3), np.float32)
+        if n_atoms <= 9:
+            xyz[:] = np.frombuffer(data, '>f4', n_atoms * 3,
+                                   offset + 56).reshape((n_atoms, 3))
+        else:
+            from .xtctools import xtcdecode
+            xtcdecode(memoryview(data)[offset + 56:], xyz)
+        return xyz, box, None
+
+    def write(self, coords, unitcell=None, **kwargs):
+        """Write *coords* to a file open in 'a' or 'w' mode.  *coords* may be
+        a NumPy array or a ProDy object that stores or points to coordinate
+        data.  If *coords* is an :class:`~.Atomic` or :class:`~.Ensemble` all
+        coordinate sets will be written.  Coordinates are converted from Å to
+        nm, and *unitcell* with lengths and angles is converted to box
+        vectors.  Box vectors are set to zero when *unitcell* is not given.
+
+        Following keywords are used when writing the first coordinate set:
+
+        :arg timestep: time between timesteps in ps, default is 1
+        :arg firsttimestep: number of the first timestep, default is 0
+        :arg framefreq: number of timesteps between frames, default is 1"""
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        if self._mode.startswith('r'):
+            raise IOError('File not open for writing')
+
+        try:
+            coords = coords._getCoordsets()
+        except AttributeError:
+            try:
+                coords = coords._getCoords()
+            except AttributeError:
+                checkCoords(coords, csets=True, dtype=None)
+            else:
+                if unitcell is None:
+                    try:
+                        unitcell = coords.getUnitcell()
+                    except AttributeError:
+                        pass
+
+        n_atoms = coords.shape[-2]
+        if self._n_atoms == 0:
+            self._n_atoms = n_atoms
+        elif self._n_atoms != n_atoms:
+            raise ValueError('coords does not have correct number of atoms')
+        if coords.ndim == 2:
+            coords = [coords]
+
+        if self._n_csets == 0:
+            self._timestep = float(kwargs.get('timestep', 1.0))
+            self._first_ts = int(kwargs.get('firsttimestep', 0))
+            self._framefreq = int(kwargs.get('framefreq', 1))
+        if unitcell is None:
+            box = np.zeros((3, 3), '>f4')
+        else:
+            box = _convertUnitcell(unitcell).astype('>f4')
+        box = box.tobytes()
+
+        xtc = self._file
+        xtc.seek(0, 2)
+        for xyz in coords:
+            step = self._first_ts + self._n_csets * self._framefreq
+            xtc.write(pack('>iiif', XTC_MAGIC, n_atoms, step,
+                           step * self._timestep))
+            xtc.write(box)
+            xtc.write(pack('>i', n_atoms))
+            xyz = np.asarray(xyz, float) / 10
+            if n_atoms <= 9:
+                xtc.write(xyz.astype('>f4').tobytes())
+            else:
+                from .xtctools import xtcencode
+                xtc.write(xtcencode(xyz.astype(np.float32), self._precision))
+            self._n_csets += 1
+            self._offsets = np.append(self._offsets, xtc.tell())
+        self._nfi = self._n_csets
+
+    def flush(self):
+        """Flush the internal output buffer."""
+
+        if not self._mode.startswith('r'):
+            self._file.flush()
+
+
+def _convertUnitcell(unitcell):
+    """Returns box vectors in nm from *unitcell* with lengths in Å followed by
+    angles in degrees."""
+
+    unitcell = np.asarray(unitcell, float)
+    a, b, c = unitcell[:3] / 10
+    cosines = np.cos(np.radians(unitcell[3:]))
+    # so that orthogonal boxes have exact zeros
+    cosines[unitcell[3:] == 90] = 0
+    cos_alpha, cos_beta, cos_gamma = cosines
+    sin_gamma = np.sqrt(1 - cos_gamma ** 2)
+    box = np.zeros((3, 3))
+    box[0, 0] = a
+    box[1, 0] = b * cos_gamma
+    box[1, 1] = b * sin_gamma
+    box[2, 0] = c * cos_beta
+    box[2, 1] = c * (cos_alpha - cos_beta * cos_gamma) / sin_gamma
+    box[2, 2] = np.sqrt(max(c ** 2 - box[2, 0] ** 2 - box[2, 1] ** 2, 0))
+    return box
@@ -0,0 +1,679 @@
+/* Compression and decompression of coordinates in GROMACS XTC format.
+
+This is a port of xdr3dfcoord function from xdrfile library distributed
+with GROMACS, which is based on the compression algorithm by Frans van Hoesel.
+Only the compressed coordinate block of a frame is handled here, i.e. bytes
+starting with the precision that follow the number of atoms. Frames with 9
+or fewer atoms are stored uncompressed and are handled in Python.
+*/
+
+#include "Python.h"
+#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
+#include "numpy/arrayobject.h"
+#include <limits.h>
+#include <math.h>
+#include <string.h>
+
+static const int magicints[] = {
+    0, 0, 0, 0, 0, 0, 0, 0, 0,
+    8, 10, 12, 16, 20, 25, 32, 40, 50, 64,
+    80, 101, 128, 161, 203, 256, 322, 406, 512, 645,
+    812, 1024, 1290, 1625, 2048, 2580, 3250, 4096, 5060, 6501,
+    8192, 10321, 13003, 16384, 20642, 26007, 32768, 41285, 52015, 65536,
+    82570, 104031, 131072, 165140, 208063, 262144, 330280, 416127, 524287,
+    660561, 832255, 1048576, 1321122, 1664510, 2097152, 2642245, 3329021,
+    4194304, 5284491, 6658042, 8388607, 10568983, 13316085, 16777216};
+
+#define FIRSTIDX 9
+#define LASTIDX (int)(sizeof(magicints) / sizeof(*magicints))
+#define MAXABS (INT_MAX - 2)
+#define HEADERSIZE 36 /* precision, minint, maxint, smallidx, byte count */
+
+/* state of a bit stream, bytes are read or written from/to data */
+typedef struct {
+    unsigned char *data;
+    size_t size;
+    size_t count;
+    unsigned int lastbits;
+    unsigned int lastbyte;
+    int error;
+} bitstream;
+
+
+static int readInt(const unsigned char *data) {
+
+    return (int) (((unsigned int) data[0] << 24) |
+                  ((unsigned int) data[1] << 16) |
+                  ((unsigned int) data[2] << 8) | (unsigned int) data[3]);
+}
+
+
+static void writeInt(unsigned char *data, int value) {
+
+    unsigned int num = (unsigned int) value;
+    data[0] = (num >> 24) & 0xff;
+    data[1] = (num >> 16) & 0xff;
+    data[2] = (num >> 8) & 0xff;
+    data[3] = num & 0xff;
+}
+
+
+static int sizeofint(int size) {
+
+    unsigned int num = 1;
+    int num_of_bits = 0;
+
+    while (size >= (int) num && num_of_bits < 32) {
+        num_of_bits++;
+        num <<= 1;
+    }
+    return num_of_bits;
+}
+
+
+static int sizeofints(int num_of_ints, unsigned int sizes[]) {
+
+    int i, num;
+    unsigned int num_of_bytes, num_of_bits, bytes[32], bytecnt, tmp;
+
+    num_of_bytes = 1;
+    bytes[0] = 1;
+    num_of_bits = 0;
+    for (i = 0; i < num_of_ints; i++) {
+        tmp = 0;
+        for (bytecnt = 0; bytecnt < num_of_bytes; bytecnt++) {
+            tmp = bytes[bytecnt] * sizes[i] + tmp;
+            bytes[bytecnt] = tmp & 0xff;
+            tmp >>= 8;
+        }
+        while (tmp != 0) {
+            bytes[bytecnt++] = tmp & 0xff;
+            tmp >>= 8;
+        }
+        num_of_bytes = bytecnt;
+    }
+    num = 1;
+    num_of_bytes--;
+    while ((int) bytes[num_of_bytes] >= num) {
+        num_of_bits++;
+        num *= 2;
+    }
+    return num_of_bits + num_of_bytes * 8;
+}
+
+
+static int receivebits(bitstream *bs, int num_of_bits) {
+
+    unsigned int lastbits = bs->lastbits, lastbyte = bs->lastbyte;
+    int num = 0, mask = (num_of_bits < 32) ? (1 << num_of_bits) - 1 : -1;
+
+    while (num_of_bits >= 8) {
+        if (bs->count >= bs->size) {
+            bs->error = 1;
+            return 0;
+        }
+        lastbyte = (lastbyte << 8) | bs->data[bs->count++];
+        num |= (lastbyte >> lastbits) << (num_of_bits - 8);
+        num_of_bits -= 8;
+    }
+    if (num_of_bits > 0) {
+        if ((int) lastbits < num_of_bits) {
+            if (bs->count >= bs->size) {
+                bs->error = 1;
+                return 0;
+            }
+            lastbits += 8;
+            lastbyte = (lastbyte << 8) | bs->data[bs->count++];
+        }
+        lastbits -= num_of_bits;
+        num |= (lastbyte >> lastbits) & ((1 << num_of_bits) - 1);
+    }
+    bs->lastbits = lastbits;
+    bs->lastbyte = lastbyte;
+    return num & mask;
+}
+
+
+static void receiveints(bitstream *bs, int num_of_ints, int num_of_bits,
+                        unsigned int sizes[], int nums[]) {
+
+    int bytes[32];
+    int i, j, num_of_bytes = 0, p, num;
+
+    bytes[1] = bytes[2] = bytes[3] = 0;
+    while (num_of_bits > 8) {
+        bytes[num_of_bytes++] = receivebits(bs, 8);
+        num_of_bits -= 8;
+    }
+    if (num_of_bits > 0)
+        bytes[num_of_bytes++] = receivebits(bs, num_of_bits);
+
+    for (i = num_of_ints - 1; i > 0; i--) {
+        num = 0;
+        for (j = num_of_bytes - 1; j >= 0; j--) {
+            num = (num << 8) | bytes[j];
+            p = num / sizes[i];
+            bytes[j] = p;
+            num = num - p * sizes[i];
+        }
+        nums[i] = num;
+    }
+    nums[0] = bytes[0] | (bytes[1] << 8) | (bytes[2] << 16) | (bytes[3] << 24);
+}
+
+
+static void sendbits(bitstream *bs, int num_of_bits, int num) {
+
+    unsigned int lastbits = bs->lastbits, lastbyte = bs->lastbyte;
+
+    /* two bytes may be written, one complete and one partial */
+    if (bs->count + (num_of_bits >> 3) + 2 > bs->size) {
+        bs->error = 1;
+        return;
+    }
+    while (num_of_bits >= 8) {
+        lastbyte = (lastbyte << 8) | ((unsigned int) num >> (num_of_bits - 8));
+        bs->data[bs->count++] = (unsigned char) (lastbyte >> lastbits);
+        num_of_bits -= 8;
+    }
+    if (num_of_bits > 0) {
+        lastbyte = (lastbyte << num_of_bits) | (unsigned int) num;
+        lastbits += num_of_bits;
+        if (lastbits >= 8) {
+            lastbits -= 8;
+            bs->data[bs->count++] = (unsigned char) (lastbyte >> lastbits);
+        }
+    }
+    bs->lastbits = lastbits;
+    bs->lastbyte = lastbyte;
+    if (lastbits > 0)
+        bs->data[bs->count] = (unsigned char) (lastbyte << (8 - lastbits));
+}
+
+
+static void sendints(bitstream *bs, int num_of_ints, int num_of_bits,
+                     unsigned int sizes[], unsigned int nums[]) {
+
+    int i, num_of_bytes = 0, bytecnt;
+    unsigned int bytes[32], tmp;
+
+    tmp = nums[0];
+    do {
+        bytes[num_of_bytes++] = tmp & 0xff;
+        tmp >>= 8;
+    } while (tmp != 0);
+
+    for (i = 1; i < num_of_ints; i++) {
+        if (nums[i] >= sizes[i]) {
+            bs->error = 1;
+            return;
+        }
+        tmp = nums[i];
+        for (bytecnt = 0; bytecnt < num_of_bytes; bytecnt++) {
+            tmp = bytes[bytecnt] * sizes[i] + tmp;
+            bytes[bytecnt] = tmp & 0xff;
+            tmp >>= 8;
+        }
+        while (tmp != 0) {
+            bytes[bytecnt++] = tmp & 0xff;
+            tmp >>= 8;
+        }
+        num_of_bytes = bytecnt;
+    }
+    if (num_of_bits >= num_of_bytes * 8) {
+        for (i = 0; i < num_of_bytes; i++)
+            sendbits(bs, 8, bytes[i]);
+        sendbits(bs, num_of_bits - num_of_bytes * 8, 0);
+    } else {
+        for (i = 0; i < num_of_bytes - 1; i++)
+            sendbits(bs, 8, bytes[i]);
+        sendbits(bs, num_of_bits - (num_of_bytes - 1) * 8, bytes[i]);
+    }
+}
+
+
+static PyObject *xtcdecode(PyObject *self, PyObject *args, PyObject *kwargs) {
+
+    Py_buffer buffer;
+    PyArrayObject *coords;
+    static char *kwlist[] = {"data", "coords", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*O!", kwlist, &buffer,
+                                     &PyArray_Type, &coords))
+        return NULL;
+
+    if (PyArray_TYPE(coords) != NPY_FLOAT32 || PyArray_NDIM(coords) != 2 ||
+        PyArray_DIMS(coords)[1] != 3 || !PyArray_ISCARRAY(coords)) {
+        PyBuffer_Release(&buffer);
+        PyErr_SetString(PyExc_ValueError,
+                        "coords must be a writeable and contiguous float32 "
+                        "array with shape (n_atoms, 3)");
+        return NULL;
+    }
+
+    const unsigned char *data = (const unsigned char *) buffer.buf;
+    long n_atoms = (long) PyArray_DIMS(coords)[0];
+    float *lfp = (float *) PyArray_DATA(coords);
+
+    if (buffer.len < HEADERSIZE) {
+        PyBuffer_Release(&buffer);
+        PyErr_SetString(PyExc_IOError, "XTC frame is truncated");
+        return NULL;
+    }
+
+    unsigned int prec = (unsigned int) readInt(data);
+    float precision;
+    memcpy(&precision, &prec, sizeof(float));
+
+    int minint[3], maxint[3];
+    unsigned int sizeint[3], sizesmall[3], bitsizeint[3] = {0, 0, 0};
+    int i, k, bitsize, smallidx, tmp, smaller, smallnum;
+    for (i = 0; i < 3; i++) {
+        minint[i] = readInt(data + 4 + 4 * i);
+        maxint[i] = readInt(data + 16 + 4 * i);
+        sizeint[i] = maxint[i] - minint[i] + 1;
+    }
+
+    /* check if one of the sizes is too big to be multiplied */
+    if ((sizeint[0] | sizeint[1] | sizeint[2]) > 0xffffff) {
+        bitsizeint[0] = sizeofint(sizeint[0]);
+        bitsizeint[1] = sizeofint(sizeint[1]);
+        bitsizeint[2] = sizeofint(sizeint[2]);
+        bitsize = 0; /* flag the use of large sizes */
+    } else
+        bitsize = sizeofints(3, sizeint);
+
+    smallidx = readInt(data + 28);
+    if (smallidx < FIRSTIDX || smallidx >= LASTIDX) {
+        PyBuffer_Release(&buffer);
+        PyErr_SetString(PyExc_IOError, "XTC frame is corrupt");
+        return NULL;
+    }
+    tmp = smallidx - 1;
+    tmp = (FIRSTIDX > tmp) ? FIRSTIDX : tmp;
+    smaller = magicints[tmp] / 2;
+    smallnum = magicints[smallidx] / 2;
+    sizesmall[0] = sizesmall[1] = sizesmall[2] = magicints[smallidx];
+
+    bitstream bs = {NULL, 0, 0, 0, 0, 0};
+    bs.data = (unsigned char *) data + HEADERSIZE;
+    bs.size = (size_t) (unsigned int) readInt(data + 32);
+    if (bs.size > (size_t) (buffer.len - HEADERSIZE)) {
+        PyBuffer_Release(&buffer);
+        PyErr_SetString(PyExc_IOError, "XTC frame is truncated");
+        return NULL;
+    }
+
+    float inv_precision = 1.0f / precision;
+    int thiscoord[3], prevcoord[3], run = 0, flag, is_smaller;
+    long n = 0;
+
+    while (n < n_atoms && !bs.error) {
+        if (bitsize == 0) {
+            thiscoord[0] = receivebits(&bs, bitsizeint[0]);
+            thiscoord[1] = receivebits(&bs, bitsizeint[1]);
+            thiscoord[2] = receivebits(&bs, bitsizeint[2]);
+        } else
+            receiveints(&bs, 3, bitsize, sizeint, thiscoord);
+
+        n++;
+        thiscoord[0] += minint[0];
+        thiscoord[1] += minint[1];
+        thiscoord[2] += minint[2];
+
+        prevcoord[0] = thiscoord[0];
+        prevcoord[1] = thiscoord[1];
+        prevcoord[2] = thiscoord[2];
+
+        flag = receivebits(&bs, 1);
+        is_smaller = 0;
+        if (flag == 1) {
+            run = receivebits(&bs, 5);
+            is_smaller = run % 3;
+            run -= is_smaller;
+            is_smaller--;
+        }
+        if (run > 0) {
+            if (n + run / 3 > n_atoms) {
+                bs.error = 1;
+                break;
+            }
+            for (k = 0; k < run; k += 3) {
+                receiveints(&bs, 3, smallidx, sizesmall, thiscoord);
+                n++;
+                thiscoord[0] += prevcoord[0] - smallnum;
+                thiscoord[1] += prevcoord[1] - smallnum;
+                thiscoord[2] += prevcoord[2] - smallnum;
+                if (k == 0) {
+                    /* interchange first with second atom for better
+                       compression of water molecules */
+                    tmp = thiscoord[0]; thiscoord[0] = prevcoord[0];
+                    prevcoord[0] = tmp;
+                    tmp = thiscoord[1]; thiscoord[1] = prevcoord[1];
+                    prevcoord[1] = tmp;
+                    tmp = thiscoord[2]; thiscoord[2] = prevcoord[2];
+                    prevcoord[2] = tmp;
+                    *lfp++ = prevcoord[0] * inv_precision;
+                    *lfp++ = prevcoord[1] * inv_precision;
+                    *lfp++ = prevcoord[2] * inv_precision;
+                } else {
+                    prevcoord[0] = thiscoord[0];
+                    prevcoord[1] = thiscoord[1];
+                    prevcoord[2] = thiscoord[2];
+                }
+                *lfp++ = thiscoord[0] * inv_precision;
+                *lfp++ = thiscoord[1] * inv_precision;
+                *lfp++ = thiscoord[2] * inv_precision;
+            }
+        } else {
+            *lfp++ = thiscoord[0] * inv_precision;
+            *lfp++ = thiscoord[1] * inv_precision;
+            *lfp++ = thiscoord[2] * inv_precision;
+        }
+        smallidx += is_smaller;
+        if (smallidx < FIRSTIDX || smallidx >= LASTIDX) {
+            bs.error = 1;
+            break;
+        }
+        if (is_smaller < 0) {
+            smallnum = smaller;
+            if (smallidx > FIRSTIDX)
+                smaller = magicints[smallidx - 1] / 2;
+            else
+                smaller = 0;
+        } else if (is_smaller > 0) {
+            smaller = smallnum;
+            smallnum = magicints[smallidx] / 2;
+        }
+        sizesmall[0] = sizesmall[1] = sizesmall[2] = magicints[smallidx];
+    }
+
+    PyBuffer_Release(&buffer);
+    if (bs.error) {
+        PyErr_SetString(PyExc_IOError, "XTC frame is corrupt");
+        return NULL;
+    }
+    /* opaque data is padded to a multiple of 4 bytes */
+    return PyLong_FromSsize_t(HEADERSIZE + ((bs.size + 3) / 4) * 4);
+}
+
+
+static PyObject *xtcencode(PyObject *self, PyObject *args, PyObject *kwargs) {
+
+    PyArrayObject *coords;
+    float precision = 1000;
+    static char *kwlist[] = {"coords", "precision", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!|f", kwlist,
+                                     &PyArray_Type, &coords, &precision))
+        return NULL;
+
+    if (PyArray_TYPE(coords) != NPY_FLOAT32 || PyArray_NDIM(coords) != 2 ||
+        PyArray_DIMS(coords)[1] != 3) {
+        PyErr_SetString(PyExc_ValueError,
+                        "coords must be a float32 array with shape "
+                        "(n_atoms, 3)");
+        return NULL;
+    }
+    if (precision <= 0)
+        precision = 1000;
+
+    coords = PyArray_GETCONTIGUOUS(coords);
+    long n_atoms = (long) PyArray_DIMS(coords)[0];
+    long size3 = n_atoms * 3;
+    const float *fp = (const float *) PyArray_DATA(coords);
+
+    int *ip = malloc(size3 * sizeof(int));
+    /* at most 12 bytes for a large coordinate, 9 bytes for a small one, and
+       6 bits for run-length per atom */
+    size_t size = n_atoms * 16 + 64;
+    unsigned char *data = calloc(HEADERSIZE + size, 1);
+    if (!ip || !data) {
+        free(ip);
+        free(data);
+        Py_DECREF(coords);
+        return PyErr_NoMemory();
+    }
+
+    int minint[3] = {INT_MAX, INT_MAX, INT_MAX};
+    int maxint[3] = {INT_MIN, INT_MIN, INT_MIN};
+    int mindiff = INT_MAX, oldlint[3] = {0, 0, 0}, lint, diff;
+    long i, k;
+    float lf;
+    int error = 0;
+
+    for (i = 0; i < size3; i++) {
+        /* find nearest integer */
+        if (fp[i] >= 0.0)
+            lf = fp[i] * precision + 0.5;
+        else
+            lf = fp[i] * precision - 0.5;
+        if (fabs(lf) > MAXABS)
+            /* scaling would cause overflow */
+            error = 1;
+        lint = (int) lf;
+        if (lint < minint[i % 3])
+            minint[i % 3] = lint;
+        if (lint > maxint[i % 3])
+            maxint[i % 3] = lint;
+        ip[i] = lint;
+        if (i % 3 == 2) {
+            diff = abs(oldlint[0] - ip[i - 2]) + abs(oldlint[1] - ip[i - 1]) +
+                   abs(oldlint[2] - lint);
+            if (diff < mindiff && i > 2)
+                mindiff = diff;
+            oldlint[0] = ip[i - 2];
+            oldlint[1] = ip[i - 1];
+            oldlint[2] = lint;
+        }
+    }
+    Py_DECREF(coords);
+
+    unsigned int sizeint[3], sizesmall[3], bitsizeint[3] = {0, 0, 0};
+    int bitsize;
+    for (i = 0; i < 3; i++) {
+        if ((float) maxint[i] - (float) minint[i] >= MAXABS)
+            /* turning value in unsigned by subtracting minint would cause
+               overflow */
+            error = 1;
+        sizeint[i] = maxint[i] - minint[i] + 1;
+    }
+    if (error) {
+        free(ip);
+        free(data);
+        PyErr_SetString(PyExc_ValueError,
+                        "coordinates are too large to be compressed with "
+                        "given precision");
+        return NULL;
+    }
+
+    /* check if one of the sizes is too big to be multiplied */
+    if ((sizeint[0] | sizeint[1] | sizeint[2]) > 0xffffff) {
+        bitsizeint[0] = sizeofint(sizeint[0]);
+        bitsizeint[1] = sizeofint(sizeint[1]);
+        bitsizeint[2] = sizeofint(sizeint[2]);
+        bitsize = 0; /* flag the use of large sizes */
+    } else
+        bitsize = sizeofints(3, sizeint);
+
+    int smallidx = FIRSTIDX, maxidx, minidx, tmp, smaller, smallnum, larger;
+    while (smallidx < LASTIDX - 1 && magicints[smallidx] < mindiff)
+        smallidx++;
+    tmp = smallidx + 8;
+    maxidx = (LASTIDX < tmp) ? LASTIDX : tmp;
+    minidx = maxidx - 8; /* often this equal smallidx */
+    tmp = smallidx - 1;
+    tmp = (FIRSTIDX > tmp) ? FIRSTIDX : tmp;
+    smaller = magicints[tmp] / 2;
+    smallnum = magicints[smallidx] / 2;
+    sizesmall[0] = sizesmall[1] = sizesmall[2] = magicints[smallidx];
+    larger = magicints[maxidx] / 2;
+
+    unsigned int prec, tmpcoord[30];
+    memcpy(&prec, &precision, sizeof(float));
+    writeInt(data, (int) prec);
+    for (i = 0; i < 3; i++) {
+        writeInt(data + 4 + 4 * i, minint[i]);
+        writeInt(data + 16 + 4 * i, maxint[i]);
+    }
+    writeInt(data + 28, smallidx);
+
+    bitstream bs = {NULL, 0, 0, 0, 0, 0};
+    bs.data = data + HEADERSIZE;
+    bs.size = size;
+
+    int *thiscoord, prevcoord[3] = {0, 0, 0}, is_small, is_smaller;
+    int run, prevrun = -1;
+    i = 0;
+    while (i < n_atoms && !bs.error) {
+        is_small = 0;
+        thiscoord = ip + i * 3;
+        if (smallidx < maxidx && i >= 1 &&
+            abs(thiscoord[0] - prevcoord[0]) < larger &&
+            abs(thiscoord[1] - prevcoord[1]) < larger &&
+            abs(thiscoord[2] - prevcoord[2]) < larger)
+            is_smaller = 1;
+        else if (smallidx > minidx)
+            is_smaller = -1;
+        else
+            is_smaller = 0;
+
+        if (i + 1 < n_atoms) {
+            if (abs(thiscoord[0] - thiscoord[3]) < smallnum &&
+                abs(thiscoord[1] - thiscoord[4]) < smallnum &&
+                abs(thiscoord[2] - thiscoord[5]) < smallnum) {
+                /* interchange first with second atom for better
+                   compression of water molecules */
+                tmp = thiscoord[0]; thiscoord[0] = thiscoord[3];
+                thiscoord[3] = tmp;
+                tmp = thiscoord[1]; thiscoord[1] = thiscoord[4];
+                thiscoord[4] = tmp;
+                tmp = thiscoord[2]; thiscoord[2] = thiscoord[5];
+                thiscoord[5] = tmp;
+                is_small = 1;
+            }
+        }
+        tmpcoord[0] = thiscoord[0] - minint[0];
+        tmpcoord[1] = thiscoord[1] - minint[1];
+        tmpcoord[2] = thiscoord[2] - minint[2];
+        if (bitsize == 0) {
+            sendbits(&bs, bitsizeint[0], tmpcoord[0]);
+            sendbits(&bs, bitsizeint[1], tmpcoord[1]);
+            sendbits(&bs, bitsizeint[2], tmpcoord[2]);
+        } else
+            sendints(&bs, 3, bitsize, sizeint, tmpcoord);
+
+        prevcoord[0] = thiscoord[0];
+        prevcoord[1] = thiscoord[1];
+        prevcoord[2] = thiscoord[2];
+        thiscoord = thiscoord + 3;
+        i++;
+
+        run = 0;
+        if (is_small == 0 && is_smaller == -1)
+            is_smaller = 0;
+        while (is_small && run < 8 * 3) {
+            if (is_smaller == -1 &&
+                ((thiscoord[0] - prevcoord[0]) * (thiscoord[0] - prevcoord[0]) +
+                 (thiscoord[1] - prevcoord[1]) * (thiscoord[1] - prevcoord[1]) +
+                 (thiscoord[2] - prevcoord[2]) * (thiscoord[2] - prevcoord[2])
+                 >= smaller * smaller))
+                is_smaller = 0;
+
+            tmpcoord[run++] = thiscoord[0] - prevcoord[0] + smallnum;
+            tmpcoord[run++] = thiscoord[1] - prevcoord[1] + smallnum;
+            tmpcoord[run++] = thiscoord[2] - prevcoord[2] + smallnum;
+
+            prevcoord[0] = thiscoord[0];
+            prevcoord[1] = thiscoord[1];
+            prevcoord[2] = thiscoord[2];
+
+            i++;
+            thiscoord = thiscoord + 3;
+            is_small = 0;
+            if (i < n_atoms &&
+                abs(thiscoord[0] - prevcoord[0]) < smallnum &&
+                abs(thiscoord[1] - prevcoord[1]) < smallnum &&
+                abs(thiscoord[2] - prevcoord[2]) < smallnum)
+                is_small = 1;
+        }
+        if (run != prevrun || is_smaller != 0) {
+            prevrun = run;
+            sendbits(&bs, 1, 1); /* flag the change in run-length */
+            sendbits(&bs, 5, run + is_smaller + 1);
+        } else
+            sendbits(&bs, 1, 0); /* flag that run-length did not change */
+
+        for (k = 0; k < run; k += 3)
+            sendints(&bs, 3, smallidx, sizesmall, &tmpcoord[k]);
+
+        if (is_smaller != 0) {
+            smallidx += is_smaller;
+            if (is_smaller == -1) {
+                smallnum = smaller;
+                smaller = magicints[smallidx - 1] / 2;
+            } else {
+                smaller = smallnum;
+                smallnum = magicints[smallidx] / 2;
+            }
+            sizesmall[0] = sizesmall[1] = sizesmall[2] = magicints[smallidx];
+        }
+    }
+    free(ip);
+    if (bs.error) {
+        free(data);
+        PyErr_SetString(PyExc_ValueError, "failed to compress coordinates");
+        return NULL;
+    }
+    if (bs.lastbits != 0)
+        bs.count++;
+    writeInt(data + 32, (int) bs.count);
+
+    /* opaque data is padded to a multiple of 4 bytes */
+    PyObject *result = PyBytes_FromStringAndSize(
+        (char *) data, HEADERSIZE + ((bs.count + 3) / 4) * 4);
+    free(data);
+    return result;
+}
+
+
+static PyMethodDef xtctools_methods[] = {
+
+    {"xtcdecode",  (PyCFunction)xtcdecode,
+     METH_VARARGS | METH_KEYWORDS,
+     "Decompress coordinates of an XTC frame from data, which starts with \n"
+     "precision, into coords, a float32 array with shape (n_atoms, 3).\n"
+     "Return number of bytes used, including padding."},
+
+    {"xtcencode",  (PyCFunction)xtcencode,
+     METH_VARARGS | METH_KEYWORDS,
+     "Return compressed XTC coordinate data for coords, a float32 array \n"
+     "with shape (n_atoms, 3), starting with precision and including \n"
+     "padding."},
+
+    {NULL, NULL, 0, NULL}
+};
+
+
+#if PY_MAJOR_VERSION >= 3
+
+static struct PyModuleDef xtctools = {
+        PyModuleDef_HEAD_INIT,
+        "xtctools",
+        "XTC coordinate compression tools.",
+        -1,
+        xtctools_methods,
+};
+PyMODINIT_FUNC PyInit_xtctools(void) {
+    import_array();
+    return PyModule_Create(&xtctools);
+}
+#else
+PyMODINIT_FUNC initxtctools(void) {
+
+    Py_InitModule3("xtctools", xtctools_methods,
+        "XTC coordinate compression tools.");
+
+    import_array();
+}
+#endif
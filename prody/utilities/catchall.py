@@ -75,7 +75,8 @@ def clusterMatrix(distance_matrix=None, similarity_matrix=None, labels=None, ret
     and linkage matrix (if **return_linkage** is **True**). Set ``similarity=True`` for clustering a similarity matrix
     
     :arg distance_matrix: an N-by-N matrix containing some measure of distance 
-         such as 1. - seqid_matrix, rmsds, or distances in PCA space
+         such as 1. - seqid_matrix, rmsds, or distances in PCA space, or its
+         condensed form, e.g. from :func:`.calcPairwiseRMSDs`
     :type similarity_matrix: :class:`~numpy.ndarray`
 
     :arg similarity_matrix: an N-by-N matrix containing some measure of similarity 
@@ -111,7 +112,11 @@ def clusterMatrix(distance_matrix=None, similarity_matrix=None, labels=None, ret
     else:
         matrix = distance_matrix
         
-    formatted_distance_matrix = spatial.distance.squareform(distance_matrix)
+    if np.ndim(distance_matrix) == 1:
+        formatted_distance_matrix = distance_matrix
+        matrix = spatial.distance.squareform(distance_matrix)
+    else:
+        formatted_distance_matrix = spatial.distance.squareform(distance_matrix)
     linkage_matrix = sch.linkage(formatted_distance_matrix, **kwargs)
     sorting_dendrogram = sch.dendrogram(linkage_matrix, orientation=orientation, labels=labels, no_plot=no_plot)
 
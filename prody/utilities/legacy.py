@@ -693,14 +693,10 @@ def refineEnsemble(ens, lower=.5, upper=10.):
     """Refine a PDB ensemble based on RMSD criterions.""" 
 
     from scipy.cluster.hierarchy import linkage, fcluster
-    from scipy.spatial.distance import squareform
     from collections import Counter
 
-    ### calculate pairwise RMSDs ###
-    RMSD = ens.getRMSDs(pairwise=True)
-
-    # convert the RMSD table to the compressed form
-    v = squareform(RMSD)
+    ### calculate pairwise RMSDs in the compressed form ###
+    v = ens.getRMSDs(pairwise=True, condensed=True)
 
     ### apply upper threshold ###
     Z_upper = linkage(v, method='complete')
@@ -82,6 +82,8 @@ PACKAGE_DATA = {
                     'datafiles/*.dat',
                     'datafiles/*.coo',
                     'datafiles/dcd*.dcd',
+                    'datafiles/xtc*.xtc',
+                    'datafiles/trr*.trr',
                     'datafiles/xml*.xml',
                     'datafiles/msa*',]
 }
@@ -112,6 +114,9 @@ EXTENSIONS = [
     Extension('prody.sequence.seqtools',
               [join('prody', 'sequence', 'seqtools.c'),],
               include_dirs=[numpy.get_include()]),
+    Extension('prody.trajectory.xtctools',
+              [join('prody', 'trajectory', 'xtctools.c'),],
+              include_dirs=[numpy.get_include()]),
 ]
 
 # extra arguments for compiling C++ extensions on MacOSX